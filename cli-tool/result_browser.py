@@ -0,0 +1,178 @@
+"""Paginated result browser for large scans in the interactive CLI.
+
+A questionary checkbox renders every match up front, which becomes unusable
+with thousands of files. The browser shows one page at a time and filters,
+sorts and selects with commands evaluated over a :class:`vtfr.filters.ResultSet`,
+so it stays responsive with 100k results.
+"""
+import re
+from pathlib import Path
+from typing import List, Optional
+
+from colorama import Fore, Style  # type: ignore
+
+from vtfr.filters import FilterError, ResultSet
+from vtfr.report import display_folder, format_file_size
+
+PAGE_SIZE = 20
+
+HELP = f"""{Style.BRIGHT}Commands{Style.RESET_ALL}
+  n / p                 next / previous page
+  g N                   go to page N
+  f EXPR                filter the list (f alone clears the filter)
+  sort KEY [desc]       sort by name, path, size, modified or owner
+  owners                space per owner of the listed rows (scans that looked up owners)
+  s [ROWS|EXPR]         select rows such as 1-20,25, rows matching EXPR, or (alone) every listed row
+  u [ROWS|EXPR]         deselect, same arguments as s
+  i                     invert the selection of the listed rows
+  done                  delete the selected files
+  q                     cancel
+
+{Style.BRIGHT}Filter terms{Style.RESET_ALL} (all must match, prefix with ! to negate)
+  *.~vsdx  name:GLOB  path:GLOB  owner:GLOB  re:REGEX  size>1MB  age>30d  orphan"""
+
+_ROWS = re.compile(r'^[\d,\s-]+$')
+
+
+class ResultBrowser:
+    """Interactive, paginated selection over scan records."""
+
+    def __init__(self, records: List[dict], base_directory: Path, page_size: int = PAGE_SIZE):
+        self.results = ResultSet(records)
+        self.base = str(base_directory)
+        self.page_size = page_size
+        self.selected = bytearray(len(self.results))
+        self.selected_count = 0
+        self.selected_size = 0
+        self.expression = ""
+        self.sort_key = None
+        self.descending = False
+        self.view = list(range(len(self.results)))
+        self.page = 0
+
+    def _refresh_view(self):
+        view = self.results.filter(self.expression)
+        if self.sort_key:
+            view = self.results.sort(view, self.sort_key, self.descending)
+        self.view = view
+        self.page = 0
+
+    def _pages(self) -> int:
+        return max(1, -(-len(self.view) // self.page_size))
+
+    def _mark(self, rows, value: int):
+        sizes = self.results.sizes
+        for i in rows:
+            if self.selected[i] != value:
+                self.selected[i] = value
+                delta = 1 if value else -1
+                self.selected_count += delta
+                self.selected_size += delta * sizes[i]
+
+    def _rows_from_numbers(self, text: str) -> List[int]:
+        """View positions like '1-20,25' (as numbered on screen) to row indices."""
+        rows = []
+        for part in text.replace(" ", "").split(","):
+            if not part:
+                continue
+            first, _, last = part.partition("-")
+            start, end = int(first), int(last or first)
+            for number in range(max(1, start), min(len(self.view), end) + 1):
+                rows.append(self.view[number - 1])
+        return rows
+
+    def _target_rows(self, argument: str) -> List[int]:
+        if not argument:
+            return self.view
+        if _ROWS.match(argument):
+            return self._rows_from_numbers(argument)
+        return self.results.filter(argument, self.view)
+
+    def render(self):
+        results = self.results
+        start = self.page * self.page_size
+        print(f"\n{Style.BRIGHT}Page {self.page + 1}/{self._pages()}{Style.RESET_ALL}  "
+              f"{len(self.view)} of {len(results)} listed  |  "
+              f"{Fore.GREEN}{self.selected_count} selected ({format_file_size(self.selected_size)}){Style.RESET_ALL}")
+        if self.expression or self.sort_key:
+            order = f"{self.sort_key}{' desc' if self.descending else ''}" if self.sort_key else "scan order"
+            print(f"{Fore.CYAN}Filter: {self.expression or '(none)'}  Sort: {order}{Style.RESET_ALL}")
+        for number, i in enumerate(self.view[start:start + self.page_size], start=start + 1):
+            mark = f"{Fore.GREEN}[x]{Style.RESET_ALL}" if self.selected[i] else "[ ]"
+            orphan = f" {Fore.YELLOW}orphan{Style.RESET_ALL}" if results.orphans[i] else ""
+            owner = f" {Fore.CYAN}{results.owners[i]}{Style.RESET_ALL}" if results.owners[i] else ""
+            folder = display_folder(str(Path(results.paths[i]).parent), self.base)
+            print(f"{mark} {number:>6}  {results.names[i]:<36.36} {format_file_size(results.sizes[i]):>10}  "
+                  f"{results.records[i].get('LastModified', '')}  {folder}{owner}{orphan}")
+        if not self.view:
+            print(f"{Fore.YELLOW}No files match the filter.{Style.RESET_ALL}")
+
+    def render_owners(self):
+        """Files and bytes per owner of the listed rows, largest first."""
+        owners, sizes = self.results.owners, self.results.sizes
+        totals = {}
+        for i in self.view:
+            bucket = totals.setdefault(owners[i] or "(unknown)", [0, 0])
+            bucket[0] += 1
+            bucket[1] += sizes[i]
+        for owner, (files, size) in sorted(totals.items(), key=lambda item: item[1][1], reverse=True):
+            print(f"  {format_file_size(size):>10}  {files:>7} file(s)  {owner}")
+
+    def handle(self, line: str) -> Optional[bool]:
+        """Run one command. Returns True when done, False when cancelled, None to keep going."""
+        command, _, argument = line.strip().partition(" ")
+        command = command.lower()
+        argument = argument.strip()
+        if command in ("", "n"):
+            self.page = min(self.page + 1, self._pages() - 1)
+        elif command == "p":
+            self.page = max(self.page - 1, 0)
+        elif command == "g":
+            self.page = min(max(int(argument) - 1, 0), self._pages() - 1)
+        elif command == "f":
+            self.expression = argument
+            self._refresh_view()
+        elif command == "sort":
+            key, _, direction = argument.partition(" ")
+            self.results.sort_keys(key)  # Validates the key
+            self.sort_key, self.descending = key, direction.strip().lower() == "desc"
+            self._refresh_view()
+        elif command == "s":
+            self._mark(self._target_rows(argument), 1)
+        elif command == "u":
+            self._mark(self._target_rows(argument), 0)
+        elif command == "owners":
+            self.render_owners()
+            return None
+        elif command == "i":
+            selected = [i for i in self.view if self.selected[i]]
+            self._mark(self.view, 1)
+            self._mark(selected, 0)
+        elif command in ("done", "d"):
+            return True
+        elif command == "q":
+            return False
+        else:
+            print(HELP)
+            return None
+        self.render()
+        return None
+
+    def run(self) -> Optional[List[Path]]:
+        """Browse until the user finishes; returns the selected paths, or None if cancelled."""
+        print(f"{Fore.CYAN}{len(self.results)} files found. Type ? for help.{Style.RESET_ALL}")
+        self.render()
+        while True:
+            try:
+                line = input(f"{Style.BRIGHT}browse>{Style.RESET_ALL} ")
+            except EOFError:
+                return None
+            try:
+                result = self.handle(line)
+            except (FilterError, ValueError) as e:
+                print(f"{Fore.RED}{e}{Style.RESET_ALL}")
+                continue
+            if result is True:
+                return [Path(self.results.paths[i]) for i in range(len(self.results)) if self.selected[i]]
+            if result is False:
+                return None
@@ -1,19 +1,44 @@
+import argparse
+import asyncio
+import contextlib
 import json
+import multiprocessing
 import os
 import subprocess
+import time
 import platform
 import sys
 import re
 from pathlib import Path
-from typing import List, Union  # For Python 3.6 compatibility
+from typing import Iterable, List, Optional, Union  # For Python 3.6 compatibility
 
 import questionary # type: ignore
 from questionary import Choice # type: ignore
 from colorama import Fore, Style, init, deinit  # type: ignore
 init()  # Initialize colorama
 
+# Make the shared vtfr package in the project root importable
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from vtfr.quarantine import find_batch, holding_dir, list_batches, purge_batches, quarantine_files, restore_batch  # noqa: E402
+from vtfr.report import aggregate, display_folder, format_file_size  # noqa: E402
+from vtfr.checkpoint import ScanCheckpoint  # noqa: E402
+from vtfr.companion import is_orphan  # noqa: E402
+from vtfr.export import FORMATS, export_records, export_scan  # noqa: E402
+from vtfr.journal import STATUS_CODES, DeletionJournal, query_journal, summarize  # noqa: E402
+from vtfr.manifest import count_manifest, iter_manifest  # noqa: E402
+from vtfr import core  # noqa: E402
+from vtfr.ratelimit import RateLimiter, describe_rate, profile_names  # noqa: E402
+from vtfr.resultstore import ResultStore  # noqa: E402
+from vtfr.scanner import ENGINES  # noqa: E402
+from vtfr.settings import SettingsError, SettingsWatcher  # noqa: E402
+from vtfr.snapshot import diff_snapshots, list_snapshots, read_header, save_snapshot, snapshot_dir  # noqa: E402
+from result_browser import ResultBrowser  # noqa: E402
+
 # Constants
 SCRIPT_TIMEOUT = 30  # 30 seconds timeout for PowerShell scripts
+REPORT_TOP_N = 10  # Number of heaviest folders/extensions shown in the summary
+CONSOLE_LIST_LIMIT = 20  # Longer deleted/failed lists are summarized; the journal has every file
+CHECKBOX_LIMIT = 200  # Larger scans are selected in the result browser instead of a checkbox list
 
 def resource_path(relative_path):
     """Get absolute path to resource, works for dev and for PyInstaller"""
@@ -52,51 +77,30 @@ def _normalize_input_path(text: str) -> str:
 
 CONFIG_FILE_PATH = resource_path('config.json')
 
-def load_config():
-    """Loads configuration from config.json"""
+def _config_reloaded(settings):
+    print(f"\n{Fore.CYAN}Reloaded configuration from {settings.source}{Style.RESET_ALL}")
+    for pattern in settings.ignored_patterns:
+        print(f"{Fore.YELLOW}Warning: Ignoring potentially unsafe pattern: {pattern}{Style.RESET_ALL}")
+
+def _config_reload_failed(error):
+    print(f"\n{Fore.YELLOW}Warning: Keeping the previous configuration: {error}{Style.RESET_ALL}")
+
+def load_config() -> SettingsWatcher:
+    """Loads configuration from config.json; the watcher picks up later edits between scans"""
     try:
-        with open(CONFIG_FILE_PATH, 'r', encoding='utf-8') as f:
-            config_data = json.load(f)
-        # Basic validation
-        if not isinstance(config_data.get('temp_file_patterns'), list):
-            raise ValueError("'temp_file_patterns' must be a list in config.json")
-        default_path = config_data.get('default_scan_path')
-        if not isinstance(default_path, str) and default_path is not None and default_path != "":
-            raise ValueError("'default_scan_path' must be a string or empty in config.json")
-        if not config_data.get('powershell_scripts_path'):
-            raise ValueError("'powershell_scripts_path' must be defined in config.json")
-        
-        # Validate pattern safety
-        safe_patterns = []
-        for pattern in config_data.get('temp_file_patterns', []):
-            # Only allow safe characters in patterns
-            if re.match(r'^[~$*.A-Za-z0-9\-_]+
-            else:
-                print(f"{Fore.YELLOW}Warning: Ignoring potentially unsafe pattern: {pattern}{Style.RESET_ALL}")
-        
-        if not safe_patterns:
-            raise ValueError("No valid file patterns found in configuration")
-        
-        config_data['temp_file_patterns'] = safe_patterns
-        return config_data
-    except FileNotFoundError:
-        print(f"{Fore.RED}Error: Configuration file not found at {CONFIG_FILE_PATH}{Style.RESET_ALL}")
-        sys.exit(1)
-    except json.JSONDecodeError:
-        print(f"{Fore.RED}Error: Could not decode JSON from {CONFIG_FILE_PATH}{Style.RESET_ALL}")
-        sys.exit(1)
-    except ValueError as ve:
-        print(f"{Fore.RED}Error in configuration: {ve}{Style.RESET_ALL}")
+        watcher = SettingsWatcher(CONFIG_FILE_PATH, on_reload=_config_reloaded, on_error=_config_reload_failed)
+    except SettingsError as e:
+        print(f"{Fore.RED}Error in configuration: {e}{Style.RESET_ALL}")
         sys.exit(1)
-    return None # Should not be reached if sys.exit works
+    for pattern in watcher.current().ignored_patterns:
+        print(f"{Fore.YELLOW}Warning: Ignoring potentially unsafe pattern: {pattern}{Style.RESET_ALL}")
+    return watcher
 
-config = load_config()
-if config is None: # Should have exited, but as a safeguard
-    sys.exit("Failed to load configuration.")
+SETTINGS = load_config()
+_settings = SETTINGS.current()
 
-TEMP_PATTERNS = config['temp_file_patterns']
-DEFAULT_DIR = config.get('default_scan_path', '') # Use .get for safety, provide default
-SCRIPTS_DIR = resource_path(config["powershell_scripts_path"])
+TEMP_PATTERNS = list(_settings.patterns)  # As loaded at start-up; scans read SETTINGS.current()
+SCRIPTS_DIR = resource_path(_settings.scripts_path)
 SCAN_SCRIPT_PATH = SCRIPTS_DIR / 'Scan-VisioTempFiles.ps1'
 REMOVE_SCRIPT_PATH = SCRIPTS_DIR / 'Remove-VisioTempFiles.ps1'
 
@@ -127,22 +131,23 @@ def get_directory_to_scan():
     Returns a Path object if a directory is selected, or None if the user cancels/exits.
     """
     while True:
-        default_path_obj = Path(DEFAULT_DIR) if DEFAULT_DIR else None
+        default_dir = SETTINGS.current().default_root  # Picks up edits to config.json between scans
+        default_path_obj = Path(default_dir) if default_dir else None
         default_path_valid = default_path_obj.is_dir() if default_path_obj else False
 
         choices = []
         if default_path_valid and default_path_obj:
-            choices.append(Choice(title=f"Default: {DEFAULT_DIR}", value="default"))
+            choices.append(Choice(title=f"Default: {default_dir}", value="default"))
         choices.append(Choice(title="Enter custom directory path", value="custom"))
         choices.append(Choice(title="Exit program", value="exit"))
 
         selection_prompt_message = "Select an option for the directory to scan:"
-        if DEFAULT_DIR and not default_path_valid:
+        if default_dir and not default_path_valid:
             selection_prompt_message = (
-                f"{Fore.YELLOW}Configured default directory '{DEFAULT_DIR}' is invalid or not accessible.{Style.RESET_ALL}\n"
+                f"{Fore.YELLOW}Configured default directory '{default_dir}' is invalid or not accessible.{Style.RESET_ALL}\n"
                 "Select an option:"
             )
-        elif not DEFAULT_DIR:
+        elif not default_dir:
              selection_prompt_message = (
                 f"{Fore.YELLOW}No default directory configured.{Style.RESET_ALL}\n"
                 "Select an option:"
@@ -156,7 +161,7 @@ def get_directory_to_scan():
 
         if action == "default":
             if default_path_valid and default_path_obj:
-                print(f"{Fore.GREEN}Using default directory: {DEFAULT_DIR}{Style.RESET_ALL}")
+                print(f"{Fore.GREEN}Using default directory: {default_dir}{Style.RESET_ALL}")
                 return default_path_obj.resolve()
             else:
                 print(f"{Fore.RED}Error: Default directory was selected but is invalid or not configured.{Style.RESET_ALL}")
@@ -189,8 +194,34 @@ def get_directory_to_scan():
             continue
     return None # Should be unreachable
 
-def find_temp_files(directory: Path, patterns: List[str]) -> List[Path]:
-    """Find files using the Scan-VisioTempFiles.ps1 PowerShell script."""
+def _rate_profile(name: Optional[str] = None):
+    """Resolve a rate profile ('auto' is decided by the current time) and say when it limits I/O."""
+    profile = SETTINGS.current().profile(name)
+    if profile.listings_per_second or profile.unlinks_per_second:
+        listings = f"{profile.listings_per_second:g}" if profile.listings_per_second else "unlimited"
+        unlinks = f"{profile.unlinks_per_second:g}" if profile.unlinks_per_second else "unlimited"
+        print(f"{Fore.CYAN}Rate profile '{profile.name}': {listings} listings/s, {unlinks} unlinks/s{Style.RESET_ALL}")
+    return profile
+
+def find_temp_file_records(directory: Path, patterns: List[str], engine: Optional[str] = None,
+                           workers: Optional[int] = None, resume: bool = False,
+                           rate_profile: Optional[str] = None, into: Optional[ResultStore] = None,
+                           owners: Optional[bool] = None) -> List[dict]:
+    """Scan for temp files and return their records.
+
+    Each record has the shape of the scan script's JSON objects (FullName, Name, Directory,
+    LastModified, Size). ``engine`` selects the Scan-VisioTempFiles.ps1 PowerShell script
+    ("powershell") or the native Python walkers ("threads" or "processes"). Native scans
+    checkpoint their progress; ``resume`` continues an interrupted scan of the same directory.
+    Native scans also honour the ``rate_profile`` listing limit, and stream their records
+    into ``into`` (returned instead of a list) when it is given. ``owners`` adds each file's
+    owner (default from config.json); only the native engines look owners up.
+    """
+    engine = engine or SETTINGS.current().scan_engine
+    if engine != 'powershell':
+        return _find_temp_file_records_native(directory, patterns, engine, workers, resume, rate_profile, into,
+                                              owners)
+
     if not SCAN_SCRIPT_PATH.is_file():
         print(f"{Fore.RED}Error: Scan script not found at {SCAN_SCRIPT_PATH}{Style.RESET_ALL}")
         return []
@@ -205,7 +236,7 @@ def find_temp_files(directory: Path, patterns: List[str]) -> List[Path]:
     # Validate each pattern for safety
     safe_patterns = []
     for pattern in patterns:
-        if re.match(r^[~$*.A-Za-z0-9\-_]+$, pattern):
+        if re.match(r'^[~$*.A-Za-z0-9\-_]+$', pattern):
             safe_patterns.append(pattern)
         else:
             print(f"{Fore.YELLOW}Warning: Skipping potentially unsafe pattern: {pattern}{Style.RESET_ALL}")
@@ -253,13 +284,19 @@ def find_temp_files(directory: Path, patterns: List[str]) -> List[Path]:
         try:
             result_data = json.loads(completed.stdout.strip())
             
+            # A single match comes back as an object rather than an array
+            if isinstance(result_data, dict):
+                result_data = [result_data]
+            elif not isinstance(result_data, list):
+                result_data = []
+
             # If we got an empty array, it means no files were found
-            if isinstance(result_data, list) and len(result_data) == 0:
+            if len(result_data) == 0:
                 return []
                 
-            found_files = [Path(item['FullName']) for item in result_data if isinstance(item, dict) and 'FullName' in item]
-            print(f"{Fore.GREEN}Found {len(found_files)} temporary Visio files.{Style.RESET_ALL}")
-            return sorted(found_files)
+            records = [item for item in result_data if isinstance(item, dict) and 'FullName' in item]
+            print(f"{Fore.GREEN}Found {len(records)} temporary Visio files.{Style.RESET_ALL}")
+            return records
         except json.JSONDecodeError as e:
             print(f"{Fore.RED}Error parsing scan JSON: {e}{Style.RESET_ALL}")
             print(f"{Fore.MAGENTA}Raw STDOUT:\n{completed.stdout.strip()}{Style.RESET_ALL}")
@@ -280,12 +317,111 @@ def find_temp_files(directory: Path, patterns: List[str]) -> List[Path]:
         return []
     return [] # Fallback
 
-def select_files_for_deletion(file_list: List[Path], base_directory: Path) -> List[Path]:
-    """Prompt user to select files to delete."""
+def _find_temp_file_records_native(directory: Path, patterns: List[str], engine: str,
+                                   workers: Optional[int] = None, resume: bool = False,
+                                   rate_profile: Optional[str] = None, into: Optional[ResultStore] = None,
+                                   owners: Optional[bool] = None) -> List[dict]:
+    """Scan with the asyncio core engine instead of PowerShell."""
+    settings = SETTINGS.current()
+    owners = settings.owners if owners is None else owners
+    checkpoint = ScanCheckpoint(str(directory), patterns, owners=owners, follow_links=settings.follow_links)
+    if checkpoint.exists():
+        if resume:
+            info = checkpoint.describe()
+            print(f"{Fore.CYAN}Resuming scan saved at {info['saved_at']}: {info['hits']} files found, "
+                  f"{info['pending']} folders left.{Style.RESET_ALL}")
+        else:
+            checkpoint.discard()  # Start over; the previous run is not being resumed
+    print(f"{Fore.CYAN}Running native {engine} scan for {directory} with patterns {','.join(patterns)}{Style.RESET_ALL}")
+    limiter = RateLimiter(_rate_profile(rate_profile).listings_per_second)
+    try:
+        records = core.scan_sync(str(directory), patterns, into, engine=engine, list_concurrency=workers,
+                                 checkpoint=checkpoint, limiter=limiter,
+                                 follow_links=settings.follow_links, owners=owners,
+                                 match=settings.match if list(patterns) == list(settings.patterns) else None)
+    except OSError as e:
+        print(f"{Fore.RED}Error: Could not scan {directory}: {e}{Style.RESET_ALL}")
+        return into if into is not None else []
+    except KeyboardInterrupt:
+        print(f"\n{Fore.YELLOW}Scan interrupted. Progress was saved; run again with --resume to continue.{Style.RESET_ALL}")
+        raise
+    print(f"{Fore.CYAN}{describe_rate(limiter, 'folder listings')}{Style.RESET_ALL}")
+    if records:
+        print(f"{Fore.GREEN}Found {len(records)} temporary Visio files.{Style.RESET_ALL}")
+    return records
+
+def find_temp_files(directory: Path, patterns: List[str], engine: Optional[str] = None,
+                    workers: Optional[int] = None) -> List[Path]:
+    """Find files using the Scan-VisioTempFiles.ps1 PowerShell script or a native walker."""
+    return sorted(Path(record['FullName']) for record in find_temp_file_records(directory, patterns, engine, workers))
+
+def scan_results(directory: Path, patterns: List[str], engine: Optional[str] = None, workers: Optional[int] = None,
+                 resume: bool = False, rate_profile: Optional[str] = None,
+                 owners: Optional[bool] = None) -> ResultStore:
+    """Scan into a ResultStore, which spills sorted runs to disk past the configured result_memory_limit."""
+    store = ResultStore(SETTINGS.current().result_memory_limit)
+    try:
+        records = find_temp_file_records(directory, patterns, engine, workers, resume, rate_profile, into=store,
+                                         owners=owners)
+        if records is not store:
+            store.extend(records)  # The PowerShell engine returns every record at once
+    except BaseException:
+        store.close()  # Remove the runs spilled before the scan failed or was interrupted
+        raise
+    return store
+
+def print_reclaim_summary(records: Iterable[dict], base_directory: Path, top_n: int = REPORT_TOP_N):
+    """Print reclaimable bytes for the heaviest folders and extensions, and owners when the scan looked them up."""
+    report = aggregate(records, base_directory, top_n)
+    print(f"\n{Style.BRIGHT}Reclaimable space:{Style.RESET_ALL} {format_file_size(report.total_size)} in {report.total_files} file(s)")
+    if report.orphan_files:
+        print(f"{Fore.YELLOW}Orphans (source document gone):{Style.RESET_ALL} {format_file_size(report.orphan_size)} in {report.orphan_files} file(s)")
+    if report.folders:
+        print(f"{Fore.CYAN}Heaviest folders:{Style.RESET_ALL}")
+        for entry in report.folders:
+            folder = display_folder(entry.key, report.root)
+            print(f"  {format_file_size(entry.size):>10}  {entry.files:>7} file(s)  {folder}")
+    if report.extensions:
+        print(f"{Fore.CYAN}By extension:{Style.RESET_ALL}")
+        for entry in report.extensions:
+            print(f"  {format_file_size(entry.size):>10}  {entry.files:>7} file(s)  {entry.key}")
+    if report.owners:
+        print(f"{Fore.CYAN}By owner:{Style.RESET_ALL}")
+        for entry in report.owners:
+            print(f"  {format_file_size(entry.size):>10}  {entry.files:>7} file(s)  {entry.key}")
+    print()
+
+def select_files_for_deletion(file_list: List[Path], base_directory: Path,
+                              orphans: Optional[set] = None, records: Optional[List[dict]] = None) -> List[Path]:
+    """Prompt user to select files to delete.
+
+    ``orphans`` holds the path strings of temp files whose source document is gone;
+    when there are any, the user can select all of them in one step. With more than
+    CHECKBOX_LIMIT files the scan ``records`` are opened in the paginated result browser.
+    Selections that need sign-off first are better exported and applied later with the
+    apply-manifest command, which skips files that changed in between.
+    """
     if not file_list:
         print(f"{Fore.GREEN}No Visio temp files found.{Style.RESET_ALL}")
         return []
-    
+
+    orphans = orphans or set()
+    if orphans:
+        mode = questionary.select(
+            "How do you want to select files?",
+            choices=[
+                Choice(title=f"Select orphans only ({len(orphans)} file(s) whose source document is gone)", value="orphans"),
+                Choice(title="Choose files individually", value="pick"),
+            ],
+        ).ask()
+        if mode is None:
+            return []
+        if mode == "orphans":
+            return [f_path for f_path in file_list if str(f_path) in orphans]
+
+    if records and len(file_list) > CHECKBOX_LIMIT:
+        return ResultBrowser(records, base_directory).run() or []
+
     choices = []
     for f_path in file_list:
         try:
@@ -293,6 +429,8 @@ def select_files_for_deletion(file_list: List[Path], base_directory: Path) -> Li
         except ValueError:
             rel_parent = f_path.parent # Fallback to absolute if not under base_directory
         display = f"{f_path.name} (in {rel_parent})"
+        if str(f_path) in orphans:
+            display += " [orphan]"
         choices.append(Choice(title=display, value=str(f_path))) # Store as string for Q
         
     selected_str_paths = questionary.checkbox(
@@ -303,14 +441,66 @@ def select_files_for_deletion(file_list: List[Path], base_directory: Path) -> Li
     
     return [Path(p) for p in selected_str_paths] if selected_str_paths else []
 
-def delete_files(selected_paths: List[Path]):
-    """Delete selected files using direct PowerShell commands similar to the web UI's approach."""
-    if not selected_paths:
+def _open_journal() -> Optional[DeletionJournal]:
+    """Open the deletion journal, warning (but carrying on) if it is not writable."""
+    try:
+        return DeletionJournal()
+    except OSError as e:
+        print(f"{Fore.YELLOW}Warning: Deletion journal unavailable, outcomes will not be recorded: {e}{Style.RESET_ALL}")
+        return None
+
+def _print_path_list(title: str, lines: List[str], color: str):
+    """Print a list of outcome lines, truncated to CONSOLE_LIST_LIMIT entries."""
+    if not lines:
+        return
+    print(f"{color}{title}{Style.RESET_ALL}")
+    for line in lines[:CONSOLE_LIST_LIMIT]:
+        print(f"  - {line}")
+    if len(lines) > CONSOLE_LIST_LIMIT:
+        print(f"  ... and {len(lines) - CONSOLE_LIST_LIMIT} more (see the deletion journal)")
+
+def quarantine_selected_files(selected_paths: List[Path], base_directory: Path, sizes: Optional[dict] = None):
+    """Move selected files into a dated batch of the scan root's quarantine holding area."""
+    confirm = questionary.confirm(
+        f"Move {len(selected_paths)} selected file(s) to quarantine? (They can be restored later.)"
+    ).ask()
+    if not confirm:
+        print(f"{Fore.YELLOW}Quarantine cancelled by user.{Style.RESET_ALL}")
         return
 
-    if not validate_powershell_available():
-        print(f"{Fore.RED}Error: PowerShell is not available on this system.{Style.RESET_ALL}")
+    print(f"{Fore.YELLOW}Moving {len(selected_paths)} files to quarantine...{Style.RESET_ALL}")
+    journal = _open_journal()
+    try:
+        settings = SETTINGS.current()
+        result = quarantine_files(selected_paths, base_directory, sizes, journal, settings.quarantine_dir,
+                                  settings.protected_prefixes, settings.match)
+    except OSError as e:
+        print(f"{Fore.RED}Error: Could not create the quarantine folder: {e}{Style.RESET_ALL}")
         return
+    finally:
+        if journal:
+            journal.close()
+
+    _print_path_list("\nFailed to quarantine:", [f"{path}: {error}" for path, error in result.failed], Fore.RED)
+    print(f"\n{Style.BRIGHT}Summary:{Style.RESET_ALL} {len(result.moved)} quarantined, {len(result.failed)} failed.")
+    if result.batch:
+        print(f"Quarantine batch: {result.batch}\n")
+
+def delete_files(selected_paths: List[Path], base_directory: Optional[Path] = None,
+                 sizes: Optional[dict] = None, quarantine: bool = False, rate_profile: Optional[str] = None):
+    """Delete selected files with the asyncio core engine.
+
+    Every outcome is appended to the deletion journal. ``base_directory`` is recorded as the
+    scan root and ``sizes`` maps path strings to sizes in bytes (from the scan records). With
+    ``quarantine`` the files are moved to the holding area instead of being deleted. Unlinks
+    are capped by the ``rate_profile`` limit.
+    """
+    if not selected_paths:
+        return
+    if quarantine:
+        quarantine_selected_files(selected_paths, base_directory or Path(selected_paths[0]).parent, sizes)
+        return
+    root = str(base_directory) if base_directory else ""
 
     confirm_delete = questionary.confirm(
         f"Are you sure you want to delete {len(selected_paths)} selected file(s)?"
@@ -319,516 +509,408 @@ def delete_files(selected_paths: List[Path]):
         print(f"{Fore.YELLOW}Deletion cancelled by user.{Style.RESET_ALL}")
         return
 
-    # Validate that all files exist before attempting deletion
-    invalid_paths = [p for p in selected_paths if not p.is_file()]
-    if invalid_paths:
-        print(f"{Fore.RED}Error: The following files don't exist or are not accessible:{Style.RESET_ALL}")
-        for p in invalid_paths:
-            print(f"  - {p}")
-        if not questionary.confirm("Continue with deleting only valid files?").ask():
-            print(f"{Fore.YELLOW}Deletion cancelled by user.{Style.RESET_ALL}")
-            return
-        # Filter out invalid paths
-        selected_paths = [p for p in selected_paths if p.is_file()]
-        if not selected_paths:
-            print(f"{Fore.YELLOW}No valid files remaining to delete.{Style.RESET_ALL}")
-            return
-
-    # Collect paths as strings
-    file_paths = [str(p) for p in selected_paths]
-    
-    # Simplify quote escaping for PS single-quoted paths
-    quoted_paths = [f"'{path.replace("'", "''")}'" for path in file_paths]
-    
-    # Build a PowerShell command that pipelines the paths through ForEach-Object
-    # This is similar to what the web UI does which works successfully
-    ps_command = f"""
-    $filesToDelete = @({','.join(quoted_paths)})
-    $results = @{{
-        deleted = @()
-        failed = @()
-    }}
-    
-    foreach ($file in $filesToDelete) {{
-        try {{
-            if (Test-Path -LiteralPath $file -PathType Leaf) {{
-                Remove-Item -LiteralPath $file -Force -ErrorAction Stop
-                $results.deleted += $file
-                Write-Host "Deleted: $file" -ForegroundColor Green
-            }} else {{
-                $results.failed += @{{ Path = $file; Error = "File not found or is not a regular file." }}
-                Write-Host "Not found: $file" -ForegroundColor Yellow
-            }}
-        }} catch {{
-            $results.failed += @{{ Path = $file; Error = $_.Exception.Message }}
-            Write-Host "Error: $file - $($_.Exception.Message)" -ForegroundColor Red
-        }}
-    }}
-    
-    # Return results as JSON for parsing (no preamble)
-    $results | ConvertTo-Json -Depth 3
-    """
-    
-    print(f"{Fore.YELLOW}Executing PowerShell delete command for {len(file_paths)} files...{Style.RESET_ALL}")
-    
+    print(f"{Fore.YELLOW}Deleting {len(selected_paths)} files...{Style.RESET_ALL}")
+    limiter = RateLimiter(_rate_profile(rate_profile).unlinks_per_second)
+    journal = _open_journal()
     try:
-        completed = subprocess.run(
-            [resolve_powershell_cmd(), "-NoProfile", "-ExecutionPolicy", "Bypass", "-Command", ps_command],
-            capture_output=True,
-            text=True,
-            check=False,
-            encoding='utf-8',
-            timeout=SCRIPT_TIMEOUT
-        )
-        
-        # Process any standard error output
-        if completed.stderr and completed.stderr.strip():
-            print(f"{Fore.RED}PowerShell error output:{Style.RESET_ALL}\n{Fore.YELLOW}{completed.stderr.strip()}{Style.RESET_ALL}")
-        
-        # Try to parse JSON results if available
-        try:
-            json_str = completed.stdout.strip()
-            result_data = json.loads(json_str)
-            
-            deleted = result_data.get('deleted', [])
-            failed = result_data.get('failed', [])
-            
-            if deleted:
-                print(f"{Fore.GREEN}Successfully deleted:{Style.RESET_ALL}")
-                for path in deleted:
-                    print(f"  - {path}")
-            
-            if failed:
-                print(f"\n{Fore.RED}Failed to delete:{Style.RESET_ALL}")
-                for item in failed:
-                    if isinstance(item, dict):
-                        print(f"  - {item.get('Path', 'Unknown')}: {item.get('Error', 'Unknown error')}")
-                    else:
-                        print(f"  - {item}: Unknown error")
-            
-            print(f"\n{Style.BRIGHT}Summary:{Style.RESET_ALL} {len(deleted)} deleted, {len(failed)} failed.\n")
-        except json.JSONDecodeError:
-            # If JSON parsing fails, just show the raw output
-            print(f"{Fore.RED}Could not parse JSON results. Raw PowerShell output:{Style.RESET_ALL}")
-            print(completed.stdout)
-            
-    except subprocess.TimeoutExpired:
-        print(f"{Fore.RED}Error: PowerShell command timed out after {SCRIPT_TIMEOUT} seconds.{Style.RESET_ALL}")
-    except subprocess.SubprocessError as e:
-        print(f"{Fore.RED}Unexpected subprocess error running delete command: {e}{Style.RESET_ALL}")
-    except Exception as e:
-        print(f"{Fore.RED}Unexpected error running delete command: {e}{Style.RESET_ALL}")
+        outcomes = core.delete_sync(selected_paths, root=root, sizes=sizes, journal=journal, limiter=limiter,
+                                    protected=SETTINGS.current().protected_prefixes,
+                                    match=SETTINGS.current().match)
+    finally:
+        if journal:
+            journal.close()
+
+    deleted = [o.path for o in outcomes if o.status == 'deleted']
+    failed_lines = [f"{o.path}: {o.error}" for o in outcomes if o.status != 'deleted']
+    _print_path_list("Successfully deleted:", deleted, Fore.GREEN)
+    _print_path_list("\nFailed to delete:", failed_lines, Fore.RED)
+
+    print(f"\n{Style.BRIGHT}Summary:{Style.RESET_ALL} {len(deleted)} deleted, {len(failed_lines)} failed.")
+    retried = sum(1 for o in outcomes if o.attempts > 1 and o.status == 'deleted')
+    if retried:
+        print(f"{Fore.CYAN}{retried} file(s) were deleted after retrying transient share errors.{Style.RESET_ALL}")
+    print(f"{Fore.CYAN}{describe_rate(limiter, 'unlinks')}{Style.RESET_ALL}\n")
+
+def delete_spilled_results(results: ResultStore, base_directory: Path, quarantine: bool = False,
+                           rate_profile: Optional[str] = None):
+    """Delete all files or all orphans of a scan too large to keep in memory.
+
+    The records are in sorted runs on disk, so they cannot be browsed one by one. The chosen
+    paths are streamed from the store into the delete engine, and only the counts and the
+    first CONSOLE_LIST_LIMIT failures are kept; the journal has every outcome.
+    """
+    print(f"{Fore.YELLOW}{len(results)} files are more than the {results.memory_limit} kept in memory, "
+          f"so they can only be deleted in bulk. Use the 'export' command to review them first.{Style.RESET_ALL}")
+    choices = [Choice(title=f"All {len(results)} file(s) ({format_file_size(results.total_size)})", value="all")]
+    if results.orphan_count:
+        choices.append(Choice(title=f"Orphans only ({results.orphan_count} file(s) whose source document is gone)",
+                              value="orphans"))
+    choices.append(Choice(title="None", value="none"))
+    mode = questionary.select("Which files do you want to remove?", choices=choices).ask()
+    if mode in (None, "none"):
+        return
+    count = len(results) if mode == "all" else results.orphan_count
+    paths = results.paths() if mode == "all" else results.orphan_paths()
+    action = "move to quarantine" if quarantine else "delete"
+    if not questionary.confirm(f"Are you sure you want to {action} {count} file(s)?").ask():
+        print(f"{Fore.YELLOW}Deletion cancelled by user.{Style.RESET_ALL}")
+        return
 
-def main():
-    print(f"{Fore.CYAN}{Style.BRIGHT}Welcome to the Visio Temporary File Remover Wizard!{Style.RESET_ALL}")
+    journal = _open_journal()
+    if quarantine:
+        try:
+            settings = SETTINGS.current()
+            result = quarantine_files(paths, base_directory, None, journal, settings.quarantine_dir,
+                                      settings.protected_prefixes, settings.match)
+        except OSError as e:
+            print(f"{Fore.RED}Error: Could not create the quarantine folder: {e}{Style.RESET_ALL}")
+            return
+        finally:
+            if journal:
+                journal.close()
+        _print_path_list("\nFailed to quarantine:", [f"{path}: {error}" for path, error in result.failed], Fore.RED)
+        print(f"\n{Style.BRIGHT}Summary:{Style.RESET_ALL} {len(result.moved)} quarantined, {len(result.failed)} failed.")
+        print(f"Quarantine batch: {result.batch}\n")
+        return
 
-    # Validate environment before starting
-    if not validate_powershell_available():
-        print(f"{Fore.RED}Error: PowerShell is not available on this system.{Style.RESET_ALL}")
-        print(f"{Fore.RED}This tool requires PowerShell to run. Please install PowerShell and try again.{Style.RESET_ALL}")
-        sys.exit(1)
-    
-    if not validate_scripts_exist():
-        print(f"{Fore.RED}Error: Required PowerShell scripts are missing.{Style.RESET_ALL}")
-        sys.exit(1)
-    
+    print(f"{Fore.YELLOW}Deleting {count} files...{Style.RESET_ALL}")
+    limiter = RateLimiter(_rate_profile(rate_profile).unlinks_per_second)
     try:
-        while True:
-            target_directory = get_directory_to_scan()
-
-            if target_directory is None:
-                print(f"{Fore.CYAN}Exiting program.{Style.RESET_ALL}")
-                break
-
-            print(f"{Fore.BLUE}Scanning {Style.BRIGHT}{target_directory}{Style.NORMAL} for files...{Style.RESET_ALL}")
-            found_temp_files = find_temp_files(target_directory, TEMP_PATTERNS)
-            
-            if not found_temp_files:
-                print(f"{Fore.GREEN}No matching temporary Visio files found in the specified location.{Style.RESET_ALL}")
-            else:
-                files_to_delete = select_files_for_deletion(found_temp_files, target_directory)
-                if files_to_delete:
-                    delete_files(files_to_delete)
-            
-            if not questionary.confirm("Would you like to scan another location or exit?", default=True, qmark="?").ask():
-                print(f"{Fore.CYAN}Exiting program.{Style.RESET_ALL}")
-                break
+        totals, failed_lines = _stream_delete(paths, str(base_directory), limiter, journal)
     finally:
-        deinit()
+        if journal:
+            journal.close()
+
+    failed = sum(n for status, n in totals.items() if status not in ('deleted', 'retried'))
+    _print_path_list("\nFailed to delete:", failed_lines, Fore.RED)
+    if failed > len(failed_lines):
+        print(f"  ... and {failed - len(failed_lines)} more (see the deletion journal)")
+    print(f"\n{Style.BRIGHT}Summary:{Style.RESET_ALL} {totals['deleted']} deleted, {failed} failed.")
+    _print_retries_and_rate(totals, limiter)
+
+def _stream_delete(paths: Iterable, root: str, limiter: RateLimiter, journal: Optional[DeletionJournal],
+                   workers: Optional[int] = None):
+    """Delete ``paths`` as they are produced, keeping counts and the first CONSOLE_LIST_LIMIT failures.
+
+    Returns the outcome counts per status, where files left alone because they changed count as
+    'changed' and 'retried' counts the files deleted after a retry, and the failure lines.
+    """
+    totals = {'deleted': 0, 'retried': 0}
+    failed_lines = []
+    options = {'unlink_concurrency': workers} if workers else {}
+
+    async def run():
+        async for outcome in core.delete(paths, root=root, journal=journal, limiter=limiter,
+                                         protected=SETTINGS.current().protected_prefixes,
+                                         match=SETTINGS.current().match, **options):
+            status = 'changed' if outcome.error == core.CHANGED else outcome.status
+            totals[status] = totals.get(status, 0) + 1
+            if outcome.status == 'deleted':
+                totals['retried'] += outcome.attempts > 1
+            elif len(failed_lines) < CONSOLE_LIST_LIMIT:
+                failed_lines.append(f"{outcome.path}: {outcome.error}")
+    asyncio.run(run())
+    return totals, failed_lines
+
+def _print_retries_and_rate(totals: dict, limiter: RateLimiter):
+    if totals['retried']:
+        print(f"{Fore.CYAN}{totals['retried']} file(s) were deleted after retrying transient share errors.{Style.RESET_ALL}")
+    print(f"{Fore.CYAN}{describe_rate(limiter, 'unlinks')}{Style.RESET_ALL}\n")
+
+def _parse_date(text: str) -> float:
+    """Parse 'YYYY-MM-DD' or 'YYYY-MM-DD HH:MM' (local time) into epoch seconds"""
+    for fmt in ("%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return time.mktime(time.strptime(text, fmt))
+        except ValueError:
+            continue
+    raise argparse.ArgumentTypeError(f"invalid date '{text}', expected YYYY-MM-DD or 'YYYY-MM-DD HH:MM'")
+
+def _parse_date_end(text: str) -> float:
+    """Like _parse_date, but a bare date means the end of that day"""
+    value = _parse_date(text)
+    return value + 86400 if len(text.strip()) == 10 else value
+
+def run_journal_query(args):
+    """Print deletion journal entries (or totals) matching the command line filters"""
+    entries = query_journal(since=args.since, until=args.until, root=args.root, status=args.status)
+    if args.summary:
+        summary = summarize(entries)
+        if not summary:
+            print(f"{Fore.YELLOW}No matching journal entries.{Style.RESET_ALL}")
+            return
+        for status, totals in sorted(summary.items()):
+            print(f"{status:>11}: {totals['files']:>8} file(s)  {format_file_size(totals['bytes']):>10}")
+        return
+    count = 0
+    for entry in entries:
+        when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entry.timestamp))
+        error = f"  ({entry.error})" if entry.error else ""
+        print(f"{when}  {entry.status:<9} {format_file_size(entry.size):>10}  {entry.user}@{entry.host}  {entry.path}{error}")
+        count += 1
+    if not count:
+        print(f"{Fore.YELLOW}No matching journal entries.{Style.RESET_ALL}")
+
+def run_quarantine_command(args):
+    """List, restore or purge quarantine batches of a scan root"""
+    settings = SETTINGS.current()
+    scan_root = args.root or settings.default_root
+    if not scan_root:
+        print(f"{Fore.RED}Error: No scan root given and no default directory configured.{Style.RESET_ALL}")
+        return
+    base = holding_dir(scan_root, settings.quarantine_dir)
+
+    if args.action == "list":
+        batches = list_batches(base)
+        if not batches:
+            print(f"{Fore.YELLOW}No quarantine batches in {base}.{Style.RESET_ALL}")
+        for info in batches:
+            created = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(info.created))
+            print(f"{info.path.name:<20} {created}  {info.files:>7} file(s)  {format_file_size(info.size):>10}")
+        return
 
-if __name__ == "__main__":
+    if args.action == "restore":
+        try:
+            batch = find_batch(base, args.batch)
+        except ValueError as e:
+            print(f"{Fore.RED}Error: {e}{Style.RESET_ALL}")
+            return
+    journal = _open_journal()
     try:
-        main()
-    except KeyboardInterrupt:
-        print(f"\n{Fore.YELLOW}Program interrupted by user. Exiting.{Style.RESET_ALL}")
-    except Exception as e:
-        print(f"\n{Fore.RED}An unexpected error occurred: {e}{Style.RESET_ALL}")
+        if args.action == "restore":
+            restored, failed = restore_batch(batch, journal)
+            _print_path_list("Could not restore:", [f"{path}: {error}" for path, error in failed], Fore.RED)
+            print(f"{Style.BRIGHT}Summary:{Style.RESET_ALL} {len(restored)} restored, {len(failed)} failed.")
+        elif args.action == "purge":
+            batches, files = purge_batches(base, args.days, journal)
+            print(f"{Style.BRIGHT}Summary:{Style.RESET_ALL} purged {files} file(s) in {batches} batch(es) older than {args.days} day(s).")
     finally:
-        deinit() , pattern):
-                safe_patterns.append(pattern)
-            else:
-                print(f"{Fore.YELLOW}Warning: Ignoring potentially unsafe pattern: {pattern}{Style.RESET_ALL}")
-            else:
-                print(f"{Fore.YELLOW}Warning: Ignoring potentially unsafe pattern: {pattern}{Style.RESET_ALL}")
-        
-        if not safe_patterns:
-            raise ValueError("No valid file patterns found in configuration")
-        
-        config_data['temp_file_patterns'] = safe_patterns
-        return config_data
-    except FileNotFoundError:
-        print(f"{Fore.RED}Error: Configuration file not found at {CONFIG_FILE_PATH}{Style.RESET_ALL}")
-        sys.exit(1)
-    except json.JSONDecodeError:
-        print(f"{Fore.RED}Error: Could not decode JSON from {CONFIG_FILE_PATH}{Style.RESET_ALL}")
-        sys.exit(1)
-    except ValueError as ve:
-        print(f"{Fore.RED}Error in configuration: {ve}{Style.RESET_ALL}")
-        sys.exit(1)
-    return None # Should not be reached if sys.exit works
+        if journal:
+            journal.close()
 
-config = load_config()
-if config is None: # Should have exited, but as a safeguard
-    sys.exit("Failed to load configuration.")
-
-TEMP_PATTERNS = config['temp_file_patterns']
-DEFAULT_DIR = config.get('default_scan_path', '') # Use .get for safety, provide default
-SCRIPTS_DIR = resource_path(config["powershell_scripts_path"])
-SCAN_SCRIPT_PATH = SCRIPTS_DIR / 'Scan-VisioTempFiles.ps1'
-REMOVE_SCRIPT_PATH = SCRIPTS_DIR / 'Remove-VisioTempFiles.ps1'
-
-def validate_scripts_exist():
-    """Validate that PowerShell scripts exist and are accessible"""
-    if not SCAN_SCRIPT_PATH.is_file():
-        return False
-    if not REMOVE_SCRIPT_PATH.is_file():
-        return False
-    return True
-
-def validate_powershell_available():
-    """Check if PowerShell is available on the system"""
+def save_scan_snapshot(records: Iterable[dict], base_directory: Path):
+    """Save the scan as a snapshot for later diffs, warning (but carrying on) on failure."""
     try:
-        result = subprocess.run(
-            [resolve_powershell_cmd(), "-Command", "Write-Output 'PowerShell Test'"],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        return result.returncode == 0
-    except (subprocess.SubprocessError, FileNotFoundError):
-        return False
-
-def get_directory_to_scan():
-    """
-    Prompts the user to choose a directory for scanning.
-    Returns a Path object if a directory is selected, or None if the user cancels/exits.
-    """
-    while True:
-        default_path_obj = Path(DEFAULT_DIR) if DEFAULT_DIR else None
-        default_path_valid = default_path_obj.is_dir() if default_path_obj else False
-
-        choices = []
-        if default_path_valid and default_path_obj:
-            choices.append(Choice(title=f"Default: {DEFAULT_DIR}", value="default"))
-        choices.append(Choice(title="Enter custom directory path", value="custom"))
-        choices.append(Choice(title="Exit program", value="exit"))
-
-        selection_prompt_message = "Select an option for the directory to scan:"
-        if DEFAULT_DIR and not default_path_valid:
-            selection_prompt_message = (
-                f"{Fore.YELLOW}Configured default directory '{DEFAULT_DIR}' is invalid or not accessible.{Style.RESET_ALL}\n"
-                "Select an option:"
-            )
-        elif not DEFAULT_DIR:
-             selection_prompt_message = (
-                f"{Fore.YELLOW}No default directory configured.{Style.RESET_ALL}\n"
-                "Select an option:"
-            )
-
-        action = questionary.select(
-            selection_prompt_message,
-            choices=choices,
-            qmark="?"
-        ).ask()
-
-        if action == "default":
-            if default_path_valid and default_path_obj:
-                print(f"{Fore.GREEN}Using default directory: {DEFAULT_DIR}{Style.RESET_ALL}")
-                return default_path_obj.resolve()
-            else:
-                print(f"{Fore.RED}Error: Default directory was selected but is invalid or not configured.{Style.RESET_ALL}")
-                if questionary.confirm("Try entering a custom path instead? (No to exit)").ask():
-                    action = "custom"
-                else:
-                    return None
-        
-        if action == "custom":
-            def _validate_dir(text: str) -> Union[bool, str]:
-                if not text:
-                    return "Input cannot be empty. Press ESC to cancel."
-                candidate = Path(_normalize_input_path(text))
-                return True if candidate.is_dir() else "Path is not a valid directory or does not exist."
-            path_str = questionary.text(
-                "Enter the directory path to scan:",
-                validate=_validate_dir,
-            ).ask()
-
-            if path_str is None:
-                print(f"{Fore.YELLOW}Custom path entry cancelled. Returning to options.{Style.RESET_ALL}")
-                continue
-            else:
-                chosen_path = Path(_normalize_input_path(path_str)).resolve()
-                print(f"{Fore.GREEN}Selected directory: {chosen_path}{Style.RESET_ALL}")
-                return chosen_path
-        elif action == "exit" or action is None:
-            return None
-        elif action != "custom":
-            continue
-    return None # Should be unreachable
+        save_snapshot(base_directory, records)
+    except OSError as e:
+        print(f"{Fore.YELLOW}Warning: Could not save scan snapshot: {e}{Style.RESET_ALL}")
+
+def _resolve_snapshot(name: str, directory: Path) -> Path:
+    """A snapshot given as a path, or by the name shown by 'snapshot list'"""
+    path = Path(name)
+    if path.is_file():
+        return path
+    return directory / (name if name.endswith(".snap") else name + ".snap")
+
+def _signed_size(delta: int) -> str:
+    return ("+" if delta >= 0 else "-") + format_file_size(abs(delta))
+
+def run_snapshot_command(args):
+    """List the snapshots of a scan root, or diff two of them"""
+    scan_root = args.root or SETTINGS.current().default_root
+    if not scan_root:
+        print(f"{Fore.RED}Error: No scan root given and no default directory configured.{Style.RESET_ALL}")
+        return
+    directory = snapshot_dir(scan_root)
+    snapshots = list_snapshots(scan_root)
+
+    if args.action == "list":
+        if not snapshots:
+            print(f"{Fore.YELLOW}No snapshots of {scan_root}.{Style.RESET_ALL}")
+        for path in snapshots:
+            header = read_header(path)
+            created = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(header['created']))
+            print(f"{path.stem:<20} {created}  {header['count']:>9} file(s)")
+        return
 
-def find_temp_files(directory: Path, patterns: List[str]) -> List[Path]:
-    """Find files using the Scan-VisioTempFiles.ps1 PowerShell script."""
-    if not SCAN_SCRIPT_PATH.is_file():
-        print(f"{Fore.RED}Error: Scan script not found at {SCAN_SCRIPT_PATH}{Style.RESET_ALL}")
-        return []
+    if args.old and args.new:
+        old, new = _resolve_snapshot(args.old, directory), _resolve_snapshot(args.new, directory)
+    elif args.old or args.new:
+        print(f"{Fore.RED}Error: Give both snapshots, or neither to compare the latest two.{Style.RESET_ALL}")
+        return
+    elif len(snapshots) < 2:
+        print(f"{Fore.YELLOW}Need at least two snapshots of {scan_root} to compare.{Style.RESET_ALL}")
+        return
+    else:
+        old, new = snapshots[-2], snapshots[-1]
+    for path in (old, new):
+        if not path.is_file():
+            print(f"{Fore.RED}Error: Snapshot not found: {path}{Style.RESET_ALL}")
+            return
 
-    dir_str = str(directory)
-    
-    # Validate parameters before passing to PowerShell
-    if not os.path.isdir(dir_str):
-        print(f"{Fore.RED}Error: Directory does not exist or is not accessible: {dir_str}{Style.RESET_ALL}")
-        return []
-    
-    # Validate each pattern for safety
-    safe_patterns = []
-    for pattern in patterns:
-        if re.match(r^[~$*.A-Za-z0-9\-_]+$, pattern):
-            safe_patterns.append(pattern)
+    print(f"{Style.BRIGHT}Comparing {old.stem} -> {new.stem}{Style.RESET_ALL}")
+    colors = {'new': Fore.GREEN, 'removed': Fore.RED, 'changed': Fore.YELLOW}
+    marks = {'new': '+', 'removed': '-', 'changed': '~'}
+    totals = {kind: [0, 0] for kind in marks}
+    for entry in diff_snapshots(old, new):
+        totals[entry.kind][0] += 1
+        totals[entry.kind][1] += entry.delta
+        if not args.summary:
+            print(f"{colors[entry.kind]}{marks[entry.kind]} {_signed_size(entry.delta):>11}  {entry.path}{Style.RESET_ALL}")
+    for kind in ('new', 'removed', 'changed'):
+        files, delta = totals[kind]
+        print(f"{kind:>8}: {files:>8} file(s)  {_signed_size(delta):>11}")
+    print(f"{Style.BRIGHT}Net change:{Style.RESET_ALL} {_signed_size(sum(delta for _, delta in totals.values()))}")
+
+def run_export_command(args):
+    """Scan a root and stream the matches into a CSV, NDJSON or columnar export"""
+    settings = SETTINGS.current()
+    scan_root = args.root or settings.default_root
+    if not scan_root or not os.path.isdir(scan_root):
+        print(f"{Fore.RED}Error: Scan root not found: {scan_root or '(none configured)'}{Style.RESET_ALL}", file=sys.stderr)
+        sys.exit(1)
+    patterns = list(settings.patterns)
+    engine = args.engine or settings.scan_engine
+    owners = args.owners or settings.owners
+    try:
+        if engine == 'powershell':
+            # The script returns every match at once, so there is nothing to stream. Its progress
+            # messages go to stderr to keep an export on stdout clean.
+            with contextlib.redirect_stdout(sys.stderr):
+                records = find_temp_file_records(Path(scan_root), patterns, engine)
+            count = export_records(records, args.output, args.format, owners)
         else:
-            print(f"{Fore.YELLOW}Warning: Skipping potentially unsafe pattern: {pattern}{Style.RESET_ALL}")
-    
-    if not safe_patterns:
-        print(f"{Fore.RED}Error: No valid safe patterns to scan with.{Style.RESET_ALL}")
-        return []
-    
-    # Use -File and pass each pattern as a separate arg to avoid quoting pitfalls
-    ps_cmd_list = [
-        resolve_powershell_cmd(),
-        "-NoProfile",
-        "-ExecutionPolicy", "Bypass",
-        "-File", str(SCAN_SCRIPT_PATH),
-        "-ScanPath", dir_str,
-        "-AsJson",
-    ]
-    for p in safe_patterns:
-        ps_cmd_list.extend(["-Patterns", p])
+            limiter = RateLimiter(settings.profile(args.rate_profile).listings_per_second)
+            count = export_scan(scan_root, patterns, args.output, args.format,
+                                engine=engine, workers=args.workers, limiter=limiter,
+                                follow_links=settings.follow_links, owners=owners, match=settings.match)
+    except (OSError, ValueError) as e:
+        print(f"{Fore.RED}Error: Could not export {scan_root}: {e}{Style.RESET_ALL}", file=sys.stderr)
+        sys.exit(1)
+    if args.output != "-":
+        print(f"{Fore.GREEN}Exported {count} file(s) to {args.output}{Style.RESET_ALL}")
 
-    print(f"{Fore.CYAN}Running PowerShell scan script: {SCAN_SCRIPT_PATH} for {dir_str} with patterns {','.join(safe_patterns)}{Style.RESET_ALL}")
-    
+def run_manifest_command(args):
+    """Delete the files listed in an earlier export, skipping those that changed since"""
+    if args.quarantine:
+        print(f"{Fore.RED}Error: --quarantine is not supported with apply-manifest.{Style.RESET_ALL}", file=sys.stderr)
+        sys.exit(1)
     try:
-        completed = subprocess.run(
-            ps_cmd_list,
-            capture_output=True,
-            text=True,
-            check=False,
-            encoding='utf-8',
-            timeout=SCRIPT_TIMEOUT  # Add timeout to prevent hanging
-        )
-
-        if completed.returncode != 0:
-            err = completed.stderr.strip()
-            if err:
-                print(f"{Fore.RED}PowerShell script failed:{Style.RESET_ALL}\n{Fore.YELLOW}{err}{Style.RESET_ALL}")
-            return []
-
-        # Check for empty output
-        if not completed.stdout or completed.stdout.strip() == "":
-            print(f"{Fore.RED}PowerShell script returned no output.{Style.RESET_ALL}")
-            return []
-
-        # Check if output is valid JSON
-        try:
-            result_data = json.loads(completed.stdout.strip())
-            
-            # If we got an empty array, it means no files were found
-            if isinstance(result_data, list) and len(result_data) == 0:
-                return []
-                
-            found_files = [Path(item['FullName']) for item in result_data if isinstance(item, dict) and 'FullName' in item]
-            print(f"{Fore.GREEN}Found {len(found_files)} temporary Visio files.{Style.RESET_ALL}")
-            return sorted(found_files)
-        except json.JSONDecodeError as e:
-            print(f"{Fore.RED}Error parsing scan JSON: {e}{Style.RESET_ALL}")
-            print(f"{Fore.MAGENTA}Raw STDOUT:\n{completed.stdout.strip()}{Style.RESET_ALL}")
-            
-            # Despite the JSON error, let's check if we need to show 'no files found' message
-            if "No matching" in completed.stdout or completed.stdout.strip() == "[]":
-                pass  # Let caller handle user-facing messaging for empty results
-            
-            return []
-    except subprocess.TimeoutExpired:
-        print(f"{Fore.RED}Error: PowerShell script timed out after {SCRIPT_TIMEOUT} seconds.{Style.RESET_ALL}")
-        return []
-    except subprocess.SubprocessError as e:
-        print(f"{Fore.RED}Unexpected subprocess error running scan script: {e}{Style.RESET_ALL}")
-        return []
-    except Exception as e:
-        print(f"{Fore.RED}Unexpected error running scan script: {e}{Style.RESET_ALL}")
-        return []
-    return [] # Fallback
-
-def select_files_for_deletion(file_list: List[Path], base_directory: Path) -> List[Path]:
-    """Prompt user to select files to delete."""
-    if not file_list:
-        print(f"{Fore.GREEN}No Visio temp files found.{Style.RESET_ALL}")
-        return []
-    
-    choices = []
-    for f_path in file_list:
-        try:
-            rel_parent = f_path.parent.relative_to(base_directory)
-        except ValueError:
-            rel_parent = f_path.parent # Fallback to absolute if not under base_directory
-        display = f"{f_path.name} (in {rel_parent})"
-        choices.append(Choice(title=display, value=str(f_path))) # Store as string for Q
-        
-    selected_str_paths = questionary.checkbox(
-        "Select files to delete (Space to toggle, Enter to confirm):",
-        choices=choices,
-        # validate=lambda vals: True if vals else "Select at least one file or ESC to cancel."
-    ).ask()
-    
-    return [Path(p) for p in selected_str_paths] if selected_str_paths else []
-
-def delete_files(selected_paths: List[Path]):
-    """Delete selected files using direct PowerShell commands similar to the web UI's approach."""
-    if not selected_paths:
-        return
-
-    if not validate_powershell_available():
-        print(f"{Fore.RED}Error: PowerShell is not available on this system.{Style.RESET_ALL}")
+        files, size = count_manifest(args.manifest, args.format, args.orphans_only)
+    except (OSError, ValueError) as e:
+        print(f"{Fore.RED}Error: Could not read manifest {args.manifest}: {e}{Style.RESET_ALL}", file=sys.stderr)
+        sys.exit(1)
+    if not files:
+        print(f"{Fore.GREEN}The manifest lists no files to delete.{Style.RESET_ALL}")
         return
-
-    confirm_delete = questionary.confirm(
-        f"Are you sure you want to delete {len(selected_paths)} selected file(s)?"
-    ).ask()
-    if not confirm_delete:
+    if not args.yes and not questionary.confirm(
+            f"Delete up to {files} file(s) ({format_file_size(size)}) listed in {args.manifest}? "
+            "Files changed since it was written are kept.").ask():
         print(f"{Fore.YELLOW}Deletion cancelled by user.{Style.RESET_ALL}")
         return
 
-    # Validate that all files exist before attempting deletion
-    invalid_paths = [p for p in selected_paths if not p.is_file()]
-    if invalid_paths:
-        print(f"{Fore.RED}Error: The following files don't exist or are not accessible:{Style.RESET_ALL}")
-        for p in invalid_paths:
-            print(f"  - {p}")
-        if not questionary.confirm("Continue with deleting only valid files?").ask():
-            print(f"{Fore.YELLOW}Deletion cancelled by user.{Style.RESET_ALL}")
-            return
-        # Filter out invalid paths
-        selected_paths = [p for p in selected_paths if p.is_file()]
-        if not selected_paths:
-            print(f"{Fore.YELLOW}No valid files remaining to delete.{Style.RESET_ALL}")
-            return
-
-    # Collect paths as strings
-    file_paths = [str(p) for p in selected_paths]
-    
-    # Simplify quote escaping for PS single-quoted paths
-    quoted_paths = [f"'{path.replace("'", "''")}'" for path in file_paths]
-    
-    # Build a PowerShell command that pipelines the paths through ForEach-Object
-    # This is similar to what the web UI does which works successfully
-    ps_command = f"""
-    $filesToDelete = @({','.join(quoted_paths)})
-    $results = @{{
-        deleted = @()
-        failed = @()
-    }}
-    
-    foreach ($file in $filesToDelete) {{
-        try {{
-            if (Test-Path -LiteralPath $file -PathType Leaf) {{
-                Remove-Item -LiteralPath $file -Force -ErrorAction Stop
-                $results.deleted += $file
-                Write-Host "Deleted: $file" -ForegroundColor Green
-            }} else {{
-                $results.failed += @{{ Path = $file; Error = "File not found or is not a regular file." }}
-                Write-Host "Not found: $file" -ForegroundColor Yellow
-            }}
-        }} catch {{
-            $results.failed += @{{ Path = $file; Error = $_.Exception.Message }}
-            Write-Host "Error: $file - $($_.Exception.Message)" -ForegroundColor Red
-        }}
-    }}
-    
-    # Return results as JSON for parsing (no preamble)
-    $results | ConvertTo-Json -Depth 3
-    """
-    
-    print(f"{Fore.YELLOW}Executing PowerShell delete command for {len(file_paths)} files...{Style.RESET_ALL}")
-    
+    print(f"{Fore.YELLOW}Deleting up to {files} files...{Style.RESET_ALL}")
+    limiter = RateLimiter(_rate_profile(args.rate_profile).unlinks_per_second)
+    journal = _open_journal()
     try:
-        completed = subprocess.run(
-            [resolve_powershell_cmd(), "-NoProfile", "-ExecutionPolicy", "Bypass", "-Command", ps_command],
-            capture_output=True,
-            text=True,
-            check=False,
-            encoding='utf-8',
-            timeout=SCRIPT_TIMEOUT
-        )
-        
-        # Process any standard error output
-        if completed.stderr and completed.stderr.strip():
-            print(f"{Fore.RED}PowerShell error output:{Style.RESET_ALL}\n{Fore.YELLOW}{completed.stderr.strip()}{Style.RESET_ALL}")
-        
-        # Try to parse JSON results if available
-        try:
-            json_str = completed.stdout.strip()
-            result_data = json.loads(json_str)
-            
-            deleted = result_data.get('deleted', [])
-            failed = result_data.get('failed', [])
-            
-            if deleted:
-                print(f"{Fore.GREEN}Successfully deleted:{Style.RESET_ALL}")
-                for path in deleted:
-                    print(f"  - {path}")
-            
-            if failed:
-                print(f"\n{Fore.RED}Failed to delete:{Style.RESET_ALL}")
-                for item in failed:
-                    if isinstance(item, dict):
-                        print(f"  - {item.get('Path', 'Unknown')}: {item.get('Error', 'Unknown error')}")
-                    else:
-                        print(f"  - {item}: Unknown error")
-            
-            print(f"\n{Style.BRIGHT}Summary:{Style.RESET_ALL} {len(deleted)} deleted, {len(failed)} failed.\n")
-        except json.JSONDecodeError:
-            # If JSON parsing fails, just show the raw output
-            print(f"{Fore.RED}Could not parse JSON results. Raw PowerShell output:{Style.RESET_ALL}")
-            print(completed.stdout)
-            
-    except subprocess.TimeoutExpired:
-        print(f"{Fore.RED}Error: PowerShell command timed out after {SCRIPT_TIMEOUT} seconds.{Style.RESET_ALL}")
-    except subprocess.SubprocessError as e:
-        print(f"{Fore.RED}Unexpected subprocess error running delete command: {e}{Style.RESET_ALL}")
-    except Exception as e:
-        print(f"{Fore.RED}Unexpected error running delete command: {e}{Style.RESET_ALL}")
+        totals, failed_lines = _stream_delete(iter_manifest(args.manifest, args.format, args.orphans_only),
+                                              args.root or "", limiter, journal, args.workers)
+    except (OSError, ValueError) as e:
+        print(f"{Fore.RED}Error: Stopped reading manifest {args.manifest}: {e}{Style.RESET_ALL}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if journal:
+            journal.close()
+
+    changed, gone = totals.get('changed', 0), totals.get('not_found', 0)
+    failed = sum(n for status, n in totals.items() if status not in ('deleted', 'retried', 'changed', 'not_found'))
+    _print_path_list("\nNot deleted:", failed_lines, Fore.YELLOW)
+    if changed + gone + failed > len(failed_lines):
+        print(f"  ... and {changed + gone + failed - len(failed_lines)} more (see the deletion journal)")
+    print(f"\n{Style.BRIGHT}Summary:{Style.RESET_ALL} {totals['deleted']} deleted, {changed} changed since the manifest "
+          f"(kept), {gone} already gone, {failed} failed.")
+    _print_retries_and_rate(totals, limiter)
+
+def parse_args(argv=None):
+    """Parse command line options"""
+    settings = SETTINGS.current()
+    parser = argparse.ArgumentParser(description="Find and remove Visio temporary files.")
+    parser.add_argument("--engine", choices=('powershell',) + ENGINES, default=None,
+                        help=f"Scan engine (default from config.json: {settings.scan_engine})")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker threads/processes for the native scan engines, or parallel unlinks "
+                             "for apply-manifest")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue an interrupted native scan of the chosen directory")
+    parser.add_argument("--rate-profile", choices=profile_names(settings.config), default=None,
+                        help=f"Limit listings/unlinks per second (default from config.json: {settings.rate_profile}); "
+                             "'auto' is gentle during business hours")
+    parser.add_argument("--quarantine", action="store_true",
+                        help="Move selected files to the quarantine holding area instead of deleting them")
+    parser.add_argument("--owners", action="store_true", default=None,
+                        help="Look up each file's owner and total the space per owner "
+                             "(native engines; default from config.json)")
+    subparsers = parser.add_subparsers(dest="command")
+
+    journal_parser = subparsers.add_parser("journal", help="Query the deletion journal")
+    journal_parser.add_argument("--since", type=_parse_date, help="Only entries on/after this date (YYYY-MM-DD[ HH:MM])")
+    journal_parser.add_argument("--until", type=_parse_date_end, help="Only entries before the end of this date")
+    journal_parser.add_argument("--root", help="Only files under this folder")
+    journal_parser.add_argument("--status", choices=sorted(STATUS_CODES), help="Only entries with this outcome")
+    journal_parser.add_argument("--summary", action="store_true", help="Print totals per outcome instead of entries")
+    quarantine_parser = subparsers.add_parser("quarantine", help="Manage quarantined files")
+    quarantine_parser.add_argument("--root", help=f"Scan root whose holding area to use (default: {settings.default_root})")
+    quarantine_actions = quarantine_parser.add_subparsers(dest="action", required=True)
+    quarantine_actions.add_parser("list", help="List quarantine batches")
+    restore_parser = quarantine_actions.add_parser("restore", help="Move a batch back to its original locations")
+    restore_parser.add_argument("batch", help="Batch folder name, as shown by 'quarantine list'")
+    purge_parser = quarantine_actions.add_parser("purge", help="Permanently delete old batches")
+    purge_parser.add_argument("--days", type=float, required=True, help="Purge batches older than this many days")
+    snapshot_parser = subparsers.add_parser("snapshot", help="List or compare saved scan snapshots")
+    snapshot_parser.add_argument("--root", help=f"Scan root whose snapshots to use (default: {settings.default_root})")
+    snapshot_actions = snapshot_parser.add_subparsers(dest="action", required=True)
+    snapshot_actions.add_parser("list", help="List snapshots, oldest first")
+    diff_parser = snapshot_actions.add_parser("diff", help="Show files created, removed or changed between two snapshots")
+    diff_parser.add_argument("old", nargs="?", help="Older snapshot (default: second newest)")
+    diff_parser.add_argument("new", nargs="?", help="Newer snapshot (default: newest)")
+    diff_parser.add_argument("--summary", action="store_true", help="Print only the totals")
+    export_parser = subparsers.add_parser("export", help="Scan a folder and write the matches to a file")
+    export_parser.add_argument("output", help="Output file (.csv, .ndjson or .vtfrc), or - for stdout")
+    export_parser.add_argument("--root", help=f"Folder to scan (default: {settings.default_root})")
+    export_parser.add_argument("--format", choices=FORMATS, help="Output format (default: from the file extension; ndjson for stdout)")
+    manifest_parser = subparsers.add_parser("apply-manifest",
+                                            help="Delete the files listed in an earlier export without scanning")
+    manifest_parser.add_argument("manifest", help="Export of an earlier scan (.csv, .ndjson or .vtfrc), edited down or not")
+    manifest_parser.add_argument("--format", choices=FORMATS, help="Manifest format (default: from the file extension)")
+    manifest_parser.add_argument("--orphans-only", action="store_true", help="Only delete the rows marked as orphans")
+    manifest_parser.add_argument("--root", help="Scan root to record in the deletion journal")
+    manifest_parser.add_argument("--yes", action="store_true", help="Do not ask for confirmation")
+    args = parser.parse_args(argv)
+    if args.resume and (args.engine or settings.scan_engine) == 'powershell':
+        args.engine = 'threads'  # Only the native engines checkpoint their progress
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == "journal":
+        run_journal_query(args)
+        return
+    if args.command == "quarantine":
+        run_quarantine_command(args)
+        return
+    if args.command == "snapshot":
+        run_snapshot_command(args)
+        return
+    if args.command == "export":
+        run_export_command(args)
+        return
+    if args.command == "apply-manifest":
+        run_manifest_command(args)
+        return
 
-def main():
     print(f"{Fore.CYAN}{Style.BRIGHT}Welcome to the Visio Temporary File Remover Wizard!{Style.RESET_ALL}")
 
-    # Validate environment before starting
-    if not validate_powershell_available():
-        print(f"{Fore.RED}Error: PowerShell is not available on this system.{Style.RESET_ALL}")
-        print(f"{Fore.RED}This tool requires PowerShell to run. Please install PowerShell and try again.{Style.RESET_ALL}")
-        sys.exit(1)
-    
-    if not validate_scripts_exist():
-        print(f"{Fore.RED}Error: Required PowerShell scripts are missing.{Style.RESET_ALL}")
-        sys.exit(1)
-    
+    # Validate environment before starting; only the PowerShell scan engine needs it
+    if (args.engine or SETTINGS.current().scan_engine) == 'powershell':
+        if not validate_powershell_available():
+            print(f"{Fore.RED}Error: PowerShell is not available on this system.{Style.RESET_ALL}")
+            print(f"{Fore.RED}The PowerShell scan engine requires PowerShell. Install it or use --engine threads.{Style.RESET_ALL}")
+            sys.exit(1)
+
+        if not validate_scripts_exist():
+            print(f"{Fore.RED}Error: Required PowerShell scripts are missing.{Style.RESET_ALL}")
+            sys.exit(1)
+
     try:
         while True:
             target_directory = get_directory_to_scan()
@@ -838,14 +920,29 @@ def main():
                 break
 
             print(f"{Fore.BLUE}Scanning {Style.BRIGHT}{target_directory}{Style.NORMAL} for files...{Style.RESET_ALL}")
-            found_temp_files = find_temp_files(target_directory, TEMP_PATTERNS)
-            
-            if not found_temp_files:
-                print(f"{Fore.GREEN}No matching temporary Visio files found in the specified location.{Style.RESET_ALL}")
-            else:
-                files_to_delete = select_files_for_deletion(found_temp_files, target_directory)
-                if files_to_delete:
-                    delete_files(files_to_delete)
+            patterns = list(SETTINGS.current().patterns)  # Picks up edits to config.json since the last scan
+            results = scan_results(target_directory, patterns, args.engine, args.workers,
+                                   args.resume, args.rate_profile, args.owners)
+            with results:  # Removes spilled runs even if a prompt is interrupted
+                save_scan_snapshot(results, target_directory)
+
+                if not results:
+                    print(f"{Fore.GREEN}No matching temporary Visio files found in the specified location.{Style.RESET_ALL}")
+                elif results.spilled:
+                    print_reclaim_summary(results, target_directory)
+                    delete_spilled_results(results, target_directory, quarantine=args.quarantine,
+                                           rate_profile=args.rate_profile)
+                else:
+                    found_records = list(results)
+                    found_temp_files = sorted(Path(record['FullName']) for record in found_records)
+                    print_reclaim_summary(found_records, target_directory)
+                    orphans = {record['FullName'] for record in found_records if is_orphan(record)}
+                    files_to_delete = select_files_for_deletion(found_temp_files, target_directory, orphans,
+                                                                found_records)
+                    if files_to_delete:
+                        sizes = {record['FullName']: record.get('Size', 0) for record in found_records}
+                        delete_files(files_to_delete, target_directory, sizes, quarantine=args.quarantine,
+                                     rate_profile=args.rate_profile)
             
             if not questionary.confirm("Would you like to scan another location or exit?", default=True, qmark="?").ask():
                 print(f"{Fore.CYAN}Exiting program.{Style.RESET_ALL}")
@@ -854,6 +951,7 @@ def main():
         deinit()
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # Needed by the process scan engine in PyInstaller builds
     try:
         main()
     except KeyboardInterrupt:
@@ -47,8 +47,32 @@ try {
 
     # Get all files recursively from the directory
     try {
-        # Use Get-ChildItem directly without Invoke-Expression for security
-        $files = Get-ChildItem -Path $ScanPath -Recurse -Force -File -ErrorAction Stop
+        # Walk the tree ourselves: Get-ChildItem -Recurse follows junctions and symbolic links,
+        # which rescans the same folders or loops until the timeout. Links are skipped, like
+        # the native scanner does by default.
+        $files = New-Object System.Collections.Generic.List[System.IO.FileInfo]
+        $pending = New-Object System.Collections.Generic.Stack[string]
+        $pending.Push($ScanPath)
+        while ($pending.Count -gt 0) {
+            $dir = $pending.Pop()
+            try {
+                $items = Get-ChildItem -LiteralPath $dir -Force -ErrorAction Stop
+            }
+            catch {
+                if ($dir -eq $ScanPath) { throw }
+                continue # Unreadable subfolder
+            }
+            foreach ($item in $items) {
+                if ($item.LinkType -eq 'Junction' -or $item.LinkType -eq 'SymbolicLink') {
+                    continue
+                }
+                if ($item.PSIsContainer) {
+                    $pending.Push($item.FullName)
+                } else {
+                    $files.Add($item)
+                }
+            }
+        }
         
         if ($DebugOutput) {
             Write-Host "DEBUG: Found $($files.Count) total files in directory" -ForegroundColor Cyan
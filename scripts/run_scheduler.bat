@@ -0,0 +1,19 @@
+@echo off
+setlocal
+cd /d "%~dp0\.."
+title Visio Temp File Remover - Scheduler
+rem Runs the cleanups listed under "schedules" in config.json until the window is closed.
+rem Start it at logon from Task Scheduler to keep nightly cleanups running.
+where py >nul 2>nul
+if %ERRORLEVEL%==0 (
+  py -3 -m vtfr.scheduler run
+) else (
+  where python >nul 2>nul
+  if %ERRORLEVEL%==0 (
+    python -m vtfr.scheduler run
+  ) else (
+    echo ERROR: Python 3 is not installed or not in PATH.
+    pause
+    exit /b 1
+  )
+)
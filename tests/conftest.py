@@ -0,0 +1,69 @@
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+FAKE_POWERSHELL_DIR = Path(__file__).resolve().parent / "fake_powershell"
+
+# The shared package lives in the repo root and the CLI in cli-tool/
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "cli-tool"))
+
+
+@pytest.fixture(autouse=True)
+def state_dir(tmp_path, monkeypatch):
+    """Keep checkpoints, journals and snapshots out of the real state directory"""
+    path = tmp_path / "state"
+    monkeypatch.setenv("VTFR_STATE_DIR", str(path))
+    return path
+
+
+@pytest.fixture
+def fake_powershell(tmp_path, monkeypatch):
+    """Put the fake PowerShell first on PATH; returns the file its invocations are logged to"""
+    log = tmp_path / "powershell.log"
+    monkeypatch.setenv("PATH", str(FAKE_POWERSHELL_DIR) + os.pathsep + os.environ.get("PATH", ""))
+    monkeypatch.setenv("FAKE_POWERSHELL_LOG", str(log))
+    for name in ("FAKE_POWERSHELL_LATENCY", "FAKE_POWERSHELL_FILE_LATENCY", "FAKE_POWERSHELL_EXIT"):
+        monkeypatch.delenv(name, raising=False)
+    return log
+
+
+@pytest.fixture
+def no_powershell(monkeypatch, tmp_path):
+    """A PATH on which no PowerShell can be found"""
+    empty = tmp_path / "empty-path"
+    empty.mkdir()
+    monkeypatch.setenv("PATH", str(empty))
+
+
+def make_files(root, names, size=16, mtime=None):
+    """Create files (relative paths, folders included) under root; returns their full paths"""
+    paths = []
+    for name in names:
+        path = Path(root) / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"x" * size)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+        paths.append(str(path))
+    return paths
+
+
+@pytest.fixture
+def temp_tree(tmp_path):
+    """A small share with Visio temp files, their documents and unrelated files"""
+    root = tmp_path / "share"
+    make_files(root, [
+        "Pumps.vsdx",
+        "~$$Pumps.~vsdx",
+        "~$$Gone.~vsdx",
+        "stencils/Valves.vssx",
+        "stencils/~$$Valves.~vssx",
+        "stencils/deep/~$$Old.~vstx",
+        "notes.txt",
+    ], mtime=time.time() - 3600)
+    return root
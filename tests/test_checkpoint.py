@@ -0,0 +1,71 @@
+"""Checkpointed native scans: stopping early saves the frontier, and a resume finishes the walk."""
+import pytest
+
+from conftest import make_files
+from vtfr.checkpoint import ScanCheckpoint
+from vtfr.scanner import scan
+
+PATTERNS = ["~$$*.*"]
+ENGINES = ["threads", "processes"]
+
+
+@pytest.fixture
+def share(tmp_path):
+    """Temp files at the root and in eight subfolders"""
+    root = tmp_path / "share"
+    make_files(root, ["~$$Root1.~vsdx", "~$$Root2.~vsdx"]
+               + [f"d{i}/sub/~$$Drawing{i}.~vsdx" for i in range(8)] + ["d0/Drawing0.vsdx"])
+    return root
+
+
+def _paths(hits):
+    return sorted(hit[0] for hit in hits)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_completed_scan_drops_its_checkpoint(share, tmp_path, engine):
+    checkpoint = ScanCheckpoint(share, PATTERNS, tmp_path / "checkpoints")
+    assert len(list(scan(str(share), PATTERNS, engine, 2, checkpoint))) == 10
+    assert not checkpoint.exists()
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_stopping_during_the_root_hits_saves_the_frontier(share, tmp_path, engine):
+    # The consumer stops at the first hit, which comes from the root listing
+    checkpoint = ScanCheckpoint(share, PATTERNS, tmp_path / "checkpoints")
+    hits = scan(str(share), PATTERNS, engine, 2, checkpoint)
+    first = next(hits)
+    hits.close()
+    assert first[0].startswith(str(share / "~$$Root"))
+    assert checkpoint.exists()
+    assert checkpoint.describe()["pending"] > 0
+
+    resumed = ScanCheckpoint(share, PATTERNS, tmp_path / "checkpoints")
+    everything = list(scan(str(share), PATTERNS, engine, 2, resumed))
+    assert _paths(everything) == _paths(scan(str(share), PATTERNS, "threads"))
+    assert not resumed.exists()
+
+
+def test_resume_skips_finished_folders(share, tmp_path):
+    checkpoint = ScanCheckpoint(share, PATTERNS, tmp_path / "checkpoints")
+    hits = scan(str(share), PATTERNS, "threads", 1, checkpoint)
+    seen = [next(hits) for _ in range(5)]
+    hits.close()
+    saved = checkpoint.describe()
+    assert saved["hits"] >= len(seen)
+    resumed = ScanCheckpoint(share, PATTERNS, tmp_path / "checkpoints")
+    assert len(list(scan(str(share), PATTERNS, "threads", 1, resumed))) == 10
+
+
+def test_other_owner_or_link_settings_start_over(share, tmp_path):
+    checkpoint = ScanCheckpoint(share, PATTERNS, tmp_path / "checkpoints")
+    hits = scan(str(share), PATTERNS, "threads", 1, checkpoint)
+    next(hits)
+    hits.close()
+    assert checkpoint.exists()
+    for options in ({"owners": True}, {"follow_links": True}):
+        assert not ScanCheckpoint(share, PATTERNS, tmp_path / "checkpoints", **options).exists()
+
+    with_owners = ScanCheckpoint(share, PATTERNS, tmp_path / "checkpoints", owners=True)
+    assert len(list(scan(str(share), PATTERNS, "threads", 1, with_owners))) == 10
+    assert not checkpoint.exists()  # Replaced by the new scan, which then finished
@@ -0,0 +1,170 @@
+"""CLI scan and delete paths, with the fake PowerShell standing in for the real one."""
+import json
+import os
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+import visio_temp_file_remover as cli
+from vtfr.settings import compile_settings
+
+
+def _names(records):
+    return sorted(r["Name"] for r in records)
+
+
+def test_resolve_powershell_cmd_falls_back_to_plain_name(no_powershell):
+    assert cli.resolve_powershell_cmd() == "powershell"
+
+
+def test_resolve_powershell_cmd_prefers_exe_on_path(tmp_path, monkeypatch):
+    exe = tmp_path / "pwsh.exe"
+    exe.write_text("")
+    exe.chmod(0o755)
+    monkeypatch.setenv("PATH", str(tmp_path))
+    assert cli.resolve_powershell_cmd() == str(exe)
+
+
+def test_validate_powershell_available(fake_powershell):
+    assert cli.validate_powershell_available()
+
+
+def test_validate_powershell_unavailable(no_powershell):
+    assert not cli.validate_powershell_available()
+
+
+def test_validate_powershell_failing(fake_powershell, monkeypatch):
+    monkeypatch.setenv("FAKE_POWERSHELL_EXIT", "1")
+    assert not cli.validate_powershell_available()
+
+
+def test_powershell_scan_matches_native_scan(fake_powershell, temp_tree):
+    ps_records = cli.find_temp_file_records(temp_tree, cli.TEMP_PATTERNS, engine="powershell")
+    native_records = cli.find_temp_file_records(temp_tree, cli.TEMP_PATTERNS, engine="threads")
+    assert _names(ps_records) == _names(native_records) == [
+        "~$$Gone.~vsdx", "~$$Old.~vstx", "~$$Pumps.~vsdx", "~$$Valves.~vssx"]
+    for ps, native in zip(sorted(ps_records, key=lambda r: r["FullName"]),
+                          sorted(native_records, key=lambda r: r["FullName"])):
+        for key in ("FullName", "Directory", "LastModified", "Size"):
+            assert ps[key] == native[key]
+
+    args = json.loads(fake_powershell.read_text().splitlines()[-1])
+    assert args[args.index("-ScanPath") + 1] == str(temp_tree)
+
+
+def test_powershell_scan_single_match(fake_powershell, temp_tree):
+    records = cli.find_temp_file_records(temp_tree, ["~$$*.~vstx"], engine="powershell")
+    assert _names(records) == ["~$$Old.~vstx"]
+
+
+def test_powershell_scan_skips_unsafe_patterns(fake_powershell, temp_tree, capsys):
+    records = cli.find_temp_file_records(temp_tree, ["~$$*.*", "*; rm -rf /"], engine="powershell")
+    assert len(records) == 4
+    assert "unsafe pattern" in capsys.readouterr().out
+
+
+def test_powershell_scan_failure_returns_nothing(fake_powershell, temp_tree, monkeypatch, capsys):
+    monkeypatch.setenv("FAKE_POWERSHELL_EXIT", "1")
+    assert cli.find_temp_file_records(temp_tree, cli.TEMP_PATTERNS, engine="powershell") == []
+    assert "PowerShell script failed" in capsys.readouterr().out
+
+
+def test_powershell_scan_timeout(fake_powershell, temp_tree, monkeypatch, capsys):
+    monkeypatch.setattr(cli, "SCRIPT_TIMEOUT", 0.5)
+    monkeypatch.setenv("FAKE_POWERSHELL_LATENCY", "3")
+    assert cli.find_temp_file_records(temp_tree, cli.TEMP_PATTERNS, engine="powershell") == []
+    assert "timed out" in capsys.readouterr().out
+
+
+def test_find_temp_files_returns_paths(temp_tree):
+    paths = cli.find_temp_files(temp_tree, cli.TEMP_PATTERNS, engine="threads")
+    assert sorted(p.name for p in paths) == ["~$$Gone.~vsdx", "~$$Old.~vstx", "~$$Pumps.~vsdx", "~$$Valves.~vssx"]
+    assert all(isinstance(p, Path) for p in paths)
+
+
+@pytest.fixture
+def confirm(monkeypatch):
+    """Answer questionary confirmations with True"""
+    class Answer:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def ask(self):
+            return True
+    monkeypatch.setattr(cli.questionary, "confirm", Answer)
+
+
+def test_delete_files_deletes_only_temp_files(temp_tree, confirm, capsys):
+    temp = temp_tree / "~$$Pumps.~vsdx"
+    doc = temp_tree / "Pumps.vsdx"
+    cli.delete_files([temp, doc], temp_tree, rate_profile="full")
+    assert not temp.exists()
+    assert doc.exists()
+    out = capsys.readouterr().out
+    assert "1 deleted, 1 failed" in out
+
+
+def test_delete_files_journals_outcomes(temp_tree, confirm, state_dir):
+    temp = temp_tree / "~$$Gone.~vsdx"
+    cli.delete_files([temp], temp_tree, sizes={str(temp): 16}, rate_profile="full")
+    entries = list(cli.query_journal(root=str(temp_tree)))
+    assert [(e.path, e.status, e.size) for e in entries] == [(str(temp), "deleted", 16)]
+
+
+def test_delete_files_respects_protected_paths(temp_tree, confirm, monkeypatch):
+    settings = cli.SETTINGS.current()
+    protected = settings._replace(protected_prefixes=(os.path.normcase(str(temp_tree)),))
+    monkeypatch.setattr(cli.SETTINGS, "current", lambda: protected)
+    temp = temp_tree / "~$$Pumps.~vsdx"
+    cli.delete_files([temp], temp_tree, rate_profile="full")
+    assert temp.exists()
+
+
+@pytest.mark.parametrize("memory_limit", [1, 1000])
+def test_interrupted_prompt_removes_spilled_results(temp_tree, tmp_path, monkeypatch, memory_limit):
+    spill = tmp_path / "spill"
+    spill.mkdir()
+    monkeypatch.setattr(tempfile, "tempdir", str(spill))
+    settings = cli.SETTINGS.current()._replace(result_memory_limit=memory_limit)
+    monkeypatch.setattr(cli.SETTINGS, "current", lambda: settings)
+    monkeypatch.setattr(cli, "get_directory_to_scan", lambda: temp_tree)
+
+    def interrupted(*args, **kwargs):
+        assert memory_limit > 1 or any(spill.iterdir())  # The small limit really spilled
+        raise KeyboardInterrupt
+    monkeypatch.setattr(cli, "delete_spilled_results", interrupted)
+    monkeypatch.setattr(cli, "select_files_for_deletion", interrupted)
+    with pytest.raises(KeyboardInterrupt) as interrupt:
+        cli.main(["--engine", "threads"])
+    assert interrupt.traceback  # Keeps the store reachable, so its finalizer cannot clean up instead
+    assert list(spill.iterdir()) == []
+
+
+def test_reloaded_settings_reach_the_use_sites(temp_tree, confirm, monkeypatch, capsys):
+    reloaded = compile_settings({"temp_file_patterns": ["~*.~vsdx"], "powershell_scripts_path": "scripts",
+                                 "default_scan_path": str(temp_tree), "quarantine_dir": "held",
+                                 "scan_engine": "processes", "rate_profile": "full"})
+    monkeypatch.setattr(cli.SETTINGS, "current", lambda: reloaded)
+    engines = []
+    monkeypatch.setattr(cli, "_find_temp_file_records_native",
+                        lambda directory, patterns, engine, *args: engines.append(engine) or [])
+    cli.find_temp_file_records(temp_tree, cli.TEMP_PATTERNS)
+    assert engines == ["processes"]
+    with pytest.raises(SystemExit):
+        cli.parse_args(["--help"])
+    help_text = " ".join(capsys.readouterr().out.split())
+    assert "(default from config.json: processes)" in help_text and "(default from config.json: full)" in help_text
+
+    # Only the reloaded patterns make this a temp file, for the safety check as well as the scan
+    temp = temp_tree / "~Pumps.~vsdx"
+    temp.write_bytes(b"x" * 16)
+    cli.quarantine_selected_files([temp], temp_tree)
+    assert not temp.exists()
+    cli.run_quarantine_command(SimpleNamespace(action="list", root=None))  # The root comes from the settings
+    assert "1 file(s)" in capsys.readouterr().out and len(list((temp_tree / "held").iterdir())) == 1
+
+    temp.write_bytes(b"x" * 16)
+    cli.delete_files([temp], temp_tree)
+    assert not temp.exists()
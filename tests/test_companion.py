@@ -0,0 +1,69 @@
+"""Companion documents: which drawing a temp file locks, and orphans whose drawing is gone."""
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+import visio_temp_file_remover as cli
+from conftest import make_files
+from vtfr.companion import companion_name, find_companion, is_orphan
+from vtfr.scanner import STAT_CALLS, scan_records
+
+PATTERNS = ["~$$*.*"]
+
+
+@pytest.mark.parametrize("temp, document", [
+    ("~$$Pumps.~vsdx", "Pumps.vsdx"),
+    ("~$$Valves.~vssx", "Valves.vssx"),
+    ("~$$Plant.Layout.~vsd", "Plant.Layout.vsd"),
+    ("~$$Notes.tmp", "Notes.tmp"),  # No ~ before the extension: the name is kept as is
+    ("~$$", None),
+    ("Pumps.~vsdx", None),  # Not a lock file
+])
+def test_companion_name(temp, document):
+    assert companion_name(temp) == document
+
+
+def test_find_companion():
+    siblings = {"pumps.vsdx", "valves.vssx"}
+    assert find_companion("/share/~$$pumps.~vsdx", siblings) == "/share/pumps.vsdx"
+    assert find_companion("/share/~$$Gone.~vsdx", siblings) == ""
+    assert find_companion("/share/scratch.tmp", siblings) is None
+    assert is_orphan({"Orphan": True}) and not is_orphan({"Orphan": "true"}) and not is_orphan({})
+
+
+def test_scan_records_name_their_companion(temp_tree):
+    before = STAT_CALLS.get()
+    records = {r["Name"]: r for r in scan_records(str(temp_tree), PATTERNS)}
+    assert STAT_CALLS.get() - before <= 4  # One per match at most; companions come from the listing
+    assert records["~$$Pumps.~vsdx"]["Companion"] == str(temp_tree / "Pumps.vsdx")
+    assert records["~$$Valves.~vssx"]["Companion"] == str(temp_tree / "stencils" / "Valves.vssx")
+    assert [name for name, r in sorted(records.items()) if r["Orphan"]] == ["~$$Gone.~vsdx", "~$$Old.~vstx"]
+    assert records["~$$Gone.~vsdx"]["Companion"] is None
+
+
+def test_companion_in_another_folder_does_not_count(tmp_path):
+    make_files(tmp_path, ["a/Pumps.vsdx", "b/~$$Pumps.~vsdx"])
+    (record,) = scan_records(str(tmp_path), PATTERNS)
+    assert record["Orphan"]
+
+
+def test_cli_selects_orphans_only(temp_tree, monkeypatch):
+    records = scan_records(str(temp_tree), PATTERNS)
+    files = sorted(Path(r["FullName"]) for r in records)
+    orphans = {r["FullName"] for r in records if is_orphan(r)}
+    monkeypatch.setattr(cli.questionary, "select", lambda *a, **kw: SimpleNamespace(ask=lambda: "orphans"))
+    selected = cli.select_files_for_deletion(files, temp_tree, orphans)
+    assert sorted(p.name for p in selected) == ["~$$Gone.~vsdx", "~$$Old.~vstx"]
+
+
+def test_gui_marks_orphan_rows(temp_tree):
+    import visio_gui
+
+    records = {r["Name"]: r for r in scan_records(str(temp_tree), PATTERNS)}
+    gui = SimpleNamespace(format_file_size=lambda size: f"{size} B", scanned_directory=str(temp_tree))
+    row = visio_gui.VisioTempFileRemoverGUI._row_values
+    values, tags = row(gui, records["~$$Pumps.~vsdx"])
+    assert values[4] == "Pumps.vsdx" and tags == (str(temp_tree / "~$$Pumps.~vsdx"),)
+    values, tags = row(gui, records["~$$Old.~vstx"])
+    assert values[4] == "(missing)" and tags[1] == "orphan"
@@ -0,0 +1,220 @@
+"""Asyncio core engine: streaming scans, bounded deletes and the front ends built on them."""
+import asyncio
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from conftest import make_files
+from vtfr import core
+from vtfr.journal import DeletionJournal, read_journal
+from vtfr.resultstore import ResultStore
+from vtfr.scanner import scan_records
+from vtfr.server import RequestHandler
+from vtfr.settings import compile_settings
+from vtfr.tkbridge import AsyncTkBridge
+
+PATTERNS = ["~$$*.*"]
+
+
+def _by_path(records):
+    return sorted(records, key=lambda r: r["FullName"])
+
+
+@pytest.mark.parametrize("engine", ["threads", "processes"])
+def test_scan_matches_the_synchronous_walkers(temp_tree, engine):
+    records = core.scan_sync(temp_tree, PATTERNS, engine=engine, list_concurrency=2)
+    assert _by_path(records) == _by_path(scan_records(str(temp_tree), PATTERNS))
+
+
+def test_scan_streams_into_a_store(temp_tree):
+    with ResultStore() as store:
+        assert core.scan_sync(temp_tree, PATTERNS, into=store) is store
+        assert len(store) == 4
+
+
+def test_scan_rejects_unknown_engines(temp_tree):
+    with pytest.raises(ValueError, match="Unknown scan engine"):
+        core.scan_sync(temp_tree, PATTERNS, engine="powershell")
+
+
+def test_delete_reports_each_file(temp_tree):
+    present = temp_tree / "~$$Pumps.~vsdx"
+    missing = temp_tree / "~$$Never.~vsdx"
+    folder = temp_tree / "~$$Folder.~vsdx"
+    folder.mkdir()
+    document = temp_tree / "Pumps.vsdx"
+    protected = temp_tree / "stencils" / "deep" / "~$$Old.~vstx"
+    journal = DeletionJournal()
+    try:
+        outcomes = core.delete_sync([present, missing, folder, document, protected], root=str(temp_tree),
+                                    journal=journal, sizes={str(missing): 7},
+                                    protected=[os.path.normcase(str(temp_tree / "stencils"))])
+    finally:
+        journal.close()
+    by_path = {o.path: o for o in outcomes}
+    assert by_path[str(present)][1:3] == ("deleted", 16)
+    assert by_path[str(missing)][1:3] == ("not_found", 7)  # Size from the scan, as the file is gone
+    assert by_path[str(folder)].status == "not_found" and folder.is_dir()
+    assert by_path[str(document)].status == "skipped" and document.exists()  # Not a temp file name
+    assert by_path[str(protected)].status == "skipped" and protected.exists()
+    assert core.count_outcomes(outcomes) == {"deleted": 1, "not_found": 2, "skipped": 2}
+    assert sorted(e.status for e in read_journal()) == ["deleted", "not_found", "not_found", "skipped", "skipped"]
+
+
+def test_delete_bounds_concurrency_and_pulls_paths_lazily(tmp_path, monkeypatch):
+    paths = make_files(tmp_path, [f"~$${i}.~vsdx" for i in range(12)])
+    lock = threading.Lock()
+    running = []
+    peak = []
+    real_remove = os.remove
+
+    def slow_remove(path):
+        with lock:
+            running.append(path)
+            peak.append(len(running))
+        time.sleep(0.02)
+        with lock:
+            running.remove(path)
+        real_remove(path)
+
+    monkeypatch.setattr(core.os, "remove", slow_remove)
+    pulled = []
+
+    def selection():
+        for path in paths:
+            pulled.append(path)
+            yield path
+
+    async def first_outcome():
+        outcomes = core.delete(selection(), unlink_concurrency=3)
+        try:
+            return await outcomes.__anext__(), len(pulled)
+        finally:
+            await outcomes.aclose()
+
+    outcome, pulled_by_then = asyncio.run(first_outcome())
+    assert outcome.status == "deleted" and pulled_by_then <= 4
+    assert len(core.delete_sync(paths[pulled_by_then:], unlink_concurrency=3)) == 12 - pulled_by_then
+    assert max(peak) <= 3 and not any(os.path.exists(p) for p in paths)
+
+
+def test_stopping_early_journals_every_finished_unlink(tmp_path, monkeypatch):
+    paths = make_files(tmp_path, [f"~$${i}.~vsdx" for i in range(6)])
+    real_remove = os.remove
+    journal_threads = set()
+
+    def slow_remove(path):
+        time.sleep(0.05)
+        real_remove(path)
+
+    class Journal(DeletionJournal):
+        def record(self, *args, **kwargs):
+            journal_threads.add(threading.current_thread().name)
+            super().record(*args, **kwargs)
+
+    monkeypatch.setattr(core.os, "remove", slow_remove)
+
+    async def first_outcome(journal):
+        outcomes = core.delete(paths, unlink_concurrency=3, journal=journal)
+        try:
+            return await outcomes.__anext__()
+        finally:
+            await outcomes.aclose()
+
+    with Journal() as journal:
+        asyncio.run(first_outcome(journal))
+    removed = {p for p in paths if not os.path.exists(p)}
+    assert len(removed) > 1  # The unlinks running when the consumer stopped finished
+    assert {e.path for e in read_journal()} == removed and len(removed) < len(paths)
+    assert threading.current_thread().name not in journal_threads  # Not on the event loop
+
+
+@pytest.fixture
+def web(tmp_path):
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), RequestHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+
+    def post(path, payload):
+        request = urllib.request.Request(f"http://127.0.0.1:{httpd.server_address[1]}{path}",
+                                         data=json.dumps(payload).encode())
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status, json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read())
+
+    yield post
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_web_server_scans_and_deletes(web, temp_tree):
+    status, body = web("/api/scan", {"directory": str(temp_tree)})
+    assert status == 200 and len(body["files"]) == 4 and body["scannedDirectory"] == str(temp_tree)
+    files = [r["FullName"] for r in body["files"]]
+    status, body = web("/api/delete", {"files": files})
+    assert status == 200 and body["success"]
+    status, body = web("/api/delete", {"files": files[:1]})
+    assert status == 207 and body["partialSuccess"] and files[0] in body["details"]
+    assert web("/api/delete", {"files": ["", 3]})[1]["invalidCount"] == 2
+    assert web("/api/scan", {"directory": str(temp_tree / "missing")})[0] == 500
+
+
+class FakeTk:
+    """Just enough of a Tk root for the bridge: after() callbacks are run by hand"""
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, delay, callback):
+        self.scheduled.append(callback)
+
+    def run_pending(self):
+        callbacks, self.scheduled = self.scheduled, []
+        for callback in callbacks:
+            callback()
+
+
+def test_bridge_delivers_results_on_the_tk_thread():
+    root = FakeTk()
+    bridge = AsyncTkBridge(root)
+    delivered = []
+
+    async def work(value):
+        await asyncio.sleep(0)
+        return value, threading.current_thread().name
+
+    async def fail():
+        raise OSError("share went away")
+
+    try:
+        bridge.submit(work(42), on_done=lambda result: delivered.append((result, threading.current_thread().name)))
+        bridge.submit(fail(), on_error=lambda error: delivered.append(str(error)))
+        deadline = time.monotonic() + 5
+        while len(delivered) < 2 and time.monotonic() < deadline:
+            root.run_pending()
+            time.sleep(0.01)
+    finally:
+        bridge.close()
+    results = dict(item if isinstance(item, tuple) else ("error", item) for item in delivered)
+    assert results[(42, "vtfr-asyncio")] == threading.current_thread().name
+    assert results["error"] == "share went away"
+
+
+def test_configured_matcher_decides_what_is_scanned_and_deleted(tmp_path, monkeypatch):
+    settings = compile_settings({"temp_file_patterns": ["~*.~vsdx"], "powershell_scripts_path": "scripts"})
+    make_files(tmp_path, ["~Pumps.~vsdx", "Pumps.vsdx"])
+    monkeypatch.setattr(core, "compile_patterns", lambda patterns: pytest.fail("patterns compiled again"))
+    (record,) = core.scan_sync(tmp_path, settings.patterns, match=settings.match)
+    assert record["Name"] == "~Pumps.~vsdx"
+
+    temp = tmp_path / "~Pumps.~vsdx"
+    (outcome,) = core.delete_sync([temp], root=str(tmp_path))
+    assert outcome.status == "skipped" and temp.exists()  # Not a ~$$ name, the default check
+    (outcome,) = core.delete_sync([temp], root=str(tmp_path), match=settings.match)
+    assert outcome.status == "deleted" and not temp.exists()
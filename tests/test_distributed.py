@@ -0,0 +1,133 @@
+"""Coordinator and agents on localhost, each agent serving its own synthetic tree."""
+import os
+import threading
+
+import pytest
+
+from conftest import make_files
+from vtfr.agent import is_loopback, make_server
+from vtfr.coordinator import Coordinator
+
+
+@pytest.fixture
+def start_agent():
+    """Start an agent on a free localhost port; returns its URL"""
+    servers = []
+
+    def start(roots, name, token=None, volume=None):
+        httpd = make_server([str(r) for r in roots], host="127.0.0.1", port=0, name=name, token=token, volume=volume)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        servers.append(httpd)
+        return f"http://127.0.0.1:{httpd.server_address[1]}"
+
+    yield start
+    for httpd in servers:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+@pytest.fixture
+def trees(tmp_path):
+    """Two servers' shares: fs01 with 30 temp files in 3 folders, fs02 with the usual small tree"""
+    fs01 = tmp_path / "fs01"
+    make_files(fs01, [f"d{i % 3}/~$$Drawing{i}.~vsdx" for i in range(30)] + ["d0/Drawing0.vsdx", "d0/readme.txt"])
+    fs02 = tmp_path / "fs02"
+    make_files(fs02, ["Pumps.vsdx", "~$$Pumps.~vsdx", "~$$Gone.~vsdx", "stencils/~$$Valves.~vssx"])
+    return fs01, fs02
+
+
+def test_scan_merges_agents(start_agent, trees):
+    fs01, fs02 = trees
+    coordinator = Coordinator([start_agent([fs01], "fs01"), start_agent([fs02], "fs02")])
+    result = coordinator.scan()
+    assert result.errors == {}
+    assert len(result.records) == 33
+    by_agent = {}
+    for record in result.records:
+        by_agent.setdefault(record["Agent"], set()).add(record["Name"])
+    assert len(by_agent["fs01"]) == 30
+    assert by_agent["fs02"] == {"~$$Pumps.~vsdx", "~$$Gone.~vsdx", "~$$Valves.~vssx"}
+    pumps = next(r for r in result.records if r["Name"] == "~$$Pumps.~vsdx")
+    assert pumps["Companion"] == str(fs02 / "Pumps.vsdx")
+
+
+def test_overlapping_roots_are_deduplicated(start_agent, trees):
+    fs01, _ = trees
+    first = start_agent([fs01], "fs01")
+    second = start_agent([fs01 / "d1"], "fs01-d1")
+    coordinator = Coordinator([first, second])
+    assert len(coordinator.scan().records) == 30
+    assert len({url for volumes in coordinator.owners.values() for url in volumes.values()}) in (1, 2)
+    assert all(len(volumes) == 1 for volumes in coordinator.owners.values())
+    assert len(coordinator.owners) == 30
+
+
+def test_deletes_go_to_the_owning_agent(start_agent, trees, state_dir):
+    fs01, fs02 = trees
+    coordinator = Coordinator([start_agent([fs01], "fs01"), start_agent([fs02], "fs02")])
+    records = coordinator.scan().records
+    targets = [r["FullName"] for r in records if r["Name"] in ("~$$Drawing4.~vsdx", "~$$Gone.~vsdx")]
+    outcomes = coordinator.delete(targets + [str(fs02 / "Pumps.vsdx")])
+    statuses = {o.path: o.status for o in outcomes}
+    assert statuses[str(fs02 / "Pumps.vsdx")] == "skipped"
+    assert [statuses[t] for t in targets] == ["deleted", "deleted"]
+    assert not any(os.path.exists(t) for t in targets)
+
+
+def test_agent_rejects_paths_outside_its_roots(start_agent, trees):
+    fs01, fs02 = trees
+    url = start_agent([fs01], "fs01")
+    coordinator = Coordinator([url])
+    # A confused owner map must not reach other shares
+    coordinator.owners[os.path.normcase(str(fs02 / "~$$Gone.~vsdx"))] = {"fs01": url}
+    (outcome,) = coordinator.delete([fs02 / "~$$Gone.~vsdx"])
+    assert outcome.status == "skipped"
+    assert (fs02 / "~$$Gone.~vsdx").exists()
+
+
+def test_token_and_unreachable_agent(start_agent, trees):
+    fs01, _ = trees
+    url = start_agent([fs01], "fs01", token="s3cret")
+    result = Coordinator([url, "http://127.0.0.1:9"], token="wrong").scan()
+    assert result.records == []
+    assert "401" in result.errors[url][0]
+    assert "http://127.0.0.1:9" in result.errors
+    assert len(Coordinator([url], token="s3cret").scan().records) == 30
+
+
+def test_missing_root_is_reported(start_agent, trees, tmp_path):
+    fs01, _ = trees
+    url = start_agent([fs01, tmp_path / "gone"], "fs01")
+    result = Coordinator([url]).scan()
+    assert len(result.records) == 30
+    assert "does not exist" in result.errors[url][0]
+
+
+def test_agent_needs_a_token_off_loopback(trees):
+    fs01, _ = trees
+    assert is_loopback("127.0.0.1") and is_loopback("::1") and is_loopback("localhost")
+    assert not is_loopback("0.0.0.0") and not is_loopback("") and not is_loopback("fs01")
+    for host in ("0.0.0.0", ""):
+        with pytest.raises(ValueError, match="token"):
+            make_server([str(fs01)], host=host, port=0)
+    httpd = make_server([str(fs01)], host="0.0.0.0", port=0, token="s3cret")
+    httpd.server_close()
+
+
+def test_same_paths_on_different_servers_are_kept_apart(start_agent, trees, monkeypatch):
+    # Two servers with the same local layout: both agents report identical paths, from different volumes
+    fs01, _ = trees
+    first = start_agent([fs01], "fs01", volume="fs01:d")
+    second = start_agent([fs01], "fs02", volume="fs02:d")
+    coordinator = Coordinator([first, second])
+    records = coordinator.scan().records
+    assert len(records) == 60
+    assert {r["Volume"] for r in records} == {"fs01:d", "fs02:d"}
+
+    routed = []
+    monkeypatch.setattr(coordinator, "_delete_on", lambda url, paths: routed.append((url, paths)) or [])
+    target = next(r for r in records if r["Name"] == "~$$Drawing4.~vsdx" and r["Agent"] == "fs02")
+    coordinator.delete([target])
+    assert routed == [(second, [target["FullName"]])]
+    (outcome,) = coordinator.delete([target["FullName"]])
+    assert outcome.status == "skipped" and "Several servers" in outcome.error
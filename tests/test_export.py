@@ -0,0 +1,86 @@
+"""Scan exports: CSV, NDJSON and the columnar binary format."""
+import csv
+import io
+import json
+
+import pytest
+
+import visio_temp_file_remover as cli
+from vtfr.export import export_records, export_scan, format_for, iter_row_groups, read_columnar, write_columnar
+from vtfr.scanner import scan_records
+
+PATTERNS = ["~$$*.*"]
+
+
+def _key(record):
+    return record["FullName"]
+
+
+def test_format_for():
+    assert format_for("out.CSV") == "csv"
+    assert format_for("out.jsonl") == "ndjson"
+    assert format_for("out.txt", "columnar") == "columnar"
+    with pytest.raises(ValueError):
+        format_for("out.txt")
+    with pytest.raises(ValueError):
+        format_for("out.csv", "parquet")
+
+
+def test_columnar_round_trip(temp_tree, tmp_path):
+    records = sorted(scan_records(str(temp_tree), PATTERNS), key=_key)
+    assert export_records(iter(records), tmp_path / "scan.vtfrc") == 4
+    back = sorted(read_columnar(tmp_path / "scan.vtfrc"), key=_key)
+    assert back == records
+    assert any(r["Companion"] for r in back) and any(r["Orphan"] for r in back)
+
+
+def test_columnar_row_groups_share_folders(tmp_path):
+    records = [{"FullName": f"/share/d{i % 3}/~$$f{i}.~vsdx", "Name": f"~$$f{i}.~vsdx", "Directory": f"/share/d{i % 3}",
+                "LastModified": "2025-03-01 10:15:00", "Size": i, "Companion": None, "Orphan": i % 2 == 0}
+               for i in range(10)]
+    with open(tmp_path / "scan.vtfrc", "wb") as f:
+        assert write_columnar(records, f, group_rows=4) == 10
+    groups = list(iter_row_groups(tmp_path / "scan.vtfrc"))
+    assert [g["rows"] for g in groups] == [4, 4, 2]
+    assert len(groups[0]["folders"]) == 3
+    assert list(read_columnar(tmp_path / "scan.vtfrc")) == records
+
+
+def test_columnar_rejects_other_files(tmp_path):
+    (tmp_path / "scan.vtfrc").write_bytes(b"FullName,Name\n")
+    with pytest.raises(ValueError):
+        list(read_columnar(tmp_path / "scan.vtfrc"))
+
+
+def test_csv_and_ndjson(temp_tree, tmp_path):
+    assert export_scan(temp_tree, PATTERNS, tmp_path / "scan.csv") == 4
+    assert export_scan(temp_tree, PATTERNS, tmp_path / "scan.ndjson") == 4
+    rows = list(csv.DictReader(io.StringIO((tmp_path / "scan.csv").read_text(encoding="utf-8"))))
+    lines = [json.loads(line) for line in (tmp_path / "scan.ndjson").read_text(encoding="utf-8").splitlines()]
+    assert sorted(r["Name"] for r in rows) == sorted(r["Name"] for r in lines) == [
+        "~$$Gone.~vsdx", "~$$Old.~vstx", "~$$Pumps.~vsdx", "~$$Valves.~vssx"]
+    orphan = next(r for r in rows if r["Name"] == "~$$Gone.~vsdx")
+    assert (orphan["Orphan"], orphan["Companion"]) == ("true", "")
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_failed_export_leaves_no_file(tmp_path):
+    def records():
+        yield {"FullName": "/a/~$$x.~vsdx", "Name": "~$$x.~vsdx", "Directory": "/a", "LastModified": "2025-03-01 10:15:00", "Size": 1}
+        raise OSError("share went away")
+    with pytest.raises(OSError):
+        export_records(records(), tmp_path / "scan.ndjson")
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_cli_export_to_stdout(temp_tree, capsys):
+    cli.main(["export", "--root", str(temp_tree), "-", "--format", "csv"])
+    out = capsys.readouterr().out.splitlines()
+    assert out[0] == "FullName,Name,Directory,LastModified,Size,Companion,Orphan"
+    assert len(out) == 5
+
+
+def test_cli_export_powershell_engine(fake_powershell, temp_tree, tmp_path, capsys):
+    cli.main(["--engine", "powershell", "export", "--root", str(temp_tree), str(tmp_path / "scan.vtfrc")])
+    assert len(list(read_columnar(tmp_path / "scan.vtfrc"))) == 4
+    assert "Exported 4 file(s)" in capsys.readouterr().out
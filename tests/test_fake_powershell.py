@@ -0,0 +1,94 @@
+"""The fake PowerShell must honour the same contracts as the real scripts."""
+import json
+import subprocess
+import time
+
+from conftest import FAKE_POWERSHELL_DIR, REPO_ROOT, make_files
+
+FAKE = str(FAKE_POWERSHELL_DIR / "powershell")
+SCAN_SCRIPT = str(REPO_ROOT / "scripts" / "Scan-VisioTempFiles.ps1")
+REMOVE_SCRIPT = str(REPO_ROOT / "scripts" / "Remove-VisioTempFiles.ps1")
+
+
+def run(*args):
+    return subprocess.run([FAKE, *args], capture_output=True, text=True, timeout=30)
+
+
+def scan(root, *patterns):
+    args = ["-NoProfile", "-ExecutionPolicy", "Bypass", "-File", SCAN_SCRIPT, "-ScanPath", str(root), "-AsJson"]
+    for pattern in patterns:
+        args += ["-Patterns", pattern]
+    return run(*args)
+
+
+def test_command_echo(fake_powershell):
+    result = run("-Command", "Write-Output 'PowerShell Test'")
+    assert result.returncode == 0
+    assert result.stdout.strip() == "PowerShell Test"
+
+
+def test_scan_many_matches_is_an_array(fake_powershell, temp_tree):
+    result = scan(temp_tree, "~$$*.*")
+    assert result.returncode == 0
+    records = json.loads(result.stdout)
+    assert sorted(r["Name"] for r in records) == ["~$$Gone.~vsdx", "~$$Old.~vstx", "~$$Pumps.~vsdx", "~$$Valves.~vssx"]
+    assert set(records[0]) == {"FullName", "Name", "Directory", "LastModified", "Size"}
+    assert records[0]["Size"] == 16
+
+
+def test_scan_single_match_is_an_object(fake_powershell, temp_tree):
+    result = scan(temp_tree, "~$$*.~vstx")
+    assert json.loads(result.stdout)["Name"] == "~$$Old.~vstx"
+
+
+def test_scan_is_case_insensitive_and_takes_several_patterns(fake_powershell, temp_tree):
+    records = json.loads(scan(temp_tree, "~$$PUMPS.*", "~$$valves.*").stdout)
+    assert sorted(r["Name"] for r in records) == ["~$$Pumps.~vsdx", "~$$Valves.~vssx"]
+
+
+def test_scan_no_match_and_missing_path(fake_powershell, temp_tree):
+    result = scan(temp_tree, "nothing*")
+    assert (result.returncode, result.stdout.strip()) == (0, "[]")
+    result = scan(temp_tree / "missing", "~$$*.*")
+    assert (result.returncode, result.stdout.strip()) == (1, "[]")
+    assert "not found" in result.stderr
+
+
+def test_remove_reports_deleted_and_failed(fake_powershell, tmp_path):
+    temp, doc = make_files(tmp_path, ["~$$A.~vsdx", "A.vsdx"])
+    result = run("-File", REMOVE_SCRIPT, "-FilePaths", temp, doc, str(tmp_path / "missing"))
+    assert result.returncode == 0
+    outcome = json.loads(result.stdout)
+    assert outcome["deleted"] == [temp]
+    assert [f["Path"] for f in outcome["failed"]] == [doc, str(tmp_path / "missing")]
+    assert "pattern" in outcome["failed"][0]["Error"]
+
+
+def test_remove_refuses_protected_folders(fake_powershell, tmp_path, monkeypatch):
+    (temp,) = make_files(tmp_path / "system", ["~$$A.~vsdx"])
+    monkeypatch.setenv("FAKE_POWERSHELL_PROTECTED", str(tmp_path / "system"))
+    outcome = json.loads(run("-File", REMOVE_SCRIPT, "-FilePaths", temp).stdout)
+    assert outcome["deleted"] == []
+    assert "system directories" in outcome["failed"][0]["Error"]
+
+
+def test_remove_without_paths_fails(fake_powershell):
+    result = run("-File", REMOVE_SCRIPT, "-FilePaths")
+    assert result.returncode == 1
+    assert json.loads(result.stdout) == {"deleted": [], "failed": []}
+
+
+def test_latency_and_forced_exit(fake_powershell, monkeypatch):
+    monkeypatch.setenv("FAKE_POWERSHELL_LATENCY", "0.3")
+    start = time.perf_counter()
+    run("-Command", "Write-Output 'x'")
+    assert time.perf_counter() - start >= 0.3
+    monkeypatch.setenv("FAKE_POWERSHELL_EXIT", "3")
+    result = run("-Command", "Write-Output 'x'")
+    assert (result.returncode, result.stdout) == (3, "")
+
+
+def test_invocations_are_logged(fake_powershell, temp_tree):
+    scan(temp_tree, "~$$*.*")
+    logged = [json.loads(line) for line in fake_powershell.read_text().splitlines()]
+    assert logged[-1][:5] == ["-NoProfile", "-ExecutionPolicy", "Bypass", "-File", SCAN_SCRIPT]
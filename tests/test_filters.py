@@ -0,0 +1,106 @@
+"""Filter expressions over result sets, and the CLI's paginated result browser."""
+from pathlib import Path
+
+import pytest
+
+import visio_temp_file_remover as cli
+from result_browser import ResultBrowser
+from vtfr.filters import FilterError, ResultSet
+from vtfr.scanner import scan_records
+from vtfr.snapshot import parse_modified
+
+NOW = "2025-03-31 12:00:00"
+
+
+def _records():
+    rows = [("/share/Plant/~$$Pumps.~vsdx", 2 * 1024 ** 2, "2025-03-31 11:00:00", False),
+            ("/share/Plant/~$$Valves.~vssx", 10, "2025-01-01 08:00:00", True),
+            ("/share/Archive/~$$Old Layout.~vsdx", 500 * 1024, "2024-06-01 08:00:00", True),
+            ("/share/Archive/scratch.tmp", 0, "2025-03-30 12:00:00", False)]
+    return [{"FullName": path, "Name": path.rsplit("/", 1)[1], "Size": size, "LastModified": modified,
+             "Orphan": orphan} for path, size, modified, orphan in rows]
+
+
+@pytest.fixture
+def results(monkeypatch):
+    monkeypatch.setattr(ResultSet, "now", staticmethod(lambda: parse_modified(NOW)))
+    return ResultSet(_records())
+
+
+@pytest.mark.parametrize("expression, rows", [
+    ("", [0, 1, 2, 3]),
+    ("*.~vsdx", [0, 2]),
+    ("pumps", [0]),  # A bare word matches anywhere in the name
+    ("name:~$$V*", [1]),
+    ("path:*/archive/*", [2, 3]),
+    ("re:plant/.*vssx$", [1]),
+    ("size>1MB", [0]),
+    ("size<=10", [1, 3]),
+    ("size=500kb", [2]),
+    ("size>=0.25MB", [0, 2]),
+    ("age<2h", [0]),
+    ("age>30d", [1, 2]),
+    ("age>1w !orphan", []),
+    ("orphan", [1, 2]),
+    ("!orphan *.~vsdx", [0]),
+    ('"name:*Old Layout*"', [2]),
+])
+def test_filter_expressions(results, expression, rows):
+    assert results.filter(expression) == rows
+
+
+@pytest.mark.parametrize("expression, message", [
+    ("size>1XB", "Unknown size unit"),
+    ("age>>3d", "Invalid comparison"),
+    ("re:(", "Invalid regular expression"),
+    ('"unclosed', "No closing quotation"),
+])
+def test_malformed_filters_are_rejected(results, expression, message):
+    with pytest.raises(FilterError, match=message):
+        results.filter(expression)
+
+
+def test_filters_narrow_given_rows(results):
+    assert results.filter("orphan", rows=[0, 2]) == [2]
+
+
+def test_browser_selects_filters_and_pages(monkeypatch, capsys):
+    monkeypatch.setattr(ResultSet, "now", staticmethod(lambda: parse_modified(NOW)))
+    browser = ResultBrowser(_records(), Path("/share"), page_size=2)
+    assert browser._pages() == 2
+    browser.handle("n")
+    assert browser.page == 1
+    browser.handle("f orphan")
+    assert browser.view == [1, 2] and browser.page == 0
+    browser.handle("s 2")
+    assert (browser.selected_count, browser.selected_size) == (1, 500 * 1024)
+    browser.handle("f")
+    browser.handle("s size>1MB")
+    browser.handle("i")  # Invert over all four listed rows
+    assert [i for i in range(4) if browser.selected[i]] == [1, 3]
+    browser.handle("u 1-2")
+    assert [i for i in range(4) if browser.selected[i]] == [3] and browser.selected_size == 0
+    assert "1 selected (0 B)" in capsys.readouterr().out
+    assert browser.handle("done") is True and browser.handle("q") is False
+    with pytest.raises(FilterError):
+        browser.handle("sort colour")
+
+
+def test_browser_run_returns_the_selection(monkeypatch):
+    answers = iter(["f *.~vsdx", "s", "bogus command", "f size>", "done"])
+    monkeypatch.setattr("builtins.input", lambda prompt="": next(answers))
+    selected = ResultBrowser(_records(), Path("/share")).run()
+    assert selected == [Path("/share/Plant/~$$Pumps.~vsdx"), Path("/share/Archive/~$$Old Layout.~vsdx")]
+    monkeypatch.setattr("builtins.input", lambda prompt="": (_ for _ in ()).throw(EOFError))
+    assert ResultBrowser(_records(), Path("/share")).run() is None
+
+
+def test_cli_opens_the_browser_for_large_scans(temp_tree, monkeypatch):
+    records = scan_records(str(temp_tree), ["~$$*.*"])
+    files = sorted(Path(r["FullName"]) for r in records)
+    monkeypatch.setattr(cli, "CHECKBOX_LIMIT", 2)
+    monkeypatch.setattr(cli.questionary, "checkbox", lambda *a, **kw: pytest.fail("checkbox for a large scan"))
+    answers = iter(["s path:*stencils*", "done"])
+    monkeypatch.setattr("builtins.input", lambda prompt="": next(answers))
+    selected = cli.select_files_for_deletion(files, temp_tree, records=records)
+    assert sorted(p.name for p in selected) == ["~$$Old.~vstx", "~$$Valves.~vssx"]
@@ -0,0 +1,92 @@
+"""GUI result sorting and filtering, driven through stand-ins for the Tk widgets."""
+from types import SimpleNamespace
+
+import pytest
+
+import visio_gui
+from vtfr.filters import FilterError, ResultSet
+
+GUI = visio_gui.VisioTempFileRemoverGUI
+
+
+class FakeTree:
+    """The Treeview calls the view makes: row order, selection and headings"""
+    def __init__(self, items):
+        self.children = list(items)
+        self.selected = []
+        self.headings = {}
+
+    def set_children(self, parent, *items):
+        self.children = list(items)
+
+    def selection(self):
+        return tuple(self.selected)
+
+    def selection_set(self, items):
+        self.selected = list(items)
+
+    def heading(self, column, text):
+        self.headings[column] = text
+
+
+class Var:
+    def __init__(self, value=""):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+
+
+def _records():
+    rows = [("~$$beta.~vsdx", 9, "2025-03-02 10:00:00"), ("~$$Alpha.~vsdx", 10 * 1024, "2025-03-01 10:00:00"),
+            ("~$$gamma.~vssx", 100, "2025-03-03 10:00:00")]
+    return [{"FullName": f"/share/{name}", "Name": name, "Size": size, "LastModified": modified}
+            for name, size, modified in rows]
+
+
+@pytest.fixture
+def gui():
+    view = SimpleNamespace(results=ResultSet(_records()), tree=FakeTree(["0", "1", "2"]), filter_var=Var(),
+                           status_var=Var(), sort_column=None, sort_descending=False)
+    view._apply_view = lambda: GUI._apply_view(view)
+    return view
+
+
+def test_headings_sort_and_reverse(gui):
+    GUI.sort_by(gui, "Size")
+    assert gui.tree.children == ["0", "2", "1"]  # By bytes, not by the formatted "10.0 KB"
+    assert gui.tree.headings["Size"].endswith("▲") and gui.tree.headings["Name"] == visio_gui.HEADINGS["Name"]
+    GUI.sort_by(gui, "Size")
+    assert gui.tree.children == ["1", "2", "0"] and gui.tree.headings["Size"].endswith("▼")
+    GUI.sort_by(gui, "Name")
+    assert gui.tree.children == ["1", "0", "2"]  # Case-insensitive
+    GUI.sort_by(gui, "Modified")
+    assert gui.tree.children == ["1", "0", "2"] and not gui.sort_descending
+
+
+def test_filter_hides_rows_and_drops_them_from_the_selection(gui):
+    gui.tree.selected = ["0", "2"]
+    gui.filter_var.set("*.~vsdx")
+    assert GUI._apply_view(gui) == 2
+    assert gui.tree.children == ["0", "1"] and gui.tree.selected == ["0"]
+    gui.sort_column = "Name"
+    gui.filter_var.set("")
+    assert GUI._apply_view(gui) == 3 and gui.tree.children == ["1", "0", "2"]
+
+
+def test_invalid_filter_keeps_the_view(gui):
+    gui.filter_var.set("size>2parsecs")
+    assert GUI._apply_view(gui) is None
+    assert gui.status_var.get().startswith("Invalid filter") and gui.tree.children == ["0", "1", "2"]
+
+
+def test_sort_keys_are_computed_once():
+    results = ResultSet(_records())
+    keys = results.sort_keys("name")
+    assert keys == ["~$$beta.~vsdx", "~$$alpha.~vsdx", "~$$gamma.~vssx"]
+    assert results.sort_keys("name") is keys and results.sort_keys("size") is results.sizes
+    with pytest.raises(FilterError, match="Unknown sort key"):
+        results.sort_keys("colour")
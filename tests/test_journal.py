@@ -0,0 +1,71 @@
+"""Deletion journal: batched binary records and streaming queries."""
+import pytest
+
+from vtfr import journal as journal_module
+from vtfr.journal import DeletionJournal, query_journal, read_journal, summarize
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A settable time.time() for the journal's timestamps"""
+    now = [1000.0]
+    monkeypatch.setattr(journal_module.time, "time", lambda: now[0])
+    return now
+
+
+def test_entries_round_trip(tmp_path):
+    path = tmp_path / "deletions.journal"
+    with DeletionJournal(path, batch_size=2) as journal:
+        journal.record("/share/~$$a.~vsdx", "deleted", 16, "/share")
+        journal.record("/share/~$$b.~vsdx", "failed", 0, "/share", "Access is denied.")
+        journal.record("/share/~$$c.~vsdx", "not_found")
+        assert [e.path for e in read_journal(path)] == ["/share/~$$a.~vsdx", "/share/~$$b.~vsdx"]
+    entries = list(read_journal(path))
+    assert [(e.status, e.size, e.error) for e in entries] == [
+        ("deleted", 16, ""), ("failed", 0, "Access is denied."), ("not_found", 0, "")]
+    assert entries[0].root == "/share" and entries[0].user and entries[0].host
+    assert summarize(entries) == {"deleted": {"files": 1, "bytes": 16}, "failed": {"files": 1, "bytes": 0},
+                                  "not_found": {"files": 1, "bytes": 0}}
+
+
+def test_truncated_tail_is_ignored(tmp_path):
+    path = tmp_path / "deletions.journal"
+    with DeletionJournal(path) as journal:
+        journal.record("/share/~$$a.~vsdx", "deleted", 16)
+        journal.record("/share/~$$b.~vsdx", "deleted", 16)
+    path.write_bytes(path.read_bytes()[:-5])
+    assert [e.path for e in read_journal(path)] == ["/share/~$$a.~vsdx"]
+
+
+def test_not_a_journal(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"something else")
+    with pytest.raises(ValueError):
+        list(read_journal(path))
+
+
+def test_until_does_not_assume_time_order(tmp_path, clock):
+    # Two processes append to one journal; the later-stamped batch is flushed first
+    path = tmp_path / "deletions.journal"
+    DeletionJournal(path).close()
+    early, late = DeletionJournal(path), DeletionJournal(path)
+    early.record("/share/~$$early.~vsdx", "deleted", 1)
+    clock[0] = 2000.0
+    late.record("/share/~$$late.~vsdx", "deleted", 2)
+    late.close()
+    early.close()
+    assert [e.path for e in read_journal(path)] == ["/share/~$$late.~vsdx", "/share/~$$early.~vsdx"]
+    assert [e.path for e in query_journal(path, until=1500.0)] == ["/share/~$$early.~vsdx"]
+    assert [e.path for e in query_journal(path, since=1500.0)] == ["/share/~$$late.~vsdx"]
+
+
+def test_query_filters(tmp_path, clock):
+    path = tmp_path / "deletions.journal"
+    with DeletionJournal(path) as journal:
+        journal.record("/share/eng/~$$a.~vsdx", "deleted", 10, "/share/eng")
+        journal.record("/share/ops/~$$b.~vsdx", "failed", 0, "/share/ops")
+        journal.record("/share/eng/sub/~$$c.~vsdx", "deleted", 5, "")
+    assert [e.path for e in query_journal(path, root="/share/eng")] == [
+        "/share/eng/~$$a.~vsdx", "/share/eng/sub/~$$c.~vsdx"]
+    assert [e.path for e in query_journal(path, status="failed")] == ["/share/ops/~$$b.~vsdx"]
+    assert list(query_journal(path, root="/share/engineering")) == []
@@ -0,0 +1,72 @@
+"""Symbolic links, link loops and hard links in the native walkers."""
+import os
+
+import pytest
+
+from conftest import make_files
+from vtfr import core
+from vtfr.scanner import scan_records
+from vtfr.settings import SettingsError, compile_settings
+
+PATTERNS = ["~$$*.*"]
+pytestmark = pytest.mark.skipif(not hasattr(os, "symlink") or os.name == "nt",
+                                reason="needs POSIX symbolic and hard links")
+
+
+@pytest.fixture
+def linked_tree(tmp_path):
+    """A share whose subfolder links back to the root, plus a link to a folder outside it"""
+    root = tmp_path / "share"
+    make_files(root, ["~$$Top.~vsdx", "a/~$$A.~vsdx", "a/b/~$$B.~vsdx"])
+    make_files(tmp_path / "elsewhere", ["~$$Outside.~vsdx"])
+    os.symlink(root, root / "a" / "b" / "loop")
+    os.symlink(root / "a", root / "a-again")
+    os.symlink(tmp_path / "elsewhere", root / "outside")
+    return root
+
+
+def _names(records):
+    return sorted(r["Name"] for r in records)
+
+
+@pytest.mark.parametrize("engine", ["threads", "processes"])
+def test_links_are_skipped_by_default(linked_tree, engine):
+    records = scan_records(str(linked_tree), PATTERNS, engine=engine, workers=2)
+    assert _names(records) == ["~$$A.~vsdx", "~$$B.~vsdx", "~$$Top.~vsdx"]
+
+
+@pytest.mark.parametrize("engine", ["threads", "processes"])
+def test_followed_links_visit_each_folder_once(linked_tree, engine):
+    records = scan_records(str(linked_tree), PATTERNS, engine=engine, workers=2, follow_links=True)
+    # The loop back to the root and the second way into "a" add nothing; the outside folder is new
+    assert _names(records) == ["~$$A.~vsdx", "~$$B.~vsdx", "~$$Outside.~vsdx", "~$$Top.~vsdx"]
+
+
+def test_async_engine_follows_links(linked_tree):
+    records = core.scan_sync(str(linked_tree), PATTERNS, follow_links=True)
+    assert _names(records) == ["~$$A.~vsdx", "~$$B.~vsdx", "~$$Outside.~vsdx", "~$$Top.~vsdx"]
+    assert _names(core.scan_sync(str(linked_tree), PATTERNS)) == ["~$$A.~vsdx", "~$$B.~vsdx", "~$$Top.~vsdx"]
+
+
+def test_hard_links_are_reported_once(tmp_path):
+    (first,) = make_files(tmp_path, ["x/~$$Plan.~vsdx"])
+    os.makedirs(tmp_path / "y")
+    os.link(first, tmp_path / "y" / "~$$Plan.~vsdx")
+    make_files(tmp_path, ["y/~$$Other.~vsdx"])
+    records = core.scan_sync(str(tmp_path), PATTERNS)
+    assert _names(records) == ["~$$Other.~vsdx", "~$$Plan.~vsdx"]
+
+
+def test_file_symlinks_are_never_reported(tmp_path):
+    (target,) = make_files(tmp_path, ["real/~$$Plan.~vsdx"])
+    os.makedirs(tmp_path / "links")
+    os.symlink(target, tmp_path / "links" / "~$$Alias.~vsdx")
+    assert _names(scan_records(str(tmp_path), PATTERNS, follow_links=True)) == ["~$$Plan.~vsdx"]
+
+
+def test_follow_links_setting():
+    base = {"temp_file_patterns": ["~$$*.*"], "powershell_scripts_path": "scripts"}
+    assert compile_settings(base).follow_links is False
+    assert compile_settings(dict(base, follow_links=True)).follow_links is True
+    with pytest.raises(SettingsError):
+        compile_settings(dict(base, follow_links="yes"))
@@ -0,0 +1,80 @@
+"""Delete-by-manifest: streaming exports back into the delete engine with revalidation."""
+import asyncio
+import os
+
+import pytest
+
+import visio_temp_file_remover as cli
+from vtfr import core
+from vtfr.export import export_records
+from vtfr.manifest import ManifestError, count_manifest, delete_manifest, iter_manifest
+from vtfr.scanner import scan_records
+
+PATTERNS = ["~$$*.*"]
+
+
+def _export(tree, tmp_path, name):
+    path = tmp_path / name
+    export_records(scan_records(str(tree), PATTERNS), path)
+    return path
+
+
+def _apply(path, **options):
+    return asyncio.run(core.collect(delete_manifest(path, **options)))
+
+
+@pytest.mark.parametrize("name", ["approved.csv", "approved.ndjson", "approved.vtfrc"])
+def test_manifest_deletes_listed_files(temp_tree, tmp_path, name):
+    path = _export(temp_tree, tmp_path, name)
+    assert count_manifest(path) == (4, 64)
+    outcomes = _apply(path)
+    assert core.count_outcomes(outcomes) == {"deleted": 4}
+    assert scan_records(str(temp_tree), PATTERNS) == []
+    assert (temp_tree / "Pumps.vsdx").exists()
+
+
+@pytest.mark.parametrize("name", ["approved.csv", "approved.ndjson"])
+def test_orphans_only(temp_tree, tmp_path, name):
+    path = _export(temp_tree, tmp_path, name)
+    assert sorted(os.path.basename(e.path) for e in iter_manifest(path, orphans_only=True)) == \
+        ["~$$Gone.~vsdx", "~$$Old.~vstx"]
+    assert [o.status for o in _apply(path, orphans_only=True)] == ["deleted", "deleted"]
+    assert (temp_tree / "~$$Pumps.~vsdx").exists()
+
+
+def test_files_changed_since_the_manifest_are_kept(temp_tree, tmp_path):
+    path = _export(temp_tree, tmp_path, "approved.ndjson")
+    grown = temp_tree / "~$$Pumps.~vsdx"
+    grown.write_bytes(b"x" * 32)
+    touched = temp_tree / "stencils" / "~$$Valves.~vssx"
+    os.utime(touched, (touched.stat().st_atime, touched.stat().st_mtime + 60))
+    (temp_tree / "~$$Gone.~vsdx").unlink()
+    outcomes = {os.path.basename(o.path): o for o in _apply(path, unlink_concurrency=2)}
+    assert {name: o.status for name, o in outcomes.items()} == {
+        "~$$Pumps.~vsdx": "skipped", "~$$Valves.~vssx": "skipped", "~$$Gone.~vsdx": "not_found",
+        "~$$Old.~vstx": "deleted"}
+    assert outcomes["~$$Pumps.~vsdx"].error == core.CHANGED
+    assert grown.exists() and touched.exists()
+
+
+def test_rows_that_are_not_scan_records_are_rejected(tmp_path):
+    bad = tmp_path / "bad.ndjson"
+    bad.write_text('{"FullName": "/x/~$$a.~vsdx", "Size": 1, "LastModified": "2025-01-01 00:00:00"}\n'
+                   '{"FullName": "/x/~$$b.~vsdx"}\n', encoding="utf-8")
+    with pytest.raises(ManifestError, match="row 2"):
+        count_manifest(bad)
+    headerless = tmp_path / "bad.csv"
+    headerless.write_text("path\n/x/~$$a.~vsdx\n", encoding="utf-8")
+    with pytest.raises(ManifestError, match="Size"):
+        list(iter_manifest(headerless))
+
+
+def test_cli_apply_manifest(temp_tree, tmp_path, state_dir, capsys):
+    path = _export(temp_tree, tmp_path, "approved.csv")
+    (temp_tree / "~$$Pumps.~vsdx").write_bytes(b"changed")
+    cli.main(["--rate-profile", "full", "--workers", "2", "apply-manifest", str(path),
+              "--root", str(temp_tree), "--yes"])
+    out = capsys.readouterr().out
+    assert "3 deleted, 1 changed since the manifest (kept), 0 already gone, 0 failed" in out
+    statuses = sorted(e.status for e in cli.query_journal(root=str(temp_tree)))
+    assert statuses == ["deleted", "deleted", "deleted", "skipped"]
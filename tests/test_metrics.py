@@ -0,0 +1,105 @@
+"""Metrics registry, text exposition and the /metrics endpoints."""
+import threading
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from conftest import make_files
+from vtfr import core
+from vtfr.metrics import REGISTRY, Registry
+from vtfr.scanner import ENTRIES, LISTINGS
+from vtfr.server import RequestHandler
+
+
+def _value(text, sample):
+    for line in text.splitlines():
+        if line.startswith(sample + " "):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"{sample} not in metrics output")
+
+
+def test_counter_loses_no_updates_across_threads():
+    counter = Registry().counter("test_total", "Test")
+
+    def work():
+        for _ in range(20000):
+            counter.inc()
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert counter.get() == 160000
+
+
+def test_text_format():
+    registry = Registry()
+    registry.counter("jobs_total", "Jobs done", ("status",)).labels('ok "quoted"').inc(3)
+    gauge = registry.gauge("queue_depth", "Items waiting")
+    gauge.inc(5)
+    gauge.dec(2)
+    histogram = registry.histogram("job_seconds", "Job time", buckets=(1, 10))
+    for seconds in (0.5, 2, 20):
+        histogram.observe(seconds)
+    text = registry.render()
+    assert "# TYPE jobs_total counter" in text
+    assert 'jobs_total{status="ok \\"quoted\\""} 3' in text
+    assert "queue_depth 3" in text
+    assert 'job_seconds_bucket{le="1"} 1' in text
+    assert 'job_seconds_bucket{le="10"} 2' in text
+    assert 'job_seconds_bucket{le="+Inf"} 3' in text
+    assert "job_seconds_sum 22.5" in text
+    assert "job_seconds_count 3" in text
+
+
+def test_registry_reuses_and_checks_names():
+    registry = Registry()
+    first = registry.counter("x_total", "X")
+    assert registry.counter("x_total", "X") is first
+    with pytest.raises(ValueError):
+        registry.gauge("x_total", "X")
+    gauge = registry.gauge("depth", "Depth")
+    gauge.set_function(lambda: 7)
+    assert "depth 7" in registry.render()
+
+
+def test_scan_and_delete_are_counted(temp_tree):
+    before = REGISTRY.render()
+    records = core.scan_sync(str(temp_tree), ["~$$*.*"])
+    core.delete_sync([records[0]["FullName"]])
+    after = REGISTRY.render()
+    assert _value(after, "vtfr_scan_matches_total") - _value(before, "vtfr_scan_matches_total") == 4
+    assert _value(after, "vtfr_scan_listings_total") - _value(before, "vtfr_scan_listings_total") == 3
+    assert _value(after, 'vtfr_scan_duration_seconds_count{engine="threads"}') >= 1
+    assert _value(after, 'vtfr_delete_outcomes_total{status="deleted"}') >= 1
+    assert _value(after, "vtfr_scans_in_progress") == 0
+    assert _value(after, "vtfr_scan_pending_directories") == 0
+    assert _value(after, "vtfr_delete_in_flight") == 0
+
+
+def test_server_metrics_endpoint(tmp_path):
+    make_files(tmp_path, ["~$$A.~vsdx"])
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), RequestHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{httpd.server_address[1]}"
+    try:
+        request = urllib.request.Request(url + "/api/scan", data=b'{"directory": "%s"}' % str(tmp_path).encode())
+        urllib.request.urlopen(request).read()
+        with urllib.request.urlopen(url + "/metrics") as response:
+            assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            text = response.read().decode("utf-8")
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+    assert _value(text, 'vtfr_http_requests_total{server="web",path="/api/scan",code="200"}') >= 1
+
+
+def test_cells_of_finished_threads_are_folded(temp_tree):
+    before = LISTINGS.get()
+    for _ in range(20):
+        core.scan_sync(str(temp_tree), ["~$$*.*"])
+    assert LISTINGS.get() - before == 20 * 3  # Nothing is lost when a cell is folded
+    for counter in (LISTINGS, ENTRIES):
+        counter.get()  # A scrape folds the cells of the last scan's workers
+        assert len(counter.labels()._cells._cells) <= threading.active_count()  # Only live threads keep a cell
@@ -0,0 +1,96 @@
+"""File owner attribution: lookups, scans, grouping and exports."""
+import csv
+import json
+import os
+
+import pytest
+
+from vtfr.export import export_records, read_columnar
+from vtfr.filters import ResultSet
+from vtfr.owners import NAME_LOOKUPS, OwnerCache
+from vtfr.report import aggregate
+from vtfr.resultstore import ResultStore
+from vtfr.scanner import scan_records
+from vtfr.settings import SettingsError, compile_settings
+
+PATTERNS = ["~$$*.*"]
+posix_only = pytest.mark.skipif(os.name == "nt", reason="POSIX uids")
+
+
+def _me():
+    import pwd
+    return pwd.getpwuid(os.getuid()).pw_name
+
+
+@posix_only
+def test_owner_names_are_looked_up_once_per_account(temp_tree):
+    cache = OwnerCache()
+    before = NAME_LOOKUPS.get()
+    names = {cache.owner(str(p), os.lstat(p)) for p in temp_tree.rglob("*") if p.is_file()}
+    assert names == {_me()}
+    assert NAME_LOOKUPS.get() - before == 1 and len(cache) == 1
+
+
+@posix_only
+def test_unknown_uid_is_reported_as_number():
+    st = os.stat_result((0, 0, 0, 1, 2 ** 31 - 7, 0, 0, 0, 0, 0))
+    assert OwnerCache().owner("/gone", st) == str(2 ** 31 - 7)
+
+
+@posix_only
+@pytest.mark.parametrize("engine", ["threads", "processes"])
+def test_scan_records_carry_owners(temp_tree, engine):
+    records = scan_records(str(temp_tree), PATTERNS, engine=engine, workers=2, owners=True)
+    assert records and {r["Owner"] for r in records} == {_me()}
+    assert all("Owner" not in r for r in scan_records(str(temp_tree), PATTERNS, engine=engine, workers=2))
+
+
+def _records():
+    return [{"FullName": f"/share/~$$f{i}.~vsdx", "Name": f"~$$f{i}.~vsdx", "Directory": "/share",
+             "LastModified": "2025-03-01 10:15:00", "Size": 10 * (i + 1), "Companion": None, "Orphan": False,
+             "Owner": "alice" if i % 3 else "CORP\\bob"} for i in range(6)]
+
+
+def test_report_groups_by_owner():
+    report = aggregate(_records(), "/share")
+    assert [(e.key, e.files, e.size) for e in report.owners] == [("alice", 4, 160), ("CORP\\bob", 2, 50)]
+    assert aggregate([dict(r, Owner=None) for r in _records()], "/share").owners == []
+
+
+def test_owners_survive_the_result_store():
+    with ResultStore(memory_limit=2) as store:
+        store.extend(_records())
+        assert store.spilled
+        assert sorted(r["Owner"] for r in store) == sorted(r["Owner"] for r in _records())
+
+
+def test_filter_and_sort_by_owner():
+    results = ResultSet(_records())
+    assert results.filter("owner:CORP*") == [0, 3]
+    assert [results.owners[i] for i in results.sort(results.rows(), "owner")][:2] == ["alice", "alice"]
+
+
+@pytest.mark.parametrize("name", ["scan.csv", "scan.ndjson", "scan.vtfrc"])
+def test_exports_include_owner_column(tmp_path, name):
+    path = tmp_path / name
+    records = _records() + [dict(_records()[0], FullName="/share/~$$x.~vsdx", Name="~$$x.~vsdx", Owner=None)]
+    assert export_records(records, path, owners=True) == 7
+    if name.endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            owners = [row["Owner"] for row in csv.DictReader(f)]
+        assert owners == [r["Owner"] or "" for r in records]
+    elif name.endswith(".ndjson"):
+        assert [json.loads(line)["Owner"] for line in path.read_text(encoding="utf-8").splitlines()] == \
+            [r["Owner"] for r in records]
+    else:
+        assert list(read_columnar(path)) == records
+    export_records(records, path)
+    assert "Owner" not in (path.read_bytes()[:200].decode("utf-8", "replace"))
+
+
+def test_owners_setting():
+    base = {"temp_file_patterns": ["~$$*.*"], "powershell_scripts_path": "scripts"}
+    assert compile_settings(base).owners is False
+    assert compile_settings(dict(base, owners=True)).owners is True
+    with pytest.raises(SettingsError):
+        compile_settings(dict(base, owners="yes"))
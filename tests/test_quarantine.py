@@ -0,0 +1,106 @@
+"""Quarantine batches: moving temp files aside, restoring and purging them."""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from vtfr import quarantine
+from vtfr.journal import DeletionJournal, read_journal
+from vtfr.quarantine import (QUARANTINE_DIR_NAME, find_batch, holding_dir, list_batches, purge_batches,
+                             quarantine_files, restore_batch)
+from vtfr.settings import compile_settings
+
+
+def test_protected_folders_are_left_alone(temp_tree, monkeypatch):
+    settings = compile_settings({"temp_file_patterns": ["~$$*.*"], "powershell_scripts_path": "scripts",
+                                 "protected_paths": [str(temp_tree / "stencils")]})
+    calls = []
+    monkeypatch.setattr(quarantine, "protected_prefixes", lambda: calls.append(1) or [])
+    inside = temp_tree / "stencils" / "~$$Valves.~vssx"
+    deep = temp_tree / "stencils" / "deep" / "~$$Old.~vstx"
+    outside = temp_tree / "~$$Pumps.~vsdx"
+    result = quarantine_files([inside, deep, outside], temp_tree, protected=settings.protected_prefixes)
+    assert result.moved == [str(outside)]
+    assert [path for path, _ in result.failed] == [str(inside), str(deep)]
+    assert all("system directories" in reason for _, reason in result.failed)
+    assert inside.exists() and deep.exists() and not outside.exists()
+    assert calls == []
+
+    quarantine_files([temp_tree / "~$$Gone.~vsdx"], temp_tree)
+    assert calls == [1]  # Default prefixes are resolved once per call
+    assert [b.files for b in list_batches(holding_dir(temp_tree))] == [1, 1]
+
+
+def test_quarantine_restore_and_purge(temp_tree, state_dir):
+    temp = temp_tree / "~$$Pumps.~vsdx"
+    with DeletionJournal() as journal:
+        result = quarantine_files([temp, temp_tree / "Pumps.vsdx", temp_tree / "~$$Missing.~vsdx"], temp_tree,
+                                  {str(temp): 16}, journal)
+    assert result.moved == [str(temp)] and not temp.exists()
+    assert [reason for _, reason in result.failed] == [
+        "File does not match Visio temporary file pattern for safety.", "File not found or is not a regular file."]
+    assert result.batch.parent == temp_tree / QUARANTINE_DIR_NAME
+    (batch,) = list_batches(holding_dir(temp_tree))
+    assert (batch.files, batch.size) == (1, 16)
+
+    restored, failed = restore_batch(batch.path)
+    assert (restored, failed) == ([str(temp)], []) and temp.exists()
+    assert not batch.path.exists()
+
+    quarantine_files([temp], temp_tree)
+    assert purge_batches(holding_dir(temp_tree), older_than_days=1) == (0, 0)
+    assert purge_batches(holding_dir(temp_tree), older_than_days=-1) == (1, 1)
+    assert list_batches(holding_dir(temp_tree)) == [] and not temp.exists()
+    statuses = [e.status for e in read_journal()]
+    assert statuses == ["quarantined", "failed", "not_found"]
+
+
+def test_restore_keeps_files_whose_place_is_taken(temp_tree):
+    temp = temp_tree / "~$$Pumps.~vsdx"
+    result = quarantine_files([temp], temp_tree)
+    temp.write_bytes(b"new lock file")
+    restored, failed = restore_batch(result.batch)
+    assert restored == [] and failed[0][0] == str(temp)
+    assert temp.read_bytes() == b"new lock file" and result.batch.exists()
+
+
+@pytest.mark.parametrize("name", ["..", ".", "", "../share", "sub/batch", "20250101-000000"])
+def test_only_batches_in_the_holding_area_are_restored(temp_tree, name):
+    result = quarantine_files([temp_tree / "~$$Pumps.~vsdx"], temp_tree)
+    base = holding_dir(temp_tree)
+    assert find_batch(base, result.batch.name) == result.batch
+    with pytest.raises(ValueError):
+        find_batch(base, name)
+    with pytest.raises(ValueError, match="not a quarantine batch"):
+        restore_batch(base / "..")
+    assert (temp_tree / "Pumps.vsdx").exists() and result.batch.exists()
+
+
+def test_cli_rejects_bad_batch_names(temp_tree, capsys):
+    import visio_temp_file_remover as cli
+
+    quarantine_files([temp_tree / "~$$Pumps.~vsdx"], temp_tree)
+    for name in ("..", "missing"):
+        cli.run_quarantine_command(SimpleNamespace(action="restore", batch=name, root=str(temp_tree)))
+        assert "Error:" in capsys.readouterr().out
+    assert (temp_tree / "Pumps.vsdx").exists() and len(list_batches(holding_dir(temp_tree))) == 1
+
+
+def test_configured_holding_area(temp_tree, tmp_path):
+    assert holding_dir(temp_tree, "held") == temp_tree / "held"
+    assert holding_dir(temp_tree, str(tmp_path / "held")) == tmp_path / "held"
+    result = quarantine_files([temp_tree / "~$$Pumps.~vsdx"], temp_tree, configured_dir="held")
+    assert result.batch.parent == temp_tree / "held"
+
+
+def test_gui_uses_the_configured_holding_area(temp_tree):
+    import visio_gui
+
+    settings = compile_settings({"temp_file_patterns": ["~$$*.*"], "powershell_scripts_path": "scripts",
+                                 "quarantine_dir": "held"})
+    gui = SimpleNamespace(_open_journal=lambda: None)
+    coroutine = visio_gui.VisioTempFileRemoverGUI._quarantine_files(gui, [temp_tree / "~$$Pumps.~vsdx"], None,
+                                                                     temp_tree, settings)
+    moved, failed, batch_path = asyncio.run(coroutine)  # On the bridge loop in the GUI
+    (batch,) = list_batches(temp_tree / "held")
+    assert (moved, failed, batch_path) == (1, 0, batch.path) and batch.files == 1
@@ -0,0 +1,89 @@
+"""Rate-limited listings and unlinks, and the time-of-day profiles that set the limits."""
+import datetime
+import threading
+import time
+
+import pytest
+
+from conftest import make_files
+from vtfr import core
+from vtfr.ratelimit import RateLimiter, describe_rate, in_business_hours, profile_names, resolve_profile
+from vtfr.scanner import scan_records
+
+PATTERNS = ["~$$*.*"]
+MONDAY_MORNING = datetime.datetime(2025, 3, 3, 9, 30)
+SATURDAY_MORNING = datetime.datetime(2025, 3, 8, 9, 30)
+
+
+def _timed(limiter, count, threads=1):
+    def work():
+        for _ in range(count):
+            limiter.acquire()
+
+    start = time.monotonic()
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.monotonic() - start
+
+
+def test_operations_are_spaced_out():
+    assert _timed(RateLimiter(50), 6) >= 5 / 50 * 0.9
+    limiter = RateLimiter(100)
+    assert _timed(limiter, 3, threads=4) >= 11 / 100 * 0.9  # The rate holds across threads
+    assert limiter.stats().operations == 12
+    assert limiter.stats().rate == pytest.approx(100, rel=0.2)
+
+
+def test_burst_and_unlimited_do_not_wait():
+    assert _timed(RateLimiter(1, burst=5), 5) < 0.5
+    unlimited = RateLimiter(None)
+    assert _timed(unlimited, 100) < 0.5
+    unlimited.add(20)  # e.g. listings made by worker processes
+    assert unlimited.stats().operations == 120 and unlimited.rate is None
+
+
+def test_describe_rate():
+    assert describe_rate(RateLimiter(25), "listings") == "0 listings in 0.0s (0.0/s, limit 25/s)"
+    limiter = RateLimiter()
+    limiter.acquire()
+    assert describe_rate(limiter, "unlinks") == "1 unlinks in 0.0s (1.0/s, unlimited)"
+
+
+def test_business_hours():
+    assert in_business_hours(now=MONDAY_MORNING)
+    assert not in_business_hours(now=SATURDAY_MORNING)
+    assert not in_business_hours(now=MONDAY_MORNING.replace(hour=18, minute=0))  # The end is exclusive
+    weekend_shift = {'business_hours': {'days': ["Sat"], 'start': "09:00", 'end': "12:00"}}
+    assert in_business_hours(weekend_shift, SATURDAY_MORNING)
+    assert not in_business_hours(weekend_shift, MONDAY_MORNING)
+
+
+def test_profiles():
+    assert resolve_profile(now=MONDAY_MORNING).name == "gentle"
+    assert resolve_profile("auto", now=SATURDAY_MORNING).listings_per_second is None
+    config = {'rate_profile': "night",
+              'rate_profiles': {'night': {'listings_per_second': 200}, 'gentle': {'listings_per_second': 10}}}
+    assert resolve_profile(config=config) == ("night", 200, None)
+    assert resolve_profile("gentle", config) == ("gentle", 10, None)
+    assert profile_names(config) == ["auto", "full", "gentle", "night"]
+    with pytest.raises(ValueError, match="Unknown rate profile 'fast'"):
+        resolve_profile("fast")
+
+
+@pytest.mark.parametrize("engine", ["threads", "processes"])
+def test_scans_count_their_listings(temp_tree, engine):
+    limiter = RateLimiter(1000)
+    assert len(scan_records(str(temp_tree), PATTERNS, engine=engine, workers=2, limiter=limiter)) == 4
+    assert limiter.stats().operations == 3  # The share, stencils and stencils/deep
+
+
+def test_deletes_are_limited(tmp_path):
+    paths = make_files(tmp_path, [f"~$${i}.~vsdx" for i in range(6)])
+    limiter = RateLimiter(50)
+    start = time.monotonic()
+    outcomes = core.delete_sync(paths, limiter=limiter, unlink_concurrency=6)
+    assert core.count_outcomes(outcomes) == {"deleted": 6}
+    assert time.monotonic() - start >= 5 / 50 * 0.9 and limiter.stats().operations == 6
@@ -0,0 +1,121 @@
+"""Incremental refreshes and merging them into a result set."""
+import asyncio
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from conftest import make_files
+from vtfr import core, scanner
+from vtfr.filters import ResultSet
+from vtfr.refresh import FolderIndex, refresh
+from vtfr.settings import compile_settings
+
+PATTERNS = ["~$$*.*"]
+OLD = 1_000_000_000  # Folder times are set back to this, so any change moves them
+
+
+def _age_folders(root):
+    for folder, _, _ in os.walk(root):
+        os.utime(folder, (OLD, OLD))
+
+
+@pytest.fixture
+def indexed(tmp_path):
+    """A share with an up-to-date folder index and a result set of its matches"""
+    make_files(tmp_path, ["~$$Top.~vsdx", "a/~$$A.~vsdx", "a/b/~$$B.~vsdx", "c/Drawing.vsdx"])
+    _age_folders(tmp_path)
+    index = FolderIndex(tmp_path)
+    first = refresh(index, PATTERNS)
+    return tmp_path, index, ResultSet(first.records), first
+
+
+def _listings(monkeypatch):
+    calls = []
+    real = scanner.list_directory
+    monkeypatch.setattr("vtfr.refresh.list_directory", lambda path, *a: calls.append(path) or real(path, *a))
+    return calls
+
+
+def test_first_refresh_lists_everything(indexed):
+    root, index, results, first = indexed
+    assert first.full and len(index) == 4
+    assert sorted(r["Name"] for r in first.records) == ["~$$A.~vsdx", "~$$B.~vsdx", "~$$Top.~vsdx"]
+
+
+def test_unchanged_tree_lists_nothing(indexed, monkeypatch):
+    root, index, results, _ = indexed
+    calls = _listings(monkeypatch)
+    again = refresh(index, PATTERNS)
+    assert calls == [] and not again.records and not again.full
+    assert not results.diff(again.records, again.listed | again.removed)
+
+
+def test_only_changed_folders_are_listed(indexed, monkeypatch):
+    root, index, results, _ = indexed
+    os.remove(root / "a" / "~$$A.~vsdx")
+    make_files(root, ["c/d/~$$New.~vsdx"])
+    calls = _listings(monkeypatch)
+    update = refresh(index, PATTERNS)
+    assert sorted(calls) == sorted(str(root / p) for p in ("a", "c", "c/d"))
+
+    diff = results.diff(update.records, update.listed | update.removed)
+    assert [r["Name"] for r in diff.added] == ["~$$New.~vsdx"]
+    assert [results.paths[i] for i in diff.removed] == [str(root / "a" / "~$$A.~vsdx")]
+    kept = {results.paths[i]: i for i in results.rows()}
+    added = results.apply(diff)
+    assert len(results) == 3 and added == [3]
+    # Rows that did not change keep their index
+    assert all(results.paths[i] == path for path, i in kept.items() if i not in diff.removed)
+    assert results.filter("") == [i for i in range(4) if i not in diff.removed]
+
+
+def test_removed_folder_drops_its_rows(indexed):
+    root, index, results, _ = indexed
+    for name in ("a/b/~$$B.~vsdx", "a/~$$A.~vsdx"):
+        os.remove(root / name)
+    os.rmdir(root / "a" / "b")
+    os.rmdir(root / "a")
+    update = refresh(index, PATTERNS)
+    assert update.removed == {str(root / "a"), str(root / "a" / "b")}
+    diff = results.diff(update.records, update.listed | update.removed)
+    results.apply(diff)
+    assert [results.names[i] for i in results.rows()] == ["~$$Top.~vsdx"]
+
+
+def test_diff_reports_changed_rows():
+    results = ResultSet([{"FullName": "/s/~$$A.~vsdx", "Size": 1, "LastModified": "2024-01-01 00:00:00"}])
+    diff = results.diff([{"FullName": "/s/~$$A.~vsdx", "Size": 5, "LastModified": "2024-01-01 00:00:00"}])
+    assert diff.changed and not diff.added and not diff.removed
+    results.apply(diff)
+    assert results.sizes == [5] and results.filter("size>4") == [0]
+
+
+def test_scan_seeds_the_folder_index(tmp_path, monkeypatch):
+    make_files(tmp_path, ["~$$Top.~vsdx", "a/~$$A.~vsdx", "a/b/~$$B.~vsdx", "c/Drawing.vsdx"])
+    _age_folders(tmp_path)
+    index = FolderIndex(tmp_path)
+    records = core.scan_sync(tmp_path, PATTERNS, folders=index.folders)
+    assert len(records) == 3 and len(index) == 4
+    calls = _listings(monkeypatch)
+    make_files(tmp_path, ["c/~$$New.~vsdx"])
+    update = refresh(index, PATTERNS)
+    assert calls == [str(tmp_path / "c")] and not update.full
+    assert [r["Name"] for r in update.records] == ["~$$New.~vsdx"]
+
+
+def test_gui_first_scan_goes_through_the_core_engine(tmp_path, monkeypatch):
+    import visio_gui
+
+    make_files(tmp_path, ["~$$Top.~vsdx", "a/~$$A.~vsdx"])
+    settings = compile_settings({"temp_file_patterns": PATTERNS, "powershell_scripts_path": "scripts",
+                                 "scan_engine": "powershell"})
+    engines = []
+    real = core.scan
+    monkeypatch.setattr(core, "scan", lambda *a, **kw: engines.append(kw["engine"]) or real(*a, **kw))
+    monkeypatch.setattr(visio_gui, "refresh", lambda *a: pytest.fail("the first scan must not refresh"))
+    index = FolderIndex(tmp_path)
+    records, _ = asyncio.run(visio_gui.VisioTempFileRemoverGUI._scan_files(SimpleNamespace(), str(tmp_path),
+                                                                            settings, index))
+    assert engines == ["threads"] and len(records) == 2
+    assert sorted(index.folders) == [str(tmp_path), str(tmp_path / "a")]
@@ -0,0 +1,87 @@
+"""Incremental release packaging: hashed sources, cached deflate streams and a valid zip."""
+import hashlib
+import importlib.util
+import os
+import zipfile
+
+import pytest
+
+from conftest import REPO_ROOT, make_files
+
+_spec = importlib.util.spec_from_file_location("create_release", REPO_ROOT / "tools" / "create_release.py")
+create_release = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(create_release)
+
+PACKAGE = f"{create_release.PACKAGE_NAME}-v1.0.0"
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    """A checkout with a few of the files the release includes; builds run from it"""
+    # core.py and safety.py have the same content, so they share one cached stream
+    make_files(tmp_path, ["vtfr/core.py", "vtfr/safety.py", "vtfr/__pycache__/core.cpython-312.pyc", "docs/gui.md"])
+    for name in ("visio_gui.py", "LICENSE", "docs/gui.md"):
+        (tmp_path / name).write_text(f"{name}\n")
+    (tmp_path / "config.json").write_text('{"temp_file_patterns": ["~$$*.*"]}')
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("VTFR_GUI_VERSION", raising=False)
+    monkeypatch.setattr(create_release, "FILES_TO_INCLUDE", ["visio_gui.py", "vtfr", "LICENSE", "config.json",
+                                                              "run_gui.bat"])
+    monkeypatch.setattr(create_release, "DOCS_TO_INCLUDE", ["docs/gui.md"])
+    return tmp_path
+
+
+def _build(capsys, **options):
+    create_release.create_release_package(jobs=2, **options)
+    return capsys.readouterr().out
+
+
+def test_release_zip_holds_the_sources(project, capsys):
+    out = _build(capsys)
+    # Missing files and bytecode are left out; the two identical files are compressed once
+    assert "6 files: 6 copied, 0 removed, 7 compressed" in out
+    zip_path = project / "release" / f"{PACKAGE}.zip"
+    with zipfile.ZipFile(zip_path) as archive:
+        assert archive.testzip() is None
+        names = archive.namelist()
+        assert archive.read(f"{PACKAGE}/config.json") == (project / "config.json").read_bytes()
+    assert sorted(names) == sorted(f"{PACKAGE}/{rel}" for rel in ["INSTALLATION.md", "LICENSE", "SHA256SUMS",
+                                                                   "config.json", "docs/gui.md", "visio_gui.py",
+                                                                   "vtfr/core.py", "vtfr/safety.py"])
+    sums = dict(reversed(line.split("  ")) for line in
+                (project / "release" / PACKAGE / "SHA256SUMS").read_text().splitlines())
+    assert sums["vtfr/core.py"] == hashlib.sha256(b"x" * 16).hexdigest()
+    digest = hashlib.sha256(zip_path.read_bytes()).hexdigest()
+    assert (project / "release" / f"{PACKAGE}.zip.sha256").read_text() == f"{digest}  {PACKAGE}.zip\n"
+    assert f"SHA-256: {digest}" in out
+
+
+def test_unchanged_rebuild_rewrites_nothing(project, capsys):
+    _build(capsys)
+    zip_path = project / "release" / f"{PACKAGE}.zip"
+    before = zip_path.stat().st_mtime_ns
+    assert "0 copied, 0 removed, 0 compressed" in _build(capsys)
+    assert zip_path.stat().st_mtime_ns == before
+
+
+def test_only_changed_files_are_copied_and_compressed(project, capsys, monkeypatch):
+    _build(capsys)
+    (project / "visio_gui.py").write_text("print('v2')\n")
+    monkeypatch.setattr(create_release, "DOCS_TO_INCLUDE", [])
+    out = _build(capsys)
+    # The changed file, plus the regenerated checksum list
+    assert "5 files: 1 copied, 1 removed, 2 compressed" in out
+    package = project / "release" / PACKAGE
+    assert not (package / "docs").exists()
+    with zipfile.ZipFile(project / "release" / f"{PACKAGE}.zip") as archive:
+        assert archive.read(f"{PACKAGE}/visio_gui.py") == b"print('v2')\n"
+    assert len(list((project / "release" / ".cache").glob("*.deflate"))) == 6  # Stale streams are dropped
+
+
+def test_level_change_and_force_rebuild(project, capsys):
+    _build(capsys)
+    assert "0 copied, 0 removed, 7 compressed" in _build(capsys, level=1)
+    assert "6 copied, 0 removed, 0 compressed" in _build(capsys, level=1, force=True)
+    with zipfile.ZipFile(project / "release" / f"{PACKAGE}.zip") as archive:
+        assert archive.testzip() is None
+    assert not os.path.exists(project / "release" / f"{PACKAGE}.zip.tmp")
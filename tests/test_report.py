@@ -0,0 +1,66 @@
+"""Reclaimable-space report: per folder subtree, extension and orphan totals."""
+import os
+
+import visio_temp_file_remover as cli
+from vtfr.report import aggregate, display_folder, format_file_size
+from vtfr.scanner import scan_records
+
+PATTERNS = ["~$$*.*"]
+
+
+def _record(path, size, **extra):
+    return dict({"FullName": path, "Name": os.path.basename(path), "Size": size}, **extra)
+
+
+def test_folders_roll_up_to_the_root():
+    records = [_record("/share/a/~$$1.~vsdx", 10, Directory="/share/a"),
+               _record("/share/a/b/~$$2.~vsdx", 20, DirectoryName="/share/a/b"),
+               _record("/share/a/b/~$$3.~VSDX", 30),
+               _record("/share/c/~$$4.~vssx", 5),
+               _record("/share/~$$5.~vsdx", 1)]
+    report = aggregate(records, "/share/")
+    assert (report.root, report.total_files, report.total_size) == ("/share", 5, 66)
+    # The root is left out; each folder counts everything beneath it
+    assert [tuple(e) for e in report.folders] == [("/share/a", 3, 60), ("/share/a/b", 2, 50), ("/share/c", 1, 5)]
+    assert [tuple(e) for e in report.extensions] == [(".~vsdx", 4, 61), (".~vssx", 1, 5)]
+    assert report.orphan_files == 0 and report.owners == []
+
+
+def test_top_n_keeps_the_heaviest():
+    records = [_record(f"/share/d{i}/~$${i}{ext}", i, Directory=f"/share/d{i}")
+               for i, ext in zip(range(1, 6), [".a", ".b", ".c", ".d", ""])]
+    report = aggregate(records, "/share", top_n=2)
+    assert [e.key for e in report.folders] == ["/share/d5", "/share/d4"]
+    assert [e.key for e in report.extensions] == ["(none)", ".d"]
+    assert report.total_files == 5
+
+
+def test_odd_records_are_tolerated():
+    records = [{"Name": "no path", "Size": 99},
+               _record("/share/~$$a.~vsdx", "not a number"),
+               _record("/share/~$$b.~vsdx", None, Orphan=True),
+               _record("/share/~$$c.~vsdx", 7, Orphan=True)]
+    report = aggregate(records, "/share")
+    assert (report.total_files, report.total_size) == (3, 7)
+    assert (report.orphan_files, report.orphan_size) == (2, 7)
+    assert report.folders == []
+
+
+def test_formatting_helpers():
+    assert format_file_size(0) == "0 B"
+    assert format_file_size(1536) == "1.5 KB"
+    assert format_file_size(3 * 1024 ** 5) == "3072.0 TB"
+    assert display_folder("/share/a/b", "/share") == os.path.join("a", "b")
+    assert display_folder("/elsewhere", "/share") == "/elsewhere"
+    assert display_folder("/share/..backup", "/share") == "..backup"
+    assert display_folder("/", "/share") == "/"
+
+
+def test_cli_prints_the_report(temp_tree, capsys):
+    records = scan_records(str(temp_tree), PATTERNS)
+    cli.print_reclaim_summary(records, temp_tree)
+    out = capsys.readouterr().out
+    assert "64.0 B in 4 file(s)" in out
+    assert "32.0 B in 2 file(s)" in out  # The orphans
+    assert "32.0 B        2 file(s)  stencils" in out
+    assert f"16.0 B        1 file(s)  {os.path.join('stencils', 'deep')}" in out
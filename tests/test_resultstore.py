@@ -0,0 +1,106 @@
+"""Spill-to-disk result store: sorted runs merged back in path order."""
+import os
+import random
+
+import pytest
+
+from vtfr import core, resultstore
+from vtfr.resultstore import ResultStore
+from vtfr.settings import SettingsError, compile_settings
+from vtfr.snapshot import iter_snapshot, save_snapshot
+
+PATTERNS = ["~$$*.*"]
+
+
+def _records(count, seed=7):
+    rng = random.Random(seed)
+    records = []
+    for i in range(count):
+        folder = os.path.join("share", f"dept{rng.randrange(20):02d}")
+        path = os.path.join(folder, f"~$$drawing{rng.randrange(10 ** 9):09d}-{i}.~vsdx")
+        orphan = i % 3 == 0
+        records.append({
+            'FullName': path, 'Name': os.path.basename(path), 'Directory': folder,
+            'LastModified': "2024-05-01 12:00:00", 'Size': i,
+            'Companion': None if orphan else os.path.join(folder, "drawing.vsdx"), 'Orphan': orphan,
+        })
+    return records
+
+
+def test_spilled_store_merges_in_path_order():
+    records = _records(1000)
+    with ResultStore(memory_limit=64) as store:
+        store.extend(records)
+        assert store.spilled and store.runs == 1000 // 64
+        assert len(store) == 1000
+        assert store.total_size == sum(range(1000))
+        assert store.orphan_count == sum(1 for r in records if r['Orphan'])
+        assert list(store) == sorted(records, key=lambda r: r['FullName'])
+        assert list(store.orphan_paths()) == sorted(r['FullName'] for r in records if r['Orphan'])
+        assert list(store.paths(lambda r: r['Size'] < 10)) == sorted(r['FullName'] for r in records if r['Size'] < 10)
+
+
+def test_runs_are_compacted(monkeypatch):
+    monkeypatch.setattr(resultstore, "MAX_RUNS", 3)
+    records = _records(500)
+    store = ResultStore(memory_limit=50).extend(records)
+    assert store.runs <= 3
+    assert [r['FullName'] for r in store] == sorted(r['FullName'] for r in records)
+    assert len(os.listdir(store._spill_dir)) == store.runs
+
+
+def test_close_removes_runs_and_extra_keys_survive():
+    store = ResultStore(memory_limit=2)
+    store.extend(dict(r, Agent="fs01") for r in _records(5))
+    spill_dir = store._spill_dir
+    assert all(r['Agent'] == "fs01" for r in store)
+    store.close()
+    assert not os.path.exists(spill_dir)
+    assert len(store) == 0 and list(store) == []
+
+
+def test_in_memory_store_writes_no_files(tmp_path):
+    store = ResultStore(memory_limit=100, directory=str(tmp_path)).extend(_records(99))
+    assert not store.spilled
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_scan_into_store_and_snapshot(temp_tree, tmp_path):
+    store = core.scan_sync(str(temp_tree), PATTERNS, into=ResultStore(memory_limit=2))
+    plain = core.scan_sync(str(temp_tree), PATTERNS)
+    assert store.spilled
+    assert list(store) == sorted(plain, key=lambda r: r['FullName'])
+    streamed = save_snapshot(temp_tree, store, tmp_path / "a")
+    sorted_in_memory = save_snapshot(temp_tree, plain, tmp_path / "b")
+    assert list(iter_snapshot(streamed)) == list(iter_snapshot(sorted_in_memory))
+
+
+def test_result_memory_limit_setting():
+    base = {'temp_file_patterns': PATTERNS, 'powershell_scripts_path': "scripts"}
+    assert compile_settings(base).result_memory_limit == resultstore.DEFAULT_MEMORY_LIMIT
+    assert compile_settings(dict(base, result_memory_limit=50000)).result_memory_limit == 50000
+    with pytest.raises(SettingsError):
+        compile_settings(dict(base, result_memory_limit=10))
+
+
+def test_cli_deletes_orphans_of_a_spilled_scan(temp_tree, monkeypatch, capsys):
+    import visio_temp_file_remover as cli
+
+    class Answer:
+        def __init__(self, value):
+            self.value = value
+
+        def ask(self):
+            return self.value
+    monkeypatch.setattr(cli.questionary, "select", lambda *args, **kwargs: Answer("orphans"))
+    monkeypatch.setattr(cli.questionary, "confirm", lambda *args, **kwargs: Answer(True))
+    monkeypatch.setattr(cli.SETTINGS, "current",
+                        lambda: compile_settings({'temp_file_patterns': PATTERNS, 'powershell_scripts_path': "scripts",
+                                                  'result_memory_limit': 1000}))
+    store = core.scan_sync(str(temp_tree), PATTERNS, into=ResultStore(memory_limit=2))
+    orphans = list(store.orphan_paths())
+    assert orphans
+    cli.delete_spilled_results(store, temp_tree, rate_profile="full")
+    assert not any(os.path.exists(p) for p in orphans)
+    assert all(os.path.exists(r['FullName']) for r in store if not r['Orphan'])
+    assert f"{len(orphans)} deleted, 0 failed" in capsys.readouterr().out
@@ -0,0 +1,108 @@
+"""Transient delete failures are retried with backoff; the rest of the batch keeps going."""
+import errno
+import os
+
+import pytest
+
+from conftest import make_files
+from vtfr import core
+from vtfr.retry import NOT_FOUND, PERMANENT, TRANSIENT, RetryPolicy, classify_error
+
+FAST = RetryPolicy(attempts=3, base_delay=0.01, max_delay=0.05)
+
+
+class SteadyPolicy(RetryPolicy):
+    """No jitter, so the order of attempts is predictable"""
+    def delay(self, attempt, rand=None):
+        return 0.1
+
+
+def _oserror(code, winerror=None):
+    error = OSError(code, os.strerror(code))
+    if winerror is not None:
+        error.winerror = winerror
+    return error
+
+
+@pytest.mark.parametrize("error, kind", [
+    (_oserror(errno.EACCES, winerror=32), TRANSIENT),  # Sharing violation
+    (_oserror(errno.EINVAL, winerror=64), TRANSIENT),  # Network name no longer available
+    (_oserror(errno.ETIMEDOUT), TRANSIENT),
+    (ConnectionResetError(errno.ECONNRESET, "reset"), TRANSIENT),
+    (FileNotFoundError(errno.ENOENT, "gone"), NOT_FOUND),
+    (_oserror(errno.ENOENT, winerror=3), NOT_FOUND),
+    (PermissionError(errno.EACCES, "denied"), PERMANENT),
+    (_oserror(errno.EROFS), PERMANENT),
+])
+def test_classify_error(error, kind):
+    assert classify_error(error) == kind
+
+
+def test_delay_is_jittered_and_capped():
+    policy = RetryPolicy(attempts=10, base_delay=1.0, max_delay=5.0)
+    assert policy.delay(1, rand=lambda: 1.0) == 1.0
+    assert policy.delay(3, rand=lambda: 1.0) == 4.0
+    assert policy.delay(8, rand=lambda: 1.0) == 5.0
+    assert policy.delay(8, rand=lambda: 0.25) == 1.25
+
+
+@pytest.fixture
+def flaky_remove(monkeypatch):
+    """Make os.remove fail for chosen files: {name: [error, ...]} raised in turn, then succeed"""
+    plan = {}
+    calls = []
+    real_remove = os.remove
+
+    def remove(path):
+        calls.append(os.path.basename(path))
+        errors = plan.get(os.path.basename(path))
+        if errors:
+            raise errors.pop(0)
+        real_remove(path)
+    monkeypatch.setattr(core.os, "remove", remove)
+    return plan, calls
+
+
+def test_transient_failure_is_retried(tmp_path, flaky_remove):
+    plan, calls = flaky_remove
+    paths = make_files(tmp_path, ["~$$A.~vsdx", "~$$B.~vsdx", "~$$C.~vsdx"])
+    plan["~$$A.~vsdx"] = [_oserror(errno.ETIMEDOUT), _oserror(errno.ECONNRESET)]
+    outcomes = core.delete_sync(paths, retry=SteadyPolicy(attempts=3), unlink_concurrency=1)
+    by_name = {os.path.basename(o.path): o for o in outcomes}
+    assert {o.status for o in outcomes} == {"deleted"}
+    assert by_name["~$$A.~vsdx"].attempts == 3
+    assert by_name["~$$B.~vsdx"].attempts == 1
+    # B and C went ahead while A waited for its retry
+    assert calls[:3] == ["~$$A.~vsdx", "~$$B.~vsdx", "~$$C.~vsdx"]
+    assert [os.path.basename(o.path) for o in outcomes][-1] == "~$$A.~vsdx"
+
+
+def test_gives_up_after_the_last_attempt(tmp_path, flaky_remove, state_dir):
+    from vtfr.journal import DeletionJournal, query_journal
+    plan, calls = flaky_remove
+    (path,) = make_files(tmp_path, ["~$$A.~vsdx"])
+    plan["~$$A.~vsdx"] = [_oserror(errno.ETIMEDOUT) for _ in range(5)]
+    journal = DeletionJournal()
+    (outcome,) = core.delete_sync([path], retry=FAST, journal=journal)
+    journal.close()
+    assert (outcome.status, outcome.attempts) == ("failed", 3)
+    assert "gave up after 3 attempts" in outcome.error
+    assert calls == ["~$$A.~vsdx"] * 3
+    assert [e.status for e in query_journal()] == ["failed"]  # Only the final outcome is journalled
+
+
+def test_permanent_failure_is_not_retried(tmp_path, flaky_remove):
+    plan, calls = flaky_remove
+    (path,) = make_files(tmp_path, ["~$$A.~vsdx"])
+    plan["~$$A.~vsdx"] = [_oserror(errno.EROFS)]
+    (outcome,) = core.delete_sync([path], retry=FAST)
+    assert (outcome.status, outcome.attempts) == ("failed", 1)
+    assert calls == ["~$$A.~vsdx"]
+
+
+def test_vanished_file_is_not_found(tmp_path, flaky_remove):
+    plan, _ = flaky_remove
+    (path,) = make_files(tmp_path, ["~$$A.~vsdx"])
+    plan["~$$A.~vsdx"] = [_oserror(errno.ENOENT)]
+    (outcome,) = core.delete_sync([path], retry=FAST)
+    assert outcome.status == "not_found"
@@ -0,0 +1,78 @@
+"""Native scan engines: threaded and process-pool walkers produce the same records."""
+import os
+import time
+
+import pytest
+
+from conftest import make_files
+from vtfr.scanner import ENGINES, compile_patterns, make_record, scan, scan_processes, scan_records
+
+PATTERNS = ["~$$*.*"]
+
+
+@pytest.fixture
+def wide_tree(tmp_path):
+    """Matches at the root and spread over several top-level shards of different depths"""
+    names = ["~$$Root.~vsdx", "Root.vsdx"]
+    for shard in range(5):
+        names += [f"s{shard}/~$${shard}-{i}.~vsdx" for i in range(3)]
+        names += [f"s{shard}/{'d/' * shard}~$$Deep{shard}.~vssx", f"s{shard}/drawing{shard}.vsdx"]
+    make_files(tmp_path, names)
+    return tmp_path
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_engines_find_every_match(wide_tree, engine):
+    records = scan_records(str(wide_tree), PATTERNS, engine=engine, workers=2)
+    assert len(records) == 1 + 5 * 4
+    assert sorted(r["Name"] for r in records if "Deep" in r["Name"]) == [f"~$$Deep{i}.~vssx" for i in range(5)]
+
+
+def test_engines_agree(temp_tree):
+    by_engine = [sorted(scan_records(str(temp_tree), PATTERNS, engine=engine, workers=2),
+                        key=lambda r: r["FullName"]) for engine in ENGINES]
+    assert by_engine[0] == by_engine[1]
+    assert {r["Name"] for r in by_engine[0]} == {"~$$Pumps.~vsdx", "~$$Gone.~vsdx", "~$$Valves.~vssx",
+                                                 "~$$Old.~vstx"}
+
+
+def test_small_batches_lose_nothing(wide_tree):
+    hits = list(scan_processes(str(wide_tree), PATTERNS, workers=3, batch_size=1))
+    assert len(hits) == len(set(hit[0] for hit in hits)) == 21
+
+
+def test_records_have_the_powershell_shape(tmp_path):
+    (path,) = make_files(tmp_path, ["~$$A.~vsdx"], size=5, mtime=time.mktime((2024, 3, 1, 9, 30, 15, 0, 0, -1)))
+    (record,) = scan_records(str(tmp_path), PATTERNS)
+    assert record == {"FullName": path, "Name": "~$$A.~vsdx", "Directory": str(tmp_path),
+                      "LastModified": "2024-03-01 09:30:15", "Size": 5, "Companion": None, "Orphan": True}
+    assert make_record((path, 5, 0.0))["Companion"] is None  # Hits from older checkpoints have no companion
+
+
+def test_patterns_match_like_powershell():
+    match = compile_patterns(["~$$*.~vs?x", "*.tmp"])
+    assert match("~$$Pumps.~VSDX") and match("scratch.TMP")
+    assert not match("Pumps.vsdx") and not match("~$$Pumps.~vsdxx")
+    assert compile_patterns([])("anything") is None
+
+
+def test_missing_root_is_an_error(tmp_path):
+    for engine in ENGINES:
+        with pytest.raises(OSError):
+            list(scan(str(tmp_path / "missing"), PATTERNS, engine))
+
+
+def test_unknown_engine_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match="Unknown scan engine"):
+        scan(str(tmp_path), PATTERNS, "powershell")
+
+
+@pytest.mark.skipif(os.name == "nt" or os.geteuid() == 0, reason="needs POSIX permissions enforced")
+def test_unreadable_folders_are_skipped(wide_tree):
+    locked = wide_tree / "s1"
+    locked.chmod(0)
+    try:
+        for engine in ENGINES:
+            assert len(scan_records(str(wide_tree), PATTERNS, engine=engine, workers=2)) == 21 - 4
+    finally:
+        locked.chmod(0o755)
@@ -0,0 +1,117 @@
+"""Scheduled runs: cron expressions, root locks, resumed scans and run summaries."""
+import datetime
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from vtfr import scheduler
+from vtfr.scheduler import (Job, RootLock, Scheduler, load_jobs, parse_cron, read_summaries, run_job)
+from vtfr.settings import SettingsError, compile_settings
+
+BASE = {'temp_file_patterns': ["~$$*.*"], 'powershell_scripts_path': "scripts", 'rate_profile': "full"}
+
+
+@pytest.mark.parametrize("expression, after, expected", [
+    ("30 2 * * Mon-Fri", datetime.datetime(2026, 10, 16, 3, 0), datetime.datetime(2026, 10, 19, 2, 30)),
+    ("*/15 * * * *", datetime.datetime(2026, 1, 1, 0, 7), datetime.datetime(2026, 1, 1, 0, 15)),
+    ("0 9 1,15 * *", datetime.datetime(2026, 2, 1, 9, 0), datetime.datetime(2026, 2, 15, 9, 0)),
+    ("0 0 13 * fri", datetime.datetime(2026, 1, 1), datetime.datetime(2026, 1, 2)),  # Either day field matches
+    ("0 3 * Jan,Jul 7", datetime.datetime(2026, 1, 31), datetime.datetime(2026, 7, 5, 3, 0)),
+    ("@monthly", datetime.datetime(2026, 12, 31, 23, 59), datetime.datetime(2027, 1, 1)),
+])
+def test_cron_next_after(expression, after, expected):
+    assert parse_cron(expression).next_after(after) == expected
+
+
+@pytest.mark.parametrize("expression", ["* * * *", "60 * * * *", "0 0 * * Funday", "*/0 * * * *", "5-1 * * * *"])
+def test_invalid_cron(expression):
+    with pytest.raises(ValueError):
+        parse_cron(expression)
+
+
+def test_load_jobs_validates_entries():
+    jobs = load_jobs({'schedules': [{'name': "nightly", 'cron': "0 2 * * *", 'root': "/srv/share"}]})
+    assert jobs[0].action == "delete_orphans" and not jobs[0].quarantine
+    for bad in ({'name': "x y", 'cron': "0 2 * * *", 'root': "/a"},
+                {'name': "n", 'cron': "0 2 * *", 'root': "/a"},
+                {'name': "n", 'cron': "0 2 * * *", 'root': "/a", 'action': "format"}):
+        with pytest.raises(SettingsError):
+            load_jobs({'schedules': [bad]})
+
+
+def test_root_lock_excludes_and_takes_over_stale_locks(tmp_path):
+    first = RootLock(tmp_path / "share", owner="first")
+    assert first.acquire()
+    assert not RootLock(str(tmp_path / "share") + os.sep).acquire()
+    first.release()
+
+    dead = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"],
+                          capture_output=True, text=True).stdout.strip()
+    lock = RootLock(tmp_path / "share")
+    lock.path.write_text(f'{{"pid": {dead}, "host": "{scheduler.socket.gethostname()}"}}', encoding='utf-8')
+    assert lock.acquire()
+    lock.release()
+    assert not lock.path.exists()
+
+
+def _job(root, action="delete_orphans"):
+    return Job("nightly", parse_cron("@daily"), str(root), action, False, None)
+
+
+def test_run_deletes_orphans_and_saves_summary(temp_tree):
+    summary = run_job(_job(temp_tree), compile_settings(BASE))
+    assert summary.status == "completed" and not summary.resumed
+    assert (summary.files, summary.orphans, summary.removed, summary.failed) == (4, 2, 2, 0)
+    assert not (temp_tree / "~$$Gone.~vsdx").exists()
+    assert (temp_tree / "~$$Pumps.~vsdx").exists()
+    assert read_summaries("nightly") == [summary]
+
+
+def test_run_is_skipped_while_the_root_is_locked(temp_tree):
+    with RootLock(temp_tree, owner="interactive scan"):
+        summary = run_job(_job(temp_tree), compile_settings(BASE))
+    assert summary.status == "skipped"
+    assert "interactive scan" in summary.error
+    assert (temp_tree / "~$$Gone.~vsdx").exists()
+
+
+def test_interrupted_scan_is_resumed_by_the_next_run(temp_tree):
+    stop = threading.Event()
+    stop.set()  # Stop after the first match
+    first = run_job(_job(temp_tree, "scan"), compile_settings(BASE), stop=stop)
+    assert first.status == "interrupted" and first.files < 4
+    second = run_job(_job(temp_tree, "scan"), compile_settings(BASE))
+    assert second.status == "completed" and second.resumed
+    assert second.files == 4
+    assert [s.status for s in read_summaries("nightly")] == ["interrupted", "completed"]
+
+
+class _Settings:
+    def __init__(self, schedules):
+        self.settings = compile_settings(dict(BASE, schedules=schedules))
+
+    def current(self):
+        return self.settings
+
+
+def test_scheduler_starts_due_jobs_once(tmp_path):
+    clock = [datetime.datetime(2026, 3, 2, 1, 59, 30)]
+    started = []
+    sched = Scheduler(_Settings([{'name': "a", 'cron': "0 2 * * *", 'root': str(tmp_path)},
+                                 {'name': "b", 'cron': "0 3 * * *", 'root': str(tmp_path)}]),
+                      now=lambda: clock[0], log=lambda message: None,
+                      runner=lambda job, settings, due, stop: started.append((job.name, due)) or
+                      scheduler.RunSummary(job.name, job.root, job.action, "completed", due, due, due))
+    assert sched.tick() == 30.0
+    assert started == []
+    clock[0] = datetime.datetime(2026, 3, 2, 2, 0, 5)
+    sched.tick()
+    for thread in sched.threads:
+        thread.join()
+    assert started == [("a", datetime.datetime(2026, 3, 2, 2, 0).timestamp())]
+    sched.tick()
+    assert len(started) == 1
+    assert sched.next_runs() == {'a': datetime.datetime(2026, 3, 3, 2, 0), 'b': datetime.datetime(2026, 3, 2, 3, 0)}
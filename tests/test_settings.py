@@ -0,0 +1,86 @@
+"""Precompiled config.json settings and reloading them when the file changes."""
+import json
+import os
+
+import pytest
+
+from vtfr.settings import SettingsError, SettingsWatcher, compile_settings, load_settings
+
+BASE = {"temp_file_patterns": ["~$$*.*", "~*.~vsdx"], "powershell_scripts_path": "scripts"}
+
+
+def _write(path, data, mtime):
+    path.write_text(json.dumps(data) if isinstance(data, dict) else data, encoding="utf-8")
+    os.utime(path, (mtime, mtime))  # Each version gets its own time, however fast the test writes
+
+
+def test_settings_are_precompiled():
+    data = dict(BASE, temp_file_patterns=["~$$*.*", "*; rm -rf /", 7], default_scan_path="/share/./plant/",
+                protected_paths=["/share/Keep"], rate_profiles={"night": {"listings_per_second": 100}})
+    settings = compile_settings(data)
+    assert settings.patterns == ("~$$*.*",) and settings.ignored_patterns == ("*; rm -rf /", "7")
+    assert settings.is_temp_name("~$$PUMPS.~VSDX") and not settings.is_temp_name("Pumps.vsdx")
+    assert settings.default_root == os.path.normpath("/share/plant")
+    assert os.path.normcase(os.path.normpath("/share/Keep")) in settings.protected_prefixes
+    assert (settings.scan_engine, settings.rate_profile, settings.quarantine_dir) == ("threads", "auto", None)
+    assert settings.profile("night").listings_per_second == 100
+    data["rate_profiles"]["night"]["listings_per_second"] = 1  # The settings keep their own copy
+    assert settings.profile("night").listings_per_second == 100
+    with pytest.raises(TypeError):
+        settings.config["rate_profile"] = "full"
+
+
+@pytest.mark.parametrize("change, message", [
+    ({"temp_file_patterns": "~$$*.*"}, "must be a list"),
+    ({"temp_file_patterns": ["*; rm"]}, "No valid file patterns"),
+    ({"powershell_scripts_path": ""}, "powershell_scripts_path"),
+    ({"default_scan_path": 3}, "default_scan_path"),
+    ({"scan_engine": "fibers"}, "scan_engine"),
+    ({"rate_profile": "turbo"}, "Invalid rate limit settings"),
+    ({"result_memory_limit": 10}, "result_memory_limit"),
+    ({"protected_paths": "/share"}, "protected_paths"),
+])
+def test_invalid_settings_are_rejected(change, message):
+    with pytest.raises(SettingsError, match=message):
+        compile_settings(dict(BASE, **change))
+
+
+def test_load_settings_errors(tmp_path):
+    with pytest.raises(SettingsError, match="not found"):
+        load_settings(tmp_path / "config.json")
+    (tmp_path / "config.json").write_text("{not json")
+    with pytest.raises(SettingsError, match="Could not decode JSON"):
+        load_settings(tmp_path / "config.json")
+
+
+def test_watcher_reloads_changed_files(tmp_path):
+    path = tmp_path / "config.json"
+    _write(path, BASE, 1_000_000)
+    reloaded, errors = [], []
+    watcher = SettingsWatcher(path, check_interval=3600, on_reload=reloaded.append, on_error=errors.append)
+    first = watcher.current()
+    assert watcher.check() is False  # Unchanged
+
+    _write(path, dict(BASE, scan_engine="processes"), 1_000_010)
+    assert watcher.current() is first  # Not checked again before the interval is up
+    assert watcher.check() is True
+    assert watcher.current().scan_engine == "processes" and reloaded == [watcher.current()]
+    assert first.scan_engine == "threads"  # Work that started with the old settings keeps them
+
+
+def test_watcher_keeps_the_last_good_settings(tmp_path):
+    path = tmp_path / "config.json"
+    _write(path, BASE, 1_000_000)
+    errors = []
+    watcher = SettingsWatcher(path, check_interval=0, on_error=errors.append)
+    good = watcher.current()
+
+    _write(path, "{broken", 1_000_010)
+    assert watcher.current() is good and watcher.current() is good
+    assert len(errors) == 1 and isinstance(errors[0], SettingsError)  # Reported once per version
+
+    path.unlink()
+    assert watcher.current() is good and len(errors) == 2
+
+    _write(path, dict(BASE, owners=True), 1_000_020)
+    assert watcher.current().owners is True and len(errors) == 2
@@ -0,0 +1,62 @@
+"""Scan snapshots: front-coded files, ordering and the streaming diff."""
+import pytest
+
+from vtfr import snapshot
+from vtfr.resultstore import ResultStore
+from vtfr.snapshot import (SNAPSHOT_TIME_FORMAT, diff_snapshots, format_modified, iter_snapshot, list_snapshots,
+                           parse_modified, read_header, save_snapshot)
+
+
+def _record(path, size, modified="2025-03-01 10:15:00"):
+    return {"FullName": path, "Size": size, "LastModified": modified}
+
+
+@pytest.fixture
+def frozen_stamp(monkeypatch):
+    """Every snapshot is taken in the same second"""
+    strftime = snapshot.time.strftime
+    monkeypatch.setattr(snapshot.time, "strftime",
+                        lambda fmt, *t: "20250301-101500" if fmt == SNAPSHOT_TIME_FORMAT and not t else strftime(fmt, *t))
+
+
+def test_modified_round_trip():
+    seconds = parse_modified("2025-03-01 10:15:07")
+    assert format_modified(seconds) == "2025-03-01 10:15:07"
+    assert parse_modified(None) == parse_modified("garbage") == 0
+
+
+def test_snapshot_round_trip(tmp_path):
+    records = [_record("/share/b/~$$x.~vsdx", 5), _record("/share/a/~$$y.~vsdx", 7), _record("/share/a/~$$é.~vsdx", 1)]
+    path = save_snapshot("/share", records, tmp_path)
+    assert read_header(path)["count"] == 3
+    entries = list(iter_snapshot(path))
+    assert [e.path for e in entries] == sorted(r["FullName"] for r in records)
+    assert entries[0].modified == parse_modified("2025-03-01 10:15:00")
+
+    with ResultStore(memory_limit=1) as store:
+        store.extend(records)
+        streamed = save_snapshot("/share", store, tmp_path)
+    assert list(iter_snapshot(streamed)) == entries
+
+
+def test_snapshots_in_the_same_second_keep_their_order(tmp_path, frozen_stamp):
+    paths = [save_snapshot("/share", [_record("/share/~$$a.~vsdx", n)], tmp_path) for n in range(1, 12)]
+    assert [p.name for p in paths[:3]] == ["20250301-101500.snap", "20250301-101500-2.snap", "20250301-101500-3.snap"]
+    assert list_snapshots("/share", tmp_path) == paths
+    assert [e.size for e in iter_snapshot(list_snapshots("/share", tmp_path)[-1])] == [11]
+
+
+def test_pruning_keeps_the_newest(tmp_path, frozen_stamp):
+    for n in range(1, 6):
+        save_snapshot("/share", [_record("/share/~$$a.~vsdx", n)], tmp_path, keep=2)
+    kept = list_snapshots("/share", tmp_path)
+    assert [next(iter_snapshot(p)).size for p in kept] == [4, 5]
+
+
+def test_diff(tmp_path, frozen_stamp):
+    old = save_snapshot("/share", [_record("/share/a", 1), _record("/share/b", 2), _record("/share/c", 3)], tmp_path)
+    new = save_snapshot("/share", [_record("/share/b", 2), _record("/share/c", 30), _record("/share/d", 4),
+                                   _record("/share/e", 5, "2025-03-02 08:00:00")], tmp_path)
+    diff = [(d.kind, d.path, d.delta) for d in diff_snapshots(old, new)]
+    assert diff == [("removed", "/share/a", -1), ("changed", "/share/c", 27), ("new", "/share/d", 4),
+                    ("new", "/share/e", 5)]
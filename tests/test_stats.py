@@ -0,0 +1,54 @@
+"""Batched and counted stat calls in the native walkers."""
+import os
+
+import pytest
+
+from conftest import make_files
+from vtfr import scanner
+from vtfr.scanner import STAT_CALLS, scan, scan_records
+
+PATTERNS = ["~$$*.*"]
+
+
+@pytest.fixture
+def busy_folder(tmp_path):
+    """A share with one folder of many matches and a few elsewhere"""
+    names = [f"big/~$$Drawing{i}.~vsdx" for i in range(150)] + [f"big/Drawing{i}.vsdx" for i in range(50)]
+    make_files(tmp_path, names + ["~$$Top.~vsdx", "a/~$$A.~vsdx"])
+    return tmp_path
+
+
+def _scan(root, engine="threads"):
+    return sorted(scan(str(root), PATTERNS, engine=engine, workers=2))
+
+
+def test_parallel_stats_give_the_same_hits(busy_folder, monkeypatch):
+    serial = _scan(busy_folder)
+    monkeypatch.setattr(scanner, "PARALLEL_STAT_MIN", 1)
+    assert _scan(busy_folder) == serial
+    assert len(serial) == 152
+    assert all(size > 0 for _, size, _, _ in serial)
+
+
+def test_vanished_match_is_dropped(tmp_path, monkeypatch):
+    make_files(tmp_path, [f"~$$D{i}.~vsdx" for i in range(3)])
+    entries = sorted(os.scandir(tmp_path), key=lambda e: e.name)
+    os.remove(entries[1].path)
+    monkeypatch.setattr(scanner, "PARALLEL_STAT_MIN", 1)
+    results = list(scanner.stat_entries(entries))
+    assert results[1] is None and results[0] is not None and results[2] is not None
+
+
+@pytest.mark.skipif(os.name == "nt", reason="Windows listings carry the stat data")
+@pytest.mark.parametrize("engine", ["threads", "processes"])
+def test_one_stat_call_per_match(busy_folder, engine):
+    before = STAT_CALLS.get()
+    records = scan_records(str(busy_folder), PATTERNS, engine=engine, workers=2)
+    assert STAT_CALLS.get() - before == len(records) == 152
+
+
+def test_no_stat_calls_when_the_listing_has_them(busy_folder, monkeypatch):
+    monkeypatch.setattr(scanner, "STAT_FROM_LISTING", True)
+    before = STAT_CALLS.get()
+    assert len(_scan(busy_folder)) == 152
+    assert STAT_CALLS.get() == before
@@ -0,0 +1,58 @@
+# PowerShell scan engine benchmark: subprocess round trip vs. the native walker
+#
+# Runs anywhere: unless --real is given, the fake PowerShell from
+# tests/fake_powershell is put first on PATH, with --latency seconds of
+# simulated start-up time per invocation.
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "cli-tool"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from bench_scan import build_tree  # noqa: E402
+
+
+def time_scan(cli, root, engine):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        records = cli.find_temp_file_records(Path(root), cli.TEMP_PATTERNS, engine)
+    return time.perf_counter() - start, len(records)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the PowerShell scan engine against the native one.")
+    parser.add_argument("--sizes", default="1000,10000,50000", help="Comma-separated synthetic tree sizes (files)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated PowerShell start-up time in seconds")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per engine; the best time is reported")
+    parser.add_argument("--real", action="store_true", help="Use the PowerShell on PATH instead of the fake")
+    args = parser.parse_args()
+
+    if not args.real:
+        os.environ["PATH"] = str(REPO_ROOT / "tests" / "fake_powershell") + os.pathsep + os.environ.get("PATH", "")
+        os.environ["FAKE_POWERSHELL_LATENCY"] = str(args.latency)
+    os.environ.setdefault("VTFR_STATE_DIR", tempfile.mkdtemp(prefix="vtfr-bench-"))
+    import visio_temp_file_remover as cli
+
+    print(f"{'files':>9} {'matches':>8} {'powershell (s)':>15} {'threads (s)':>12}  overhead")
+    for size in (int(s) for s in args.sizes.split(",")):
+        with tempfile.TemporaryDirectory() as root:
+            created = build_tree(root, size)
+            results = {}
+            for engine in ("powershell", "threads"):
+                runs = [time_scan(cli, root, engine) for _ in range(args.repeat)]
+                results[engine] = min(t for t, _ in runs)
+                matches = runs[0][1]
+            print(f"{created:>9} {matches:>8} {results['powershell']:>15.3f} {results['threads']:>12.3f}  "
+                  f"{results['powershell'] / results['threads']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
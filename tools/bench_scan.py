@@ -0,0 +1,83 @@
+# Scan engine benchmark: threaded walker vs. process-pool walker
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from vtfr.scanner import LISTINGS, STAT_CALLS, scan  # noqa: E402
+
+PATTERNS = ["~$$*.*"]
+
+
+def build_tree(root, total_files, top_dirs=16, depth=3, match_ratio=0.05):
+    """Create a synthetic tree with roughly ``total_files`` files spread over ``top_dirs`` shards"""
+    per_leaf = max(1, total_files // (top_dirs * depth))
+    created = 0
+    for t in range(top_dirs):
+        current = Path(root) / f"share{t:03d}"
+        for d in range(depth):
+            current = current / f"level{d}"
+            current.mkdir(parents=True, exist_ok=True)
+            for i in range(per_leaf):
+                name = f"~$$Drawing{i}.~vsdx" if (i % int(1 / match_ratio)) == 0 else f"Drawing{i}.vsdx"
+                (current / name).write_bytes(b"x" * 128)
+                created += 1
+    return created
+
+
+def time_engine(root, engine, workers):
+    start = time.perf_counter()
+    matched = sum(1 for _ in scan(root, PATTERNS, engine, workers))
+    return time.perf_counter() - start, matched
+
+
+def count_syscalls(root, engine, workers):
+    """Folder listings and stat calls of one scan, read from the scan metrics"""
+    listings, stats = LISTINGS.get(), STAT_CALLS.get()
+    matched = time_engine(root, engine, workers)[1]
+    return int(LISTINGS.get() - listings), int(STAT_CALLS.get() - stats), matched
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the native scan engines.")
+    parser.add_argument("--sizes", default="2000,20000,100000",
+                        help="Comma-separated synthetic tree sizes (files)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Workers for both engines")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per engine; the best time is reported")
+    args = parser.parse_args()
+
+    crossover = None
+    syscalls = []
+    print(f"{'files':>9} {'threads (s)':>12} {'processes (s)':>14} {'threads f/s':>12} {'processes f/s':>14}  faster")
+    for size in (int(s) for s in args.sizes.split(",")):
+        with tempfile.TemporaryDirectory() as root:
+            created = build_tree(root, size)
+            results = {}
+            for engine in ("threads", "processes"):
+                results[engine] = min(time_engine(root, engine, args.workers)[0] for _ in range(args.repeat))
+            syscalls += [(created, engine) + count_syscalls(root, engine, args.workers)
+                         for engine in ("threads", "processes")]
+            faster = min(results, key=results.get)
+            if faster == "processes" and crossover is None:
+                crossover = created
+            print(f"{created:>9} {results['threads']:>12.3f} {results['processes']:>14.3f} "
+                  f"{created / results['threads']:>12.0f} {created / results['processes']:>14.0f}  {faster}")
+
+    if crossover is None:
+        print("Crossover: the threaded walker was faster at every size tested.")
+    else:
+        print(f"Crossover: the process pool overtakes the threaded walker at about {crossover} files.")
+
+    print()
+    print(f"{'files':>9} {'engine':>10} {'listings':>9} {'matches':>8} {'stat calls':>11} {'stats/match':>12}")
+    for created, engine, listings, stats, matched in syscalls:
+        print(f"{created:>9} {engine:>10} {listings:>9} {matched:>8} {stats:>11} {stats / max(matched, 1):>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,69 +1,46 @@
 # Visio Temp File Remover GUI Release Packaging Script
+#
+# Builds are incremental: source files are hashed (reusing the previous hash
+# when size and mtime are unchanged), only changed files are copied into the
+# package directory, and zip members are deflated in parallel and cached by
+# content hash. A rebuild with no changes rewrites nothing.
 
+import argparse
+import hashlib
+import json
 import os
 import shutil
-import zipfile
+import struct
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-def create_release_package():
-    """Create a release package for the Visio Temp File Remover GUI"""
-    
-    # Define package name and version
-    package_name = "VisioTempFileRemover-GUI"
-    # Prefer environment override, e.g., VTFR_GUI_VERSION=1.0.1
-    version = os.getenv("VTFR_GUI_VERSION", "1.0.0")
-    
-    # Create release directory
-    release_dir = Path("release")
-    release_dir.mkdir(exist_ok=True)
-    
-    # Create package directory
-    package_dir = release_dir / f"{package_name}-v{version}"
-    if package_dir.exists():
-        shutil.rmtree(package_dir)
-    package_dir.mkdir()
-    
-    # Files to include in the release
-    files_to_include = [
-        "visio_gui.py",
-        "run_gui.bat",
-        "LICENSE",
-        "config.json",
-        "scripts/Scan-VisioTempFiles.ps1",
-        "scripts/Remove-VisioTempFiles.ps1",
-        "scripts/.placeholder",
-        "dist/VisioTempFileRemover.exe"
-    ]
-    
-    # Copy files to package directory
-    for file_path in files_to_include:
-        src_path = Path(file_path)
-        if src_path.exists():
-            dst_path = package_dir / file_path
-            dst_path.parent.mkdir(parents=True, exist_ok=True)
-            if src_path.is_dir():
-                shutil.copytree(src_path, dst_path)
-            elif src_path.is_file():
-                shutil.copy2(src_path, dst_path)
-    
-    # Copy documentation files
-    docs_to_include = [
-        "docs/gui.md",
-        "docs/installation.md",
-        "docs/release-notes.md"
-    ]
-    
-    docs_dir = package_dir / "docs"
-    docs_dir.mkdir(exist_ok=True)
-    
-    for doc_path in docs_to_include:
-        src_path = Path(doc_path)
-        if src_path.exists():
-            dst_path = package_dir / doc_path
-            shutil.copy2(src_path, dst_path)
-    
-    # Create a simple installation guide
-    install_guide = """# Visio Temp File Remover GUI - Installation Guide
+PACKAGE_NAME = "VisioTempFileRemover-GUI"
+DEFAULT_LEVEL = 9
+CHECKSUMS_FILE = "SHA256SUMS"
+HASH_CHUNK = 1024 * 1024
+
+# Files and folders to include in the release
+FILES_TO_INCLUDE = [
+    "visio_gui.py",
+    "vtfr",
+    "run_gui.bat",
+    "LICENSE",
+    "config.json",
+    "scripts/Scan-VisioTempFiles.ps1",
+    "scripts/Remove-VisioTempFiles.ps1",
+    "scripts/.placeholder",
+    "dist/VisioTempFileRemover.exe"
+]
+
+DOCS_TO_INCLUDE = [
+    "docs/gui.md",
+    "docs/installation.md",
+    "docs/release-notes.md"
+]
+
+INSTALL_GUIDE = """# Visio Temp File Remover GUI - Installation Guide
 
 ## System Requirements
 - Windows operating system (Windows 7 or later)
@@ -91,23 +68,225 @@ def create_release_package():
 - For detailed instructions, see docs/installation.md
 - For GUI information, see docs/gui.md
 """
-    
-    with open(package_dir / "INSTALLATION.md", "w", encoding="utf-8", newline="\n") as f:
-        f.write(install_guide)
-    
-    # Create a release zip file
-    zip_filename = f"{package_name}-v{version}.zip"
-    zip_path = release_dir / zip_filename
-    
-    with zipfile.ZipFile(zip_path, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=9) as zipf:
-        for root, _, files in os.walk(package_dir):
-            for file in files:
-                file_path = Path(root) / file
-                arc_path = file_path.relative_to(release_dir)
-                zipf.write(file_path, arc_path)
-    
+
+# Zip structures (no zip64; members are far below 4 GB)
+_LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+_CENTRAL_HEADER = struct.Struct("<4s6H3L5H2L")
+_END_RECORD = struct.Struct("<4s4H2LH")
+_BLOB_HEADER = struct.Struct("<2L")  # crc32 and uncompressed size, ahead of the cached deflate stream
+_ZIP_VERSION = 20
+_UTF8_FLAG = 0x800
+_DEFLATED = 8  # Compression method
+
+
+def file_sha256(path):
+    """SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def collect_sources():
+    """Map each package-relative path (with / separators) to its source file"""
+    sources = {}
+    for entry in FILES_TO_INCLUDE + DOCS_TO_INCLUDE:
+        src_path = Path(entry)
+        if src_path.is_dir():
+            for path in sorted(src_path.rglob("*")):
+                if path.is_file() and "__pycache__" not in path.parts and path.suffix != ".pyc":
+                    sources[path.as_posix()] = path
+        elif src_path.is_file():
+            sources[src_path.as_posix()] = src_path
+    return sources
+
+
+def hash_sources(sources, previous, jobs):
+    """Return {relative path: [size, mtime_ns, sha256]}, rehashing only files whose size or mtime changed"""
+    hashes = {}
+    to_hash = []
+    for rel, path in sources.items():
+        st = path.stat()
+        old = previous.get(rel)
+        if old and old[0] == st.st_size and old[1] == st.st_mtime_ns:
+            hashes[rel] = old
+        else:
+            hashes[rel] = [st.st_size, st.st_mtime_ns, None]
+            to_hash.append(rel)
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        for rel, sha in zip(to_hash, pool.map(lambda r: file_sha256(sources[r]), to_hash)):
+            hashes[rel][2] = sha
+    return hashes
+
+
+def sync_package(package_dir, sources, hashes, previous):
+    """Copy new and changed files into the package directory and remove files no longer included"""
+    copied = 0
+    for rel, path in sources.items():
+        dst_path = package_dir / rel
+        old = previous.get(rel)
+        if old and old[2] == hashes[rel][2] and dst_path.is_file():
+            continue
+        dst_path.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(path, dst_path)
+        copied += 1
+
+    removed = 0
+    keep = set(sources) | {"INSTALLATION.md", CHECKSUMS_FILE}
+    for root, dirs, files in os.walk(package_dir, topdown=False):
+        for file in files:
+            file_path = Path(root) / file
+            if file_path.relative_to(package_dir).as_posix() not in keep:
+                file_path.unlink()
+                removed += 1
+        if Path(root) != package_dir and not os.listdir(root):
+            os.rmdir(root)
+    return copied, removed
+
+
+def write_if_changed(path, text):
+    """Write a generated file only when its content differs, so its mtime stays put otherwise"""
+    data = text.encode('utf-8')
+    if path.is_file() and path.read_bytes() == data:
+        return False
+    path.write_bytes(data)
+    return True
+
+
+def _dos_timestamp(mtime):
+    t = time.localtime(max(mtime, 315532800))  # The zip format starts at 1980
+    return (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2), ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+
+
+def _deflate(path, blob_path, level):
+    """Compress one file into a cached raw deflate stream"""
+    data = path.read_bytes()
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    compressed = compressor.compress(data) + compressor.flush()
+    tmp = blob_path.with_name(blob_path.name + ".tmp")
+    with open(tmp, 'wb') as f:
+        f.write(_BLOB_HEADER.pack(zlib.crc32(data) & 0xFFFFFFFF, len(data)))
+        f.write(compressed)
+    os.replace(tmp, blob_path)
+
+
+def write_zip(zip_path, members, cache_dir, level, jobs):
+    """Write the release zip from (arcname, file, sha256) members.
+
+    Members are deflated on a thread pool (zlib releases the GIL) into
+    ``cache_dir``, keyed by content hash and level, so unchanged files are
+    never compressed twice. The zip is then assembled from the cached streams.
+    Returns how many members had to be compressed.
+    """
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    blobs = [cache_dir / f"{sha}-{level}.deflate" for _, _, sha in members]
+    # Keyed by blob: members with the same content share one stream and must be deflated once
+    pending = {blob: path for (_, path, _), blob in zip(members, blobs) if not blob.is_file()}
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        list(pool.map(lambda job: _deflate(job[1], job[0], level), pending.items()))
+
+    tmp = zip_path.with_name(zip_path.name + ".tmp")
+    central = []
+    with open(tmp, 'wb') as out:
+        for (arcname, path, _), blob in zip(members, blobs):
+            name = arcname.encode('utf-8')
+            dos_time, dos_date = _dos_timestamp(path.stat().st_mtime)
+            with open(blob, 'rb') as f:
+                crc, size = _BLOB_HEADER.unpack(f.read(_BLOB_HEADER.size))
+                compressed_size = blob.stat().st_size - _BLOB_HEADER.size
+                offset = out.tell()
+                out.write(_LOCAL_HEADER.pack(b"PK\x03\x04", _ZIP_VERSION, _UTF8_FLAG, _DEFLATED,
+                                             dos_time, dos_date, crc, compressed_size, size, len(name), 0))
+                out.write(name)
+                shutil.copyfileobj(f, out)
+            central.append(_CENTRAL_HEADER.pack(b"PK\x01\x02", _ZIP_VERSION, _ZIP_VERSION, _UTF8_FLAG,
+                                                _DEFLATED, dos_time, dos_date, crc, compressed_size,
+                                                size, len(name), 0, 0, 0, 0, 0, offset) + name)
+        start = out.tell()
+        for record in central:
+            out.write(record)
+        out.write(_END_RECORD.pack(b"PK\x05\x06", 0, 0, len(central), len(central), out.tell() - start, start, 0))
+    os.replace(tmp, zip_path)
+
+    used = {blob.name for blob in blobs}
+    for old in cache_dir.glob("*.deflate"):
+        if old.name not in used:
+            old.unlink()
+    return len(pending)
+
+
+def create_release_package(level=DEFAULT_LEVEL, jobs=None, force=False):
+    """Create a release package for the Visio Temp File Remover GUI"""
+    start = time.perf_counter()
+
+    # Prefer environment override, e.g., VTFR_GUI_VERSION=1.0.1
+    version = os.getenv("VTFR_GUI_VERSION", "1.0.0")
+
+    # Create release directory
+    release_dir = Path("release")
+    release_dir.mkdir(exist_ok=True)
+    package_dir = release_dir / f"{PACKAGE_NAME}-v{version}"
+    zip_path = release_dir / f"{PACKAGE_NAME}-v{version}.zip"
+    state_path = release_dir / f".{package_dir.name}.state.json"
+    cache_dir = release_dir / ".cache"
+
+    state = {}
+    if state_path.is_file() and not force:
+        try:
+            state = json.loads(state_path.read_text(encoding="utf-8"))
+        except ValueError:
+            state = {}
+    if force and package_dir.exists():
+        shutil.rmtree(package_dir)
+    package_dir.mkdir(exist_ok=True)
+
+    # Hash the sources and bring the package directory up to date
+    sources = collect_sources()
+    previous = state.get('files', {})
+    hashes = hash_sources(sources, previous, jobs)
+    copied, removed = sync_package(package_dir, sources, hashes, previous)
+
+    # Generated files: installation guide and checksum manifest
+    write_if_changed(package_dir / "INSTALLATION.md", INSTALL_GUIDE)
+    checksums = {rel: entry[2] for rel, entry in hashes.items()}
+    checksums["INSTALLATION.md"] = hashlib.sha256(INSTALL_GUIDE.encode('utf-8')).hexdigest()
+    manifest = "".join(f"{checksums[rel]}  {rel}\n" for rel in sorted(checksums))
+    write_if_changed(package_dir / CHECKSUMS_FILE, manifest)
+    checksums[CHECKSUMS_FILE] = hashlib.sha256(manifest.encode('utf-8')).hexdigest()
+
+    # Rebuild the zip only when a member, the compression level or the zip itself changed
+    zip_key = hashlib.sha256(f"{level}\n{manifest}".encode('utf-8')).hexdigest()
+    compressed = 0
+    if state.get('zip') != zip_key or not zip_path.is_file() or zip_path.stat().st_size != state.get('zip_size'):
+        members = [(f"{package_dir.name}/{rel}", package_dir / rel, checksums[rel]) for rel in sorted(checksums)]
+        compressed = write_zip(zip_path, members, cache_dir, level, jobs)
+        zip_sha = file_sha256(zip_path)
+        write_if_changed(zip_path.with_name(zip_path.name + ".sha256"), f"{zip_sha}  {zip_path.name}\n")
+    else:
+        zip_sha = state.get('zip_sha256')
+
+    state = {'files': hashes, 'zip': zip_key, 'zip_size': zip_path.stat().st_size, 'zip_sha256': zip_sha}
+    tmp = state_path.with_name(state_path.name + ".tmp")
+    tmp.write_text(json.dumps(state, indent=1), encoding="utf-8")
+    os.replace(tmp, state_path)
+
+    elapsed = time.perf_counter() - start
     print(f"Release package created: {zip_path}")
     print(f"Package contents are in: {package_dir}")
+    print(f"{len(sources)} files: {copied} copied, {removed} removed, {compressed} compressed in {elapsed:.2f}s")
+    print(f"SHA-256: {zip_sha}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the Visio Temp File Remover GUI release package.")
+    parser.add_argument("--level", type=int, default=DEFAULT_LEVEL, choices=range(0, 10), metavar="0-9",
+                        help=f"Deflate compression level (default: {DEFAULT_LEVEL})")
+    parser.add_argument("--jobs", type=int, default=None, help="Parallel hashing and compression jobs (default: CPU-based)")
+    parser.add_argument("--force", action="store_true", help="Ignore the previous build and rebuild everything")
+    args = parser.parse_args()
+    create_release_package(args.level, args.jobs, args.force)
+
 
 if __name__ == "__main__":
-    create_release_package()
\ No newline at end of file
+    main()
@@ -1,12 +1,33 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-import subprocess
-import json
+import asyncio
+import itertools
 import os
-import threading
 from pathlib import Path
 import sys
 
+from vtfr import core
+from vtfr.companion import is_orphan
+from vtfr.export import export_records
+from vtfr.filters import FilterError, ResultSet
+from vtfr.journal import DeletionJournal
+from vtfr.ratelimit import RateLimiter, describe_rate, resolve_profile
+from vtfr.refresh import FolderIndex, RefreshResult, refresh
+from vtfr.report import aggregate, display_folder, format_file_size
+from vtfr.resultstore import DEFAULT_MEMORY_LIMIT, ResultStore
+from vtfr.safety import VISIO_TEMP_PATTERNS
+from vtfr.settings import SettingsError, SettingsWatcher
+from vtfr.snapshot import save_snapshot
+from vtfr.tkbridge import AsyncTkBridge
+
+REPORT_TOP_N = 5  # Heaviest folders listed under the scan results
+FILTER_DELAY_MS = 250  # Wait for a pause in typing before filtering
+REFRESH_INTERVAL_MS = 30000  # Pause between background refreshes when Auto-refresh is on
+HEADINGS = {'Name': 'File Name', 'Path': 'Path', 'Size': 'Size', 'Modified': 'Last Modified', 'Source': 'Source Document',
+            'Owner': 'Owner'}
+SORT_KEYS = {'Name': 'name', 'Path': 'path', 'Size': 'size', 'Modified': 'modified', 'Owner': 'owner'}  # Sortable columns
+GROUPS = {'folder': 'Folder', 'owner': 'Owner'}  # Ways to total the reclaimable space
+
 def resource_path(relative_path):
     """Get absolute path to resource, works for dev and for PyInstaller"""
     try:
@@ -31,23 +52,59 @@ class VisioTempFileRemoverGUI:
         self.style = ttk.Style()
         self.style.theme_use('clam')
         
+        # Settings from config.json, reloaded between scans when the file changes
+        self.settings = self._load_settings()
+        default_dir = self.settings.current().default_scan_path if self.settings else ""
+
         # Variables
-        self.directory_var = tk.StringVar(value="Z:\\ENGINEERING TEMPLATES\\VISIO SHAPES 2025")
-        self.found_files = []
+        self.directory_var = tk.StringVar(value=default_dir or "Z:\\ENGINEERING TEMPLATES\\VISIO SHAPES 2025")
+        self.found_files = ResultStore()  # Every record of the last scan; spills to disk when huge
         self.selected_files = []
+        self.quarantine_var = tk.BooleanVar(value=False)
+        self.filter_var = tk.StringVar()
+        self.group_var = tk.StringVar(value='folder')
+        self.report = None  # ReclaimReport of the current results
+        self.results = None  # ResultSet of the rows in the tree; row i has item id str(i)
+        self.sort_column = None
+        self.sort_descending = False
+        self._filter_job = None
+        self.auto_refresh_var = tk.BooleanVar(value=False)
+        self.scanned_directory = ""
+        self.folder_index = None  # FolderIndex of the scanned tree, seeded by the scan or the first refresh
+        self._refresh_job = None
+        self._refreshing = False
+        self._refresh_again = False  # Refresh once more when the running refresh finishes
+        self._scan_generation = 0  # A refresh started before the latest scan is discarded
         
         # Create UI
         self.create_widgets()
-        
-        # Check if PowerShell is available
-        print("Checking if PowerShell is available...")
-        ps_available = self.is_powershell_available()
-        print(f"PowerShell available: {ps_available}")
-        if not ps_available:
-            print("PowerShell is not available on this system. This tool requires PowerShell to run.")
-            messagebox.showerror("Error", "PowerShell is not available on this system. This tool requires PowerShell to run.")
-            self.root.destroy()
-            return
+
+        # Scans and deletions run on the asyncio core in a background loop
+        self.bridge = AsyncTkBridge(self.root)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+    def on_close(self):
+        """Cancel any running scan or deletion, then close the window"""
+        if self._refresh_job is not None:
+            self.root.after_cancel(self._refresh_job)
+        self.bridge.close()
+        self.root.destroy()
+
+    def _load_settings(self):
+        """Watch config.json; without a valid one the built-in patterns and rate profiles are used"""
+        try:
+            return SettingsWatcher(resource_path('config.json'), on_reload=self._settings_reloaded,
+                                   on_error=self._settings_reload_failed)
+        except SettingsError as e:
+            print(f"Warning: {e}; using the built-in settings")
+            return None
+
+    def _settings_reloaded(self, settings):
+        print(f"Reloaded configuration from {settings.source}")
+
+    def _settings_reload_failed(self, error):
+        print(f"Warning: keeping the previous configuration: {error}")
+        messagebox.showwarning("Configuration", f"config.json could not be reloaded, so the previous settings stay in effect.\n\n{error}")
 
     def set_icon(self):
         """Set the application icon using the .ico file"""
@@ -58,20 +115,6 @@ class VisioTempFileRemoverGUI:
             except tk.TclError as e:
                 print(f"Warning: Could not set icon. Ensure the file is a valid .ico format. Error: {e}")
 
-    def is_powershell_available(self):
-        """Check if PowerShell is available on the system"""
-        try:
-            result = subprocess.run(
-                ["powershell", "-Command", "Write-Output 'PowerShell Test'"],
-                capture_output=True,
-                text=True,
-                timeout=10, # Increased timeout for robustness
-                creationflags=subprocess.CREATE_NO_WINDOW
-            )
-            return result.returncode == 0
-        except (subprocess.SubprocessError, FileNotFoundError):
-            return False
-            
     def create_widgets(self):
         # Main frame
         main_frame = ttk.Frame(self.root, padding="10")
@@ -103,6 +146,17 @@ class VisioTempFileRemoverGUI:
 
         self.select_all_button = ttk.Button(button_frame, text="Select All", command=self.select_all_files, state=tk.DISABLED)
         self.select_all_button.pack(side=tk.LEFT, padx=(0, 5))
+
+        self.select_orphans_button = ttk.Button(button_frame, text="Select Orphans Only", command=self.select_orphan_files, state=tk.DISABLED)
+        self.select_orphans_button.pack(side=tk.LEFT, padx=(0, 5))
+
+        self.export_button = ttk.Button(button_frame, text="Export Results...", command=self.export_results, state=tk.DISABLED)
+        self.export_button.pack(side=tk.LEFT, padx=(0, 5))
+
+        ttk.Checkbutton(button_frame, text="Quarantine instead of delete", variable=self.quarantine_var).pack(side=tk.LEFT, padx=(10, 0))
+
+        ttk.Checkbutton(button_frame, text="Auto-refresh", variable=self.auto_refresh_var,
+                        command=self._schedule_refresh).pack(side=tk.LEFT, padx=(10, 0))
         
         # Progress bar
         self.progress = ttk.Progressbar(main_frame, mode='indeterminate')
@@ -111,22 +165,36 @@ class VisioTempFileRemoverGUI:
         # Results frame
         results_frame = ttk.LabelFrame(main_frame, text="Scan Results", padding="10")
         results_frame.grid(row=3, column=0, columnspan=2, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(0, 10))
-        results_frame.columnconfigure(0, weight=1)
-        results_frame.rowconfigure(0, weight=1)
         main_frame.rowconfigure(3, weight=1)
         
-        # Treeview for files
-        self.tree = ttk.Treeview(results_frame, columns=('Name', 'Path', 'Size', 'Modified'), show='headings')
-        self.tree.heading('Name', text='File Name')
-        self.tree.heading('Path', text='Path')
-        self.tree.heading('Size', text='Size')
-        self.tree.heading('Modified', text='Last Modified')
+        # Live filter over the results
+        filter_frame = ttk.Frame(results_frame)
+        filter_frame.grid(row=0, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(0, 5))
+        filter_frame.columnconfigure(1, weight=1)
+        ttk.Label(filter_frame, text="Filter:").grid(row=0, column=0, sticky=tk.W, padx=(0, 5))
+        ttk.Entry(filter_frame, textvariable=self.filter_var).grid(row=0, column=1, sticky=(tk.W, tk.E), padx=(0, 5))
+        ttk.Button(filter_frame, text="Clear", command=lambda: self.filter_var.set("")).grid(row=0, column=2)
+        ttk.Label(filter_frame, text="e.g. *.~vsdx  size>1MB  age>30d  orphan  !path:*Archive*",
+                  foreground='gray').grid(row=1, column=1, sticky=tk.W)
+        self.filter_var.trace_add('write', self._on_filter_changed)
+
+        # Treeview for files; click a heading to sort by that column
+        self.tree = ttk.Treeview(results_frame, columns=tuple(HEADINGS), show='headings')
+        for column, text in HEADINGS.items():
+            if column in SORT_KEYS:
+                self.tree.heading(column, text=text, command=lambda c=column: self.sort_by(c))
+            else:
+                self.tree.heading(column, text=text)
         
         # Adjusted column widths
         self.tree.column('Name', width=200)  # Wider for file name
         self.tree.column('Path', width=250)  # Smaller but still readable
         self.tree.column('Size', width=75)   # Half of previous width
         self.tree.column('Modified', width=175)  # Wider for date/time
+        self.tree.column('Source', width=175)
+        self.tree.column('Owner', width=150)
+        self._show_owner_column(False)  # Only scans that look up owners fill it
+        self.tree.tag_configure('orphan', foreground='#b35900')  # Source document is gone
         
         # Scrollbars
         v_scrollbar = ttk.Scrollbar(results_frame, orient=tk.VERTICAL, command=self.tree.yview)
@@ -134,19 +202,42 @@ class VisioTempFileRemoverGUI:
         self.tree.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
         
         # Grid layout
-        self.tree.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
-        v_scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
-        h_scrollbar.grid(row=1, column=0, sticky=(tk.W, tk.E))
+        self.tree.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        v_scrollbar.grid(row=1, column=1, sticky=(tk.N, tk.S))
+        h_scrollbar.grid(row=2, column=0, sticky=(tk.W, tk.E))
         results_frame.columnconfigure(0, weight=1)
-        results_frame.rowconfigure(0, weight=1)
+        results_frame.rowconfigure(1, weight=1)
         
         # Bind selection event
         self.tree.bind('<<TreeviewSelect>>', self.on_tree_select)
         
+        # Reclaimable space summary (heaviest folders)
+        summary_frame = ttk.LabelFrame(main_frame, text="Reclaimable Space", padding="10")
+        summary_frame.grid(row=4, column=0, columnspan=2, sticky=(tk.W, tk.E))
+        summary_frame.columnconfigure(0, weight=1)
+
+        self.summary_var = tk.StringVar(value="Scan a directory to see reclaimable space.")
+        ttk.Label(summary_frame, textvariable=self.summary_var, anchor=tk.W).grid(row=0, column=0, sticky=(tk.W, tk.E))
+        group_frame = ttk.Frame(summary_frame)
+        group_frame.grid(row=0, column=1, sticky=tk.E)
+        for group, text in GROUPS.items():
+            ttk.Radiobutton(group_frame, text=f"By {text.lower()}", value=group, variable=self.group_var,
+                            command=lambda: self._show_reclaim_report(self.report)).pack(side=tk.LEFT, padx=(5, 0))
+
+        # The heaviest folders, or owners when grouped by owner
+        self.folder_tree = ttk.Treeview(summary_frame, columns=('Folder', 'Files', 'Size'), show='headings', height=REPORT_TOP_N)
+        self.folder_tree.heading('Folder', text='Folder')
+        self.folder_tree.heading('Files', text='Files')
+        self.folder_tree.heading('Size', text='Size')
+        self.folder_tree.column('Folder', width=450)
+        self.folder_tree.column('Files', width=75, anchor=tk.E)
+        self.folder_tree.column('Size', width=100, anchor=tk.E)
+        self.folder_tree.grid(row=1, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(5, 0))
+
         # Status bar
         self.status_var = tk.StringVar(value="Ready")
         status_bar = ttk.Label(main_frame, textvariable=self.status_var, relief=tk.SUNKEN, anchor=tk.W)
-        status_bar.grid(row=4, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(10, 0))
+        status_bar.grid(row=5, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(10, 0))
         
     def browse_directory(self):
         """Open directory browser dialog"""
@@ -168,7 +259,37 @@ class VisioTempFileRemoverGUI:
         if all_items:
             self.tree.selection_set(all_items)
             # The on_tree_select method will automatically enable the delete button
+
+    def _set_select_buttons(self, enabled):
+        """Enable or disable the bulk selection buttons; Select Orphans Only needs orphans"""
+        self.select_all_button.config(state=tk.NORMAL if enabled else tk.DISABLED)
+        has_orphans = enabled and self.found_files.orphan_count > 0
+        self.select_orphans_button.config(state=tk.NORMAL if has_orphans else tk.DISABLED)
+        self.export_button.config(state=tk.NORMAL if enabled and self.found_files else tk.DISABLED)
+
+    def select_orphan_files(self):
+        """Select only the listed temp files whose source document is gone"""
+        orphans = self.results.orphans if self.results else []
+        orphan_items = [item for item in self.tree.get_children() if orphans[int(item)]]
+        self.tree.selection_set(orphan_items)
+        self.status_var.set(f"Selected {len(orphan_items)} orphaned temp files.")
             
+    def export_results(self):
+        """Save every file found by the last scan as CSV, NDJSON or a columnar export"""
+        path = filedialog.asksaveasfilename(
+            title="Export Scan Results",
+            defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("NDJSON", "*.ndjson"), ("Columnar export", "*.vtfrc")],
+        )
+        if not path:
+            return
+        try:
+            count = export_records(self.found_files, path)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Export Failed", str(e))
+            return
+        self.status_var.set(f"Exported {count} files to {path}.")
+
     def scan_files(self):
         """Scan for Visio temp files"""
         directory = self.directory_var.get().strip()
@@ -180,144 +301,309 @@ class VisioTempFileRemoverGUI:
             messagebox.showerror("Error", f"The directory '{directory}' does not exist.")
             return
             
-        # Start scanning in a separate thread to prevent UI freezing
+        # Scan in the background to prevent UI freezing
         self.scan_button.config(state=tk.DISABLED)
         self.delete_button.config(state=tk.DISABLED)
-        self.select_all_button.config(state=tk.DISABLED)
+        self._set_select_buttons(False)
         self.progress.start()
         self.status_var.set("Scanning for Visio temp files...")
         
         # Clear previous results
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        self._clear_results()
+        self._show_reclaim_report(None)
+        settings = self.settings.current() if self.settings else None
+        self.scanned_directory = directory
+        self._scan_generation += 1
+        self._refresh_again = False
+        self.folder_index = None
+        if self.auto_refresh_var.get() and not (settings and settings.follow_links):
+            # Filled by the scan with each folder's time; the processes engine leaves it to the first refresh
+            self.folder_index = FolderIndex(directory)
             
-        # Start scanning thread
-        scan_thread = threading.Thread(target=self._scan_files_thread, args=(directory,))
-        scan_thread.daemon = True
-        scan_thread.start()
+        # Scan on the asyncio core; results come back on the Tk thread
+        self.bridge.submit(self._scan_files(directory, settings, self.folder_index),
+                           on_done=self._scan_done, on_error=self._scan_failed)
         
-    def _scan_files_thread(self, directory):
-        """Thread function to scan for files"""
+    async def _scan_files(self, directory, settings=None, index=None):
+        """Coroutine run on the bridge loop: collect the scan into a ResultStore, with the achieved listing rate"""
+        print(f"Scanning {directory} for Visio temp files...")
+        patterns = settings.patterns if settings else VISIO_TEMP_PATTERNS
+        match = settings.match if settings else None
+        profile = settings.profile() if settings else resolve_profile()
+        limiter = RateLimiter(profile.listings_per_second)
+        follow_links = settings.follow_links if settings else False
+        owners = settings.owners if settings else False
+        store = ResultStore(settings.result_memory_limit if settings else DEFAULT_MEMORY_LIMIT)
+        # The GUI has no PowerShell runner; that setting scans on threads, as scheduled runs do
+        engine = settings.scan_engine if settings and settings.scan_engine != "powershell" else "threads"
+        # The scan seeds the folder index, so the first refresh is already incremental
+        scan = core.scan(directory, patterns, engine=engine, limiter=limiter, follow_links=follow_links,
+                         owners=owners, folders=index.folders if index is not None else None, match=match)
+        records = await core.collect(scan, store)
         try:
-            # Escape directory path for PowerShell
-            escaped_dir = directory.replace("'", "''")
-
-            # Build PowerShell command
-            ps_command = f"Get-ChildItem -Path '{escaped_dir}' -Recurse -File -Force -Include \"~$$*.*\" | Select-Object -Property FullName,Name,DirectoryName,@{{Name=\"LastModified\";Expression={{$_.LastWriteTime.ToString(\"yyyy-MM-dd HH:mm:ss\")}}}},@{{Name=\"Size\";Expression={{$_.Length}}}} | ConvertTo-Json"
-
-            # Execute PowerShell command
-            ps_cmd_list = [
-                "powershell",
-                "-NoProfile",
-                "-ExecutionPolicy", "Bypass",
-                "-Command", ps_command
-            ]
-
-            print(f"Executing PowerShell command: {ps_command}")
-
-            result = subprocess.run(
-                ps_cmd_list,
-                capture_output=True,
-                text=True,
-                encoding='utf-8',
-                timeout=60,  # 60 second timeout
-                creationflags=subprocess.CREATE_NO_WINDOW
-            )
-            
-            print(f"PowerShell return code: {result.returncode}")
-            print(f"PowerShell stdout: {result.stdout}")
-            print(f"PowerShell stderr: {result.stderr}")
+            # Keep a snapshot so the CLI's 'snapshot diff' can compare scans
+            await asyncio.get_running_loop().run_in_executor(None, save_snapshot, directory, records)
+        except OSError as e:
+            print(f"Warning: could not save scan snapshot: {e}")
+        return records, describe_rate(limiter, "folder listings")
+
+    def _scan_done(self, result):
+        """Called on the Tk thread when the scan coroutine returns"""
+        files_data, rate = result
+        print(rate)
+        self._scan_complete(files_data)
+        self.status_var.set(f"{self.status_var.get()}  [{rate}]")
+        self._scan_finished()
+
+    def _scan_failed(self, error):
+        """Called on the Tk thread when the scan coroutine raises"""
+        print(f"Unexpected error during scan: {error}")
+        messagebox.showerror("Error", f"Unexpected error during scan: {str(error)}")
+        self._scan_finished()
 
-            
-            if result.returncode != 0:
-                error_msg = result.stderr if result.stderr else "Unknown error occurred"
-                self.root.after(0, lambda: messagebox.showerror("Error", f"Error scanning files: {error_msg}"))
-                return
-                
-            if not result.stdout or result.stdout.strip() == "":
-                self.root.after(0, self._scan_complete, [])
-                return
-                
-            # Parse JSON results
-            try:
-                files_data = json.loads(result.stdout.strip())
-                # Handle both single object and array cases
-                if isinstance(files_data, dict):
-                    files_data = [files_data]
-                elif not isinstance(files_data, list):
-                    files_data = []
-                self.root.after(0, self._scan_complete, files_data)
-            except json.JSONDecodeError as e:
-                self.root.after(0, lambda: messagebox.showerror("Error", f"Error parsing scan results: {str(e)}"))
-                print(f"JSON parsing error: {e}")
-                print(f"Raw output: {result.stdout}")
-                
-        except subprocess.TimeoutExpired:
-            self.root.after(0, lambda: messagebox.showerror("Error", "Scan timed out after 60 seconds."))
-        except Exception as e:
-            self.root.after(0, lambda: messagebox.showerror("Error", f"Unexpected error during scan: {str(e)}"))
-        finally:
-            self.root.after(0, self._scan_finished)
-            
     def _scan_complete(self, files_data):
         """Called when scan is complete"""
-        self.found_files = files_data if isinstance(files_data, list) else []
+        self.found_files.close()
+        self.found_files = files_data if isinstance(files_data, ResultStore) else ResultStore().extend(files_data or [])
         
         if not self.found_files:
             self.status_var.set("No matching Visio temp files found.")
             messagebox.showinfo("Scan Complete", "No matching Visio temp files were found.")
-            self.select_all_button.config(state=tk.DISABLED)
+            self._set_select_buttons(False)
             return
 
         # Enable select all button when files are found
-        self.select_all_button.config(state=tk.NORMAL)
+        self._set_select_buttons(True)
             
-        # Populate treeview
-        for file_info in self.found_files:
+        # Populate treeview; past the memory limit only the first files in path order are listed
+        shown = []
+        for file_info in itertools.islice(self.found_files, self.found_files.memory_limit):
             try:
-                size = file_info.get('Size', 0)
-                size_str = self.format_file_size(size) if size else "Unknown"
-                
-                # Get full path and relative path for display
-                full_path = file_info.get('FullName', 'Unknown')
-                scan_directory = self.directory_var.get().strip()
-                
-                # Calculate relative path for display
-                if full_path != 'Unknown' and scan_directory:
-                    try:
-                        # Normalize paths for comparison
-                        import os
-                        full_path_norm = os.path.normpath(full_path)
-                        scan_dir_norm = os.path.normpath(scan_directory)
-                        
-                        # Get relative path
-                        if full_path_norm.startswith(scan_dir_norm):
-                            relative_path = os.path.relpath(full_path_norm, scan_dir_norm)
-                            # Get the directory part only (exclude filename)
-                            relative_dir = os.path.dirname(relative_path)
-                            # If it's in the root of scan directory, show "."
-                            path_display = relative_dir if relative_dir else "."
-                        else:
-                            # Fallback to full path if not under scan directory
-                            path_display = full_path
-                    except Exception:
-                        # Fallback to full path if there's any error
-                        path_display = full_path
-                else:
-                    path_display = full_path
-                
-                # Insert item with full path as tags so we can retrieve it later for deletion
-                item_id = self.tree.insert('', tk.END, values=(
-                    file_info.get('Name', 'Unknown'),
-                    path_display,
-                    size_str,
-                    file_info.get('LastModified', 'Unknown')
-                ), tags=(full_path,))  # Store full path in tags
+                values, tags = self._row_values(file_info)
+                # Row i has item id str(i); the full path is the first tag, for deletion
+                self.tree.insert('', tk.END, iid=str(len(shown)), values=values, tags=tags)
+                shown.append(file_info)
             except Exception as e:
                 print(f"Error inserting file into tree: {e}")
-                
-        self.status_var.set(f"Found {len(self.found_files)} Visio temp files.")
-        messagebox.showinfo("Scan Complete", f"Found {len(self.found_files)} Visio temp files.")
+
+        # Sort keys and timestamps are computed once here, not from the formatted cells
+        self.results = ResultSet(shown)
+        self._show_owner_column(any(self.results.owners))
+        if self.sort_column or self.filter_var.get().strip():
+            self._apply_view()
+
+        report = aggregate(self.found_files, self.directory_var.get().strip(), REPORT_TOP_N)
+        self._show_reclaim_report(report)
+
+        summary = f"Found {len(self.found_files)} Visio temp files ({format_file_size(report.total_size)} reclaimable)."
+        if report.orphan_files:
+            summary += f" {report.orphan_files} are orphans whose source document is gone."
+        if len(shown) < len(self.found_files):
+            summary += f" Listing the first {len(shown)}; Select All followed by Delete removes every file found."
+        self.status_var.set(summary)
+        messagebox.showinfo("Scan Complete", summary)
+        self._schedule_refresh()
+
+    def _row_values(self, file_info):
+        """The cells and tags of one file's row; the path is shown relative to the scanned folder"""
+        size = file_info.get('Size', 0)
+        size_str = self.format_file_size(size) if size else "Unknown"
+        full_path = file_info.get('FullName', 'Unknown')
+        path_display = full_path
+        if full_path != 'Unknown' and self.scanned_directory:
+            try:
+                full_path_norm = os.path.normpath(full_path)
+                scan_dir_norm = os.path.normpath(self.scanned_directory)
+                if full_path_norm.startswith(scan_dir_norm):
+                    # The directory part only; "." for files in the scanned folder itself
+                    path_display = os.path.dirname(os.path.relpath(full_path_norm, scan_dir_norm)) or "."
+            except Exception:
+                path_display = full_path
+        if is_orphan(file_info):
+            source = "(missing)"
+        else:
+            source = os.path.basename(file_info.get('Companion') or "")
+        values = (file_info.get('Name', 'Unknown'), path_display, size_str, file_info.get('LastModified', 'Unknown'), source,
+                  file_info.get('Owner') or "")
+        return values, (full_path, 'orphan') if is_orphan(file_info) else (full_path,)
+
+    def _refresh_after_change(self):
+        """Refresh the file list after a deletion; with Auto-refresh only the changed folders are listed again"""
+        if self.auto_refresh_var.get() and self.results is not None and not self.found_files.spilled:
+            self.refresh_files()
+        else:
+            self.scan_files()
+
+    def _schedule_refresh(self):
+        """(Re)start the Auto-refresh timer, or stop it when the option is off"""
+        if self._refresh_job is not None:
+            self.root.after_cancel(self._refresh_job)
+            self._refresh_job = None
+        if self.auto_refresh_var.get():
+            self._refresh_job = self.root.after(REFRESH_INTERVAL_MS, self._refresh_when_idle)
+
+    def _refresh_when_idle(self):
+        """Wait until Tk has no pending events, so a refresh never delays a redraw"""
+        self._refresh_job = self.root.after_idle(self.refresh_files)
+
+    def refresh_files(self):
+        """Rescan the changed folders in the background and update only the rows that differ"""
+        self._refresh_job = None
+        if self._refreshing:
+            self._refresh_again = True
+            return
+        if self.results is None or self.found_files.spilled:
+            # Nothing listed yet, or too many files to keep the tree current
+            self._schedule_refresh()
+            return
+        if self.folder_index is None:
+            self.folder_index = FolderIndex(self.scanned_directory)
+        self._refreshing = True
+        settings = self.settings.current() if self.settings else None
+        generation = self._scan_generation
+        self.bridge.submit(self._refresh_files(self.folder_index, settings),
+                           on_done=lambda result: self._refresh_done(result, generation),
+                           on_error=self._refresh_failed)
+
+    async def _refresh_files(self, index, settings=None):
+        """Coroutine run on the bridge loop: relist the folders that changed since the last refresh"""
+        patterns = settings.patterns if settings else VISIO_TEMP_PATTERNS
+        match = settings.match if settings else None
+        profile = settings.profile() if settings else resolve_profile()
+        limiter = RateLimiter(profile.listings_per_second)
+        owners = settings.owners if settings else False
+        if settings and settings.follow_links:
+            # The folder index does not follow links; walk the whole tree and diff every row instead
+            scan = core.scan(index.root, patterns, limiter=limiter, follow_links=True, owners=owners, match=match)
+            return RefreshResult(await core.collect(scan), set(), set(), True)
+        return await asyncio.get_running_loop().run_in_executor(None, refresh, index, patterns, limiter,
+                                                               core.DEFAULT_LIST_CONCURRENCY, None, owners, match)
+
+    def _refresh_done(self, result, generation):
+        """Called on the Tk thread with a refresh result: insert, update and remove rows in place"""
+        self._refreshing = False
+        if generation == self._scan_generation and self.results is not None:
+            diff = self.results.diff(result.records, None if result.full else result.listed | result.removed)
+            if diff:
+                self._apply_diff(diff)
+        if self._refresh_again:
+            self._refresh_again = False
+            self.refresh_files()
+        else:
+            self._schedule_refresh()
+
+    def _refresh_failed(self, error):
+        """Called on the Tk thread when a refresh raises; the next one starts from a full walk"""
+        print(f"Background refresh failed: {error}")
+        self._refreshing = False
+        self.folder_index = None
+        self._schedule_refresh()
+
+    def _apply_diff(self, diff):
+        """Change only the rows a refresh found different, then update the totals"""
+        if diff.removed:
+            self.tree.delete(*(str(i) for i in diff.removed))
+        for i, file_info in diff.changed:
+            values, tags = self._row_values(file_info)
+            self.tree.item(str(i), values=values, tags=tags)
+        for i in self.results.apply(diff):
+            values, tags = self._row_values(self.results.records[i])
+            self.tree.insert('', tk.END, iid=str(i), values=values, tags=tags)
+        if diff.added and (self.sort_column or self.filter_var.get().strip()):
+            self._apply_view()
+
+        records = [self.results.records[i] for i in self.results.rows()]
+        memory_limit = self.found_files.memory_limit
+        self.found_files.close()
+        self.found_files = ResultStore(memory_limit).extend(records)
+        report = aggregate(self.found_files, self.scanned_directory, REPORT_TOP_N)
+        self._show_reclaim_report(report)
+        self._set_select_buttons(bool(self.found_files))
+        self.status_var.set(f"Refreshed: {len(diff.added)} new, {len(diff.removed)} gone, {len(diff.changed)} changed. "
+                            f"{len(self.found_files)} Visio temp files ({format_file_size(report.total_size)} reclaimable).")
+
+    def _clear_results(self):
+        """Remove every row, including rows hidden by the filter"""
+        if self.results is not None:
+            items = [str(i) for i in self.results.rows()]
+            self.results = None
+        else:
+            items = self.tree.get_children()
+        if items:
+            self.tree.delete(*items)
+
+    def sort_by(self, column):
+        """Sort the results by a column; clicking the same heading again reverses the order"""
+        if self.sort_column == column:
+            self.sort_descending = not self.sort_descending
+        else:
+            self.sort_column, self.sort_descending = column, False
+        for name, text in HEADINGS.items():
+            if name == column:
+                text += " \u25bc" if self.sort_descending else " \u25b2"
+            self.tree.heading(name, text=text)
+        self._apply_view()
+
+    def _on_filter_changed(self, *args):
+        """Re-filter shortly after the user stops typing"""
+        if self._filter_job is not None:
+            self.root.after_cancel(self._filter_job)
+        self._filter_job = self.root.after(FILTER_DELAY_MS, self._run_filter)
+
+    def _run_filter(self):
+        self._filter_job = None
+        shown = self._apply_view()
+        if shown is None or self.results is None:
+            return
+        if self.filter_var.get().strip():
+            self.status_var.set(f"Showing {shown} of {len(self.results)} files matching the filter.")
+        else:
+            self.status_var.set(f"Showing all {len(self.results)} files.")
+
+    def _apply_view(self):
+        """Show the rows matching the filter in the chosen order; returns how many are shown"""
+        if self.results is None:
+            return None
+        try:
+            rows = self.results.filter(self.filter_var.get())
+        except FilterError as e:
+            self.status_var.set(f"Invalid filter: {e}")
+            return None
+        if self.sort_column:
+            rows = self.results.sort(rows, SORT_KEYS[self.sort_column], self.sort_descending)
+        items = [str(i) for i in rows]
+        # One Tcl call reorders the tree and detaches the rows that do not match
+        self.tree.set_children('', *items)
+        visible = set(items)
+        selected = self.tree.selection()
+        kept = [item for item in selected if item in visible]
+        if len(kept) != len(selected):
+            self.tree.selection_set(kept)  # Never delete files the user can no longer see
+        return len(items)
+
+    def _show_owner_column(self, show):
+        """Show the Owner column only for results that have owners"""
+        self.tree.configure(displaycolumns=[c for c in HEADINGS if show or c != 'Owner'])
+
+    def _show_reclaim_report(self, report):
+        """Show total reclaimable bytes and the heaviest folders (or owners) of a scan"""
+        self.report = report
+        for item in self.folder_tree.get_children():
+            self.folder_tree.delete(item)
+        by_owner = self.group_var.get() == 'owner'
+        self.folder_tree.heading('Folder', text=GROUPS[self.group_var.get()])
+        if report is None or not report.total_files:
+            self.summary_var.set("Scan a directory to see reclaimable space.")
+            return
+        self.summary_var.set(f"{format_file_size(report.total_size)} reclaimable in {report.total_files} files")
+        if by_owner and not report.owners:
+            self.folder_tree.insert('', tk.END, values=("Owners were not looked up; set \"owners\": true in config.json", "", ""))
+        for entry in report.owners if by_owner else report.folders:
+            self.folder_tree.insert('', tk.END, values=(
+                entry.key if by_owner else display_folder(entry.key, report.root),
+                entry.files,
+                format_file_size(entry.size)
+            ))
         
     def _scan_finished(self):
         """Called when scan thread finishes"""
@@ -325,7 +611,7 @@ class VisioTempFileRemoverGUI:
         self.progress.stop()
         # Re-enable select all button if files were found
         if self.found_files:
-            self.select_all_button.config(state=tk.NORMAL)
+            self._set_select_buttons(True)
         
     def delete_files(self):
         """Delete selected files"""
@@ -350,129 +636,139 @@ class VisioTempFileRemoverGUI:
         if not selected_paths:
             messagebox.showinfo("Info", "No valid files selected for deletion.")
             return
-            
+
+        # Select All on a scan too large to list means every file found, streamed from the store
+        delete_all = (self.found_files.spilled and len(selected_items) == len(self.results)
+                      and not self.filter_var.get().strip())
+        what = f"all {len(self.found_files)} files found" if delete_all else f"{len(selected_paths)} selected file(s)"
+        if delete_all:
+            selected_paths = self.found_files.paths()
+
+        quarantine = self.quarantine_var.get()
+
         # Confirm deletion
-        result = messagebox.askyesno(
-            "Confirm Deletion",
-            f"Are you sure you want to delete {len(selected_paths)} selected file(s)?\n\nThis action cannot be undone."
-        )
+        if quarantine:
+            result = messagebox.askyesno(
+                "Confirm Quarantine",
+                f"Move {what} to quarantine?\n\nThey can be restored later with the CLI's 'quarantine restore' command."
+            )
+        else:
+            result = messagebox.askyesno(
+                "Confirm Deletion",
+                f"Are you sure you want to delete {what}?\n\nThis action cannot be undone."
+            )
         
         if not result:
             return
             
-        # Start deletion in a separate thread
+        # Run the deletion in the background
         self.scan_button.config(state=tk.DISABLED)
         self.delete_button.config(state=tk.DISABLED)
-        self.select_all_button.config(state=tk.DISABLED)
+        self._set_select_buttons(False)
         self.progress.start()
-        self.status_var.set("Deleting selected files...")
+        self.status_var.set("Moving selected files to quarantine..." if quarantine else "Deleting selected files...")
         
-        delete_thread = threading.Thread(target=self._delete_files_thread, args=(selected_paths,))
-        delete_thread.daemon = True
-        delete_thread.start()
+        sizes = {f.get('FullName'): f.get('Size', 0) for f in self.results.records}
+        root_dir = self.directory_var.get().strip()
+        settings = self.settings.current() if self.settings else None
+        if quarantine:
+            self.bridge.submit(self._quarantine_files(selected_paths, sizes, root_dir, settings),
+                               on_done=self._quarantine_done, on_error=self._quarantine_failed)
+        else:
+            self.bridge.submit(self._delete_files(selected_paths, sizes, root_dir, settings),
+                               on_done=self._delete_done, on_error=self._delete_failed)
         
-    def _delete_files_thread(self, file_paths):
-        """Thread function to delete files using direct PowerShell approach"""
+    def _open_journal(self):
+        """Open the deletion journal; deletion goes ahead without it if it is not writable"""
         try:
-            deleted_count = 0
-            failed_count = 0
-            
-            # Perform safety checks in Python before deleting
-            safe_to_delete = []
-            for path in file_paths:
-                # 1. Check if file exists
-                if not os.path.exists(path) or not os.path.isfile(path):
-                    failed_count += 1
-                    print(f"File not found or is not a regular file: {path}")
-                    continue
-
-                # 2. Check if file is in a system directory
-                is_protected_location = False
-                invalid_paths = [
-                    os.environ.get("windir", ""),
-                    os.path.join(os.environ.get("windir", ""), "System32"),
-                    os.path.join(os.environ.get("windir", ""), "System"),
-                    os.environ.get("ProgramFiles", ""),
-                    os.environ.get("ProgramFiles(x86)", ""),
-                    os.environ.get("ProgramData", ""),
-                ]
-                for protected_path in invalid_paths:
-                    if protected_path and os.path.normpath(path).startswith(os.path.normpath(protected_path)):
-                        is_protected_location = True
-                        break
-                
-                if is_protected_location:
-                    failed_count += 1
-                    print(f"Cannot delete file in system directory: {path}")
-                    continue
+            return DeletionJournal()
+        except OSError as e:
+            print(f"Warning: deletion journal unavailable: {e}")
+            return None
 
-                # 3. Check if file matches Visio temporary file pattern
-                if not os.path.basename(path).startswith("~$$"):
-                    failed_count += 1
-                    print(f"File does not match Visio temporary file pattern: {path}")
-                    continue
-                
-                safe_to_delete.append(path)
+    async def _quarantine_files(self, file_paths, sizes=None, root_dir="", settings=None):
+        """Coroutine run on the bridge loop: move files into the quarantine holding area"""
+        journal = self._open_journal()
+        try:
+            result = await core.quarantine(file_paths, root_dir, sizes=sizes, journal=journal,
+                                           configured_dir=settings.quarantine_dir if settings else None,
+                                           protected=settings.protected_prefixes if settings else None,
+                                           match=settings.match if settings else None)
+        finally:
+            if journal:
+                journal.close()
+        print(f"Quarantined {len(result.moved)} files into {result.batch}")
+        for path, error in result.failed:
+            print(f"Could not quarantine {path}: {error}")
+        return len(result.moved), len(result.failed), result.batch
 
-            if not safe_to_delete:
-                self.root.after(0, self._delete_complete, deleted_count, failed_count)
-                return
+    def _quarantine_done(self, result):
+        """Called on the Tk thread when the quarantine coroutine returns"""
+        self._delete_finished()
+        self._quarantine_complete(*result)
 
-            # Use direct approach like web version
-            print("Using direct PowerShell approach for deletion...")
-            file_list_string = [f"'{path.replace("'", "''")}'" for path in safe_to_delete]
-            file_list_joined = ",".join(file_list_string)
-            
-            direct_ps_command = f"@({file_list_joined}) | ForEach-Object {{ Remove-Item -Path $_ -Force -ErrorAction SilentlyContinue }}"
-            
-            direct_ps_cmd_list = [
-                "powershell",
-                "-NoProfile",
-                "-ExecutionPolicy", "Bypass",
-                "-Command", direct_ps_command
-            ]
-            
-            print(f"Executing direct PowerShell delete command: {direct_ps_command}")
-            
-            direct_result = subprocess.run(
-                direct_ps_cmd_list,
-                capture_output=True,
-                text=True,
-                encoding='utf-8',
-                timeout=60,
-                creationflags=subprocess.CREATE_NO_WINDOW
-            )
-            
-            print(f"Direct PowerShell delete return code: {direct_result.returncode}")
-            print(f"Direct PowerShell delete stdout: {direct_result.stdout}")
-            print(f"Direct PowerShell delete stderr: {direct_result.stderr}")
-            
-            # For direct approach, we assume success if no errors
-            if direct_result.returncode == 0:
-                deleted_count = len(safe_to_delete)
-            else:
-                # If there are errors, we can't be sure which files failed.
-                # We can try to check which files still exist.
-                still_exist = [path for path in safe_to_delete if os.path.exists(path)]
-                deleted_count = len(safe_to_delete) - len(still_exist)
-                failed_count += len(still_exist)
-                
-            self.root.after(0, self._delete_complete, deleted_count, failed_count)
-            
-        except Exception as e:
-            self.root.after(0, lambda: messagebox.showerror("Error", f"Unexpected error during deletion: {str(e)}"))
-            print(f"Unexpected error: {e}")
+    def _quarantine_failed(self, error):
+        """Called on the Tk thread when the quarantine coroutine raises"""
+        print(f"Unexpected error: {error}")
+        messagebox.showerror("Error", f"Unexpected error during quarantine: {str(error)}")
+        self._delete_finished()
+
+    def _quarantine_complete(self, moved_count, failed_count, batch):
+        """Called when quarantine is complete"""
+        message = f"Quarantine complete:\n- {moved_count} files moved to quarantine\n- {failed_count} files failed"
+        if batch:
+            message += f"\n\nBatch folder:\n{batch}"
+        self.status_var.set(f"Quarantined {moved_count} files, {failed_count} failed.")
+        messagebox.showinfo("Quarantine Complete", message)
+
+        self._refresh_after_change()
+
+    async def _delete_files(self, file_paths, sizes=None, root_dir="", settings=None):
+        """Coroutine run on the bridge loop: delete files and journal each outcome"""
+        journal = self._open_journal()
+        profile = settings.profile() if settings else resolve_profile()
+        limiter = RateLimiter(profile.unlinks_per_second)
+        protected = settings.protected_prefixes if settings else None
+        match = settings.match if settings else None
+        deleted_count = 0
+        failed_count = 0
+        retried_count = 0
+        try:
+            async for outcome in core.delete(file_paths, root=root_dir, sizes=sizes, journal=journal,
+                                             limiter=limiter, protected=protected, match=match):
+                if outcome.status == 'deleted':
+                    deleted_count += 1
+                    retried_count += outcome.attempts > 1
+                else:
+                    failed_count += 1
+                    print(f"Could not delete {outcome.path}: {outcome.error}")
         finally:
-            self.root.after(0, self._delete_finished)
-            
-    def _delete_complete(self, deleted_count, failed_count):
+            if journal:
+                journal.close()
+        return deleted_count, failed_count, describe_rate(limiter, "unlinks"), retried_count
+
+    def _delete_done(self, counts):
+        """Called on the Tk thread when the delete coroutine returns"""
+        self._delete_finished()
+        self._delete_complete(*counts)
+
+    def _delete_failed(self, error):
+        """Called on the Tk thread when the delete coroutine raises"""
+        print(f"Unexpected error: {error}")
+        messagebox.showerror("Error", f"Unexpected error during deletion: {str(error)}")
+        self._delete_finished()
+
+    def _delete_complete(self, deleted_count, failed_count, rate="", retried_count=0):
         """Called when deletion is complete"""
         message = f"Deletion complete:\n- {deleted_count} files deleted successfully\n- {failed_count} files failed to delete"
+        if retried_count:
+            message += f"\n- {retried_count} files deleted after retrying share errors"
+        if rate:
+            message += f"\n\n{rate}"
         self.status_var.set(f"Deleted {deleted_count} files, {failed_count} failed.")
         messagebox.showinfo("Deletion Complete", message)
         
-        # Refresh the file list
-        self.scan_files()
+        self._refresh_after_change()
         
     def _delete_finished(self):
         """Called when deletion thread finishes"""
@@ -480,18 +776,11 @@ class VisioTempFileRemoverGUI:
         self.progress.stop()
         # Re-enable select all button if files are still available
         if self.found_files:
-            self.select_all_button.config(state=tk.NORMAL)
+            self._set_select_buttons(True)
         
     def format_file_size(self, size_bytes):
         """Format file size in human readable format"""
-        if size_bytes == 0:
-            return "0 B"
-        size_names = ["B", "KB", "MB", "GB"]
-        i = 0
-        while size_bytes >= 1024 and i < len(size_names) - 1:
-            size_bytes /= 1024.0
-            i += 1
-        return f"{size_bytes:.1f} {size_names[i]}"
+        return format_file_size(size_bytes)
 
 def main():
     root = tk.Tk()
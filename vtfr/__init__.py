@@ -0,0 +1,5 @@
+"""Shared helpers for the Visio Temp File Remover CLI and desktop GUI.
+
+Everything in this package uses the standard library only, so the GUI keeps
+working from a plain Python install and from the PyInstaller build.
+"""
@@ -0,0 +1,318 @@
+"""Scan agent: runs the native scanner on a file server for a coordinator.
+
+A client walking a share over SMB pays a network round trip per folder
+listing. An agent runs on the file server itself, walks its local disks
+with the native scanner and streams the matches back to a
+:class:`vtfr.coordinator.Coordinator` over HTTP:
+
+* ``GET /agent/info`` returns the agent's name and the roots it serves.
+* ``POST /agent/scan`` with ``{"roots": [...]}`` (default: every served
+  root) streams NDJSON: one ``{"root": ..., "volume": ..., "hits": [...]}``
+  line per batch of compact ``(path, size, mtime, companion)`` hits (plus
+  the owner when ``owners`` is set in the agent's ``config.json``), a
+  ``{"root": ..., "error": ...}`` line for a root that cannot be scanned,
+  and a final ``{"done": true, "files": N}`` line.
+* ``POST /agent/delete`` with ``{"files": [...]}`` deletes files under the
+  served roots and returns ``{"outcomes": [[path, status, size, error, attempts], ...]}``.
+  Every outcome is recorded in the agent's own deletion journal.
+* ``GET /metrics`` returns the agent's scan and delete metrics in the
+  Prometheus text format (see :mod:`vtfr.metrics`).
+
+Patterns, rate profiles and protected folders come from the agent's
+``config.json``. When a token is set (``--token`` or ``VTFR_AGENT_TOKEN``)
+every request must carry it as ``Authorization: Bearer <token>``. Without
+a token the agent only listens on the loopback interface; it refuses to
+bind any other address, since anyone who can reach it could delete files.
+
+Run it with ``python -m vtfr.agent --root D:\\Shares --host 0.0.0.0 [--port 8765]``.
+"""
+import argparse
+import hmac
+import ipaddress
+import json
+import os
+import socket
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+from . import core
+from .journal import DeletionJournal
+from .metrics import CONTENT_TYPE, REGISTRY
+from .ratelimit import RateLimiter, resolve_profile
+from .safety import VISIO_TEMP_PATTERNS
+from .scanner import scan
+from .settings import Settings, SettingsError, SettingsWatcher
+
+APP_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+BATCH_SIZE = 2000  # Hits per streamed line
+BATCH_INTERVAL = 1.0  # Seconds before a partial batch is sent anyway
+MAX_BODY_BYTES = 64 * 1024 * 1024
+TOKEN_ENV = "VTFR_AGENT_TOKEN"
+ROUTES = ("/agent/info", "/agent/scan", "/agent/delete", "/metrics")
+
+# The same metric as in vtfr.server; the registry hands back the existing one
+REQUESTS = REGISTRY.counter("vtfr_http_requests_total", "HTTP requests answered", ("server", "path", "code"))
+
+
+def volume_id(root: str) -> str:
+    """Identity of the volume holding ``root``: the host name and the device number.
+
+    Agents on one server that serve the same volume report the same id, so
+    the coordinator can merge their reports; the same path on another
+    server is a different file.
+    """
+    return f"{socket.gethostname().lower()}:{os.stat(root).st_dev:x}"
+
+
+def _normalize(path: str) -> str:
+    return os.path.normcase(os.path.abspath(path))
+
+
+def is_under(path: str, roots: Sequence[str]) -> bool:
+    """Whether ``path`` is one of ``roots`` (normalized) or inside one of them."""
+    path = _normalize(path)
+    for root in roots:
+        if path == root or path.startswith(root.rstrip(os.sep) + os.sep):
+            return True
+    return False
+
+
+class AgentHandler(BaseHTTPRequestHandler):
+    server_version = "VisioTempFileRemoverAgent"
+
+    def log_request(self, code='-', size='-'):
+        path = self.path.split("?", 1)[0]
+        code = int(code) if isinstance(code, int) else code  # HTTPStatus prints as its name before 3.11
+        REQUESTS.labels("agent", path if path in ROUTES else "other", code).inc()
+        super().log_request(code, size)
+
+    def _settings(self) -> Optional[Settings]:
+        watcher = getattr(self.server, 'settings', None)
+        return watcher.current() if watcher else None
+
+    def _authorized(self) -> bool:
+        token = self.server.token
+        if not token:
+            return True
+        supplied = self.headers.get("Authorization", "")
+        if hmac.compare_digest(supplied.encode('utf-8'), f"Bearer {token}".encode('utf-8')):
+            return True
+        self._send_json(HTTPStatus.UNAUTHORIZED, {'error': 'Missing or wrong agent token'})
+        return False
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            raise ValueError("Request body too large")
+        data = json.loads(self.rfile.read(length) or b"{}")
+        if not isinstance(data, dict):
+            raise ValueError("Request body must be a JSON object")
+        return data
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        if self.path == "/metrics":
+            body = REGISTRY.render().encode('utf-8')
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if self.path != "/agent/info":
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        self._send_json(HTTPStatus.OK, {'name': self.server.name, 'roots': self.server.roots})
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        try:
+            body = self._read_json()
+        except ValueError as e:
+            self._send_json(HTTPStatus.BAD_REQUEST, {'error': 'Invalid request body', 'details': str(e)})
+            return
+        try:
+            if self.path == "/agent/scan":
+                self._scan(body)
+            elif self.path == "/agent/delete":
+                self._delete(body)
+            else:
+                self.send_error(HTTPStatus.NOT_FOUND)
+        except (BrokenPipeError, ConnectionResetError):
+            self.log_message("Coordinator disconnected during %s", self.path)
+        except Exception as e:
+            self.log_error("Unhandled exception on path %s: %s", self.path, e)
+            self._send_json(HTTPStatus.INTERNAL_SERVER_ERROR,
+                            {'error': 'Internal server error', 'message': str(e), 'path': self.path})
+
+    def _scan(self, body: dict):
+        roots = body.get('roots') or self.server.roots
+        if not isinstance(roots, list) or not all(isinstance(r, str) for r in roots):
+            self._send_json(HTTPStatus.BAD_REQUEST, {'error': '"roots" must be a list of folders'})
+            return
+        outside = [r for r in roots if not is_under(r, self.server.roots)]
+        if outside:
+            self._send_json(HTTPStatus.FORBIDDEN, {'error': 'Not served by this agent', 'roots': outside})
+            return
+
+        settings = self._settings()
+        patterns = list(settings.patterns if settings else VISIO_TEMP_PATTERNS)
+        match = settings.match if settings else None
+        follow_links = settings.follow_links if settings else False
+        owners = settings.owners if settings else False
+        limiter = RateLimiter((settings.profile() if settings else resolve_profile()).listings_per_second)
+        # No Content-Length: the stream ends when the connection closes
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        total = 0
+        for root in roots:
+            if not os.path.isdir(root):
+                self._write_line({'root': root, 'error': f"Directory does not exist or is not accessible: {root}"})
+                continue
+            batch: List[tuple] = []
+            sent = time.monotonic()
+            try:
+                volume = self.server.volume or volume_id(root)
+                hits = scan(root, patterns, engine=self.server.engine, workers=self.server.workers, limiter=limiter,
+                            follow_links=follow_links, owners=owners, match=match)
+                for hit in hits:
+                    batch.append(hit)
+                    if len(batch) >= BATCH_SIZE or time.monotonic() - sent >= BATCH_INTERVAL:
+                        self._write_line({'root': root, 'volume': volume, 'hits': batch})
+                        total += len(batch)
+                        batch, sent = [], time.monotonic()
+            except (BrokenPipeError, ConnectionResetError):
+                raise
+            except OSError as e:
+                self._write_line({'root': root, 'error': str(e)})
+            if batch:
+                self._write_line({'root': root, 'volume': volume, 'hits': batch})
+                total += len(batch)
+        self._write_line({'done': True, 'files': total})
+        self.log_message("Streamed %d file(s) from %d root(s)", total, len(roots))
+
+    def _write_line(self, payload: dict):
+        self.wfile.write(json.dumps(payload, separators=(',', ':')).encode('utf-8') + b"\n")
+        self.wfile.flush()
+
+    def _delete(self, body: dict):
+        files = body.get('files')
+        if not isinstance(files, list) or not all(isinstance(f, str) and f.strip() for f in files):
+            self._send_json(HTTPStatus.BAD_REQUEST, {'error': '"files" must be a list of file paths'})
+            return
+        allowed = [f for f in files if is_under(f, self.server.roots)]
+        outcomes = [core.DeleteOutcome(f, 'skipped', 0, "Not under a root served by this agent.")
+                    for f in files if not is_under(f, self.server.roots)]
+
+        try:
+            journal = DeletionJournal()
+        except OSError as e:
+            self.log_error("Deletion journal unavailable: %s", e)
+            journal = None
+        settings = self._settings()
+        try:
+            limiter = RateLimiter((settings.profile() if settings else resolve_profile()).unlinks_per_second)
+            outcomes += core.delete_sync(allowed, root=body.get('root') or "", journal=journal, limiter=limiter,
+                                         protected=settings.protected_prefixes if settings else None,
+                                         match=settings.match if settings else None)
+        finally:
+            if journal:
+                journal.close()
+        self._send_json(HTTPStatus.OK, {'outcomes': [list(o) for o in outcomes]})
+
+
+def is_loopback(host: str) -> bool:
+    """True if ``host`` only accepts connections from this machine."""
+    if host.lower() == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False  # "" (every interface) or a host name
+
+
+def make_server(roots: Sequence[str], host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                name: Optional[str] = None, token: Optional[str] = None, engine: str = "threads",
+                workers: Optional[int] = None, settings: Optional[SettingsWatcher] = None,
+                volume: Optional[str] = None) -> ThreadingHTTPServer:
+    """An agent server for ``roots``; call ``serve_forever()`` on it (port 0 picks a free port).
+
+    ``volume`` overrides the :func:`volume_id` reported for every root.
+
+    Raises ValueError for a ``host`` other than a loopback address when no
+    ``token`` is set.
+    """
+    if not token and not is_loopback(host):
+        raise ValueError(f"Refusing to serve on {host or 'every interface'} without an agent token; "
+                         f"set --token or ${TOKEN_ENV}, or bind {DEFAULT_HOST}")
+    httpd = ThreadingHTTPServer((host, port), AgentHandler)
+    httpd.daemon_threads = True
+    httpd.roots = [_normalize(r) for r in roots]
+    httpd.name = name or socket.gethostname()
+    httpd.token = token
+    httpd.engine = engine
+    httpd.workers = workers
+    httpd.settings = settings
+    httpd.volume = volume
+    return httpd
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve local scans and deletes to a Visio Temp File Remover coordinator.")
+    parser.add_argument("--root", action="append", required=True, help="Folder this agent scans (repeat for several)")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"Address to bind (default: {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port to listen on (default: {DEFAULT_PORT})")
+    parser.add_argument("--name", help="Name reported to the coordinator (default: the host name)")
+    parser.add_argument("--token", default=os.environ.get(TOKEN_ENV),
+                        help=f"Shared secret the coordinator must send (default: ${TOKEN_ENV})")
+    parser.add_argument("--volume", help="Volume id reported to the coordinator (default: host name and device "
+                                         "number); give agents that serve the same share the same id")
+    parser.add_argument("--engine", choices=("threads", "processes"), default="threads", help="Native scan engine")
+    parser.add_argument("--workers", type=int, default=None, help="Worker threads/processes for the scan engine")
+    args = parser.parse_args(argv)
+
+    try:
+        settings = SettingsWatcher(
+            APP_ROOT / "config.json",
+            on_reload=lambda s: print(f"Reloaded configuration from {s.source}"),
+            on_error=lambda error: print(f"Keeping the previous configuration: {error}"))
+    except SettingsError as e:
+        print(f"Warning: {e}; using the built-in settings")
+        settings = None
+    try:
+        httpd = make_server(args.root, args.host, args.port, args.name, args.token, args.engine, args.workers,
+                            settings, args.volume)
+    except ValueError as e:
+        parser.error(str(e))
+    if not args.token:
+        print("Warning: No agent token set; only clients on this machine can reach the agent")
+    print(f"Scan agent {httpd.name} serving {', '.join(httpd.roots)} on http://{args.host}:{httpd.server_address[1]}/")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""Checkpoints that let an interrupted native scan resume where it stopped.
+
+A checkpoint is two files in the state directory, keyed by scan root and
+patterns:
+
+* ``<key>.hits`` - matches found so far, one JSON ``[path, size, mtime,
+  companion]`` per line, appended as directories finish.
+* ``<key>.json`` - the frontier of directories still to be listed plus the
+  byte length of the hits file that belongs to it. It is replaced atomically,
+  so a crash between saves leaves the previous consistent checkpoint behind.
+
+The walker records every finished directory's hits before it yields them and
+saves the frontier every ``interval`` seconds and when it is stopped early.
+The state also records whether the scan looked up owners and followed links;
+a scan with other settings does not resume it but starts over, as the saved
+hits would not match its own.
+"""
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional
+
+from .paths import state_dir
+
+CHECKPOINT_VERSION = 1
+CHECKPOINT_INTERVAL = 30.0  # Seconds between periodic saves
+
+
+class ScanCheckpoint:
+    """Frontier and partial results of one scan (root + patterns, with its owner and link settings)."""
+
+    def __init__(self, root: str, patterns: Iterable[str], directory: Optional[Path] = None,
+                 interval: float = CHECKPOINT_INTERVAL, owners: bool = False, follow_links: bool = False):
+        self.root = os.path.normpath(str(root))
+        self.patterns = sorted(patterns)
+        self.options = {'owners': bool(owners), 'follow_links': bool(follow_links)}
+        key = hashlib.sha1(json.dumps([self.root, self.patterns]).encode('utf-8')).hexdigest()[:16]
+        directory = Path(directory) if directory else state_dir("checkpoints")
+        self.state_path = directory / f"{key}.json"
+        self.hits_path = directory / f"{key}.hits"
+        self.interval = interval
+        self._hits_file = None
+        self._hit_count = 0
+        self._last_save = time.monotonic()
+
+    def exists(self) -> bool:
+        """True if an earlier, unfinished scan of this root with the same settings left a checkpoint."""
+        if not (self.state_path.is_file() and self.hits_path.is_file()):
+            return False
+        try:
+            self._read_state()
+        except (OSError, ValueError):
+            return False  # Another version or other settings: begin() replaces it
+        return True
+
+    def _read_state(self) -> dict:
+        with open(self.state_path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        if (state.get('version') != CHECKPOINT_VERSION or state.get('root') != self.root
+                or state.get('options') != self.options):
+            raise ValueError(f"Checkpoint {self.state_path} does not belong to this scan")
+        return state
+
+    def describe(self) -> dict:
+        """Summary of the saved checkpoint: hits, pending directories and save time."""
+        state = self._read_state()
+        return {
+            'hits': state['hit_count'],
+            'pending': len(state['frontier']),
+            'saved_at': state['saved_at'],
+        }
+
+    def begin(self):
+        """Start a fresh checkpoint, discarding any earlier one."""
+        self.discard()
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        self._hits_file = open(self.hits_path, 'wb')
+        self._hit_count = 0
+        self._last_save = time.monotonic()
+
+    def resume(self) -> List[str]:
+        """Reopen the checkpoint and return its frontier of pending directories.
+
+        Hits written after the last save are dropped: the directories that
+        produced them are still in the frontier and will be listed again.
+        """
+        state = self._read_state()
+        self._hits_file = open(self.hits_path, 'r+b')
+        self._hits_file.truncate(state['hits_bytes'])
+        self._hits_file.seek(state['hits_bytes'])
+        self._hit_count = state['hit_count']
+        self._last_save = time.monotonic()
+        return list(state['frontier'])
+
+    def previous_hits(self) -> Iterator[tuple]:
+        """Stream the hits saved by the interrupted run."""
+        with open(self.hits_path, 'rb') as f:
+            for _, line in zip(range(self._hit_count), f):
+                yield tuple(json.loads(line))
+
+    def record(self, hits: Iterable[tuple]):
+        """Append the hits of a finished directory."""
+        write = self._hits_file.write
+        for hit in hits:
+            write(json.dumps(hit).encode('utf-8') + b"\n")
+            self._hit_count += 1
+
+    def due(self) -> bool:
+        """True when the periodic save interval has elapsed."""
+        return time.monotonic() - self._last_save >= self.interval
+
+    def save(self, frontier: Iterable[str]):
+        """Persist the frontier together with the hits recorded so far."""
+        self._hits_file.flush()
+        os.fsync(self._hits_file.fileno())
+        state = {
+            'version': CHECKPOINT_VERSION,
+            'root': self.root,
+            'patterns': self.patterns,
+            'options': self.options,
+            'frontier': list(frontier),
+            'hit_count': self._hit_count,
+            'hits_bytes': self._hits_file.tell(),
+            'saved_at': time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        tmp_path = self.state_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_path)
+        self._last_save = time.monotonic()
+
+    def close(self):
+        if self._hits_file is not None:
+            self._hits_file.close()
+            self._hits_file = None
+
+    def complete(self):
+        """The scan finished: the checkpoint is no longer needed."""
+        self.discard()
+
+    def discard(self):
+        self.close()
+        for path in (self.state_path, self.hits_path):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
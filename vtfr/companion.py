@@ -0,0 +1,46 @@
+"""Match Visio temp files to the drawings and stencils they belong to.
+
+Visio keeps a lock file next to every open document, named after it with a
+``~$$`` prefix and a ``~`` in front of the extension: editing
+``Pumps.vsdx`` creates ``~$$Pumps.~vsdx``. A temp file whose companion
+document no longer exists in the same folder is an *orphan*: nobody can have
+the document open, so the temp file is stale.
+
+The scanner resolves companions from the directory listing it already has, so
+no extra file system calls are made.
+"""
+import os
+from typing import Iterable, Optional
+
+TEMP_PREFIX = "~$$"
+
+
+def companion_name(temp_name: str) -> Optional[str]:
+    """Name of the document a temp file belongs to, or None if it cannot be derived."""
+    if not temp_name.startswith(TEMP_PREFIX):
+        return None
+    name = temp_name[len(TEMP_PREFIX):]
+    stem, dot, ext = name.rpartition(".")
+    if dot and stem and ext.startswith("~"):
+        name = f"{stem}.{ext[1:]}"
+    return name or None
+
+
+def find_companion(temp_path: str, sibling_names: Iterable[str]) -> Optional[str]:
+    """Full path of a temp file's companion among ``sibling_names``.
+
+    Returns ``""`` when the companion is missing (an orphan) and None when the
+    temp file name does not follow the lock file convention. ``sibling_names``
+    should be a set of ``os.path.normcase``'d names for fast lookups.
+    """
+    name = companion_name(os.path.basename(temp_path))
+    if name is None:
+        return None
+    if os.path.normcase(name) in sibling_names:
+        return os.path.join(os.path.dirname(temp_path), name)
+    return ""
+
+
+def is_orphan(record: dict) -> bool:
+    """True if a scan record is a temp file whose source document is gone."""
+    return record.get('Orphan') is True
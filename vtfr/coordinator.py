@@ -0,0 +1,229 @@
+"""Coordinator for scan agents on several file servers.
+
+Each :mod:`vtfr.agent` walks the disks of its own server. The coordinator
+asks every agent to scan at once, merges the streamed batches into one set
+of scan records as they arrive, and remembers which agent reported each
+file. Deletes are sent back to the owning agent, which checks and unlinks
+the files locally and records them in its own journal.
+
+Agents report paths local to their own server, so the same path from two
+servers is two files. Each batch names the volume its root is on (see
+:func:`vtfr.agent.volume_id`), and a file is identified by its volume and
+path. The same file can still be reported twice when served roots overlap
+on one volume, e.g. a folder and one of its subfolders, or one volume
+served by two agents. The first report wins and its agent owns the file.
+Paths are compared case-insensitively on Windows (``os.path.normcase``).
+
+Run a scan from the command line with
+``python -m vtfr.coordinator http://fs01:8765 http://fs02:8765 [--export scan.vtfrc]``.
+"""
+import argparse
+import json
+import os
+import queue
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from .core import DeleteOutcome, count_outcomes
+from .scanner import make_record
+
+DEFAULT_TIMEOUT = 10  # Seconds to wait for an agent's info
+DELETE_CHUNK = 5000  # Paths per delete request
+
+
+class CoordinatedScan(NamedTuple):
+    """Merged result of a scan across agents."""
+    records: List[dict]  # Scan records, each with extra 'Agent' (the agent's name) and 'Volume' keys
+    errors: Dict[str, List[str]]  # Agent URL -> problems reported while scanning
+
+
+class Coordinator:
+    """Fan scans out to agents and route deletes back to the agent owning each file.
+
+    ``agents`` are base URLs such as ``http://fs01:8765``. ``token`` is sent
+    to every agent. ``scan_timeout`` bounds the wait for the next streamed
+    scan line and for delete replies; the default (None) waits as long as
+    the agent keeps working, since a batch is only sent once matches are
+    found and deletes may be rate limited.
+    """
+
+    def __init__(self, agents: Iterable[str], token: Optional[str] = None,
+                 timeout: float = DEFAULT_TIMEOUT, scan_timeout: Optional[float] = None):
+        self.agents = [url.rstrip("/") for url in agents]
+        self.token = token
+        self.timeout = timeout
+        self.scan_timeout = scan_timeout
+        self.names: Dict[str, str] = {}
+        self.owners: Dict[str, Dict[str, str]] = {}  # Normalized path -> volume -> URL of the reporting agent
+
+    def _request(self, url: str, path: str, payload: Optional[dict] = None, timeout: Optional[float] = None):
+        data = json.dumps(payload).encode('utf-8') if payload is not None else None
+        request = urllib.request.Request(url + path, data=data)
+        if data is not None:
+            request.add_header("Content-Type", "application/json")
+        if self.token:
+            request.add_header("Authorization", f"Bearer {self.token}")
+        return urllib.request.urlopen(request, timeout=timeout)
+
+    def info(self, url: str) -> dict:
+        """The agent's name and served roots."""
+        with self._request(url, "/agent/info", timeout=self.timeout) as response:
+            info = json.loads(response.read().decode('utf-8'))
+        self.names[url] = info.get('name') or url
+        return info
+
+    def _stream(self, url: str, roots: Optional[List[str]], lines: queue.Queue):
+        """Read one agent's scan stream into ``lines`` as ``(url, message)``; ``None`` marks the end."""
+        try:
+            self.info(url)
+            with self._request(url, "/agent/scan", {'roots': roots}, timeout=self.scan_timeout) as response:
+                for line in response:
+                    if line.strip():
+                        lines.put((url, json.loads(line.decode('utf-8'))))
+        except urllib.error.HTTPError as e:
+            lines.put((url, {'error': f"HTTP {e.code}: {e.read().decode('utf-8', 'replace')[:200]}"}))
+        except (OSError, ValueError) as e:  # URLError, timeouts and broken streams are OSErrors
+            lines.put((url, {'error': str(e)}))
+        finally:
+            lines.put((url, None))
+
+    def iter_scan(self, roots: Optional[Dict[str, List[str]]] = None,
+                  errors: Optional[Dict[str, List[str]]] = None) -> Iterator[dict]:
+        """Scan on every agent at once, yielding merged, deduplicated records as batches arrive.
+
+        ``roots`` maps agent URLs to the roots to scan (default: all of an
+        agent's roots). Problems are collected per agent URL in ``errors``;
+        an agent that stops before its final line is reported there too.
+        """
+        errors = errors if errors is not None else {}
+        lines: queue.Queue = queue.Queue(maxsize=64)  # Back-pressure on agents that stream faster than we merge
+        threads = [threading.Thread(target=self._stream, args=(url, (roots or {}).get(url), lines), daemon=True)
+                   for url in self.agents]
+        for thread in threads:
+            thread.start()
+        self.owners = {}
+        running, finished = len(threads), set()
+        while running:
+            url, message = lines.get()
+            if message is None:
+                running -= 1
+                if url not in finished and not errors.get(url):
+                    errors.setdefault(url, []).append("Scan stream ended early")
+                continue
+            if message.get('error'):
+                where = f"{message['root']}: " if message.get('root') else ""
+                errors.setdefault(url, []).append(where + message['error'])
+            if message.get('done'):
+                finished.add(url)
+            name = self.names.get(url, url)
+            volume = message.get('volume') or url  # Agents that do not name volumes only merge with themselves
+            for hit in message.get('hits') or ():
+                volumes = self.owners.setdefault(os.path.normcase(hit[0]), {})
+                if volume in volumes:
+                    continue
+                volumes[volume] = url
+                record = make_record(hit)
+                record['Agent'] = name
+                record['Volume'] = volume
+                yield record
+
+    def scan(self, roots: Optional[Dict[str, List[str]]] = None) -> CoordinatedScan:
+        """Scan on every agent and return all merged records with the per-agent errors."""
+        errors: Dict[str, List[str]] = {}
+        records = list(self.iter_scan(roots, errors))
+        return CoordinatedScan(records, errors)
+
+    def _delete_on(self, url: str, paths: List[str]) -> List[DeleteOutcome]:
+        outcomes = []
+        for start in range(0, len(paths), DELETE_CHUNK):
+            chunk = paths[start:start + DELETE_CHUNK]
+            try:
+                with self._request(url, "/agent/delete", {'files': chunk}, timeout=self.scan_timeout) as response:
+                    reply = json.loads(response.read().decode('utf-8'))
+                outcomes.extend(DeleteOutcome(*o) for o in reply.get('outcomes', []))
+            except urllib.error.HTTPError as e:
+                outcomes.extend(DeleteOutcome(p, 'failed', 0, f"Agent returned HTTP {e.code}") for p in chunk)
+            except (OSError, ValueError) as e:
+                outcomes.extend(DeleteOutcome(p, 'failed', 0, f"Agent unreachable: {e}") for p in chunk)
+        return outcomes
+
+    def _owner(self, item) -> Tuple[str, Optional[str], str]:
+        """``(path, owning agent URL or None, reason)`` for a scan record or a path."""
+        if isinstance(item, dict):
+            path = item['FullName']
+            owner = self.owners.get(os.path.normcase(path), {}).get(item.get('Volume'))
+            return path, owner, "No agent reported this file."
+        path = str(item)
+        volumes = self.owners.get(os.path.normcase(path), {})
+        if len(volumes) > 1:
+            return path, None, "Several servers reported this path; pass its scan record to pick one."
+        return path, next(iter(volumes.values()), None), "No agent reported this file."
+
+    def delete(self, files: Iterable) -> List[DeleteOutcome]:
+        """Delete ``files`` on the agents that reported them in the last scan, all agents at once.
+
+        ``files`` are scan records from :meth:`scan`, or paths. A path no
+        agent reported is skipped, since it is unknown which server could
+        delete it, and so is a bare path that several servers reported.
+        """
+        by_agent: Dict[str, List[str]] = {}
+        outcomes = []
+        for item in files:
+            path, owner, reason = self._owner(item)
+            if owner is None:
+                outcomes.append(DeleteOutcome(path, 'skipped', 0, reason))
+            else:
+                by_agent.setdefault(owner, []).append(path)
+        if by_agent:
+            with ThreadPoolExecutor(max_workers=len(by_agent)) as pool:
+                for result in pool.map(lambda item: self._delete_on(*item), by_agent.items()):
+                    outcomes.extend(result)
+        return outcomes
+
+
+def main(argv=None):
+    from .export import export_records
+    from .report import format_file_size
+
+    parser = argparse.ArgumentParser(description="Scan file servers through their Visio Temp File Remover agents.")
+    parser.add_argument("agents", nargs="+", help="Agent URLs, e.g. http://fs01:8765")
+    parser.add_argument("--token", default=os.environ.get("VTFR_AGENT_TOKEN"),
+                        help="Shared agent secret (default: $VTFR_AGENT_TOKEN)")
+    parser.add_argument("--export", metavar="PATH", help="Write the merged results to a .csv, .ndjson or .vtfrc file")
+    parser.add_argument("--delete-orphans", action="store_true",
+                        help="Delete the temp files whose source document is gone, on their own servers")
+    parser.add_argument("--yes", action="store_true", help="Do not ask before deleting")
+    args = parser.parse_args(argv)
+
+    coordinator = Coordinator(args.agents, token=args.token)
+    result = coordinator.scan()
+    totals: Dict[str, List[int]] = {}
+    for record in result.records:
+        entry = totals.setdefault(record['Agent'], [0, 0])
+        entry[0] += 1
+        entry[1] += record.get('Size') or 0
+    for agent, (files, size) in sorted(totals.items()):
+        print(f"{agent:<24} {files:>9} file(s)  {format_file_size(size):>10}")
+    for url, problems in sorted(result.errors.items()):
+        for problem in problems:
+            print(f"{url}: {problem}")
+    if args.export:
+        count = export_records(result.records, args.export)
+        print(f"Exported {count} file(s) to {args.export}")
+    if args.delete_orphans:
+        orphans = [r for r in result.records if r.get('Orphan')]
+        if not orphans:
+            print("No orphaned temp files found.")
+            return
+        if not args.yes and input(f"Delete {len(orphans)} orphaned temp file(s)? [y/N] ").strip().lower() != "y":
+            print("Deletion cancelled.")
+            return
+        counts = count_outcomes(coordinator.delete(orphans))
+        print(", ".join(f"{count} {status}" for status, count in sorted(counts.items())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,379 @@
+"""Asyncio scan and delete engine shared by every front end.
+
+The CLI, the desktop GUI (through :mod:`vtfr.tkbridge`) and the HTTP server
+in :mod:`vtfr.server` all go through the two entry points here:
+
+* ``async for record in scan(root, patterns)`` yields scan records as
+  directories are listed.
+* ``async for outcome in delete(paths)`` yields one :class:`DeleteOutcome`
+  per file as it is unlinked. Transient failures (see :mod:`vtfr.retry`)
+  are retried in the background while the rest of the batch goes on.
+  A path may come with the size and ``LastModified`` it was found with, in
+  which case a file that has changed since is left alone (see
+  :mod:`vtfr.manifest`).
+* ``await quarantine(paths, scan_root)`` moves files into a quarantine
+  batch (see :mod:`vtfr.quarantine`) instead of deleting them.
+
+Blocking file system calls run on a dedicated thread pool whose size bounds
+the concurrency: ``list_concurrency`` directory listings or
+``unlink_concurrency`` unlinks in flight at once. The event loop only
+schedules work and hands results back, so a front end stays responsive while
+a scan or delete is running.
+"""
+import asyncio
+import functools
+import heapq
+import itertools
+import os
+import stat
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from .checkpoint import ScanCheckpoint
+from .metrics import REGISTRY
+from .owners import OwnerCache
+from .quarantine import QuarantineResult, quarantine_files
+from .ratelimit import RateLimiter
+from .retry import NOT_FOUND, TRANSIENT, RetryPolicy, classify_error
+from .safety import check_deletable, protected_prefixes
+from .scanner import (PENDING, SCAN_SECONDS, SCANS_RUNNING, Matcher, WalkGuard, _finish, _start,
+                      compile_patterns, format_mtime, list_directory, make_record, scan_processes)
+
+DEFAULT_LIST_CONCURRENCY = 16
+DEFAULT_UNLINK_CONCURRENCY = 8
+_ITER_BATCH = 1000
+CHANGED = "Changed since it was listed; left in place."
+
+DELETE_OUTCOMES = REGISTRY.counter("vtfr_delete_outcomes_total", "Final delete outcomes", ("status",))
+DELETE_RETRIES = REGISTRY.counter("vtfr_delete_retries_total", "Unlinks retried after a transient error")
+DELETES_IN_FLIGHT = REGISTRY.gauge("vtfr_delete_in_flight", "Unlinks currently running")
+RETRY_QUEUE = REGISTRY.gauge("vtfr_delete_retry_queue", "Files waiting for a retry")
+
+
+class DeleteOutcome(NamedTuple):
+    """Result of deleting one file: status is deleted, failed, not_found or skipped."""
+    path: str
+    status: str
+    size: int
+    error: str
+    attempts: int = 1
+
+
+async def collect(items: AsyncIterator, into=None):
+    """Gather everything an async iterator yields into a list, or append it to ``into``.
+
+    ``into`` can be anything with an ``append`` method, such as a
+    :class:`vtfr.resultstore.ResultStore` that keeps memory bounded.
+    """
+    if into is None:
+        return [item async for item in items]
+    async for item in items:
+        into.append(item)
+    return into
+
+
+async def scan(root, patterns: Iterable[str], *, engine: str = "threads",
+               list_concurrency: Optional[int] = None,
+               checkpoint: Optional[ScanCheckpoint] = None,
+               limiter: Optional[RateLimiter] = None,
+               follow_links: bool = False, owners: bool = False,
+               folders: Optional[dict] = None, match: Optional[Matcher] = None) -> AsyncIterator[dict]:
+    """Yield a record for every file under ``root`` that matches ``patterns``.
+
+    ``engine="threads"`` lists directories on a pool of ``list_concurrency``
+    threads (default :data:`DEFAULT_LIST_CONCURRENCY`). ``engine="processes"``
+    runs the process-pool walker from :mod:`vtfr.scanner` instead, with
+    ``list_concurrency`` worker processes (default: one per CPU). Both honour
+    ``checkpoint`` the same way the synchronous walkers do. A ``limiter``
+    caps the directory listings per second. ``follow_links`` walks into
+    symbolic links and junctions, each physical directory once (see
+    :class:`vtfr.scanner.WalkGuard`). ``owners`` adds an ``Owner`` to every
+    record (see :mod:`vtfr.owners`). With the ``threads`` engine, ``folders``
+    receives the modification time (in ns) and subfolders of every folder
+    listed, as :class:`vtfr.refresh.FolderIndex` keeps them, so a later
+    refresh only lists what changed after the scan. ``match`` is ``patterns``
+    already compiled (:attr:`vtfr.settings.Settings.match`), so a front end
+    does not compile them again for every scan.
+    """
+    if engine not in ("threads", "processes"):
+        raise ValueError(f"Unknown scan engine: {engine!r}")
+    SCANS_RUNNING.inc()
+    start = asyncio.get_running_loop().time()
+    try:
+        if engine == "processes":
+            records = _scan_in_thread(root, patterns, list_concurrency, checkpoint, limiter, follow_links, owners,
+                                      match)
+        else:
+            records = _scan_threads(root, patterns, list_concurrency, checkpoint, limiter, follow_links, owners,
+                                    folders, match)
+        try:
+            async for record in records:
+                yield record
+        finally:
+            await records.aclose()  # Save the checkpoint now if the caller stopped early
+        SCAN_SECONDS.labels(engine).observe(asyncio.get_running_loop().time() - start)
+    finally:
+        SCANS_RUNNING.dec()
+
+
+def _list_and_record(folders: dict, path: str, *args) -> Tuple[List[str], list]:
+    """:func:`list_directory`, storing the folder's time and subfolders in ``folders``."""
+    # Stat before listing, as vtfr.refresh does: a change made during the listing moves the time again
+    mtime = os.stat(path).st_mtime_ns
+    subdirs, hits = list_directory(path, *args)
+    folders[path] = (mtime, tuple(subdirs))
+    return subdirs, hits
+
+
+async def _scan_threads(root, patterns, list_concurrency, checkpoint, limiter, follow_links,
+                        owners=False, folders=None, match=None) -> AsyncIterator[dict]:
+    """The ``threads`` engine: list directories on a thread pool driven by the event loop."""
+    loop = asyncio.get_running_loop()
+    lister = list_directory if folders is None else functools.partial(_list_and_record, folders)
+    match = match or compile_patterns(patterns)
+    root = os.path.normpath(str(root))
+    executor = ThreadPoolExecutor(max_workers=list_concurrency or DEFAULT_LIST_CONCURRENCY)
+    guard = WalkGuard(follow_links)
+    cache = OwnerCache() if owners else None
+    pending = {}
+    try:
+        frontier, hits = await loop.run_in_executor(executor, _start, root, match, checkpoint, limiter, guard, cache,
+                                                    lister)
+        # Queue the frontier first, so a caller stopping during the root's hits still checkpoints it
+        for d in frontier:
+            pending[loop.run_in_executor(executor, lister, d, match, limiter, guard, cache)] = d
+        PENDING.inc(len(pending))
+        for hit in hits:
+            yield make_record(hit)
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                del pending[future]
+                PENDING.dec()
+                try:
+                    subdirs, hits = future.result()
+                except OSError:
+                    continue
+                PENDING.inc(len(subdirs))
+                for d in subdirs:
+                    pending[loop.run_in_executor(executor, lister, d, match, limiter, guard, cache)] = d
+                if checkpoint is not None:
+                    checkpoint.record(hits)
+                for hit in hits:
+                    yield make_record(hit)
+            if checkpoint is not None and checkpoint.due():
+                checkpoint.save(pending.values())
+    finally:
+        PENDING.dec(len(pending))
+        _finish(checkpoint, pending)
+        executor.shutdown(wait=False)
+
+
+def _next_batch(iterator, size: int) -> list:
+    batch = []
+    for item in iterator:
+        batch.append(item)
+        if len(batch) >= size:
+            break
+    return batch
+
+
+async def _scan_in_thread(root, patterns, workers, checkpoint, limiter, follow_links=False,
+                          owners=False, match=None) -> AsyncIterator[dict]:
+    """Drive the synchronous process-pool walker from a helper thread."""
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=1)
+    hits = scan_processes(root, patterns, workers, checkpoint=checkpoint, limiter=limiter, follow_links=follow_links,
+                          owners=owners, match=match)
+    try:
+        while True:
+            batch = await loop.run_in_executor(executor, _next_batch, hits, _ITER_BATCH)
+            if not batch:
+                return
+            for hit in batch:
+                yield make_record(hit)
+    finally:
+        await loop.run_in_executor(executor, hits.close)
+        executor.shutdown(wait=False)
+
+
+def _unlink(path: str, limiter: Optional[RateLimiter] = None, prefixes: Optional[Sequence[str]] = None,
+            expected: Optional[Tuple[int, str]] = None,
+            match: Optional[Matcher] = None) -> Tuple[DeleteOutcome, bool]:
+    """Remove one file after the safety checks; never raises for per-file errors.
+
+    With ``expected`` (size, ``LastModified``) the file is only removed if it
+    still has that size and modification time. Returns the outcome and
+    whether the failure is transient, i.e. worth retrying.
+    """
+    reason = check_deletable(path, prefixes, match)
+    if reason is not None:
+        return DeleteOutcome(path, 'skipped', 0, reason), False
+    if limiter is not None:
+        limiter.acquire()
+    try:
+        st = os.lstat(path)
+        if not stat.S_ISREG(st.st_mode):
+            return DeleteOutcome(path, 'not_found', 0, "File not found or is not a regular file."), False
+        if expected is not None and (st.st_size != expected[0] or format_mtime(st.st_mtime) != expected[1]):
+            return DeleteOutcome(path, 'skipped', 0, CHANGED), False
+        try:
+            os.remove(path)
+        except PermissionError:
+            if os.name != 'nt':
+                raise
+            # Like Remove-Item -Force: clear the read-only attribute and retry
+            os.chmod(path, stat.S_IWRITE)
+            os.remove(path)
+    except FileNotFoundError:
+        return DeleteOutcome(path, 'not_found', 0, "File not found or is not a regular file."), False
+    except OSError as e:
+        kind = classify_error(e)
+        status = 'not_found' if kind == NOT_FOUND else 'failed'
+        return DeleteOutcome(path, status, 0, e.strerror or str(e)), kind == TRANSIENT
+    return DeleteOutcome(path, 'deleted', st.st_size, ""), False
+
+
+async def delete(paths: Iterable, *, unlink_concurrency: int = DEFAULT_UNLINK_CONCURRENCY,
+                 root: str = "", sizes: Optional[dict] = None, journal=None,
+                 limiter: Optional[RateLimiter] = None,
+                 protected: Optional[Sequence[str]] = None,
+                 retry: Optional[RetryPolicy] = None,
+                 match: Optional[Matcher] = None) -> AsyncIterator[DeleteOutcome]:
+    """Delete ``paths``, yielding an outcome per file as each unlink finishes.
+
+    At most ``unlink_concurrency`` unlinks are in flight; ``paths`` is consumed
+    lazily, so it can be a generator over a very large selection. An item
+    may also be a ``(path, size, modified)`` tuple: that file is only
+    deleted if its size and ``LastModified`` text still match, and is
+    otherwise skipped with the :data:`CHANGED` error. Each
+    outcome is recorded in ``journal`` (a :class:`vtfr.journal.DeletionJournal`)
+    when one is given, using ``sizes`` for files that could not be stat'ed.
+    A ``limiter`` caps the unlinks per second. ``protected`` lists the
+    normalized folders that must never be touched (default: the system
+    folders from :func:`vtfr.safety.protected_prefixes`, resolved once).
+    A file whose name ``match`` (the configured patterns,
+    :attr:`vtfr.settings.Settings.match`) does not match is skipped; without
+    it the built-in Visio temp file pattern applies.
+
+    A file that fails with a transient error is queued and retried after a
+    jittered backoff (``retry``, default :class:`vtfr.retry.RetryPolicy`)
+    while the other files keep going. Only its final outcome is yielded and
+    journalled, with ``attempts`` set to the number of tries.
+
+    When the consumer stops early, unlinks that have not started are
+    cancelled; those already running finish, and their outcomes are
+    journalled although they are not yielded. Journal writes run on a
+    thread of their own, so a batch ``fsync`` never stalls the event loop.
+    """
+    loop = asyncio.get_running_loop()
+    sizes = sizes or {}
+    policy = retry or RetryPolicy()
+    prefixes = list(protected) if protected is not None else protected_prefixes()
+    executor = ThreadPoolExecutor(max_workers=unlink_concurrency)
+    journal_executor = ThreadPoolExecutor(max_workers=1) if journal else None
+    path_iter = iter((str(p[0]), (int(p[1]), p[2])) if isinstance(p, tuple) else (str(p), None) for p in paths)
+    in_flight = {}  # future -> (path, expected, attempt, unlink job)
+    retries = []  # heap of (due time, sequence, path, expected, attempt)
+    sequence = itertools.count()
+
+    def submit(path: str, expected: Optional[Tuple[int, str]], attempt: int):
+        unlink = executor.submit(_unlink, path, limiter, prefixes, expected, match)
+        in_flight[asyncio.wrap_future(unlink, loop=loop)] = (path, expected, attempt, unlink)
+        DELETES_IN_FLIGHT.inc()
+
+    def final(outcome: DeleteOutcome, attempt: int, transient: bool) -> DeleteOutcome:
+        if attempt > 1:
+            outcome = outcome._replace(attempts=attempt)
+            if transient:
+                outcome = outcome._replace(error=f"{outcome.error} (gave up after {attempt} attempts)")
+        if not outcome.size and outcome.path in sizes:
+            outcome = outcome._replace(size=int(sizes[outcome.path] or 0))
+        return outcome
+
+    async def record(outcome: DeleteOutcome):
+        if journal:
+            await loop.run_in_executor(journal_executor, journal.record, outcome.path, outcome.status,
+                                       outcome.size, root, outcome.error)
+        DELETE_OUTCOMES.labels(outcome.status).inc()
+
+    try:
+        while True:
+            while retries and retries[0][0] <= loop.time() and len(in_flight) < unlink_concurrency:
+                _, _, path, expected, attempt = heapq.heappop(retries)
+                RETRY_QUEUE.dec()
+                DELETE_RETRIES.inc()
+                submit(path, expected, attempt)
+            if len(in_flight) < unlink_concurrency:
+                for path, expected in path_iter:
+                    submit(path, expected, 1)
+                    if len(in_flight) >= unlink_concurrency:
+                        break
+            if not in_flight:
+                if not retries:
+                    return
+                await asyncio.sleep(retries[0][0] - loop.time())
+                continue
+            # Wake up for the next due retry, unless there is no free slot for it anyway
+            has_slot = retries and len(in_flight) < unlink_concurrency
+            timeout = max(0.0, retries[0][0] - loop.time()) if has_slot else None
+            done, _ = await asyncio.wait(in_flight, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                path, expected, attempt, _ = in_flight.pop(future)
+                DELETES_IN_FLIGHT.dec()  # Per future: the consumer may stop before the rest of done
+                outcome, transient = future.result()
+                if transient and attempt < policy.attempts:
+                    due = loop.time() + policy.delay(attempt)
+                    heapq.heappush(retries, (due, next(sequence), path, expected, attempt + 1))
+                    RETRY_QUEUE.inc()
+                    continue
+                outcome = final(outcome, attempt, transient)
+                await record(outcome)
+                yield outcome
+    finally:
+        RETRY_QUEUE.dec(len(retries))
+        # Stopped early: only unlinks that have not started can be called off
+        for *_, unlink in in_flight.values():
+            unlink.cancel()
+        if in_flight:
+            await asyncio.wait(in_flight)
+        for future, (_, _, attempt, _) in in_flight.items():
+            DELETES_IN_FLIGHT.dec()
+            if not future.cancelled():
+                outcome, transient = future.result()
+                await record(final(outcome, attempt, transient))
+        executor.shutdown(wait=False)
+        if journal_executor is not None:
+            journal_executor.shutdown(wait=False)
+
+
+async def quarantine(paths: Iterable, scan_root, **kwargs) -> QuarantineResult:
+    """Move ``paths`` into a new batch of the scan root's holding area without blocking the event loop.
+
+    Takes the keyword arguments of :func:`vtfr.quarantine.quarantine_files`.
+    The renames run one after another on a worker thread: each is a single
+    metadata update, and the batch manifest is written in order.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(quarantine_files, paths, scan_root, **kwargs))
+
+
+def count_outcomes(outcomes: Iterable[DeleteOutcome]) -> dict:
+    """Count outcomes per status."""
+    counts = {}
+    for outcome in outcomes:
+        counts[outcome.status] = counts.get(outcome.status, 0) + 1
+    return counts
+
+
+def delete_sync(paths: Iterable, **kwargs) -> List[DeleteOutcome]:
+    """Blocking convenience wrapper around :func:`delete` for callers without an event loop."""
+    return asyncio.run(collect(delete(paths, **kwargs)))
+
+
+def scan_sync(root, patterns: Iterable[str], into=None, **kwargs) -> List[dict]:
+    """Blocking convenience wrapper around :func:`scan` for callers without an event loop.
+
+    Records are returned as a list, or appended to ``into`` (see :func:`collect`).
+    """
+    return asyncio.run(collect(scan(root, patterns, **kwargs), into))
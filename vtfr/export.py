@@ -0,0 +1,331 @@
+"""Stream scan records to CSV, NDJSON or a compact columnar binary file.
+
+Every writer takes an iterable of scan records and consumes it lazily, so a
+scan can be exported as it runs (see :func:`export_scan`) without building a
+list of millions of records first.
+
+The columnar format (``.vtfrc``) is meant for reporting jobs that ingest many
+large exports. Records are written in row groups of up to ``group_rows``
+rows. Within a group each column is stored on its own and compressed with
+zlib, and folders are dictionary-encoded, since thousands of files share a
+handful of folders::
+
+    8 bytes   magic "VTFRC001"
+    uint32    length of the JSON header (columns, path separator, created)
+    ...       JSON header
+    per row group:
+      uint32  rows in the group (0 marks the end of the file)
+      7 x     uint32 length + zlib data, in this order:
+              folders   distinct folders of the group, NUL-terminated UTF-8
+              folder    uint32 index into folders, per row
+              names     file names, NUL-terminated UTF-8
+              sizes     int64 bytes, per row
+              modified  int64 wall-clock seconds (see vtfr.snapshot), per row
+              source    uint8 per row: 0 unknown, 1 orphan, 2 source document found
+              documents source document names of the rows marked 2, NUL-terminated
+      2 more when the header's columns include Owner:
+              owners    distinct owners of the group, NUL-terminated UTF-8
+              owner     uint32 index into owners per row, 0xFFFFFFFF if unknown
+    uint64    total rows, after the end marker
+
+``FullName`` is rebuilt from the folder and the name, and ``Companion`` from
+the folder and the document name. All integers are little-endian.
+
+Every writer takes ``owners=True`` to add an ``Owner`` column for scans
+that looked up file owners (see :mod:`vtfr.owners`).
+"""
+import csv
+import json
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+from pathlib import Path
+from typing import IO, Dict, Iterable, Iterator, List, Optional
+
+from .companion import is_orphan
+from .scanner import make_record, scan
+from .snapshot import format_modified, parse_modified
+
+FORMATS = ("csv", "ndjson", "columnar")
+COLUMNS = ("FullName", "Name", "Directory", "LastModified", "Size", "Companion", "Orphan")
+OWNER_COLUMNS = COLUMNS + ("Owner",)
+EXTENSIONS = {'.csv': "csv", '.ndjson': "ndjson", '.jsonl': "ndjson", '.vtfrc': "columnar"}
+COLUMNAR_MAGIC = b"VTFRC001"
+DEFAULT_GROUP_ROWS = 65536
+COMPRESS_LEVEL = 6
+
+_U32 = struct.Struct("<I")
+_U64 = struct.Struct("<Q")
+_SOURCE_UNKNOWN, _SOURCE_ORPHAN, _SOURCE_FOUND = 0, 1, 2
+_NO_OWNER = 0xFFFFFFFF
+
+
+def format_for(path, fmt: Optional[str] = None) -> str:
+    """The export format: ``fmt`` if given, else guessed from the file extension."""
+    if fmt:
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown export format {fmt!r} (expected one of {', '.join(FORMATS)})")
+        return fmt
+    guessed = EXTENSIONS.get(Path(str(path)).suffix.lower())
+    if guessed is None:
+        raise ValueError(f"Cannot tell the export format from {path!r}; use .csv, .ndjson or .vtfrc")
+    return guessed
+
+
+def write_csv(records: Iterable[dict], out: IO[str], owners: bool = False) -> int:
+    """Write records as CSV with a header row; returns the number of rows."""
+    writer = csv.writer(out)
+    writer.writerow(OWNER_COLUMNS if owners else COLUMNS)
+    count = 0
+    for record in records:
+        row = (
+            record.get('FullName', ''),
+            record.get('Name', ''),
+            record.get('Directory', ''),
+            record.get('LastModified', ''),
+            record.get('Size', 0),
+            record.get('Companion') or '',
+            'true' if is_orphan(record) else 'false',
+        )
+        writer.writerow(row + (record.get('Owner') or '',) if owners else row)
+        count += 1
+    return count
+
+
+def write_ndjson(records: Iterable[dict], out: IO[str], owners: bool = False) -> int:
+    """Write one JSON object per line; returns the number of rows."""
+    dumps = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+    columns = OWNER_COLUMNS if owners else COLUMNS
+    count = 0
+    for record in records:
+        out.write(dumps({column: record.get(column) for column in columns}))
+        out.write("\n")
+        count += 1
+    return count
+
+
+def _int_column(typecode: str, values) -> bytes:
+    column = array(typecode, values)
+    if sys.byteorder != "little":
+        column.byteswap()
+    return column.tobytes()
+
+
+def _strings(values: List[str]) -> bytes:
+    return "".join(value + "\0" for value in values).encode('utf-8', 'surrogatepass')
+
+
+class _RowGroup:
+    """Columns of the row group being filled."""
+
+    def __init__(self, owners: bool = False):
+        self.folders: Dict[str, int] = {}
+        self.folder = []
+        self.names = []
+        self.sizes = []
+        self.modified = []
+        self.source = bytearray()
+        self.documents = []
+        self.owners: Optional[Dict[str, int]] = {} if owners else None
+        self.owner = []
+        self._seconds: Dict[str, int] = {}  # LastModified strings repeat a lot within a scan
+
+    def add(self, record: dict):
+        folder = record.get('Directory')
+        name = record.get('Name')
+        if folder is None or name is None:
+            folder, name = os.path.split(record['FullName'])
+        self.folder.append(self.folders.setdefault(folder, len(self.folders)))
+        self.names.append(name)
+        self.sizes.append(int(record.get('Size') or 0))
+        text = record.get('LastModified')
+        seconds = self._seconds.get(text)
+        if seconds is None:
+            seconds = self._seconds[text] = parse_modified(text)
+        self.modified.append(seconds)
+        companion = record.get('Companion')
+        if companion:
+            self.source.append(_SOURCE_FOUND)
+            self.documents.append(os.path.basename(companion))
+        else:
+            self.source.append(_SOURCE_ORPHAN if is_orphan(record) else _SOURCE_UNKNOWN)
+        if self.owners is not None:
+            owner = record.get('Owner')
+            self.owner.append(_NO_OWNER if owner is None else self.owners.setdefault(owner, len(self.owners)))
+
+    def __len__(self):
+        return len(self.names)
+
+    def write(self, out: IO[bytes]):
+        out.write(_U32.pack(len(self)))
+        columns = [
+            _strings(list(self.folders)),
+            _int_column('I', self.folder),
+            _strings(self.names),
+            _int_column('q', self.sizes),
+            _int_column('q', self.modified),
+            bytes(self.source),
+            _strings(self.documents),
+        ]
+        if self.owners is not None:
+            columns += [_strings(list(self.owners)), _int_column('I', self.owner)]
+        for data in columns:
+            packed = zlib.compress(data, COMPRESS_LEVEL)
+            out.write(_U32.pack(len(packed)))
+            out.write(packed)
+
+
+def write_columnar(records: Iterable[dict], out: IO[bytes], group_rows: int = DEFAULT_GROUP_ROWS,
+                   owners: bool = False) -> int:
+    """Write records in the columnar format; only one row group is held in memory."""
+    columns = list(OWNER_COLUMNS if owners else COLUMNS)
+    header = json.dumps({'columns': columns, 'sep': os.sep, 'created': time.time()}).encode('utf-8')
+    out.write(COLUMNAR_MAGIC)
+    out.write(_U32.pack(len(header)))
+    out.write(header)
+    total = 0
+    group = _RowGroup(owners)
+    for record in records:
+        group.add(record)
+        if len(group) >= group_rows:
+            group.write(out)
+            total += len(group)
+            group = _RowGroup(owners)
+    if len(group):
+        group.write(out)
+        total += len(group)
+    out.write(_U32.pack(0))
+    out.write(_U64.pack(total))
+    return total
+
+
+def _read_exact(f: IO[bytes], size: int) -> bytes:
+    data = f.read(size)
+    if len(data) != size:
+        raise ValueError(f"{getattr(f, 'name', 'export')} is truncated")
+    return data
+
+
+def _read_column(f: IO[bytes]) -> bytes:
+    (length,) = _U32.unpack(_read_exact(f, _U32.size))
+    return zlib.decompress(_read_exact(f, length))
+
+
+def _split(data: bytes) -> List[str]:
+    return data.decode('utf-8', 'surrogatepass').split("\0")[:-1]
+
+
+def _ints(typecode: str, data: bytes) -> array:
+    column = array(typecode)
+    column.frombytes(data)
+    if sys.byteorder != "little":
+        column.byteswap()
+    return column
+
+
+def iter_row_groups(path) -> Iterator[dict]:
+    """Stream the row groups of a columnar export as dicts of column lists.
+
+    Keys: ``folders``, ``folder`` (indices), ``names``, ``sizes``,
+    ``modified`` (wall-clock seconds) and ``source`` / ``documents``, plus
+    ``owners`` / ``owner`` (indices) in exports with owners. This is the
+    cheap way to ingest an export: no per-row objects are built.
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+            raise ValueError(f"{path} is not a columnar scan export")
+        (length,) = _U32.unpack(_read_exact(f, _U32.size))
+        header = json.loads(_read_exact(f, length).decode('utf-8'))
+        owners = "Owner" in header.get('columns', ())
+        while True:
+            (rows,) = _U32.unpack(_read_exact(f, _U32.size))
+            if rows == 0:
+                return
+            group = {
+                'sep': header.get('sep', os.sep),
+                'rows': rows,
+                'folders': _split(_read_column(f)),
+                'folder': _ints('I', _read_column(f)),
+                'names': _split(_read_column(f)),
+                'sizes': _ints('q', _read_column(f)),
+                'modified': _ints('q', _read_column(f)),
+                'source': _read_column(f),
+                'documents': _split(_read_column(f)),
+            }
+            if owners:
+                group['owners'] = _split(_read_column(f))
+                group['owner'] = _ints('I', _read_column(f))
+            yield group
+
+
+def _join(folder: str, name: str, sep: str) -> str:
+    if not folder:
+        return name
+    return folder + name if folder.endswith(sep) else folder + sep + name
+
+
+def read_columnar(path) -> Iterator[dict]:
+    """Stream the records of a columnar export in the scan record shape."""
+    for group in iter_row_groups(path):
+        sep = group['sep']
+        folders, names, documents = group['folders'], group['names'], iter(group['documents'])
+        owners, owner = group.get('owners'), group.get('owner')
+        for i in range(group['rows']):
+            folder = folders[group['folder'][i]]
+            source = group['source'][i]
+            companion = _join(folder, next(documents), sep) if source == _SOURCE_FOUND else None
+            record = {
+                'FullName': _join(folder, names[i], sep),
+                'Name': names[i],
+                'Directory': folder,
+                'LastModified': format_modified(group['modified'][i]),
+                'Size': group['sizes'][i],
+                'Companion': companion,
+                'Orphan': source == _SOURCE_ORPHAN,
+            }
+            if owners is not None:
+                record['Owner'] = None if owner[i] == _NO_OWNER else owners[owner[i]]
+            yield record
+
+
+def export_records(records: Iterable[dict], path, fmt: Optional[str] = None, owners: bool = False) -> int:
+    """Write records to ``path`` (``-`` for stdout, text formats only); returns the row count.
+
+    Files are written next to their final name and moved into place, so a
+    failed export never leaves a truncated file behind.
+    """
+    fmt = format_for(path, fmt) if str(path) != "-" else (fmt or "ndjson")
+    if str(path) == "-":
+        if fmt == "columnar":
+            raise ValueError("The columnar format cannot be written to stdout")
+        writer = write_csv if fmt == "csv" else write_ndjson
+        return writer(records, sys.stdout, owners)
+
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    try:
+        if fmt == "columnar":
+            with open(tmp, 'wb') as f:
+                count = write_columnar(records, f, owners=owners)
+        else:
+            with open(tmp, 'w', encoding='utf-8', newline='') as f:
+                count = (write_csv if fmt == "csv" else write_ndjson)(records, f, owners)
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+    return count
+
+
+def export_scan(root, patterns: Iterable[str], path, fmt: Optional[str] = None, **scan_options) -> int:
+    """Scan ``root`` and stream every match straight into an export file.
+
+    ``scan_options`` go to :func:`vtfr.scanner.scan` (``engine``,
+    ``workers``, ``limiter``, ``owners``). Records are built one at a time
+    as the walker yields them; with ``owners`` the export has an Owner column.
+    """
+    hits = scan(str(root), list(patterns), **scan_options)
+    return export_records((make_record(hit) for hit in hits), path, fmt, scan_options.get('owners', False))
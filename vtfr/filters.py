@@ -0,0 +1,252 @@
+"""Filter and sort expressions over in-memory scan results.
+
+:class:`ResultSet` turns scan records into parallel columns (paths, names,
+sizes, timestamps, orphan flags) once. Filters and sorts then work on row
+indices and never re-parse the records, so they stay fast with 100k rows.
+A rescan is merged with :meth:`ResultSet.diff` and :meth:`ResultSet.apply`:
+changed rows are updated where they are, new rows are appended and gone
+rows are dropped, so every other row keeps its index.
+
+A filter expression is a list of space-separated terms that must all match.
+Put a term in quotes if it contains spaces, and prefix it with ``!`` to
+negate it:
+
+==================  =====================================================
+``*.~vsdx``          file name matches the wildcard (a bare term)
+``name:GLOB``        file name matches the wildcard
+``path:GLOB``        full path matches the wildcard
+``owner:GLOB``       owner name matches the wildcard (scans that looked up owners)
+``re:REGEX``         full path contains a match for the regular expression
+``size>1MB``         size compared with ``>``, ``>=``, ``<``, ``<=`` or ``=``
+``age>30d``          age compared the same way; units ``m``, ``h``, ``d``, ``w``
+``orphan``           the source document is gone
+==================  =====================================================
+
+Wildcards and regular expressions are case-insensitive, as in PowerShell.
+"""
+import fnmatch
+import os
+import re
+import shlex
+import time
+from typing import Callable, Collection, List, NamedTuple, Optional, Sequence, Tuple
+
+from .snapshot import parse_modified
+
+SIZE_UNITS = {'': 1, 'b': 1, 'kb': 1024, 'mb': 1024 ** 2, 'gb': 1024 ** 3, 'tb': 1024 ** 4}
+AGE_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 7 * 86400}
+SORT_KEYS = ('name', 'path', 'size', 'modified', 'owner')
+_DIFF_FIELDS = ('Size', 'LastModified', 'Companion', 'Orphan', 'Owner')
+
+_COMPARISON = re.compile(r'^(size|age)(>=|<=|>|<|=)(\d+(?:\.\d+)?)([a-z]*)$', re.IGNORECASE)
+_OPERATORS = {
+    '>': lambda a, b: a > b,
+    '>=': lambda a, b: a >= b,
+    '<': lambda a, b: a < b,
+    '<=': lambda a, b: a <= b,
+    '=': lambda a, b: a == b,
+}
+
+# A compiled term: takes the result set and candidate row indices, returns the rows that pass
+Term = Callable[["ResultSet", List[int]], List[int]]
+
+
+class FilterError(ValueError):
+    """A filter expression could not be parsed."""
+
+
+class RowDiff(NamedTuple):
+    """How a rescan differs from a result set: new records, gone rows and rows with new values."""
+    added: List[dict]
+    removed: List[int]
+    changed: List[Tuple[int, dict]]
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+
+class ResultSet:
+    """Scan records stored column-wise for fast filtering, sorting and selection."""
+
+    def __init__(self, records: Sequence[dict]):
+        self.records = records = list(records)
+        self.paths = [r.get('FullName', '') for r in records]
+        self.names = [r.get('Name') or r.get('FullName', '') for r in records]
+        self.sizes = [_to_int(r.get('Size')) for r in records]
+        # Wall-clock seconds; compare with now() below, never with time.time()
+        self.modified = [parse_modified(r.get('LastModified')) for r in records]
+        self.orphans = [r.get('Orphan') is True for r in records]
+        self.owners = [r.get('Owner') or '' for r in records]  # "" when the scan did not look up owners
+        self.dropped = set()  # Rows removed by apply(); their indices are never reused
+        self._sort_cache = {}
+
+    def __len__(self) -> int:
+        return len(self.paths) - len(self.dropped)
+
+    def rows(self) -> List[int]:
+        """Indices of the rows that have not been dropped."""
+        if not self.dropped:
+            return list(range(len(self.paths)))
+        return [i for i in range(len(self.paths)) if i not in self.dropped]
+
+    def diff(self, records: Sequence[dict], folders: Optional[Collection[str]] = None) -> RowDiff:
+        """Compare ``records`` from a rescan with the rows, matching them by full path.
+
+        With ``folders``, the rescan only covered those folders: rows in
+        other folders are left alone rather than counted as removed.
+        """
+        fresh = {r.get('FullName', ''): r for r in records}
+        removed, changed = [], []
+        for i in self.rows():
+            path = self.paths[i]
+            if folders is not None and os.path.dirname(path) not in folders:
+                continue
+            record = fresh.pop(path, None)
+            if record is None:
+                removed.append(i)
+            elif any(record.get(f) != self.records[i].get(f) for f in _DIFF_FIELDS):
+                changed.append((i, record))
+        return RowDiff(list(fresh.values()), removed, changed)
+
+    def apply(self, diff: RowDiff) -> List[int]:
+        """Merge ``diff`` into the columns and return the indices of the added rows."""
+        self.dropped.update(diff.removed)
+        for i, record in diff.changed:
+            self._set_row(i, record)
+        start = len(self.paths)
+        for record in diff.added:
+            for column in (self.records, self.paths, self.names, self.sizes, self.modified, self.orphans,
+                           self.owners):
+                column.append(None)
+            self._set_row(len(self.paths) - 1, record)
+        self._sort_cache.clear()
+        return list(range(start, len(self.paths)))
+
+    def _set_row(self, i: int, record: dict):
+        self.records[i] = record
+        self.paths[i] = record.get('FullName', '')
+        self.names[i] = record.get('Name') or record.get('FullName', '')
+        self.sizes[i] = _to_int(record.get('Size'))
+        self.modified[i] = parse_modified(record.get('LastModified'))
+        self.orphans[i] = record.get('Orphan') is True
+        self.owners[i] = record.get('Owner') or ''
+
+    @staticmethod
+    def now() -> int:
+        """The current time on the same wall-clock scale as :attr:`modified`."""
+        return parse_modified(time.strftime("%Y-%m-%d %H:%M:%S"))
+
+    def filter(self, expression: str, rows: Optional[List[int]] = None) -> List[int]:
+        """Indices of the rows (default: all not dropped) matching every term of ``expression``."""
+        rows = self.rows() if rows is None else rows
+        for term in parse_filter(expression):
+            rows = term(self, rows)
+        return rows
+
+    def sort_keys(self, key: str) -> list:
+        """The column used to sort by ``key``; names, paths and owners are case-folded once and cached."""
+        if key not in SORT_KEYS:
+            raise FilterError(f"Unknown sort key {key!r} (expected one of {', '.join(SORT_KEYS)})")
+        if key == 'size':
+            return self.sizes
+        if key == 'modified':
+            return self.modified
+        if key not in self._sort_cache:
+            column = {'name': self.names, 'path': self.paths, 'owner': self.owners}[key]
+            self._sort_cache[key] = [value.casefold() for value in column]
+        return self._sort_cache[key]
+
+    def sort(self, rows: List[int], key: str, reverse: bool = False) -> List[int]:
+        """Return ``rows`` ordered by ``key``."""
+        keys = self.sort_keys(key)
+        return sorted(rows, key=keys.__getitem__, reverse=reverse)
+
+
+def _to_int(value) -> int:
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _glob_term(column: str, pattern: str) -> Term:
+    match = re.compile(fnmatch.translate(pattern), re.IGNORECASE).match
+
+    def term(rs: ResultSet, rows: List[int]) -> List[int]:
+        values = getattr(rs, column)
+        return [i for i in rows if match(values[i])]
+    return term
+
+
+def _regex_term(pattern: str) -> Term:
+    try:
+        search = re.compile(pattern, re.IGNORECASE).search
+    except re.error as e:
+        raise FilterError(f"Invalid regular expression {pattern!r}: {e}")
+
+    def term(rs: ResultSet, rows: List[int]) -> List[int]:
+        paths = rs.paths
+        return [i for i in rows if search(paths[i])]
+    return term
+
+
+def _comparison_term(field: str, op: str, number: str, unit: str) -> Term:
+    units = SIZE_UNITS if field == 'size' else AGE_UNITS
+    if unit.lower() not in units:
+        raise FilterError(f"Unknown {field} unit {unit!r} (expected one of {', '.join(u for u in units if u)})")
+    limit = float(number) * units[unit.lower()]
+    compare = _OPERATORS[op]
+
+    if field == 'size':
+        def term(rs: ResultSet, rows: List[int]) -> List[int]:
+            sizes = rs.sizes
+            return [i for i in rows if compare(sizes[i], limit)]
+    else:
+        def term(rs: ResultSet, rows: List[int]) -> List[int]:
+            now = rs.now()
+            modified = rs.modified
+            return [i for i in rows if compare(now - modified[i], limit)]
+    return term
+
+
+def _orphan_term(rs: ResultSet, rows: List[int]) -> List[int]:
+    orphans = rs.orphans
+    return [i for i in rows if orphans[i]]
+
+
+def _negate(term: Term) -> Term:
+    def negated(rs: ResultSet, rows: List[int]) -> List[int]:
+        keep = set(term(rs, rows))
+        return [i for i in rows if i not in keep]
+    return negated
+
+
+def _compile_term(text: str) -> Term:
+    if text.startswith("!") and len(text) > 1:
+        return _negate(_compile_term(text[1:]))
+    lowered = text.lower()
+    if lowered == "orphan":
+        return _orphan_term
+    if lowered.startswith("name:"):
+        return _glob_term('names', text[5:])
+    if lowered.startswith("path:"):
+        return _glob_term('paths', text[5:])
+    if lowered.startswith("owner:"):
+        return _glob_term('owners', text[6:])
+    if lowered.startswith("re:"):
+        return _regex_term(text[3:])
+    comparison = _COMPARISON.match(text)
+    if comparison:
+        return _comparison_term(comparison.group(1).lower(), *comparison.groups()[1:])
+    if lowered.startswith(("size", "age")):
+        raise FilterError(f"Invalid comparison {text!r}, e.g. size>1MB or age>30d")
+    return _glob_term('names', text if any(c in text for c in "*?[") else f"*{text}*")
+
+
+def parse_filter(expression: str) -> List[Term]:
+    """Compile a filter expression into terms; raises :class:`FilterError` if it is malformed."""
+    try:
+        words = shlex.split(expression or "", posix=False)
+    except ValueError as e:
+        raise FilterError(str(e))
+    return [_compile_term(word.strip('"')) for word in words]
@@ -0,0 +1,198 @@
+"""Append-only audit journal of deletion outcomes.
+
+Every file the tool tries to remove gets one binary record: when, by whom,
+from which scan root, the outcome and the file size. Records are buffered and
+written with a single ``fsync`` per batch, so journaling a large delete costs
+far less than printing each file to the console.
+
+File layout: the 8-byte magic ``VTFRJ001`` followed by records of the form::
+
+    uint32 body length
+    float64 timestamp (epoch seconds)
+    uint8   status code
+    int64   size in bytes
+    uint16  len(user), uint16 len(host), uint16 len(root),
+    uint32  len(path), uint16 len(error)
+    utf-8   user, host, root, path, error
+
+Readers stream the file record by record and stop at a truncated tail (a
+crash in the middle of a write), so queries never load the whole journal.
+"""
+import getpass
+import os
+import socket
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterator, NamedTuple, Optional
+
+from .paths import state_dir
+
+MAGIC = b"VTFRJ001"
+DEFAULT_BATCH_SIZE = 512
+
+_LENGTH = struct.Struct("<I")
+_HEADER = struct.Struct("<dBqHHHIH")
+
+STATUS_CODES = {
+    'deleted': 1,
+    'failed': 2,
+    'not_found': 3,
+    'skipped': 4,
+    'quarantined': 5,
+    'restored': 6,
+    'purged': 7,
+}
+STATUS_NAMES = {code: name for name, code in STATUS_CODES.items()}
+
+
+class JournalEntry(NamedTuple):
+    timestamp: float
+    status: str
+    size: int
+    user: str
+    host: str
+    root: str
+    path: str
+    error: str
+
+
+def default_journal_path() -> Path:
+    """Location of the journal in the local state directory."""
+    return state_dir() / "deletions.journal"
+
+
+def _current_user() -> str:
+    try:
+        user = getpass.getuser()
+    except Exception:
+        user = "unknown"
+    domain = os.environ.get("USERDOMAIN")
+    return f"{domain}\\{user}" if domain else user
+
+
+class DeletionJournal:
+    """Buffered, thread-safe writer for the deletion journal.
+
+    Use as a context manager, or call :meth:`close` to flush the final batch.
+    """
+
+    def __init__(self, path: Optional[Path] = None, batch_size: int = DEFAULT_BATCH_SIZE):
+        self.path = Path(path) if path else default_journal_path()
+        self.batch_size = batch_size
+        self.user = _current_user()
+        self.host = socket.gethostname()
+        self._buffer = bytearray()
+        self._pending = 0
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'ab')
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+
+    def record(self, path, status: str, size: int = 0, root: str = "", error: str = ""):
+        """Queue one outcome; the batch is written and fsync'ed once it is full."""
+        user = self.user.encode('utf-8')
+        host = self.host.encode('utf-8')
+        root_b = str(root).encode('utf-8')
+        path_b = str(path).encode('utf-8')
+        error_b = (error or "").encode('utf-8')[:65535]
+        body = _HEADER.pack(time.time(), STATUS_CODES[status], int(size or 0),
+                            len(user), len(host), len(root_b), len(path_b), len(error_b))
+        body += user + host + root_b + path_b + error_b
+        with self._lock:
+            self._buffer += _LENGTH.pack(len(body))
+            self._buffer += body
+            self._pending += 1
+            if self._pending >= self.batch_size:
+                self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._buffer:
+            return
+        self._file.write(self._buffer)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._buffer.clear()
+        self._pending = 0
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        with self._lock:
+            if self._file.closed:
+                return
+            self._flush_locked()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def read_journal(path: Optional[Path] = None) -> Iterator[JournalEntry]:
+    """Stream every complete entry of the journal, in the order the batches were written."""
+    path = Path(path) if path else default_journal_path()
+    if not path.is_file():
+        return
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a deletion journal")
+        while True:
+            raw_len = f.read(_LENGTH.size)
+            if len(raw_len) < _LENGTH.size:
+                return
+            (body_len,) = _LENGTH.unpack(raw_len)
+            body = f.read(body_len)
+            if len(body) < body_len:
+                return  # Truncated tail from an interrupted write
+            ts, code, size, n_user, n_host, n_root, n_path, n_error = _HEADER.unpack_from(body)
+            offset = _HEADER.size
+            fields = []
+            for n in (n_user, n_host, n_root, n_path, n_error):
+                fields.append(body[offset:offset + n].decode('utf-8', 'replace'))
+                offset += n
+            yield JournalEntry(ts, STATUS_NAMES.get(code, str(code)), size, *fields)
+
+
+def _under(path: str, prefix: str) -> bool:
+    path = os.path.normcase(os.path.normpath(path))
+    prefix = os.path.normcase(os.path.normpath(prefix))
+    return path == prefix or path.startswith(prefix.rstrip(os.sep) + os.sep)
+
+
+def query_journal(path: Optional[Path] = None, since: Optional[float] = None, until: Optional[float] = None,
+                  root: Optional[str] = None, status: Optional[str] = None) -> Iterator[JournalEntry]:
+    """Stream the entries matching every given filter.
+
+    ``since``/``until`` are epoch seconds; ``root`` matches entries whose scan
+    root or file path lies under that folder. Entries are not in time order:
+    each is stamped when it is recorded but written with its batch, and
+    several processes append batches to the same journal. So the whole
+    journal is always read, one entry at a time.
+    """
+    for entry in read_journal(path):
+        if since is not None and entry.timestamp < since:
+            continue
+        if until is not None and entry.timestamp >= until:
+            continue
+        if status is not None and entry.status != status:
+            continue
+        if root is not None and not (_under(entry.root, root) or _under(entry.path, root)):
+            continue
+        yield entry
+
+
+def summarize(entries) -> Dict[str, Dict[str, int]]:
+    """Count entries and bytes per status: ``{status: {'files': n, 'bytes': b}}``."""
+    summary: Dict[str, Dict[str, int]] = {}
+    for entry in entries:
+        bucket = summary.setdefault(entry.status, {'files': 0, 'bytes': 0})
+        bucket['files'] += 1
+        bucket['bytes'] += entry.size
+    return summary
@@ -0,0 +1,113 @@
+"""Delete the files listed in an earlier export, without scanning again.
+
+A review often happens days after the scan: the scan is exported on Monday,
+the file owners approve the list, and the approved files are deleted on
+Friday. :func:`delete_manifest` applies such a list, the *manifest*, directly.
+Any CSV, NDJSON or columnar file written by :mod:`vtfr.export` is a manifest,
+edited down or not.
+
+The manifest is read one row at a time and fed to :func:`vtfr.core.delete`
+as it goes, so applying millions of rows takes no more memory than applying
+ten. Each file is checked against its row just before the unlink: a file
+whose size or ``LastModified`` differs from the manifest has been written
+since it was reviewed, perhaps by someone who reopened the drawing, and it is
+skipped rather than deleted.
+"""
+import csv
+import json
+from typing import AsyncIterator, Iterator, NamedTuple, Optional, Tuple
+
+from . import core
+from .export import format_for, read_columnar
+
+
+class ManifestError(ValueError):
+    """A manifest row that cannot be applied, e.g. one without a size."""
+
+
+class ManifestEntry(NamedTuple):
+    """A file to delete, with the size and ``LastModified`` it had when it was listed."""
+    path: str
+    size: int
+    modified: str
+
+
+_REQUIRED = ("FullName", "Size", "LastModified")
+
+
+def _entry(record: dict, where: str) -> ManifestEntry:
+    try:
+        path, size, modified = (record[column] for column in _REQUIRED)
+        if not path or not modified:
+            raise ValueError("empty FullName or LastModified")
+        return ManifestEntry(str(path), int(size), str(modified))
+    except (KeyError, TypeError, ValueError) as e:
+        raise ManifestError(f"{where}: not a scan record ({e})") from None
+
+
+def _csv_records(path) -> Iterator[dict]:
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        missing = [column for column in _REQUIRED if column not in (reader.fieldnames or ())]
+        if missing:
+            raise ManifestError(f"{path}: no {', '.join(missing)} column")
+        for record in reader:
+            yield record
+
+
+def _ndjson_records(path) -> Iterator[dict]:
+    with open(path, encoding='utf-8') as f:
+        for number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                raise ManifestError(f"{path}, line {number}: {e}") from None
+            if not isinstance(record, dict):
+                raise ManifestError(f"{path}, line {number}: not a JSON object")
+            yield record
+
+
+def iter_manifest(path, fmt: Optional[str] = None, orphans_only: bool = False) -> Iterator[ManifestEntry]:
+    """Stream the entries of a manifest, in file order.
+
+    The format follows the extension as for exports, or ``fmt``.
+    ``orphans_only`` keeps the rows marked as orphans. Raises
+    :class:`ManifestError` at the first row that is not a scan record.
+    """
+    fmt = format_for(path, fmt)
+    if fmt == "columnar":
+        records = read_columnar(path)
+    else:
+        records = _csv_records(path) if fmt == "csv" else _ndjson_records(path)
+    for row, record in enumerate(records, start=1):
+        if orphans_only and record.get('Orphan') not in (True, 'true'):  # CSV has no booleans
+            continue
+        yield _entry(record, f"{path}, row {row}")
+
+
+def count_manifest(path, fmt: Optional[str] = None, orphans_only: bool = False) -> Tuple[int, int]:
+    """``(files, bytes)`` listed in a manifest.
+
+    Reading the manifest once up front also checks every row before the
+    first file is deleted.
+    """
+    files = size = 0
+    for entry in iter_manifest(path, fmt, orphans_only):
+        files += 1
+        size += entry.size
+    return files, size
+
+
+async def delete_manifest(path, fmt: Optional[str] = None, orphans_only: bool = False,
+                          **delete_options) -> AsyncIterator[core.DeleteOutcome]:
+    """Delete the files of a manifest that are unchanged since it was written.
+
+    ``delete_options`` go to :func:`vtfr.core.delete` (``unlink_concurrency``,
+    ``journal``, ``limiter``, ...). A file whose size or modification time
+    no longer matches is yielded as ``skipped`` with the
+    :data:`vtfr.core.CHANGED` error.
+    """
+    async for outcome in core.delete(iter_manifest(path, fmt, orphans_only), **delete_options):
+        yield outcome
@@ -0,0 +1,295 @@
+"""Process-wide metrics in the Prometheus text exposition format.
+
+The scan and delete engines count what they do in the default
+:data:`REGISTRY`. The long-running front ends (``vtfr.server``,
+``vtfr.agent``) serve it on ``GET /metrics``, so any Prometheus-compatible
+collector can chart scan durations, files per second, delete outcomes and
+queue depths.
+
+Updates sit on the scan hot path, so they take no lock. Each thread adds
+to its own cell, a one-element list reached through a ``threading.local``.
+Only that thread ever writes the cell, so no increment is lost. A scrape
+sums the cells of all threads; it may miss an update that is in progress,
+which the next scrape picks up. Only creating a labelled child or a thread's
+first cell takes a lock. The cells of threads that have exited are folded
+into a base total then, and on each scrape, so pools that come and go with
+every scan do not leave a cell behind per worker.
+
+Example::
+
+    FILES = REGISTRY.counter("vtfr_demo_files_total", "Files seen", ("engine",))
+    FILES.labels("threads").inc(len(hits))
+"""
+import bisect
+import math
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+
+
+class _Cells:
+    """Per-thread accumulators of ``width`` floats, summed on read."""
+    __slots__ = ('width', '_cells', '_base', '_local', '_lock')
+
+    def __init__(self, width: int = 1):
+        self.width = width
+        self._cells: Dict[threading.Thread, List[float]] = {}
+        self._base = [0.0] * width  # Totals of the threads that have exited
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def cell(self) -> List[float]:
+        try:
+            return self._local.cell
+        except AttributeError:
+            cell = self._local.cell = [0.0] * self.width
+            with self._lock:
+                self._fold_exited()
+                self._cells[threading.current_thread()] = cell
+            return cell
+
+    def _fold_exited(self):
+        """Add the cells of finished threads, which never write again, to the base (lock held)."""
+        for thread in [t for t in self._cells if not t.is_alive()]:
+            for i, value in enumerate(self._cells.pop(thread)):
+                self._base[i] += value
+
+    def totals(self) -> List[float]:
+        with self._lock:
+            self._fold_exited()
+            cells = [self._base, *self._cells.values()]
+        return [sum(column) for column in zip(*cells)]
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(int(value)) if value == int(value) and abs(value) < 1e15 else repr(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._children[()] = self._new_child()  # Report 0 before the first update
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """The child for one combination of label values, created on first use."""
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {self.labelnames}, got {key}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _unlabelled(self):
+        if self.labelnames:
+            raise ValueError(f"{self.name} needs labels {self.labelnames}")
+        return self.labels()
+
+    def samples(self) -> Iterable[Tuple[str, str, float]]:
+        """``(name suffix, label text, value)`` for every child."""
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines += [f"{self.name}{suffix}{labels} {_format_value(value)}" for suffix, labels, value in self.samples()]
+        return "\n".join(lines) + "\n"
+
+
+class _CounterChild:
+    __slots__ = ('_cells',)
+
+    def __init__(self):
+        self._cells = _Cells()
+
+    def inc(self, amount: float = 1):
+        self._cells.cell()[0] += amount
+
+    def get(self) -> float:
+        return self._cells.totals()[0]
+
+
+class Counter(_Metric):
+    """A total that only goes up, such as files matched or deletes per outcome."""
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1):
+        self._unlabelled().inc(amount)
+
+    def get(self) -> float:
+        return self._unlabelled().get()
+
+    def samples(self):
+        for key, child in sorted(self._children.items()):
+            yield "", _label_text(self.labelnames, key), child.get()
+
+
+class _GaugeChild:
+    __slots__ = ('_cells', '_base', '_function')
+
+    def __init__(self):
+        self._cells = _Cells()
+        self._base = 0.0
+        self._function: Optional[Callable[[], float]] = None
+
+    def inc(self, amount: float = 1):
+        self._cells.cell()[0] += amount
+
+    def dec(self, amount: float = 1):
+        self._cells.cell()[0] -= amount
+
+    def set(self, value: float):
+        """Replace the value. Not for gauges that are also moved with inc/dec from several threads."""
+        self._base = value - self._cells.totals()[0]
+
+    def set_function(self, function: Callable[[], float]):
+        """Read the value from ``function`` at scrape time, e.g. the length of a queue."""
+        self._function = function
+
+    def get(self) -> float:
+        if self._function is not None:
+            return float(self._function())
+        return self._base + self._cells.totals()[0]
+
+
+class Gauge(_Metric):
+    """A value that goes up and down, such as the directories waiting to be listed."""
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def inc(self, amount: float = 1):
+        self._unlabelled().inc(amount)
+
+    def dec(self, amount: float = 1):
+        self._unlabelled().dec(amount)
+
+    def set(self, value: float):
+        self._unlabelled().set(value)
+
+    def set_function(self, function: Callable[[], float]):
+        self._unlabelled().set_function(function)
+
+    def get(self) -> float:
+        return self._unlabelled().get()
+
+    def samples(self):
+        for key, child in sorted(self._children.items()):
+            yield "", _label_text(self.labelnames, key), child.get()
+
+
+class _HistogramChild:
+    __slots__ = ('_bounds', '_cells')
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self._bounds = bounds
+        # One slot per bucket (the last is +Inf), then the sum
+        self._cells = _Cells(len(bounds) + 2)
+
+    def observe(self, value: float):
+        cell = self._cells.cell()
+        cell[bisect.bisect_left(self._bounds, value)] += 1
+        cell[-1] += value
+
+    def snapshot(self) -> Tuple[List[float], float, float]:
+        """Cumulative bucket counts, the sum and the count."""
+        totals = self._cells.totals()
+        cumulative, running = [], 0.0
+        for count in totals[:-1]:
+            running += count
+            cumulative.append(running)
+        return cumulative, totals[-1], running
+
+
+class Histogram(_Metric):
+    """Observations sorted into buckets, such as scan durations in seconds."""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._unlabelled().observe(value)
+
+    def samples(self):
+        bounds = [_format_value(b) for b in self.buckets] + ["+Inf"]
+        for key, child in sorted(self._children.items()):
+            cumulative, total, count = child.snapshot()
+            for bound, value in zip(bounds, cumulative):
+                yield "_bucket", _label_text(self.labelnames, key, f'le="{bound}"'), value
+            yield "_sum", _label_text(self.labelnames, key), total
+            yield "_count", _label_text(self.labelnames, key), count
+
+
+class Registry:
+    """A named set of metrics, rendered together for a ``/metrics`` response."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric {metric.name} is already registered differently")
+                return existing  # Modules that are imported twice share one metric
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Every metric in the text exposition format (version 0.0.4)."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        return "".join(metric.render() for metric in metrics)
+
+
+REGISTRY = Registry()
@@ -0,0 +1,112 @@
+"""File owner names for scan records, looked up once per account.
+
+Whether a stale temp file can go often depends on who left it behind. On
+Linux and macOS the owner's uid comes with the ``lstat`` the scanner already
+makes for every match, so attribution only adds a dictionary lookup per file.
+On Windows the owner's SID needs one ``GetNamedSecurityInfoW`` call per
+file. In both cases turning the uid or SID into an account name is the slow
+part: it can mean a round trip to a directory server. :class:`OwnerCache`
+does that once per account and remembers the answer, including failures.
+
+A SID or uid that no longer resolves, e.g. for an account that was deleted
+when someone left the company, is reported as the raw SID or uid.
+"""
+import os
+import threading
+from typing import Dict, Optional
+
+from .metrics import REGISTRY
+
+NAME_LOOKUPS = REGISTRY.counter("vtfr_owner_name_lookups_total", "Owner account names resolved (cache misses)")
+
+if os.name == 'nt':
+    import ctypes
+    from ctypes import wintypes
+
+    _advapi32 = ctypes.WinDLL('advapi32', use_last_error=True)
+    _kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+    _SE_FILE_OBJECT = 1
+    _OWNER_SECURITY_INFORMATION = 0x1
+    _ERROR_INSUFFICIENT_BUFFER = 122
+    _advapi32.GetNamedSecurityInfoW.argtypes = (
+        wintypes.LPCWSTR, ctypes.c_int, wintypes.DWORD, ctypes.POINTER(ctypes.c_void_p),
+        ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p, ctypes.POINTER(ctypes.c_void_p))
+    _advapi32.GetNamedSecurityInfoW.restype = wintypes.DWORD
+    _advapi32.ConvertSidToStringSidW.argtypes = (ctypes.c_void_p, ctypes.POINTER(wintypes.LPWSTR))
+    _advapi32.ConvertSidToStringSidW.restype = wintypes.BOOL
+    _advapi32.LookupAccountSidW.argtypes = (
+        wintypes.LPCWSTR, ctypes.c_void_p, wintypes.LPWSTR, ctypes.POINTER(wintypes.DWORD),
+        wintypes.LPWSTR, ctypes.POINTER(wintypes.DWORD), ctypes.POINTER(wintypes.DWORD))
+    _advapi32.LookupAccountSidW.restype = wintypes.BOOL
+    _kernel32.LocalFree.argtypes = (ctypes.c_void_p,)
+    _kernel32.LocalFree.restype = ctypes.c_void_p
+
+
+def _account_name(sid) -> Optional[str]:
+    """``DOMAIN\\user`` for a SID, or None if it does not resolve."""
+    name_len, domain_len, use = wintypes.DWORD(0), wintypes.DWORD(0), wintypes.DWORD(0)
+    _advapi32.LookupAccountSidW(None, sid, None, ctypes.byref(name_len), None, ctypes.byref(domain_len),
+                                ctypes.byref(use))
+    if ctypes.get_last_error() != _ERROR_INSUFFICIENT_BUFFER:
+        return None
+    name = ctypes.create_unicode_buffer(name_len.value)
+    domain = ctypes.create_unicode_buffer(domain_len.value)
+    if not _advapi32.LookupAccountSidW(None, sid, name, ctypes.byref(name_len), domain, ctypes.byref(domain_len),
+                                       ctypes.byref(use)):
+        return None
+    return f"{domain.value}\\{name.value}" if domain.value else name.value
+
+
+def _user_name(uid: int) -> Optional[str]:
+    try:
+        import pwd
+    except ImportError:
+        return None
+    try:
+        return pwd.getpwuid(uid).pw_name
+    except KeyError:
+        return None
+
+
+class OwnerCache:
+    """Owner names of files, with one name lookup per uid or SID.
+
+    Safe to share between the scanner's threads: two threads may both
+    resolve a new account at the same moment, but never more than that.
+    """
+
+    def __init__(self):
+        self._names: Dict[object, str] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def _remember(self, key, resolve) -> str:
+        name = self._names.get(key)
+        if name is None:
+            NAME_LOOKUPS.inc()
+            name = resolve() or str(key)
+            with self._lock:
+                name = self._names.setdefault(key, name)
+        return name
+
+    def owner(self, path: str, st: os.stat_result) -> Optional[str]:
+        """The owner of ``path``, whose ``lstat`` result is ``st``; None if it cannot be read."""
+        if os.name != 'nt':
+            return self._remember(st.st_uid, lambda: _user_name(st.st_uid))
+        sid, descriptor = ctypes.c_void_p(), ctypes.c_void_p()
+        if _advapi32.GetNamedSecurityInfoW(path, _SE_FILE_OBJECT, _OWNER_SECURITY_INFORMATION, ctypes.byref(sid),
+                                           None, None, None, ctypes.byref(descriptor)):
+            return None
+        try:
+            text = wintypes.LPWSTR()
+            if not _advapi32.ConvertSidToStringSidW(sid, ctypes.byref(text)):
+                return None
+            try:
+                key = text.value
+            finally:
+                _kernel32.LocalFree(text)
+            return self._remember(key, lambda: _account_name(sid))
+        finally:
+            _kernel32.LocalFree(descriptor)
@@ -0,0 +1,23 @@
+"""Locations of the tool's local state (checkpoints, journals, snapshots)."""
+import os
+from pathlib import Path
+
+APP_DIR_NAME = "VisioTempFileRemover"
+
+
+def state_dir(*parts: str) -> Path:
+    """Return (and create) the local state directory, or a subdirectory of it.
+
+    ``VTFR_STATE_DIR`` overrides the location. Otherwise ``%LOCALAPPDATA%`` is
+    used on Windows and ``$XDG_STATE_HOME`` (``~/.local/state``) elsewhere.
+    """
+    override = os.environ.get("VTFR_STATE_DIR")
+    if override:
+        base = Path(override)
+    elif os.name == "nt":
+        base = Path(os.environ.get("LOCALAPPDATA") or Path.home() / "AppData" / "Local") / APP_DIR_NAME
+    else:
+        base = Path(os.environ.get("XDG_STATE_HOME") or Path.home() / ".local" / "state") / APP_DIR_NAME
+    path = base.joinpath(*parts)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
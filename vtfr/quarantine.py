@@ -0,0 +1,221 @@
+"""Quarantine: move temp files into a holding area instead of deleting them.
+
+Each quarantine run creates a dated batch folder inside the holding area, by
+default ``<scan root>\\.vtfr-quarantine\\<YYYYMMDD-HHMMSS>``. Because the
+holding area is on the same volume as the files, every file is moved with a
+single rename and no data is copied. Files are stored flat under sequence
+numbers (``000001``, ``000002``, ...). Batch creation is the only ``mkdir``,
+and the stored names never match the temp file patterns, so later scans do
+not find quarantined files again.
+
+``manifest.ndjson`` in the batch folder maps each stored file back to its
+original path, size and timestamp. :func:`restore_batch` uses it to move files
+back, and :func:`purge_batches` removes batches older than a given age. Batch
+names given by a user go through :func:`find_batch`, which only accepts a
+batch folder directly inside the holding area.
+"""
+import errno
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Callable, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from .safety import check_deletable, protected_prefixes
+
+QUARANTINE_DIR_NAME = ".vtfr-quarantine"
+MANIFEST_NAME = "manifest.ndjson"
+BATCH_TIME_FORMAT = "%Y%m%d-%H%M%S"
+
+
+class QuarantineResult(NamedTuple):
+    batch: Optional[Path]
+    moved: List[str]
+    failed: List[Tuple[str, str]]
+
+
+class BatchInfo(NamedTuple):
+    path: Path
+    created: float
+    files: int
+    size: int
+
+
+def holding_dir(scan_root, configured: Optional[str] = None) -> Path:
+    """Holding area for a scan root; a relative ``configured`` path is taken relative to the root."""
+    if configured:
+        configured_path = Path(configured)
+        return configured_path if configured_path.is_absolute() else Path(scan_root) / configured_path
+    return Path(scan_root) / QUARANTINE_DIR_NAME
+
+
+def _new_batch_dir(base: Path) -> Path:
+    base.mkdir(parents=True, exist_ok=True)
+    stamp = time.strftime(BATCH_TIME_FORMAT)
+    batch = base / stamp
+    suffix = 1
+    while True:
+        try:
+            batch.mkdir()
+            return batch
+        except FileExistsError:
+            suffix += 1
+            batch = base / f"{stamp}-{suffix}"
+
+
+def quarantine_files(paths: Iterable, scan_root, sizes: Optional[dict] = None, journal=None,
+                     configured_dir: Optional[str] = None,
+                     protected: Optional[Sequence[str]] = None,
+                     match: Optional[Callable[[str], object]] = None) -> QuarantineResult:
+    """Move ``paths`` into a new batch folder of the scan root's holding area.
+
+    Files that fail the safety checks, have vanished, or live on another
+    volume (where a rename would have to copy) are reported as failed and
+    left in place. ``protected`` lists the normalized folders that must
+    never be touched, and ``match`` the configured temp file matcher, as for
+    :func:`vtfr.core.delete` (default: the system folders and the built-in
+    Visio temp file pattern). Outcomes are recorded in ``journal`` when one
+    is given.
+    """
+    sizes = sizes or {}
+    prefixes = list(protected) if protected is not None else protected_prefixes()
+    root = str(scan_root)
+    batch = _new_batch_dir(holding_dir(scan_root, configured_dir))
+    moved: List[str] = []
+    failed: List[Tuple[str, str]] = []
+
+    with open(batch / MANIFEST_NAME, 'w', encoding='utf-8', newline='\n') as manifest:
+        for seq, path in enumerate((str(p) for p in paths), start=1):
+            reason = check_deletable(path, prefixes, match)
+            if reason is None:
+                stored = f"{seq:06d}"
+                try:
+                    st = os.stat(path)
+                    os.rename(path, batch / stored)
+                except FileNotFoundError:
+                    reason = "File not found or is not a regular file."
+                except OSError as e:
+                    reason = "File is on a different volume than the holding area." if e.errno == errno.EXDEV else str(e)
+                else:
+                    manifest.write(json.dumps({
+                        'original': path,
+                        'stored': stored,
+                        'size': st.st_size,
+                        'mtime': st.st_mtime,
+                        'quarantined_at': time.time(),
+                    }) + "\n")
+                    moved.append(path)
+                    if journal:
+                        journal.record(path, 'quarantined', st.st_size, root)
+                    continue
+            failed.append((path, reason))
+            if journal:
+                status = 'not_found' if reason.startswith("File not found") else 'failed'
+                journal.record(path, status, sizes.get(path, 0), root, reason)
+
+    if not moved:
+        shutil.rmtree(batch, ignore_errors=True)
+        return QuarantineResult(None, moved, failed)
+    return QuarantineResult(batch, moved, failed)
+
+
+def _read_manifest(batch: Path):
+    manifest = batch / MANIFEST_NAME
+    if not manifest.is_file():
+        return
+    with open(manifest, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _batch_created(batch: Path) -> float:
+    try:
+        return time.mktime(time.strptime(batch.name[:15], BATCH_TIME_FORMAT))
+    except ValueError:
+        return batch.stat().st_mtime
+
+
+def list_batches(base: Path) -> List[BatchInfo]:
+    """Batches in a holding area, oldest first."""
+    if not base.is_dir():
+        return []
+    batches = []
+    for batch in sorted(p for p in base.iterdir() if (p / MANIFEST_NAME).is_file()):
+        files = size = 0
+        for entry in _read_manifest(batch):
+            if (batch / entry['stored']).exists():
+                files += 1
+                size += entry.get('size', 0)
+        batches.append(BatchInfo(batch, _batch_created(batch), files, size))
+    return batches
+
+
+def find_batch(base: Path, name: str) -> Path:
+    """The batch folder ``name`` in the holding area ``base``; raises ValueError unless it is one.
+
+    Only a plain folder name as shown by :func:`list_batches` is accepted,
+    never a path, so a restore cannot reach outside the holding area.
+    """
+    if not name or name in (os.curdir, os.pardir) or any(sep and sep in name for sep in ("/", os.sep, os.altsep)):
+        raise ValueError(f"Invalid batch name {name!r}: give a folder name as shown by 'quarantine list'.")
+    batch = Path(base) / name
+    if not (batch / MANIFEST_NAME).is_file():
+        raise ValueError(f"No quarantine batch named {name!r} in {base}.")
+    return batch
+
+
+def restore_batch(batch: Path, journal=None) -> Tuple[List[str], List[Tuple[str, str]]]:
+    """Move every file of a batch back to its original location.
+
+    Files whose original path is occupied again are left in the batch. The
+    batch folder is removed once every file in its manifest is back. Raises
+    ValueError if ``batch`` has no manifest, as it is then not a batch.
+    """
+    if not (batch / MANIFEST_NAME).is_file():
+        raise ValueError(f"{batch} is not a quarantine batch: it has no {MANIFEST_NAME}.")
+    restored: List[str] = []
+    failed: List[Tuple[str, str]] = []
+    created_dirs = set()
+    for entry in _read_manifest(batch):
+        stored = batch / entry['stored']
+        original = entry['original']
+        if not stored.exists():
+            continue  # Restored or purged earlier
+        if os.path.lexists(original):
+            failed.append((original, "A file already exists at the original location."))
+            continue
+        parent = os.path.dirname(original)
+        try:
+            if parent not in created_dirs:
+                os.makedirs(parent, exist_ok=True)
+                created_dirs.add(parent)
+            os.rename(stored, original)
+        except OSError as e:
+            failed.append((original, str(e)))
+            continue
+        restored.append(original)
+        if journal:
+            journal.record(original, 'restored', entry.get('size', 0), str(batch))
+    if not failed:
+        shutil.rmtree(batch, ignore_errors=True)
+    return restored, failed
+
+
+def purge_batches(base: Path, older_than_days: float, journal=None) -> Tuple[int, int]:
+    """Permanently delete batches older than ``older_than_days``; returns (batches, files) removed."""
+    cutoff = time.time() - older_than_days * 86400
+    purged_batches = purged_files = 0
+    for info in list_batches(base):
+        if info.created > cutoff:
+            continue
+        for entry in _read_manifest(info.path):
+            stored = info.path / entry['stored']
+            if stored.exists():
+                purged_files += 1
+                if journal:
+                    journal.record(entry['original'], 'purged', entry.get('size', 0), str(info.path))
+        shutil.rmtree(info.path, ignore_errors=True)
+        purged_batches += 1
+    return purged_batches, purged_files
@@ -0,0 +1,145 @@
+"""Token-bucket rate limiting for directory listings and unlinks.
+
+Parallel scans and deletes against a shared file server can slow it down for
+everyone else. A :class:`RateLimiter` caps how many operations per second the
+scanner and the delete engine issue. Worker threads call :meth:`acquire`
+before each listing or unlink and sleep until a token is free.
+
+Rate profiles name a pair of limits. ``full`` is unlimited and ``gentle`` is
+meant for working hours. ``auto`` picks ``gentle`` during business hours and
+``full`` otherwise. ``config.json`` can override the built-in profiles, add
+new ones and change the business hours::
+
+    "rate_profile": "auto",
+    "rate_profiles": {"gentle": {"listings_per_second": 25, "unlinks_per_second": 5}},
+    "business_hours": {"days": ["Mon", "Tue", "Wed", "Thu", "Fri"], "start": "08:00", "end": "18:00"}
+"""
+import datetime
+import threading
+import time
+from typing import Dict, NamedTuple, Optional
+
+AUTO_PROFILE = "auto"
+BUSINESS_HOURS_PROFILE = "gentle"
+OFF_HOURS_PROFILE = "full"
+DAY_NAMES = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+DEFAULT_BUSINESS_HOURS = {'days': list(DAY_NAMES[:5]), 'start': "08:00", 'end': "18:00"}
+
+
+class RateProfile(NamedTuple):
+    """Operations per second allowed for listings and unlinks; None means unlimited."""
+    name: str
+    listings_per_second: Optional[float]
+    unlinks_per_second: Optional[float]
+
+
+BUILTIN_PROFILES = {
+    'full': RateProfile('full', None, None),
+    'gentle': RateProfile('gentle', 25.0, 5.0),
+}
+
+
+class RateStats(NamedTuple):
+    operations: int
+    elapsed: float
+    rate: float
+
+
+class RateLimiter:
+    """Thread-safe token bucket. A ``rate`` of None (or 0) only counts operations.
+
+    The bucket holds up to ``burst`` tokens (default 1, i.e. operations are
+    evenly spaced). A larger burst lets work resume quickly after an idle
+    spell; the long-run rate never exceeds ``rate`` either way.
+    """
+
+    def __init__(self, rate: Optional[float] = None, burst: Optional[float] = None):
+        self.rate = rate or None
+        self.capacity = burst or 1.0
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._count = 0
+        self._first = None
+        self._last = None
+
+    def acquire(self):
+        """Take one token, sleeping until it is available."""
+        now = time.monotonic()
+        wait = 0.0
+        with self._lock:
+            if self.rate:
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                self._tokens -= 1  # Reserve the token now; a negative balance is the queue ahead of us
+                if self._tokens < 0:
+                    wait = -self._tokens / self.rate
+            self._note(1, now + wait)
+        if wait:
+            time.sleep(wait)
+
+    def add(self, count: int):
+        """Count operations that were limited elsewhere (e.g. in a worker process)."""
+        with self._lock:
+            self._note(count, time.monotonic())
+
+    def _note(self, count: int, when: float):
+        if self._first is None:
+            self._first = when
+        self._last = when
+        self._count += count
+
+    def stats(self) -> RateStats:
+        """Operations so far and the achieved rate between the first and the last one."""
+        with self._lock:
+            count = self._count
+            elapsed = (self._last - self._first) if count else 0.0
+        rate = (count - 1) / elapsed if count > 1 and elapsed > 0 else float(count)
+        return RateStats(count, elapsed, rate)
+
+
+def _profiles(config: Optional[dict]) -> Dict[str, RateProfile]:
+    profiles = dict(BUILTIN_PROFILES)
+    for name, limits in ((config or {}).get('rate_profiles') or {}).items():
+        profiles[name] = RateProfile(name, limits.get('listings_per_second') or None,
+                                     limits.get('unlinks_per_second') or None)
+    return profiles
+
+
+def profile_names(config: Optional[dict] = None):
+    """Names accepted by :func:`resolve_profile`, ``auto`` first."""
+    return [AUTO_PROFILE] + sorted(_profiles(config))
+
+
+def _minutes(text: str) -> int:
+    hours, minutes = text.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def in_business_hours(config: Optional[dict] = None, now: Optional[datetime.datetime] = None) -> bool:
+    """True if ``now`` (default: the local time) falls within the configured business hours."""
+    hours = dict(DEFAULT_BUSINESS_HOURS, **((config or {}).get('business_hours') or {}))
+    now = now or datetime.datetime.now()
+    if DAY_NAMES[now.weekday()] not in hours['days']:
+        return False
+    minute = now.hour * 60 + now.minute
+    return _minutes(hours['start']) <= minute < _minutes(hours['end'])
+
+
+def resolve_profile(name: Optional[str] = None, config: Optional[dict] = None,
+                    now: Optional[datetime.datetime] = None) -> RateProfile:
+    """Look up a profile by name; ``auto`` (the default) picks one from the time of day."""
+    name = name or (config or {}).get('rate_profile') or AUTO_PROFILE
+    if name == AUTO_PROFILE:
+        name = BUSINESS_HOURS_PROFILE if in_business_hours(config, now) else OFF_HOURS_PROFILE
+    profiles = _profiles(config)
+    if name not in profiles:
+        raise ValueError(f"Unknown rate profile {name!r} (expected one of {', '.join(profile_names(config))})")
+    return profiles[name]
+
+
+def describe_rate(limiter: RateLimiter, noun: str) -> str:
+    """One-line report such as '1200 listings in 48.0s (25.0/s, limit 25/s)'."""
+    stats = limiter.stats()
+    limit = f"limit {limiter.rate:g}/s" if limiter.rate else "unlimited"
+    return f"{stats.operations} {noun} in {stats.elapsed:.1f}s ({stats.rate:.1f}/s, {limit})"
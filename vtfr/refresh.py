@@ -0,0 +1,113 @@
+"""Incremental rescans that relist only the folders that changed.
+
+Creating, deleting or renaming a file updates the modification time of its
+folder. :class:`FolderIndex` remembers each folder of a tree with its
+modification time and subfolders as of the last walk. :func:`refresh` stats
+every known folder and lists only the folders whose time has moved, plus any
+new subfolders. Keeping a view current then costs one ``stat`` per folder
+instead of one listing per folder. The first refresh, with an empty index,
+lists the whole tree.
+
+A temp file that grows or shrinks without being recreated leaves its folder's
+time alone, so its size is only updated by the next full scan. Links are
+not followed.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from .owners import OwnerCache
+from .ratelimit import RateLimiter
+from .retry import NOT_FOUND, classify_error
+from .scanner import FileHit, Matcher, compile_patterns, list_directory, make_record
+
+DEFAULT_WORKERS = 8
+
+
+class RefreshResult(NamedTuple):
+    """What one refresh found.
+
+    ``records`` holds every match in the ``listed`` folders and nothing
+    else; it is the ``into`` passed to :func:`refresh`, if any. ``removed``
+    are the folders that no longer exist. ``full`` is true when the whole
+    tree was listed, so ``records`` is every match under the root.
+    """
+    records: Sequence[dict]
+    listed: Set[str]
+    removed: Set[str]
+    full: bool
+
+
+class FolderIndex:
+    """Modification time (in ns) and subfolders of every folder under ``root``, from the last refresh.
+
+    ``owners`` keeps the owner names resolved by refreshes that look them up.
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.normpath(str(root))
+        self.folders: Dict[str, Tuple[int, Tuple[str, ...]]] = {}
+        self.owners: Optional[OwnerCache] = None
+
+    def __len__(self) -> int:
+        return len(self.folders)
+
+
+def _visit(folder: str, known: Optional[Tuple[int, Tuple[str, ...]]], match: Matcher,
+           limiter: Optional[RateLimiter],
+           owners: Optional[OwnerCache]) -> Optional[Tuple[int, Tuple[str, ...], Optional[List[FileHit]]]]:
+    """``(mtime, subfolders, hits)``, with hits None if the folder is unchanged; None if it is gone."""
+    try:
+        # Stat before listing: a change made during the listing moves the time again
+        mtime = os.stat(folder).st_mtime_ns
+        if known is not None and known[0] == mtime:
+            return mtime, known[1], None
+        subdirs, hits = list_directory(folder, match, limiter, None, owners)
+    except OSError as e:
+        if classify_error(e) == NOT_FOUND:
+            return None
+        if known is None:
+            return None  # Never listed and unreadable now: nothing to report either way
+        return known[0], known[1], None  # Unreadable for now; keep what the last walk saw
+    return mtime, tuple(subdirs), hits
+
+
+def refresh(index: FolderIndex, patterns: Iterable[str], limiter: Optional[RateLimiter] = None,
+            workers: int = DEFAULT_WORKERS, into=None, owners: bool = False,
+            match: Optional[Matcher] = None) -> RefreshResult:
+    """Bring ``index`` up to date and return the matches of the folders that had to be listed.
+
+    Folders are visited level by level, ``workers`` at a time. A
+    ``limiter`` caps the listings per second; the ``stat`` calls on
+    unchanged folders are not limited. Records are appended to ``into``
+    when given, e.g. a :class:`vtfr.resultstore.ResultStore` for a first
+    refresh of a large tree. ``owners`` adds each file's owner, with names
+    cached on the index across refreshes. ``match`` is ``patterns`` already
+    compiled, such as :attr:`vtfr.settings.Settings.match`.
+    """
+    match = match or compile_patterns(patterns)
+    cache = None
+    if owners:
+        cache = index.owners = index.owners or OwnerCache()
+    full = not index.folders
+    folders: Dict[str, Tuple[int, Tuple[str, ...]]] = {}
+    records = [] if into is None else into
+    listed: Set[str] = set()
+    level = [index.root]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="vtfr-refresh") as pool:
+        while level:
+            outcomes = pool.map(lambda f: _visit(f, index.folders.get(f), match, limiter, cache), level)
+            next_level = []
+            for folder, outcome in zip(level, outcomes):
+                if outcome is None:
+                    continue
+                mtime, subdirs, hits = outcome
+                folders[folder] = (mtime, subdirs)
+                if hits is not None:
+                    listed.add(folder)
+                    records.extend(map(make_record, hits))
+                next_level.extend(subdirs)
+            level = next_level
+    removed = set(index.folders).difference(folders)
+    index.folders = folders
+    return RefreshResult(records, listed, removed, full)
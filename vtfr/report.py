@@ -0,0 +1,156 @@
+"""Disk-space reclamation report built from scan results.
+
+Scan records are the dictionaries produced by the PowerShell scan
+(``FullName``, ``Name``, ``Directory``/``DirectoryName``, ``LastModified``,
+``Size``). The aggregation makes one pass over the records, bucketing bytes by
+immediate parent directory, by extension and, when the records carry an
+``Owner``, by owner, and then rolls the per-directory
+totals up to their ancestors. The roll-up cost depends on the number of
+distinct folders rather than the number of files, which keeps million-file
+scans cheap.
+"""
+import heapq
+import os
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+DEFAULT_TOP_N = 10
+
+
+class UsageEntry(NamedTuple):
+    """Bytes reclaimable for one folder subtree, file extension or owner."""
+    key: str
+    files: int
+    size: int
+
+
+class ReclaimReport(NamedTuple):
+    """Result of :func:`aggregate`."""
+    root: str
+    total_files: int
+    total_size: int
+    folders: List[UsageEntry]
+    extensions: List[UsageEntry]
+    orphan_files: int = 0  # Temp files whose source document is gone
+    orphan_size: int = 0
+    owners: Sequence[UsageEntry] = ()  # Empty unless the scan looked up owners
+
+
+def format_file_size(size_bytes) -> str:
+    """Format file size in human readable format"""
+    if not size_bytes:
+        return "0 B"
+    size_names = ["B", "KB", "MB", "GB", "TB"]
+    size = float(size_bytes)
+    i = 0
+    while size >= 1024 and i < len(size_names) - 1:
+        size /= 1024.0
+        i += 1
+    return f"{size:.1f} {size_names[i]}"
+
+
+def _record_directory(record: dict, full_name: str) -> str:
+    directory = record.get('Directory') or record.get('DirectoryName')
+    return directory if directory else os.path.dirname(full_name)
+
+
+def _record_size(record: dict) -> int:
+    try:
+        return int(record.get('Size') or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def aggregate(records: Iterable[dict], root: Optional[str] = None, top_n: int = DEFAULT_TOP_N) -> ReclaimReport:
+    """Aggregate reclaimable bytes per folder subtree and per extension.
+
+    ``root`` is the scanned directory; folder totals stop rolling up once they
+    reach it and the root itself is left out of the folder ranking (it would
+    always come first). Only the ``top_n`` heaviest folders, extensions and
+    owners are returned, largest first.
+    """
+    root_norm = os.path.normpath(str(root)) if root else None
+    per_dir: Dict[str, List[int]] = {}
+    per_ext: Dict[str, List[int]] = {}
+    per_owner: Dict[str, List[int]] = {}
+    total_files = 0
+    total_size = 0
+    orphan_files = 0
+    orphan_size = 0
+
+    for record in records:
+        full_name = record.get('FullName')
+        if not full_name:
+            continue
+        size = _record_size(record)
+        total_files += 1
+        total_size += size
+        if record.get('Orphan') is True:
+            orphan_files += 1
+            orphan_size += size
+
+        directory = _record_directory(record, full_name)
+        bucket = per_dir.get(directory)
+        if bucket is None:
+            per_dir[directory] = [1, size]
+        else:
+            bucket[0] += 1
+            bucket[1] += size
+
+        ext = os.path.splitext(record.get('Name') or full_name)[1].lower() or "(none)"
+        bucket = per_ext.get(ext)
+        if bucket is None:
+            per_ext[ext] = [1, size]
+        else:
+            bucket[0] += 1
+            bucket[1] += size
+
+        owner = record.get('Owner')
+        if owner is not None:
+            bucket = per_owner.get(owner)
+            if bucket is None:
+                per_owner[owner] = [1, size]
+            else:
+                bucket[0] += 1
+                bucket[1] += size
+
+    # Roll each folder's direct totals up into every ancestor below the root
+    subtree: Dict[str, List[int]] = {}
+    for directory, (files, size) in per_dir.items():
+        current = os.path.normpath(directory)
+        while current and current != root_norm:
+            bucket = subtree.get(current)
+            if bucket is None:
+                subtree[current] = [files, size]
+            else:
+                bucket[0] += files
+                bucket[1] += size
+            parent = os.path.dirname(current)
+            if parent == current:
+                break
+            current = parent
+
+    folders = heapq.nlargest(top_n, subtree.items(), key=lambda item: item[1][1])
+    extensions = heapq.nlargest(top_n, per_ext.items(), key=lambda item: item[1][1])
+    owners = heapq.nlargest(top_n, per_owner.items(), key=lambda item: item[1][1])
+    return ReclaimReport(
+        root=root_norm or "",
+        total_files=total_files,
+        total_size=total_size,
+        folders=[UsageEntry(path, files, size) for path, (files, size) in folders],
+        extensions=[UsageEntry(ext, files, size) for ext, (files, size) in extensions],
+        orphan_files=orphan_files,
+        orphan_size=orphan_size,
+        owners=[UsageEntry(owner, files, size) for owner, (files, size) in owners],
+    )
+
+
+def display_folder(path: str, root: str) -> str:
+    """Return ``path`` relative to ``root`` when it lies underneath it."""
+    if root:
+        try:
+            rel = os.path.relpath(path, root)
+            if rel != os.pardir and not rel.startswith(os.pardir + os.sep):  # ..backup is inside
+                return rel
+        except ValueError:
+            pass  # Different drives on Windows
+    return path
@@ -0,0 +1,185 @@
+"""Scan results in bounded memory, spilling sorted runs to disk.
+
+A scan of an archive volume can find millions of stale temp files, more than
+a workstation should hold as record dicts. :class:`ResultStore` keeps up to
+``memory_limit`` records in memory as compact tuples. When that buffer is
+full it is sorted by path and written to a temporary run file, and the buffer
+starts over. Iterating the store merges the runs and the buffer with
+:func:`heapq.merge`, holding one block of each run in memory at a time, so
+records come back in path order however many there are.
+
+Run files are sequences of pickled blocks of up to :data:`BLOCK_ROWS` rows in
+a private temporary folder, removed by :meth:`ResultStore.close` (or when the
+store is garbage collected). Once more than :data:`MAX_RUNS` runs pile up
+they are merged into one, which bounds the files open during a merge.
+"""
+import heapq
+import itertools
+import os
+import pickle
+import shutil
+import tempfile
+import weakref
+from operator import itemgetter
+from typing import Callable, Iterable, Iterator, List, Optional
+
+from .companion import is_orphan
+
+DEFAULT_MEMORY_LIMIT = 250000  # Records held in memory before a run is spilled
+BLOCK_ROWS = 4096  # Rows per pickled block in a run file
+MAX_RUNS = 32  # Runs merged into one when exceeded
+
+_COLUMNS = frozenset(("FullName", "Name", "Directory", "LastModified", "Size", "Companion", "Orphan", "Owner"))
+_path_key = itemgetter(0)
+
+
+def _row(record: dict) -> tuple:
+    """``(path, modified, size, companion, orphan, owner, extra)``; ``extra`` holds keys beyond the scan columns."""
+    extra = None
+    if not _COLUMNS.issuperset(record):
+        extra = {k: v for k, v in record.items() if k not in _COLUMNS} or None
+    return (record['FullName'], record.get('LastModified'), record.get('Size') or 0,
+            record.get('Companion') or None, is_orphan(record), record.get('Owner'), extra)
+
+
+def _record(row: tuple) -> dict:
+    path, modified, size, companion, orphan, owner, extra = row
+    record = {
+        'FullName': path,
+        'Name': os.path.basename(path),
+        'Directory': os.path.dirname(path),
+        'LastModified': modified,
+        'Size': size,
+        'Companion': companion,
+        'Orphan': orphan,
+    }
+    if owner is not None:
+        record['Owner'] = owner
+    if extra:
+        record.update(extra)
+    return record
+
+
+def _write_run(path: str, rows: Iterable[tuple]):
+    with open(path, 'wb') as f:
+        rows = iter(rows)
+        while True:
+            block = list(itertools.islice(rows, BLOCK_ROWS))
+            if not block:
+                return
+            pickle.dump(block, f, pickle.HIGHEST_PROTOCOL)
+
+
+def _read_run(path: str) -> Iterator[tuple]:
+    with open(path, 'rb') as f:
+        while True:
+            try:
+                block = pickle.load(f)
+            except EOFError:
+                return
+            yield from block
+
+
+class ResultStore:
+    """Scan records held in memory up to ``memory_limit``, then in sorted runs under ``directory``.
+
+    Records are added with ``append``/``extend`` like a list, so a store can
+    stand in for the list a scan is collected into. ``len(store)``,
+    :attr:`total_size` and :attr:`orphan_count` are kept up to date as
+    records are added. Iterating yields the records sorted by
+    ``FullName``; records may be added again after an iteration.
+    """
+
+    def __init__(self, memory_limit: int = DEFAULT_MEMORY_LIMIT, directory: Optional[str] = None):
+        if memory_limit < 1:
+            raise ValueError("memory_limit must be at least 1")
+        self.memory_limit = memory_limit
+        self.directory = directory
+        self.total_size = 0
+        self.orphan_count = 0
+        self._buffer: List[tuple] = []
+        self._runs: List[str] = []
+        self._count = 0
+        self._spill_dir: Optional[str] = None
+        self._finalizer = None
+        self._run_names = itertools.count()
+
+    def append(self, record: dict):
+        row = _row(record)
+        self._buffer.append(row)
+        self._count += 1
+        self.total_size += row[2]
+        self.orphan_count += row[4]
+        if len(self._buffer) >= self.memory_limit:
+            self._spill()
+
+    def extend(self, records: Iterable[dict]) -> "ResultStore":
+        for record in records:
+            self.append(record)
+        return self
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def spilled(self) -> bool:
+        """Whether some records live on disk, i.e. the store is larger than its memory limit."""
+        return bool(self._runs)
+
+    @property
+    def runs(self) -> int:
+        return len(self._runs)
+
+    def _new_run(self) -> str:
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.mkdtemp(prefix="vtfr-results-", dir=self.directory)
+            self._finalizer = weakref.finalize(self, shutil.rmtree, self._spill_dir, True)
+        return os.path.join(self._spill_dir, f"run-{next(self._run_names):05d}.pkl")
+
+    def _spill(self):
+        self._buffer.sort(key=_path_key)
+        path = self._new_run()
+        _write_run(path, self._buffer)
+        self._runs.append(path)
+        self._buffer = []
+        if len(self._runs) > MAX_RUNS:
+            merged = self._new_run()
+            _write_run(merged, heapq.merge(*map(_read_run, self._runs), key=_path_key))
+            for old in self._runs:
+                os.remove(old)
+            self._runs = [merged]
+
+    def rows(self) -> Iterator[tuple]:
+        """Compact rows in path order, without building record dicts."""
+        self._buffer.sort(key=_path_key)
+        if not self._runs:
+            return iter(list(self._buffer))  # Unaffected by records added while iterating
+        return heapq.merge(*map(_read_run, self._runs), list(self._buffer), key=_path_key)
+
+    def __iter__(self) -> Iterator[dict]:
+        return map(_record, self.rows())
+
+    def paths(self, where: Optional[Callable[[dict], bool]] = None) -> Iterator[str]:
+        """Full paths in sorted order, optionally only those of records for which ``where`` is true."""
+        if where is None:
+            return map(_path_key, self.rows())
+        return (record['FullName'] for record in self if where(record))
+
+    def orphan_paths(self) -> Iterator[str]:
+        """Paths of the temp files whose source document is gone, in sorted order."""
+        return (row[0] for row in self.rows() if row[4])
+
+    def close(self):
+        """Drop every record and remove the run files."""
+        self._buffer = []
+        self._runs = []
+        self._count = self.total_size = self.orphan_count = 0
+        if self._finalizer is not None:
+            self._finalizer()
+            self._finalizer = self._spill_dir = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,80 @@
+"""Error classification and backoff for retrying deletes on flaky shares.
+
+An SMB share that blips for a few seconds makes unlinks fail with network
+errors, and a file someone has just opened fails with a sharing violation.
+Both usually clear up on their own, so the delete engine retries them later
+instead of reporting a failure. :func:`classify_error` sorts an ``OSError``
+into one of three kinds:
+
+* ``transient``: sharing and lock violations, dropped connections, timeouts.
+  Worth retrying.
+* ``not_found``: the file is already gone. Never retried.
+* ``permanent``: anything else, e.g. access denied. Retrying would not help.
+
+:class:`RetryPolicy` spaces the retries with exponential backoff and full
+jitter, so a batch of files that failed together does not hit the server
+again all at the same moment.
+"""
+import errno
+import random
+from typing import Callable, NamedTuple
+
+TRANSIENT = "transient"
+PERMANENT = "permanent"
+NOT_FOUND = "not_found"
+
+# Windows system error codes that mean "try again later"
+_TRANSIENT_WINERRORS = frozenset((
+    32,    # ERROR_SHARING_VIOLATION: the file is open in another program
+    33,    # ERROR_LOCK_VIOLATION
+    51,    # ERROR_REM_NOT_LIST: the remote computer is not available
+    53,    # ERROR_BAD_NETPATH
+    59,    # ERROR_UNEXP_NET_ERR
+    64,    # ERROR_NETNAME_DELETED: the connection to the share was lost
+    121,   # ERROR_SEM_TIMEOUT
+    1231,  # ERROR_NETWORK_UNREACHABLE
+    1232,  # ERROR_HOST_UNREACHABLE
+    1236,  # ERROR_CONNECTION_ABORTED
+))
+_NOT_FOUND_WINERRORS = frozenset((2, 3))  # ERROR_FILE_NOT_FOUND, ERROR_PATH_NOT_FOUND
+_TRANSIENT_ERRNOS = frozenset(getattr(errno, name) for name in (
+    "EAGAIN", "EBUSY", "EINTR", "ETIMEDOUT", "ECONNRESET", "ECONNABORTED",
+    "ENETDOWN", "ENETUNREACH", "EHOSTDOWN", "EHOSTUNREACH", "ESTALE", "ETXTBSY",
+) if hasattr(errno, name))
+_NOT_FOUND_ERRNOS = frozenset((errno.ENOENT, errno.ENOTDIR))
+
+
+def classify_error(error: OSError) -> str:
+    """Whether a failed file operation is ``transient``, ``not_found`` or ``permanent``."""
+    winerror = getattr(error, 'winerror', None)
+    if winerror is not None:
+        if winerror in _TRANSIENT_WINERRORS:
+            return TRANSIENT
+        if winerror in _NOT_FOUND_WINERRORS:
+            return NOT_FOUND
+    if isinstance(error, (FileNotFoundError, NotADirectoryError)) or error.errno in _NOT_FOUND_ERRNOS:
+        return NOT_FOUND
+    if isinstance(error, (TimeoutError, ConnectionError, BlockingIOError, InterruptedError)):
+        return TRANSIENT
+    if error.errno in _TRANSIENT_ERRNOS:
+        return TRANSIENT
+    return PERMANENT
+
+
+class RetryPolicy(NamedTuple):
+    """How often and how patiently transient failures are retried.
+
+    ``attempts`` counts the first try, so 1 disables retries. Before retry n
+    the engine waits a random time between 0 and
+    ``min(max_delay, base_delay * 2 ** (n - 1))`` seconds.
+    """
+    attempts: int = 4
+    base_delay: float = 0.5
+    max_delay: float = 8.0
+
+    def delay(self, attempt: int, rand: Callable[[], float] = random.random) -> float:
+        """Seconds to wait after failed attempt number ``attempt`` (1-based)."""
+        return rand() * min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+
+
+NO_RETRY = RetryPolicy(attempts=1)
@@ -0,0 +1,55 @@
+"""Pre-delete safety checks shared by the native file operations.
+
+These mirror the checks in ``scripts/Remove-VisioTempFiles.ps1``: never touch
+files under Windows system folders and only act on names that look like Visio
+temporary files.
+"""
+import fnmatch
+import os
+from typing import Callable, Iterable, List, Optional
+
+VISIO_TEMP_PATTERNS = ("~$$*.*",)
+
+
+def protected_prefixes() -> List[str]:
+    """Normalized system folders that must never be modified."""
+    windir = os.environ.get("windir", "")
+    candidates = [
+        windir,
+        os.path.join(windir, "System32") if windir else "",
+        os.path.join(windir, "System") if windir else "",
+        os.environ.get("ProgramFiles", ""),
+        os.environ.get("ProgramFiles(x86)", ""),
+        os.environ.get("ProgramData", ""),
+    ]
+    return [os.path.normcase(os.path.normpath(p)) for p in candidates if p]
+
+
+def is_protected(path: str, prefixes: Optional[Iterable[str]] = None) -> bool:
+    """True if ``path`` lies in a protected system folder."""
+    normalized = os.path.normcase(os.path.normpath(path))
+    for prefix in (protected_prefixes() if prefixes is None else prefixes):
+        if normalized == prefix or normalized.startswith(prefix.rstrip(os.sep) + os.sep):
+            return True
+    return False
+
+
+def is_visio_temp_name(name: str, patterns: Iterable[str] = VISIO_TEMP_PATTERNS) -> bool:
+    """True if the file name matches one of the Visio temp file patterns (case-insensitive)."""
+    lowered = name.lower()
+    return any(fnmatch.fnmatchcase(lowered, p.lower()) for p in patterns)
+
+
+def check_deletable(path: str, prefixes: Optional[Iterable[str]] = None,
+                    match: Optional[Callable[[str], object]] = None) -> Optional[str]:
+    """Return the reason ``path`` must not be removed, or None if it is safe to act on.
+
+    ``match`` is the configured temp file matcher (:attr:`vtfr.settings.Settings.match`);
+    without it the name must match :data:`VISIO_TEMP_PATTERNS`.
+    """
+    if is_protected(path, prefixes):
+        return "Cannot delete files in system directories for security reasons."
+    name = os.path.basename(path)
+    if not (match(name) if match is not None else is_visio_temp_name(name)):
+        return "File does not match Visio temporary file pattern for safety."
+    return None
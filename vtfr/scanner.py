@@ -0,0 +1,496 @@
+"""Native Python scanner for Visio temp files.
+
+This is the PowerShell-free counterpart of ``scripts/Scan-VisioTempFiles.ps1``.
+It produces the same record shape (``FullName``, ``Name``, ``Directory``,
+``LastModified``, ``Size``) so callers can switch engines without changing
+how results are handled.
+
+Two walkers are provided:
+
+* ``threads``: a thread pool lists directories concurrently. Listing is I/O
+  bound, so this is the best choice for network shares.
+* ``processes``: the top-level subdirectories of the scan root are sharded
+  across worker processes. Each worker walks its shard and sends matches back
+  as marshalled batches of ``(path, size, mtime)`` tuples. This gets around
+  the GIL when pattern matching and record building become the bottleneck,
+  i.e. on fast local volumes with millions of files.
+
+Symbolic links and junctions to directories are skipped unless
+``follow_links`` is set. When it is, every directory's ``(device, inode)``
+identity goes into a :class:`WalkGuard`, so a link back to a folder that was
+already walked (or to one of its ancestors) is not listed again. The guard
+also drops the second name of a hard-linked file, so each physical file is
+reported, and later deleted, once.
+
+A match's size and modification time come from ``DirEntry.stat()``. On
+Windows the directory listing already carries them, so a match costs no
+system call at all. POSIX listings only carry names and types, so every match
+needs one ``lstat``; a folder with many matches hands its stats to a small
+shared thread pool, which overlaps their round trips on network file systems.
+:data:`STAT_CALLS` counts the calls actually made.
+"""
+import fnmatch
+import itertools
+import marshal
+import os
+import re
+import stat
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+from .checkpoint import ScanCheckpoint
+from .companion import find_companion
+from .metrics import REGISTRY
+from .owners import OwnerCache
+from .ratelimit import RateLimiter
+
+ENGINES = ("threads", "processes")
+DEFAULT_THREADS = 16
+DEFAULT_BATCH_SIZE = 5000
+STAT_FROM_LISTING = os.name == 'nt'  # DirEntry.stat() is answered from the listing, without a system call
+PARALLEL_STAT_MIN = 64  # Matches in one folder before their stats are made on the stat pool
+STAT_THREADS = 8
+
+# (full path, size in bytes, modification time as epoch seconds, companion document), plus the
+# owner's name when owners are looked up; the companion is its full path, "" if it is missing
+# or None if unknown (see vtfr.companion)
+FileHit = Tuple[str, int, float, Optional[str]]
+Matcher = Callable[[str], Optional[object]]
+
+_LINK_REPARSE_TAGS = (0xA000000C, 0xA0000003)  # IO_REPARSE_TAG_SYMLINK, IO_REPARSE_TAG_MOUNT_POINT (junctions)
+
+# Counted once per listing, not per entry, to stay off the per-file path
+LISTINGS = REGISTRY.counter("vtfr_scan_listings_total", "Directories listed by the scan engines")
+ENTRIES = REGISTRY.counter("vtfr_scan_entries_total", "Directory entries examined by the scan engines")
+MATCHES = REGISTRY.counter("vtfr_scan_matches_total", "Files that matched the temp file patterns")
+PENDING = REGISTRY.gauge("vtfr_scan_pending_directories", "Directories (or shards) queued for listing")
+SCANS_RUNNING = REGISTRY.gauge("vtfr_scans_in_progress", "Scans currently running")
+SCAN_SECONDS = REGISTRY.histogram("vtfr_scan_duration_seconds", "Wall-clock time of completed scans", ("engine",))
+STAT_CALLS = REGISTRY.counter("vtfr_scan_stat_calls_total", "stat system calls made for matched files")
+
+_stat_pool: Optional[Tuple[int, ThreadPoolExecutor]] = None  # (pid, pool): a forked worker needs its own
+_stat_pool_lock = threading.Lock()
+
+
+def compile_patterns(patterns: Iterable[str]) -> Matcher:
+    """Compile wildcard patterns into one case-insensitive matcher (PowerShell ``-like`` semantics)."""
+    regex = "|".join(fnmatch.translate(p) for p in patterns)
+    if not regex:
+        return lambda name: None
+    return re.compile(regex, re.IGNORECASE).match
+
+
+def format_mtime(mtime: float) -> str:
+    """A modification time as a record's ``LastModified``: local time, to the second."""
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(mtime))
+
+
+def make_record(hit: FileHit) -> dict:
+    """Convert a compact hit tuple into a scan record."""
+    path, size, mtime = hit[:3]
+    companion = hit[3] if len(hit) > 3 else None  # Hits saved by older checkpoints have no companion
+    record = {
+        'FullName': path,
+        'Name': os.path.basename(path),
+        'Directory': os.path.dirname(path),
+        'LastModified': format_mtime(mtime),
+        'Size': size,
+        'Companion': companion or None,
+        'Orphan': companion == "",
+    }
+    if len(hit) > 4:
+        record['Owner'] = hit[4]
+    return record
+
+
+class WalkGuard:
+    """The physical directories and hard-linked files one scan has already seen.
+
+    Identities are packed into single ints (``device << 64 | inode``) in a
+    plain set, about 60 bytes per entry. Directories are only tracked when
+    links are followed, since a tree without links cannot loop. Files are
+    only tracked when they have more than one link. Safe to share between
+    the walker threads.
+    """
+
+    def __init__(self, follow_links: bool = False):
+        self.follow_links = follow_links
+        self._seen = set()
+        self._lock = threading.Lock()
+
+    def first_visit(self, st: os.stat_result) -> bool:
+        """Record ``st``'s file; False if the same physical file was seen before."""
+        if not st.st_ino:
+            return True  # No identity (e.g. some network file systems): cannot tell, so do not skip
+        key = (st.st_dev << 64) | st.st_ino
+        with self._lock:
+            if key in self._seen:
+                return False
+            self._seen.add(key)
+            return True
+
+    def enter_root(self, root: str):
+        """Mark the scan root as visited, so a link back to it is not followed."""
+        if self.follow_links:
+            self.first_visit(os.stat(root))
+
+    def __len__(self):
+        return len(self._seen)
+
+
+def is_link(entry: os.DirEntry) -> bool:
+    """Whether a directory entry is a symbolic link or an NTFS junction."""
+    if entry.is_symlink():
+        return True
+    if os.name != 'nt':
+        return False
+    # Before Python 3.12 junctions look like plain directories; the reparse tag gives them away.
+    # On Windows DirEntry.stat(follow_symlinks=False) comes from the listing itself, without a system call.
+    return getattr(entry.stat(follow_symlinks=False), 'st_reparse_tag', 0) in _LINK_REPARSE_TAGS
+
+
+def _identity(entry: os.DirEntry) -> os.stat_result:
+    # DirEntry.stat() leaves st_ino at zero on Windows, so ask the file system there
+    return os.stat(entry.path) if os.name == 'nt' else entry.stat()
+
+
+def _stat_entry(entry: os.DirEntry) -> Optional[os.stat_result]:
+    try:
+        return entry.stat(follow_symlinks=False)
+    except OSError:
+        return None  # Vanished since the listing
+
+
+def _stat_slice(entries: List[os.DirEntry]) -> List[Optional[os.stat_result]]:
+    return [_stat_entry(entry) for entry in entries]
+
+
+def _get_stat_pool() -> ThreadPoolExecutor:
+    global _stat_pool
+    with _stat_pool_lock:
+        if _stat_pool is None or _stat_pool[0] != os.getpid():
+            _stat_pool = (os.getpid(), ThreadPoolExecutor(max_workers=STAT_THREADS, thread_name_prefix="vtfr-stat"))
+        return _stat_pool[1]
+
+
+def stat_entries(entries: List[os.DirEntry]) -> Iterable[Optional[os.stat_result]]:
+    """``lstat`` results of ``entries`` in order (None for vanished files), in parallel for long lists."""
+    if STAT_FROM_LISTING:
+        return map(_stat_entry, entries)
+    STAT_CALLS.inc(len(entries))
+    if len(entries) < PARALLEL_STAT_MIN:
+        return map(_stat_entry, entries)
+    # One task per slice: a future per file would cost more than a local stat
+    step = -(-len(entries) // STAT_THREADS)
+    slices = _get_stat_pool().map(_stat_slice, [entries[i:i + step] for i in range(0, len(entries), step)])
+    return itertools.chain.from_iterable(slices)
+
+
+def list_directory(path: str, match: Matcher, limiter: Optional[RateLimiter] = None,
+                   guard: Optional[WalkGuard] = None,
+                   owners: Optional[OwnerCache] = None) -> Tuple[List[str], List[FileHit]]:
+    """List one directory, returning its subdirectories and the files that match.
+
+    Symbolic links and junctions are only followed when ``guard`` says so,
+    and then only to directories the guard has not seen yet. Links to files
+    are never reported. Entries that vanish or cannot be stat'ed while
+    listing are skipped. Matches are stat'ed after the listing (see
+    :func:`stat_entries`). Each hit's companion document is looked up among
+    the names of the same listing. With ``owners`` each hit also carries
+    its owner's name. With a ``limiter`` the listing waits for a token first.
+    """
+    if limiter is not None:
+        limiter.acquire()
+    follow = guard is not None and guard.follow_links
+    subdirs = []
+    files = []
+    matched = []
+    hits = []
+    found_owners = []
+    with os.scandir(path) as entries:
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=follow):
+                    if follow:
+                        if guard.first_visit(_identity(entry)):
+                            subdirs.append(entry.path)
+                    elif not is_link(entry):
+                        subdirs.append(entry.path)
+                    continue
+                files.append(entry.name)
+                if match(entry.name) and entry.is_file(follow_symlinks=False):
+                    matched.append(entry)
+            except OSError:
+                continue
+    # Stat after the listing, so a folder's matches can be stat'ed together
+    for entry, st in zip(matched, stat_entries(matched)):
+        if st is None:
+            continue
+        if st.st_nlink > 1 and guard is not None and not guard.first_visit(st):
+            continue  # Another name of a hard-linked file that was already reported
+        hits.append((entry.path, st.st_size, st.st_mtime))
+        if owners is not None:
+            found_owners.append(owners.owner(entry.path, st))
+    LISTINGS.inc()
+    ENTRIES.inc(len(subdirs) + len(files))
+    if hits:
+        MATCHES.inc(len(hits))
+        names = {os.path.normcase(name) for name in files}
+        hits = [hit + (find_companion(hit[0], names),) for hit in hits]
+        if owners is not None:
+            hits = [hit + (owner,) for hit, owner in zip(hits, found_owners)]
+    return subdirs, hits
+
+
+def _walk(root: str, match: Matcher, limiter: Optional[RateLimiter] = None,
+          guard: Optional[WalkGuard] = None, owners: Optional[OwnerCache] = None) -> Iterator[FileHit]:
+    """Depth-first walk of ``root`` on the calling thread."""
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            subdirs, hits = list_directory(directory, match, limiter, guard, owners)
+        except OSError:
+            if directory == root:
+                raise
+            continue
+        stack.extend(subdirs)
+        yield from hits
+
+
+def _start(root: str, match: Matcher, checkpoint: Optional[ScanCheckpoint],
+           limiter: Optional[RateLimiter] = None, guard: Optional[WalkGuard] = None,
+           owners: Optional[OwnerCache] = None,
+           lister=list_directory) -> Tuple[List[str], Iterable[FileHit]]:
+    """Return the initial frontier and hits, resuming from ``checkpoint`` when it has saved state.
+
+    A resumed scan starts with an empty ``guard``: links into folders that
+    were walked before the interruption are followed again. The root is
+    listed with ``lister``, which takes the arguments of :func:`list_directory`.
+    """
+    if guard is not None:
+        guard.enter_root(root)
+    if checkpoint is not None and checkpoint.exists():
+        return checkpoint.resume(), checkpoint.previous_hits()
+    # Surface an unreadable or missing root to the caller instead of returning nothing
+    subdirs, hits = lister(root, match, limiter, guard, owners)
+    if checkpoint is not None:
+        checkpoint.begin()
+        checkpoint.record(hits)
+    return subdirs, hits
+
+
+def _finish(checkpoint: Optional[ScanCheckpoint], pending: dict):
+    """Cancel queued work and either drop the checkpoint (scan done) or save the frontier."""
+    for future in pending:
+        future.cancel()
+    if checkpoint is None:
+        return
+    if pending:
+        checkpoint.save(pending.values())
+        checkpoint.close()
+    else:
+        checkpoint.complete()
+
+
+def scan_threaded(root: str, patterns: Iterable[str], workers: Optional[int] = None,
+                  checkpoint: Optional[ScanCheckpoint] = None,
+                  limiter: Optional[RateLimiter] = None, follow_links: bool = False,
+                  owners: bool = False, match: Optional[Matcher] = None) -> Iterator[FileHit]:
+    """Walk ``root`` with a pool of threads listing directories concurrently.
+
+    With a ``checkpoint`` the frontier of unlisted directories and the hits so
+    far are saved periodically and when the walk is abandoned (interrupt, error
+    or the consumer closing the generator); a later call with the same
+    checkpoint continues from there. A ``limiter`` caps the directory listings
+    per second across all threads. ``follow_links`` walks into symbolic links
+    and junctions, each physical directory once. ``owners`` adds each file's
+    owner to its hit (see :mod:`vtfr.owners`). ``match`` is ``patterns``
+    already compiled, such as :attr:`vtfr.settings.Settings.match`.
+    """
+    match = match or compile_patterns(patterns)
+    root = os.path.normpath(str(root))
+    guard = WalkGuard(follow_links)
+    cache = OwnerCache() if owners else None
+    frontier, hits = _start(root, match, checkpoint, limiter, guard, cache)
+
+    with ThreadPoolExecutor(max_workers=workers or DEFAULT_THREADS) as pool:
+        pending = {pool.submit(list_directory, d, match, limiter, guard, cache): d for d in frontier}
+        PENDING.inc(len(pending))
+        try:
+            yield from hits  # Inside the try, so stopping here still saves the frontier
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    del pending[future]
+                    PENDING.dec()  # Per future: the consumer may stop before the rest of done
+                    try:
+                        subdirs, hits = future.result()
+                    except OSError:
+                        continue
+                    PENDING.inc(len(subdirs))
+                    for d in subdirs:
+                        pending[pool.submit(list_directory, d, match, limiter, guard, cache)] = d
+                    if checkpoint is not None:
+                        checkpoint.record(hits)
+                    yield from hits
+                if checkpoint is not None and checkpoint.due():
+                    checkpoint.save(pending.values())
+        finally:
+            PENDING.dec(len(pending))
+            _finish(checkpoint, pending)
+
+
+_worker_limiter: Optional[RateLimiter] = None
+_worker_owners: Optional[OwnerCache] = None
+
+
+def _shard_limiter(rate: Optional[float]) -> RateLimiter:
+    """The worker process's own limiter, shared by every shard it walks."""
+    global _worker_limiter
+    if _worker_limiter is None or _worker_limiter.rate != (rate or None):
+        _worker_limiter = RateLimiter(rate)
+    return _worker_limiter
+
+
+def _shard_owners() -> OwnerCache:
+    """The worker process's owner cache, kept across shards so each account is resolved once per worker."""
+    global _worker_owners
+    if _worker_owners is None:
+        _worker_owners = OwnerCache()
+    return _worker_owners
+
+
+def _scan_shard(shard: str, patterns: List[str], batch_size: int,
+                rate: Optional[float] = None, follow_links: bool = False,
+                owners: bool = False) -> Tuple[int, int, int, List[bytes]]:
+    """Worker-process entry point: walk one shard and return its listing, entry and stat counts and marshalled hit batches."""
+    match = compile_patterns(patterns)
+    limiter = _shard_limiter(rate)
+    listed_before = limiter.stats().operations
+    entries_before = ENTRIES.get()  # The worker's own registry; the parent adds the counts to its own
+    stats_before = STAT_CALLS.get()
+    guard = WalkGuard(follow_links)
+    batches = []
+    batch = []
+    try:
+        guard.enter_root(shard)
+        for hit in _walk(shard, match, limiter, guard, _shard_owners() if owners else None):
+            batch.append(hit)
+            if len(batch) >= batch_size:
+                batches.append(marshal.dumps(batch))
+                batch = []
+    except OSError:
+        pass  # Unreadable shard root; same as an unreadable subdirectory
+    if batch:
+        batches.append(marshal.dumps(batch))
+    return (limiter.stats().operations - listed_before, int(ENTRIES.get() - entries_before),
+            int(STAT_CALLS.get() - stats_before), batches)
+
+
+def _first_hit(hit: FileHit, guard: WalkGuard) -> bool:
+    STAT_CALLS.inc()
+    try:
+        return guard.first_visit(os.stat(hit[0]))
+    except OSError:
+        return True  # Gone since the worker saw it; the delete will report that
+
+
+def scan_processes(root: str, patterns: Iterable[str], workers: Optional[int] = None,
+                   batch_size: int = DEFAULT_BATCH_SIZE,
+                   checkpoint: Optional[ScanCheckpoint] = None,
+                   limiter: Optional[RateLimiter] = None, follow_links: bool = False,
+                   owners: bool = False, match: Optional[Matcher] = None) -> Iterator[FileHit]:
+    """Walk ``root`` by sharding its top-level subdirectories across worker processes.
+
+    Checkpoints work as in :func:`scan_threaded`, at shard granularity: the
+    frontier is the set of shards that have not finished yet. A token bucket
+    cannot be shared between processes, so each worker gets an equal share of
+    the ``limiter``'s rate and reports its listings back for the totals.
+
+    Each worker guards its own shard against link loops. With
+    ``follow_links`` a link can still lead one worker into another's shard,
+    so the hits are de-duplicated here by file identity, at one ``stat``
+    per hit. Hard links that span shards are only caught in that mode.
+    A precompiled ``match`` serves the root listing; the workers compile
+    ``patterns`` themselves.
+    """
+    patterns = list(patterns)
+    match = match or compile_patterns(patterns)
+    root = os.path.normpath(str(root))
+    guard = WalkGuard(follow_links)
+    shards, hits = _start(root, match, checkpoint, limiter, guard, OwnerCache() if owners else None)
+    if follow_links:
+        hits = [hit for hit in hits if _first_hit(hit, guard)]  # A worker may reach the root again
+
+    workers = workers or os.cpu_count() or 1
+    rate = limiter.rate / workers if limiter is not None and limiter.rate else None
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = {pool.submit(_scan_shard, shard, patterns, batch_size, rate, follow_links, owners): shard
+                   for shard in shards}
+        PENDING.inc(len(pending))
+        try:
+            yield from hits  # Inside the try, so stopping here still saves the frontier
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    del pending[future]
+                    PENDING.dec()
+                    listings, entries, stat_calls, blobs = future.result()
+                    if limiter is not None:
+                        limiter.add(listings)
+                    batches = [marshal.loads(blob) for blob in blobs]
+                    if follow_links:
+                        batches = [[hit for hit in batch if _first_hit(hit, guard)] for batch in batches]
+                    LISTINGS.inc(listings)
+                    ENTRIES.inc(entries)
+                    STAT_CALLS.inc(stat_calls)
+                    MATCHES.inc(sum(len(batch) for batch in batches))
+                    if checkpoint is not None:
+                        for batch in batches:
+                            checkpoint.record(batch)
+                    for batch in batches:
+                        yield from batch
+                if checkpoint is not None and checkpoint.due():
+                    checkpoint.save(pending.values())
+        finally:
+            PENDING.dec(len(pending))
+            _finish(checkpoint, pending)
+
+
+def timed_scan(hits: Iterable, engine: str) -> Iterator:
+    """Pass ``hits`` through, counting the scan as running and timing it if it completes."""
+    SCANS_RUNNING.inc()
+    start = time.perf_counter()
+    try:
+        yield from hits
+        SCAN_SECONDS.labels(engine).observe(time.perf_counter() - start)
+    finally:
+        SCANS_RUNNING.dec()
+
+
+def scan(root: str, patterns: Iterable[str], engine: str = "threads", workers: Optional[int] = None,
+         checkpoint: Optional[ScanCheckpoint] = None, limiter: Optional[RateLimiter] = None,
+         follow_links: bool = False, owners: bool = False,
+         match: Optional[Matcher] = None) -> Iterator[FileHit]:
+    """Yield ``(path, size, mtime, companion)`` for every file under ``root`` matching ``patterns``."""
+    if engine == "threads":
+        hits = scan_threaded(root, patterns, workers, checkpoint=checkpoint, limiter=limiter, follow_links=follow_links,
+                             owners=owners, match=match)
+        return timed_scan(hits, engine)
+    if engine == "processes":
+        hits = scan_processes(root, patterns, workers, checkpoint=checkpoint, limiter=limiter,
+                              follow_links=follow_links, owners=owners, match=match)
+        return timed_scan(hits, engine)
+    raise ValueError(f"Unknown scan engine: {engine!r} (expected one of {', '.join(ENGINES)})")
+
+
+def scan_records(root: str, patterns: Iterable[str], engine: str = "threads", workers: Optional[int] = None,
+                 checkpoint: Optional[ScanCheckpoint] = None, limiter: Optional[RateLimiter] = None,
+                 follow_links: bool = False, owners: bool = False,
+                 match: Optional[Matcher] = None) -> List[dict]:
+    """Scan ``root`` and return scan records, the same result type as the PowerShell scan."""
+    hits = scan(root, patterns, engine, workers, checkpoint, limiter, follow_links, owners, match)
+    return [make_record(hit) for hit in hits]
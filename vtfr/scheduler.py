@@ -0,0 +1,595 @@
+"""Scheduled cleanup runs with per-root locks and persisted run summaries.
+
+Jobs are listed under ``schedules`` in ``config.json``::
+
+    "schedules": [
+        {"name": "engineering-nightly", "cron": "30 2 * * Mon-Fri",
+         "root": "Z:\\\\ENGINEERING", "action": "delete_orphans", "rate_profile": "gentle"}
+    ]
+
+``cron`` takes the five classic fields (minute, hour, day of month, month,
+day of week) with ``*``, lists, ranges, ``/`` steps and English month and day
+names, or one of ``@hourly``, ``@daily``, ``@weekly`` and ``@monthly``.
+``action`` is ``scan`` (snapshot only), ``delete_orphans`` or ``delete``;
+``"quarantine": true`` moves the files to the holding area instead.
+
+Every run takes a lock file for its root in the state directory, so two runs
+of the same share never overlap, even from separate scheduler processes. A
+run that finds its root locked is skipped. A scan stopped early (the
+scheduler was shut down, the share went away) saves a checkpoint, and the next
+run of that root resumes it with the matches already found. Each run writes
+a :class:`RunSummary` to ``runs/<job>/<YYYYMMDD-HHMMSS>.json``.
+
+Run the scheduler with ``python -m vtfr.scheduler run``; ``list`` shows the
+next run of every job and ``history JOB`` its past runs.
+"""
+import argparse
+import asyncio
+import calendar
+import datetime
+import hashlib
+import json
+import os
+import re
+import socket
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, FrozenSet, Iterable, List, Mapping, NamedTuple, Optional
+
+from . import core
+from .checkpoint import ScanCheckpoint
+from .journal import DeletionJournal
+from .metrics import REGISTRY
+from .paths import state_dir
+from .quarantine import quarantine_files
+from .ratelimit import RateLimiter
+from .resultstore import ResultStore
+from .settings import Settings, SettingsError, SettingsWatcher
+from .snapshot import SNAPSHOT_TIME_FORMAT, save_snapshot
+
+APP_ROOT = Path(__file__).resolve().parent.parent
+ACTIONS = ("scan", "delete_orphans", "delete")
+RUNS_KEEP = 200  # Summaries kept per job; older ones are pruned
+MAX_WAIT = 60.0  # Seconds between checks of config.json while idle
+_SEARCH_YEARS = 5  # An expression with no match this far ahead never matches (e.g. Feb 30)
+
+RUNS = REGISTRY.counter("vtfr_scheduled_runs_total", "Scheduled runs finished", ("job", "status"))
+RUNS_ACTIVE = REGISTRY.gauge("vtfr_scheduled_runs_in_progress", "Scheduled runs currently running")
+
+_MONTHS = {name.lower(): i for i, name in enumerate(calendar.month_abbr) if name}
+_DAYS = {name: i for i, name in enumerate(("sun", "mon", "tue", "wed", "thu", "fri", "sat"))}
+_ALIASES = {
+    "@hourly": "0 * * * *",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@weekly": "0 0 * * 0",
+    "@monthly": "0 0 1 * *",
+}
+_NAME = re.compile(r'^[A-Za-z0-9][A-Za-z0-9._-]*$')
+
+
+class CronSchedule(NamedTuple):
+    """A parsed cron expression; days of the week count from Sunday = 0."""
+    expression: str
+    minutes: FrozenSet[int]
+    hours: FrozenSet[int]
+    days: FrozenSet[int]
+    months: FrozenSet[int]
+    weekdays: FrozenSet[int]
+    any_day: bool  # Day of month is "*"
+    any_weekday: bool  # Day of week is "*"
+
+    def matches_day(self, day: datetime.date) -> bool:
+        # As in cron, a day matches either field when both are restricted
+        by_day = day.day in self.days
+        by_weekday = (day.weekday() + 1) % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return by_day and by_weekday
+        return by_day or by_weekday
+
+    def next_after(self, moment: datetime.datetime) -> datetime.datetime:
+        """The first matching minute strictly after ``moment`` (naive local time)."""
+        t = moment.replace(second=0, microsecond=0) + datetime.timedelta(minutes=1)
+        limit = moment.year + _SEARCH_YEARS
+        while t.year <= limit:
+            if t.month not in self.months:
+                t = (t.replace(day=1) + datetime.timedelta(days=32)).replace(day=1, hour=0, minute=0)
+            elif not self.matches_day(t.date()):
+                t = (t + datetime.timedelta(days=1)).replace(hour=0, minute=0)
+            elif t.hour not in self.hours:
+                t = (t + datetime.timedelta(hours=1)).replace(minute=0)
+            elif t.minute not in self.minutes:
+                t += datetime.timedelta(minutes=1)
+            else:
+                return t
+        raise ValueError(f"Cron expression {self.expression!r} never matches")
+
+
+def _parse_value(text: str, names: Optional[Mapping[str, int]]) -> int:
+    value = names.get(text.lower()) if names else None
+    if value is not None:
+        return value
+    if not text.isdigit():
+        raise ValueError(f"Invalid value {text!r}")
+    return int(text)
+
+
+def _parse_field(text: str, low: int, high: int, names: Optional[Mapping[str, int]] = None) -> FrozenSet[int]:
+    values = set()
+    for part in text.split(","):
+        spec, _, step_text = part.partition("/")
+        step = int(step_text) if step_text.isdigit() and int(step_text) > 0 else None
+        if step_text and step is None:
+            raise ValueError(f"Invalid step in {part!r}")
+        if spec == "*":
+            start, end = low, high
+        elif "-" in spec:
+            first, _, last = spec.partition("-")
+            start, end = _parse_value(first, names), _parse_value(last, names)
+        else:
+            start = end = _parse_value(spec, names)
+            if step:
+                end = high
+        if not low <= start <= high or not low <= end <= high or start > end:
+            raise ValueError(f"{part!r} is outside {low}-{high}")
+        values.update(range(start, end + 1, step or 1))
+    return frozenset(values)
+
+
+def parse_cron(expression: str) -> CronSchedule:
+    """Parse a five-field cron expression or an ``@`` alias; raises ``ValueError``."""
+    text = _ALIASES.get(expression.strip().lower(), expression.strip())
+    fields = text.split()
+    if len(fields) != 5:
+        raise ValueError(f"Cron expression {expression!r} needs 5 fields: minute hour day month weekday")
+    weekdays = _parse_field(fields[4], 0, 7, _DAYS)
+    if 7 in weekdays:
+        weekdays = (weekdays - {7}) | {0}  # Both 0 and 7 mean Sunday
+    return CronSchedule(
+        expression=expression,
+        minutes=_parse_field(fields[0], 0, 59),
+        hours=_parse_field(fields[1], 0, 23),
+        days=_parse_field(fields[2], 1, 31),
+        months=_parse_field(fields[3], 1, 12, _MONTHS),
+        weekdays=weekdays,
+        any_day=fields[2] == "*",
+        any_weekday=fields[4] == "*",
+    )
+
+
+class Job(NamedTuple):
+    """One entry of ``schedules`` in config.json."""
+    name: str
+    schedule: CronSchedule
+    root: str
+    action: str
+    quarantine: bool
+    rate_profile: Optional[str]
+
+
+def load_jobs(config: Mapping) -> List[Job]:
+    """The scheduled jobs of a config.json; raises :class:`vtfr.settings.SettingsError`."""
+    entries = config.get('schedules') or []
+    if not isinstance(entries, list):
+        raise SettingsError("'schedules' must be a list in config.json")
+    jobs: Dict[str, Job] = {}
+    for entry in entries:
+        if not isinstance(entry, Mapping):
+            raise SettingsError("Each entry of 'schedules' must be an object")
+        name = entry.get('name')
+        if not isinstance(name, str) or not _NAME.match(name):
+            raise SettingsError(f"Schedule name {name!r} must be letters, digits, '.', '_' or '-'")
+        if name in jobs:
+            raise SettingsError(f"Schedule {name!r} is defined twice")
+        root = entry.get('root')
+        if not isinstance(root, str) or not root:
+            raise SettingsError(f"Schedule {name!r} needs a 'root' folder")
+        action = entry.get('action', 'delete_orphans')
+        if action not in ACTIONS:
+            raise SettingsError(f"Schedule {name!r}: 'action' must be one of: {', '.join(ACTIONS)}")
+        profile = entry.get('rate_profile')
+        if profile is not None and not isinstance(profile, str):
+            raise SettingsError(f"Schedule {name!r}: 'rate_profile' must be a profile name")
+        try:
+            schedule = parse_cron(str(entry.get('cron', '')))
+        except ValueError as e:
+            raise SettingsError(f"Schedule {name!r}: {e}")
+        jobs[name] = Job(name, schedule, os.path.normpath(root), action, entry.get('quarantine') is True, profile)
+    return list(jobs.values())
+
+
+def _pid_alive(pid: int) -> bool:
+    if os.name == "nt":
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return kernel32.GetLastError() == 5  # Access denied: it exists but belongs to someone else
+        try:
+            code = ctypes.c_ulong()
+            return bool(kernel32.GetExitCodeProcess(handle, ctypes.byref(code))) and code.value == 259  # STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class RootLock:
+    """An exclusive lock file for one scan root in ``locks/`` of the state directory.
+
+    The file holds the owner's process id and host. A lock left behind by a
+    process on this host that no longer runs is taken over.
+    """
+
+    def __init__(self, root, owner: str = "", directory: Optional[Path] = None):
+        self.root = os.path.normpath(str(root))
+        key = hashlib.sha1(os.path.normcase(self.root).encode('utf-8')).hexdigest()[:16]
+        self.path = (Path(directory) if directory else state_dir("locks")) / f"{key}.lock"
+        self.owner = owner
+        self.locked = False
+
+    def holder(self) -> Optional[dict]:
+        """Who holds the lock (pid, host, owner, since), or None if it is free."""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def acquire(self) -> bool:
+        """Take the lock without waiting; False if another live process holds it."""
+        info = json.dumps({'pid': os.getpid(), 'host': socket.gethostname(), 'owner': self.owner,
+                           'root': self.root, 'since': time.time()})
+        for _ in range(2):
+            try:
+                fd = os.open(str(self.path), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                holder = self.holder()
+                stale = (holder is not None and holder.get('host') == socket.gethostname()
+                         and not _pid_alive(int(holder.get('pid', 0))))
+                if not stale:
+                    return False
+                try:
+                    os.remove(self.path)
+                except FileNotFoundError:
+                    pass
+                continue
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(info)
+            self.locked = True
+            return True
+        return False
+
+    def release(self):
+        if self.locked:
+            self.locked = False
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+    def __enter__(self):
+        if not self.acquire():
+            raise RuntimeError(f"{self.root} is locked by {self.holder()}")
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class RunSummary(NamedTuple):
+    """What one scheduled run did; status is completed, interrupted, skipped or failed."""
+    job: str
+    root: str
+    action: str
+    status: str
+    scheduled_for: float
+    started: float
+    finished: float
+    resumed: bool = False  # Continued the scan of a run that stopped early
+    files: int = 0
+    size: int = 0
+    orphans: int = 0
+    removed: int = 0  # Deleted or quarantined
+    failed: int = 0
+    retried: int = 0
+    error: str = ""
+
+
+def runs_dir(job: str) -> Path:
+    return state_dir("runs", job)
+
+
+def _run_order(path: Path):
+    """Sort key for summary files: time stamp, then the -2, -3... suffix of runs in the same second."""
+    date, _, rest = path.stem.partition("-")
+    clock, _, suffix = rest.partition("-")
+    return date, clock, int(suffix) if suffix.isdigit() else 1
+
+
+def save_summary(summary: RunSummary, directory: Optional[Path] = None, keep: int = RUNS_KEEP) -> Path:
+    """Write a run summary as JSON (atomically) and prune the oldest ones of the job."""
+    directory = Path(directory) if directory else runs_dir(summary.job)
+    directory.mkdir(parents=True, exist_ok=True)
+    stamp = time.strftime(SNAPSHOT_TIME_FORMAT, time.localtime(summary.started))
+    path = directory / f"{stamp}.json"
+    suffix = 1
+    while path.exists():
+        suffix += 1
+        path = directory / f"{stamp}-{suffix}.json"
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(summary._asdict(), f, indent=2)
+    os.replace(tmp, path)
+    runs = sorted(directory.glob("*.json"), key=_run_order)
+    for old in runs[:max(0, len(runs) - keep)]:
+        try:
+            old.unlink()
+        except OSError:
+            pass
+    return path
+
+
+def read_summaries(job: str, directory: Optional[Path] = None) -> List[RunSummary]:
+    """The saved summaries of a job, oldest first; unreadable files are skipped."""
+    directory = Path(directory) if directory else runs_dir(job)
+    summaries = []
+    for path in sorted(directory.glob("*.json"), key=_run_order):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                summaries.append(RunSummary(**json.load(f)))
+        except (OSError, TypeError, ValueError):
+            continue
+    return summaries
+
+
+async def _scan_into(store: ResultStore, job: Job, settings: Settings, checkpoint: ScanCheckpoint,
+                     limiter: RateLimiter, stop: threading.Event) -> bool:
+    """Scan the job's root into ``store``; False if ``stop`` cut it short (the checkpoint is saved)."""
+    engine = settings.scan_engine if settings.scan_engine != "powershell" else "threads"
+    async for record in core.scan(job.root, settings.patterns, engine=engine, checkpoint=checkpoint,
+                                  limiter=limiter, follow_links=settings.follow_links, owners=settings.owners,
+                                  match=settings.match):
+        store.append(record)
+        if stop.is_set():
+            return False
+    return True
+
+
+async def _delete(paths: Iterable[str], job: Job, settings: Settings, journal, limiter: RateLimiter,
+                  stop: threading.Event) -> Dict[str, int]:
+    totals = {'removed': 0, 'failed': 0, 'retried': 0}
+    outcomes = core.delete(paths, root=job.root, journal=journal, limiter=limiter,
+                           protected=settings.protected_prefixes, match=settings.match)
+    try:
+        async for outcome in outcomes:
+            if outcome.status == 'deleted':
+                totals['removed'] += 1
+                totals['retried'] += outcome.attempts > 1
+            elif outcome.status != 'not_found':
+                totals['failed'] += 1
+            if stop.is_set():
+                break
+    finally:
+        await outcomes.aclose()  # Journals the unlinks still running before the journal is closed
+    return totals
+
+
+def _remove(paths: Iterable[str], job: Job, settings: Settings, limiter: RateLimiter,
+            stop: threading.Event) -> Dict[str, int]:
+    """Delete or quarantine ``paths``, journalling every outcome; returns removed/failed/retried counts."""
+    try:
+        journal = DeletionJournal()
+    except OSError:
+        journal = None
+    try:
+        if job.quarantine:
+            result = quarantine_files(paths, job.root, None, journal, settings.quarantine_dir,
+                                      settings.protected_prefixes, settings.match)
+            return {'removed': len(result.moved), 'failed': len(result.failed)}
+        return asyncio.run(_delete(paths, job, settings, journal, limiter, stop))
+    finally:
+        if journal:
+            journal.close()
+
+
+def run_job(job: Job, settings: Settings, scheduled_for: Optional[float] = None,
+            stop: Optional[threading.Event] = None, checkpoints: Optional[Path] = None) -> RunSummary:
+    """Run one job now under its root lock and save its summary.
+
+    ``stop`` ends the run early: a scan saves its checkpoint for the next
+    run, and a delete stops after the unlinks in flight.
+    """
+    stop = stop or threading.Event()
+    started = time.time()
+    base = dict(job=job.name, root=job.root, action=job.action, scheduled_for=scheduled_for or started,
+                started=started)
+    lock = RootLock(job.root, owner=f"schedule {job.name}")
+    if not lock.acquire():
+        holder = lock.holder() or {}
+        summary = RunSummary(status='skipped', finished=time.time(),
+                             error=f"{job.root} is locked by {holder.get('owner') or 'another run'} "
+                                   f"(pid {holder.get('pid', '?')} on {holder.get('host', '?')})", **base)
+        save_summary(summary)
+        RUNS.labels(job.name, summary.status).inc()
+        return summary
+
+    RUNS_ACTIVE.inc()
+    store = ResultStore(settings.result_memory_limit)
+    # Scheduled runs keep their own checkpoints, so an interactive scan of the same root never discards them
+    checkpoint = ScanCheckpoint(job.root, settings.patterns,
+                                directory=checkpoints or state_dir("checkpoints", "scheduled"),
+                                owners=settings.owners, follow_links=settings.follow_links)
+    resumed = checkpoint.exists()
+    counts = {}
+    status, error = 'completed', ""
+    try:
+        if not os.path.isdir(job.root):
+            raise OSError(f"Directory does not exist or is not accessible: {job.root}")
+        profile = settings.profile(job.rate_profile)
+        complete = asyncio.run(_scan_into(store, job, settings, checkpoint,
+                                          RateLimiter(profile.listings_per_second), stop))
+        if not complete:
+            status = 'interrupted'
+        else:
+            try:
+                save_snapshot(job.root, store)
+            except OSError as e:
+                error = f"Could not save scan snapshot: {e}"
+            if job.action != "scan" and not stop.is_set():
+                paths = store.paths() if job.action == "delete" else store.orphan_paths()
+                counts = _remove(paths, job, settings, RateLimiter(profile.unlinks_per_second), stop)
+                if stop.is_set():
+                    status = 'interrupted'
+    except Exception as e:
+        status, error = 'failed', str(e)
+    finally:
+        lock.release()
+        RUNS_ACTIVE.dec()
+    summary = RunSummary(status=status, finished=time.time(), resumed=resumed, files=len(store),
+                         size=store.total_size, orphans=store.orphan_count, error=error, **base, **counts)
+    store.close()
+    save_summary(summary)
+    RUNS.labels(job.name, summary.status).inc()
+    return summary
+
+
+class Scheduler:
+    """Start each job of ``settings`` at its next cron time, each run on its own thread.
+
+    Jobs are re-read from config.json (through the watcher) between runs, so
+    edits take effect without a restart. Runs that fall due while the
+    computer is off are not made up.
+    """
+
+    def __init__(self, settings: SettingsWatcher, now: Callable[[], datetime.datetime] = datetime.datetime.now,
+                 log: Callable[[str], None] = print, runner: Callable[..., RunSummary] = run_job):
+        self.settings = settings
+        self.now = now
+        self.log = log
+        self.runner = runner
+        self.stop_event = threading.Event()
+        self.threads: List[threading.Thread] = []
+        self._jobs: List[Job] = []
+        self._due: Dict[str, datetime.datetime] = {}
+
+    def jobs(self) -> List[Job]:
+        """The current jobs; an invalid ``schedules`` section keeps the previous ones."""
+        try:
+            jobs = load_jobs(self.settings.current().config)
+        except SettingsError as e:
+            self.log(f"Keeping the previous schedules: {e}")
+            return self._jobs
+        if jobs != self._jobs:
+            now = self.now()
+            # Unchanged jobs keep their next run; new and edited ones are scheduled from now
+            self._due = {job.name: self._due[job.name] if job in self._jobs else job.schedule.next_after(now)
+                         for job in jobs}
+            self._jobs = jobs
+        return jobs
+
+    def next_runs(self) -> Dict[str, datetime.datetime]:
+        self.jobs()
+        return dict(self._due)
+
+    def tick(self) -> float:
+        """Start every job that is due; returns the seconds until the next check."""
+        jobs = self.jobs()
+        now = self.now()
+        for job in jobs:
+            due = self._due[job.name]
+            if due <= now:
+                self._due[job.name] = job.schedule.next_after(now)
+                self._start(job, due)
+        self.threads = [t for t in self.threads if t.is_alive()]
+        if not self._due:
+            return MAX_WAIT
+        return max(0.0, min(MAX_WAIT, (min(self._due.values()) - self.now()).total_seconds()))
+
+    def _start(self, job: Job, due: datetime.datetime):
+        settings = self.settings.current()
+
+        def run():
+            self.log(f"Starting {job.name} ({job.action} {job.root})")
+            summary = self.runner(job, settings, due.timestamp(), self.stop_event)
+            detail = f": {summary.error}" if summary.error else ""
+            self.log(f"{job.name} {summary.status}: {summary.files} file(s) found, "
+                     f"{summary.removed} removed, {summary.failed} failed{detail}")
+        thread = threading.Thread(target=run, name=f"vtfr-schedule-{job.name}")
+        thread.start()
+        self.threads.append(thread)
+
+    def run_forever(self):
+        """Run until :meth:`stop` is called (e.g. from a signal handler or another thread)."""
+        while not self.stop_event.is_set():
+            self.stop_event.wait(self.tick())
+        for thread in self.threads:
+            thread.join()
+
+    def stop(self):
+        """Stop starting runs and ask the running ones to wrap up and save their checkpoints."""
+        self.stop_event.set()
+
+
+def _format_time(seconds: float) -> str:
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(seconds))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the scheduled cleanups from config.json.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("run", help="Run every schedule until interrupted")
+    commands.add_parser("list", help="Show the schedules and their next run")
+    once = commands.add_parser("once", help="Run one schedule now")
+    once.add_argument("job")
+    history = commands.add_parser("history", help="Show the past runs of a schedule")
+    history.add_argument("job")
+    history.add_argument("--last", type=int, default=20, help="Number of runs to show (default: 20)")
+    args = parser.parse_args(argv)
+
+    try:
+        settings = SettingsWatcher(
+            APP_ROOT / "config.json",
+            on_reload=lambda s: print(f"Reloaded configuration from {s.source}"),
+            on_error=lambda error: print(f"Keeping the previous configuration: {error}"))
+        jobs = {job.name: job for job in load_jobs(settings.current().config)}
+    except SettingsError as e:
+        parser.exit(1, f"Error: {e}\n")
+
+    if args.command == "list":
+        if not jobs:
+            print("No schedules in config.json.")
+        now = datetime.datetime.now()
+        for job in jobs.values():
+            print(f"{job.name:<24} {job.schedule.expression:<18} next {job.schedule.next_after(now):%Y-%m-%d %H:%M}  "
+                  f"{job.action}{' (quarantine)' if job.quarantine else ''}  {job.root}")
+    elif args.command == "history":
+        for summary in read_summaries(args.job)[-args.last:]:
+            took = summary.finished - summary.started
+            print(f"{_format_time(summary.started)}  {summary.status:<11} {took:7.1f}s  {summary.files:>8} found  "
+                  f"{summary.removed:>8} removed  {summary.failed:>6} failed"
+                  f"{'  resumed' if summary.resumed else ''}{'  ' + summary.error if summary.error else ''}")
+    elif args.command == "once":
+        if args.job not in jobs:
+            parser.exit(1, f"Error: No schedule named {args.job!r}\n")
+        summary = run_job(jobs[args.job], settings.current())
+        print(json.dumps(summary._asdict(), indent=2))
+    else:
+        scheduler = Scheduler(settings)
+        print(f"Scheduler started with {len(jobs)} schedule(s); press Ctrl+C to stop.")
+        try:
+            scheduler.run_forever()
+        except KeyboardInterrupt:
+            print("Stopping; running scans save their progress for the next run...")
+            scheduler.stop()
+            scheduler.run_forever()
+
+
+if __name__ == "__main__":
+    main()
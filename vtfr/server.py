@@ -0,0 +1,223 @@
+"""HTTP front end for the asyncio core engine.
+
+Serves the web UI in ``views/`` and ``public/`` and implements the same JSON
+API as ``app.js``, so ``public/main.js`` works unchanged against either
+server:
+
+* ``POST /api/scan`` with ``{"directory": ...}`` returns the scan records.
+* ``POST /api/delete`` with ``{"files": [...]}`` deletes them, journalling
+  every outcome.
+* ``GET /metrics`` returns the scan, delete and request metrics of
+  :mod:`vtfr.metrics` in the Prometheus text format.
+
+Patterns, the default scan directory, rate profiles and protected folders
+come from ``config.json``, which is reloaded when it changes; requests in
+progress finish with the settings they started with.
+
+Run it with ``python -m vtfr.server [--host HOST] [--port PORT]``.
+"""
+import argparse
+import json
+import mimetypes
+import os
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional
+
+from . import core
+from .journal import DeletionJournal
+from .metrics import CONTENT_TYPE, REGISTRY
+from .ratelimit import RateLimiter, describe_rate, resolve_profile
+from .safety import VISIO_TEMP_PATTERNS
+from .settings import Settings, SettingsError, SettingsWatcher
+
+APP_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 3000
+DEFAULT_SCAN_DIR = "Z:\\ENGINEERING TEMPLATES\\VISIO SHAPES 2025"
+MAX_BODY_BYTES = 16 * 1024 * 1024
+ROUTES = ("/", "/api/scan", "/api/delete", "/metrics")  # Other paths are counted as "other"
+
+REQUESTS = REGISTRY.counter("vtfr_http_requests_total", "HTTP requests answered", ("server", "path", "code"))
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    server_version = "VisioTempFileRemover"
+
+    def log_request(self, code='-', size='-'):
+        path = self.path.split("?", 1)[0]
+        code = int(code) if isinstance(code, int) else code  # HTTPStatus prints as its name before 3.11
+        REQUESTS.labels("web", path if path in ROUTES else "other", code).inc()
+        super().log_request(code, size)
+
+    def _send_metrics(self):
+        body = REGISTRY.render().encode('utf-8')
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _settings(self) -> Optional[Settings]:
+        """Current config.json settings, or None to use the built-in defaults."""
+        watcher = getattr(self.server, 'settings', None)
+        return watcher.current() if watcher else None
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_file(self, path: Path):
+        try:
+            data = path.read_bytes()
+        except OSError:
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", mimetypes.guess_type(path.name)[0] or "application/octet-stream")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            raise ValueError("Request body too large")
+        data = json.loads(self.rfile.read(length) or b"{}")
+        if not isinstance(data, dict):
+            raise ValueError("Request body must be a JSON object")
+        return data
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path == "/":
+            self._send_file(APP_ROOT / "views" / "index.html")
+            return
+        if path == "/metrics":
+            self._send_metrics()
+            return
+        public = APP_ROOT / "public"
+        target = (public / path.lstrip("/")).resolve()
+        if public.resolve() not in target.parents or not target.is_file():
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        self._send_file(target)
+
+    def do_POST(self):
+        try:
+            body = self._read_json()
+        except ValueError as e:  # json.JSONDecodeError is a ValueError
+            self._send_json(HTTPStatus.BAD_REQUEST, {'error': 'Invalid request body', 'details': str(e)})
+            return
+        try:
+            if self.path == "/api/scan":
+                self._scan(body)
+            elif self.path == "/api/delete":
+                self._delete(body)
+            else:
+                self.send_error(HTTPStatus.NOT_FOUND)
+        except Exception as e:
+            self.log_error("Unhandled exception on path %s: %s", self.path, e)
+            self._send_json(HTTPStatus.INTERNAL_SERVER_ERROR,
+                            {'error': 'Internal server error', 'message': str(e), 'path': self.path})
+
+    def _scan(self, body: dict):
+        settings = self._settings()
+        directory = body.get('directory') or (settings and settings.default_scan_path) or DEFAULT_SCAN_DIR
+        if not os.path.isdir(directory):
+            self._send_json(HTTPStatus.INTERNAL_SERVER_ERROR, {
+                'error': f"Directory does not exist or is not accessible: {directory}",
+                'details': 'Error scanning for files',
+            })
+            return
+        patterns = settings.patterns if settings else VISIO_TEMP_PATTERNS
+        limiter = RateLimiter((settings.profile() if settings else resolve_profile()).listings_per_second)
+        files = core.scan_sync(directory, patterns, limiter=limiter,
+                               follow_links=settings.follow_links if settings else False,
+                               owners=settings.owners if settings else False,
+                               match=settings.match if settings else None)
+        self.log_message("Scanned %s: %s", directory, describe_rate(limiter, "folder listings"))
+        if not files:
+            self._send_json(HTTPStatus.OK, {'files': [], 'message': 'No matching files found'})
+            return
+        self._send_json(HTTPStatus.OK, {
+            'files': files,
+            'message': f"Found {len(files)} file(s)",
+            'scannedDirectory': directory,
+        })
+
+    def _delete(self, body: dict):
+        files = body.get('files')
+        if not files or not isinstance(files, list):
+            self._send_json(HTTPStatus.BAD_REQUEST, {
+                'error': 'No files specified for deletion',
+                'details': 'The request must include a "files" array with at least one file path',
+            })
+            return
+        invalid = [f for f in files if not isinstance(f, str) or not f.strip()]
+        if invalid:
+            self._send_json(HTTPStatus.BAD_REQUEST, {
+                'error': 'Invalid file paths provided',
+                'details': 'All file paths must be non-empty strings',
+                'invalidCount': len(invalid),
+            })
+            return
+
+        try:
+            journal = DeletionJournal()
+        except OSError as e:
+            self.log_error("Deletion journal unavailable: %s", e)
+            journal = None
+        settings = self._settings()
+        try:
+            limiter = RateLimiter((settings.profile() if settings else resolve_profile()).unlinks_per_second)
+            outcomes = core.delete_sync(files, journal=journal, limiter=limiter,
+                                        protected=settings.protected_prefixes if settings else None,
+                                        match=settings.match if settings else None)
+        finally:
+            if journal:
+                journal.close()
+        self.log_message("Deleted files: %s", describe_rate(limiter, "unlinks"))
+
+        failed = [o for o in outcomes if o.status != 'deleted']
+        if failed:
+            self._send_json(HTTPStatus.MULTI_STATUS, {
+                'partialSuccess': True,
+                'message': 'Some files may not have been deleted successfully',
+                'details': "\n".join(f"{o.path}: {o.error}" for o in failed),
+                'filesAttempted': len(files),
+            })
+            return
+        self._send_json(HTTPStatus.OK, {'success': True, 'message': f"{len(files)} files deleted successfully"})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the Visio Temp File Remover web interface.")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"Address to bind (default: {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port to listen on (default: {DEFAULT_PORT})")
+    args = parser.parse_args(argv)
+
+    httpd = ThreadingHTTPServer((args.host, args.port), RequestHandler)
+    try:
+        httpd.settings = SettingsWatcher(
+            APP_ROOT / "config.json",
+            on_reload=lambda settings: print(f"Reloaded configuration from {settings.source}"),
+            on_error=lambda error: print(f"Keeping the previous configuration: {error}"))
+    except SettingsError as e:
+        print(f"Warning: {e}; using the built-in settings")
+    print(f"Visio Temp File Remover server running at http://{args.host}:{args.port}/")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
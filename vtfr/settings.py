@@ -0,0 +1,206 @@
+"""Validated, precompiled settings from ``config.json``, reloaded when the file changes.
+
+:func:`load_settings` reads the file once into an immutable :class:`Settings`.
+The wildcard patterns are compiled into one matcher, the default scan root is
+normalized and the protected system folders are resolved up front, so nothing
+is re-parsed per file.
+
+Long-running front ends (the GUI, the web server, the interactive CLI loop)
+hold a :class:`SettingsWatcher` and call :meth:`SettingsWatcher.current` at
+the start of each scan or delete. It stats ``config.json`` at most once per
+``check_interval``. When the modification time or size has changed, it loads
+and validates the new file and swaps the reference in a single assignment.
+Scans already running keep the ``Settings`` they started with, so a reload
+never pauses or disturbs them. If the new file is invalid, the previous
+settings stay in effect until the file changes again.
+"""
+import json
+import os
+import re
+import threading
+import time
+from types import MappingProxyType
+from typing import Callable, Mapping, NamedTuple, Optional, Tuple
+
+from .ratelimit import RateProfile, resolve_profile
+from .resultstore import DEFAULT_MEMORY_LIMIT
+from .safety import protected_prefixes
+from .scanner import ENGINES, Matcher, compile_patterns
+
+DEFAULT_CHECK_INTERVAL = 2.0  # Seconds between stat() calls on config.json
+SCAN_ENGINES = ("powershell",) + ENGINES
+SAFE_PATTERN = re.compile(r'^[~$*.A-Za-z0-9\-_]+$')
+
+
+class SettingsError(ValueError):
+    """config.json is missing, unreadable or fails validation."""
+
+
+class Settings(NamedTuple):
+    """One validated version of config.json. Never mutated; reloads build a new one."""
+    source: str
+    version: Tuple[int, int]  # (mtime_ns, size) of the file this was loaded from
+    patterns: Tuple[str, ...]
+    ignored_patterns: Tuple[str, ...]  # Patterns dropped as unsafe
+    match: Matcher
+    default_scan_path: str
+    default_root: str  # default_scan_path normalized, "" if not configured
+    scripts_path: str
+    scan_engine: str
+    follow_links: bool  # Walk into symbolic links and junctions (each physical folder once)
+    owners: bool  # Record each file's owner (see vtfr.owners)
+    result_memory_limit: int  # Scan records kept in memory before spilling to disk (see vtfr.resultstore)
+    quarantine_dir: Optional[str]
+    rate_profile: str
+    protected_prefixes: Tuple[str, ...]
+    config: Mapping  # Read-only view of the raw file, for the rate profile helpers
+
+    def is_temp_name(self, name: str) -> bool:
+        """True if a file name matches the configured temp file patterns."""
+        return self.match(name) is not None
+
+    def profile(self, name: Optional[str] = None, now=None) -> RateProfile:
+        """Resolve a rate profile, defaulting to the configured one."""
+        return resolve_profile(name or self.rate_profile, self.config, now)
+
+
+def compile_settings(data: dict, source: str = "config.json", version: Tuple[int, int] = (0, 0)) -> Settings:
+    """Validate parsed config.json contents and precompile them; raises :class:`SettingsError`."""
+    if not isinstance(data, dict):
+        raise SettingsError("config.json must contain a JSON object")
+    if not isinstance(data.get('temp_file_patterns'), list):
+        raise SettingsError("'temp_file_patterns' must be a list in config.json")
+    default_path = data.get('default_scan_path') or ""
+    if not isinstance(default_path, str):
+        raise SettingsError("'default_scan_path' must be a string or empty in config.json")
+    if not data.get('powershell_scripts_path'):
+        raise SettingsError("'powershell_scripts_path' must be defined in config.json")
+    scan_engine = data.get('scan_engine', 'threads')
+    if scan_engine not in SCAN_ENGINES:
+        raise SettingsError(f"'scan_engine' must be one of: {', '.join(SCAN_ENGINES)}")
+    try:
+        resolve_profile(None, data)
+    except (AttributeError, KeyError, TypeError, ValueError) as e:
+        raise SettingsError(f"Invalid rate limit settings: {e}")
+    follow_links = data.get('follow_links', False)
+    if not isinstance(follow_links, bool):
+        raise SettingsError("'follow_links' must be true or false in config.json")
+    owners = data.get('owners', False)
+    if not isinstance(owners, bool):
+        raise SettingsError("'owners' must be true or false in config.json")
+    result_memory_limit = data.get('result_memory_limit', DEFAULT_MEMORY_LIMIT)
+    if not isinstance(result_memory_limit, int) or isinstance(result_memory_limit, bool) or result_memory_limit < 1000:
+        raise SettingsError("'result_memory_limit' must be a whole number of at least 1000 in config.json")
+    extra_protected = data.get('protected_paths') or []
+    if not isinstance(extra_protected, list) or not all(isinstance(p, str) for p in extra_protected):
+        raise SettingsError("'protected_paths' must be a list of folders in config.json")
+
+    # Only allow safe characters in patterns
+    patterns = tuple(p for p in data['temp_file_patterns'] if isinstance(p, str) and SAFE_PATTERN.match(p))
+    ignored = tuple(str(p) for p in data['temp_file_patterns'] if p not in patterns)
+    if not patterns:
+        raise SettingsError("No valid file patterns found in configuration")
+
+    prefixes = protected_prefixes() + [os.path.normcase(os.path.normpath(p)) for p in extra_protected if p]
+    return Settings(
+        source=str(source),
+        version=version,
+        patterns=patterns,
+        ignored_patterns=ignored,
+        match=compile_patterns(patterns),
+        default_scan_path=default_path,
+        default_root=os.path.normpath(default_path) if default_path else "",
+        scripts_path=data['powershell_scripts_path'],
+        scan_engine=scan_engine,
+        follow_links=follow_links,
+        owners=owners,
+        result_memory_limit=result_memory_limit,
+        quarantine_dir=data.get('quarantine_dir') or None,
+        rate_profile=data.get('rate_profile') or 'auto',
+        protected_prefixes=tuple(prefixes),
+        config=MappingProxyType(json.loads(json.dumps(data))),  # Private deep copy
+    )
+
+
+def load_settings(path) -> Settings:
+    """Read, validate and precompile a config.json file; raises :class:`SettingsError`."""
+    try:
+        with open(path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            data = json.loads(f.read().decode('utf-8'))
+    except FileNotFoundError:
+        raise SettingsError(f"Configuration file not found at {path}")
+    except OSError as e:
+        raise SettingsError(f"Could not read {path}: {e}")
+    except ValueError as e:  # Also covers UnicodeDecodeError
+        raise SettingsError(f"Could not decode JSON from {path}: {e}")
+    return compile_settings(data, str(path), (st.st_mtime_ns, st.st_size))
+
+
+def _file_version(path) -> Tuple[int, int]:
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+class SettingsWatcher:
+    """Holds the current :class:`Settings` and reloads them when config.json changes.
+
+    ``on_reload(settings)`` and ``on_error(error)`` are called on the thread
+    that noticed the change. A file that fails to load is reported once per
+    version, not on every check.
+    """
+
+    def __init__(self, path, check_interval: float = DEFAULT_CHECK_INTERVAL,
+                 on_reload: Optional[Callable[[Settings], None]] = None,
+                 on_error: Optional[Callable[[Exception], None]] = None):
+        self.path = str(path)
+        self.check_interval = check_interval
+        self.on_reload = on_reload
+        self.on_error = on_error
+        self._settings = load_settings(self.path)
+        self._failed_version = None
+        self._lock = threading.Lock()
+        self._next_check = time.monotonic() + check_interval
+
+    def current(self) -> Settings:
+        """The latest settings. Never blocks: if another thread is reloading, this returns the old ones."""
+        now = time.monotonic()
+        if now >= self._next_check and self._lock.acquire(blocking=False):
+            try:
+                self._next_check = now + self.check_interval
+                self._reload_if_changed()
+            finally:
+                self._lock.release()
+        return self._settings
+
+    def check(self) -> bool:
+        """Check config.json now; returns True if new settings were swapped in."""
+        with self._lock:
+            self._next_check = time.monotonic() + self.check_interval
+            return self._reload_if_changed()
+
+    def _reload_if_changed(self) -> bool:
+        try:
+            version = _file_version(self.path)
+        except OSError as e:
+            version = "unreadable"
+            if self._failed_version != version:
+                self._report(SettingsError(f"Could not read {self.path}: {e}"), version)
+            return False
+        if version in (self._settings.version, self._failed_version):
+            return False
+        try:
+            settings = load_settings(self.path)
+        except SettingsError as e:
+            self._report(e, version)
+            return False
+        self._settings = settings  # Atomic swap; running scans keep their own reference
+        self._failed_version = None
+        if self.on_reload:
+            self.on_reload(settings)
+        return True
+
+    def _report(self, error: Exception, version):
+        self._failed_version = version
+        if self.on_error:
+            self.on_error(error)
@@ -0,0 +1,216 @@
+"""Compact sorted snapshots of scan results, and a streaming diff between two.
+
+Every completed scan can be saved as a snapshot in the state directory under
+``snapshots/<root key>/<YYYYMMDD-HHMMSS>.snap``. Comparing two snapshots of the
+same root shows which temp files appeared, vanished or changed in between.
+
+File layout: the 8-byte magic ``VTFRS001``, a ``uint32`` length and a JSON
+header (root, creation time, entry count), then one record per file, sorted
+by the UTF-8 bytes of its path::
+
+    uint32 bytes shared with the previous path
+    uint32 len(suffix)
+    int64  size in bytes
+    int64  last modified, wall-clock seconds (no time zone)
+    utf-8  path suffix
+
+Sorted paths under the same folders share long prefixes, so front coding keeps
+snapshots small. Because both sides are sorted, :func:`diff_snapshots` is a
+single merge-join pass that holds one entry of each snapshot in memory at a
+time, however large the snapshots are.
+"""
+import datetime
+import hashlib
+import json
+import os
+import struct
+import time
+from pathlib import Path
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from .paths import state_dir
+from .resultstore import ResultStore
+
+MAGIC = b"VTFRS001"
+SNAPSHOT_SUFFIX = ".snap"
+SNAPSHOT_TIME_FORMAT = "%Y%m%d-%H%M%S"
+SNAPSHOT_KEEP = 100  # Snapshots kept per scan root; older ones are pruned
+MODIFIED_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_LENGTH = struct.Struct("<I")
+_ENTRY = struct.Struct("<IIqq")
+_EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+_day_cache = {}
+
+
+class SnapshotEntry(NamedTuple):
+    path: str
+    size: int
+    modified: int
+
+
+class DiffEntry(NamedTuple):
+    """One difference between two snapshots: kind is new, removed or changed."""
+    kind: str
+    path: str
+    old_size: int
+    new_size: int
+
+    @property
+    def delta(self) -> int:
+        return self.new_size - self.old_size
+
+
+def parse_modified(text: str) -> int:
+    """Turn a record's ``LastModified`` ("YYYY-MM-DD HH:MM:SS") into wall-clock seconds.
+
+    The date part is memoized, since the files of one scan share few dates.
+    """
+    try:
+        days = _day_cache.get(text[:10])
+        if days is None:
+            days = datetime.date(int(text[0:4]), int(text[5:7]), int(text[8:10])).toordinal() - _EPOCH_ORDINAL
+            _day_cache[text[:10]] = days
+        return days * 86400 + int(text[11:13]) * 3600 + int(text[14:16]) * 60 + int(text[17:19])
+    except (TypeError, ValueError):
+        return 0
+
+
+def format_modified(seconds: int) -> str:
+    """Inverse of :func:`parse_modified`."""
+    return time.strftime(MODIFIED_FORMAT, time.gmtime(seconds))
+
+
+def snapshot_dir(root) -> Path:
+    """Folder holding the snapshots of one scan root."""
+    key = hashlib.sha1(os.path.normpath(str(root)).encode('utf-8')).hexdigest()[:16]
+    return state_dir("snapshots", key)
+
+
+def write_snapshot(path: Path, root, entries: Iterable[Tuple[str, int, int]], count: Optional[int] = None) -> int:
+    """Sort ``(path, size, modified)`` entries and write them as a snapshot; returns the count.
+
+    Entries already in path order can be streamed without sorting by
+    passing their ``count``. The file is written next to its final name and
+    moved into place, so readers never see a partial snapshot.
+    """
+    rows = ((p.encode('utf-8', 'surrogatepass'), int(size or 0), int(modified or 0)) for p, size, modified in entries)
+    if count is None:
+        rows = sorted(rows)
+        count = len(rows)
+    header = json.dumps({
+        'root': os.path.normpath(str(root)),
+        'created': time.time(),
+        'count': count,
+    }).encode('utf-8')
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, 'wb') as f:
+        f.write(MAGIC)
+        f.write(_LENGTH.pack(len(header)))
+        f.write(header)
+        prev = b""
+        for key, size, modified in rows:
+            shared = len(os.path.commonprefix((prev, key)))
+            f.write(_ENTRY.pack(shared, len(key) - shared, size, modified))
+            f.write(key[shared:])
+            prev = key
+    os.replace(tmp, path)
+    return count
+
+
+def save_snapshot(root, records: Iterable[dict], directory: Optional[Path] = None,
+                  keep: int = SNAPSHOT_KEEP) -> Path:
+    """Save the records of a completed scan of ``root`` and prune the oldest snapshots.
+
+    A :class:`vtfr.resultstore.ResultStore` is streamed in its path order
+    instead of being sorted again in memory.
+    """
+    directory = Path(directory) if directory else snapshot_dir(root)
+    directory.mkdir(parents=True, exist_ok=True)
+    stamp = time.strftime(SNAPSHOT_TIME_FORMAT)
+    # After the last snapshot of this second, even if earlier ones were pruned
+    taken = [_snapshot_order(p)[2] for p in directory.glob(f"{stamp}*{SNAPSHOT_SUFFIX}")]
+    suffix = max(taken, default=0) + 1
+    path = directory / (f"{stamp}-{suffix}{SNAPSHOT_SUFFIX}" if suffix > 1 else f"{stamp}{SNAPSHOT_SUFFIX}")
+    if isinstance(records, ResultStore):
+        entries = ((p, size, parse_modified(modified)) for p, modified, size, *_ in records.rows())
+        write_snapshot(path, root, entries, count=len(records))
+    else:
+        write_snapshot(path, root, ((r['FullName'], r.get('Size', 0), parse_modified(r.get('LastModified')))
+                                    for r in records))
+    snapshots = list_snapshots(root, directory)
+    for old in snapshots[:max(0, len(snapshots) - keep)]:
+        try:
+            old.unlink()
+        except OSError:
+            pass
+    return path
+
+
+def _snapshot_order(path: Path):
+    """Sort key: time stamp, then the -2, -3... suffix of snapshots taken in the same second."""
+    date, _, rest = path.stem.partition("-")
+    clock, _, suffix = rest.partition("-")
+    return date, clock, int(suffix) if suffix.isdigit() else 1
+
+
+def list_snapshots(root, directory: Optional[Path] = None) -> List[Path]:
+    """Snapshots of a scan root, oldest first."""
+    directory = Path(directory) if directory else snapshot_dir(root)
+    return sorted(directory.glob(f"*{SNAPSHOT_SUFFIX}"), key=_snapshot_order)
+
+
+def _read_header(f) -> dict:
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError(f"{f.name} is not a scan snapshot")
+    (length,) = _LENGTH.unpack(f.read(_LENGTH.size))
+    return json.loads(f.read(length).decode('utf-8'))
+
+
+def read_header(path: Path) -> dict:
+    """The root, creation time and entry count of a snapshot."""
+    with open(path, 'rb') as f:
+        return _read_header(f)
+
+
+def _iter_raw(path: Path) -> Iterator[Tuple[bytes, int, int]]:
+    with open(path, 'rb') as f:
+        header = _read_header(f)
+        prev = b""
+        for _ in range(header['count']):
+            raw = f.read(_ENTRY.size)
+            if len(raw) < _ENTRY.size:
+                raise ValueError(f"{path} is truncated")
+            shared, length, size, modified = _ENTRY.unpack(raw)
+            prev = prev[:shared] + f.read(length)
+            yield prev, size, modified
+
+
+def iter_snapshot(path: Path) -> Iterator[SnapshotEntry]:
+    """Stream the entries of a snapshot in path order."""
+    for key, size, modified in _iter_raw(path):
+        yield SnapshotEntry(key.decode('utf-8', 'surrogatepass'), size, modified)
+
+
+def diff_snapshots(old: Path, new: Path) -> Iterator[DiffEntry]:
+    """Merge-join two snapshots, yielding new, removed and changed files in path order.
+
+    A file counts as changed when its size or timestamp differs.
+    """
+    old_iter = _iter_raw(old)
+    new_iter = _iter_raw(new)
+    a = next(old_iter, None)
+    b = next(new_iter, None)
+    while a is not None or b is not None:
+        if b is None or (a is not None and a[0] < b[0]):
+            yield DiffEntry('removed', a[0].decode('utf-8', 'surrogatepass'), a[1], 0)
+            a = next(old_iter, None)
+        elif a is None or b[0] < a[0]:
+            yield DiffEntry('new', b[0].decode('utf-8', 'surrogatepass'), 0, b[1])
+            b = next(new_iter, None)
+        else:
+            if a[1] != b[1] or a[2] != b[2]:
+                yield DiffEntry('changed', b[0].decode('utf-8', 'surrogatepass'), a[1], b[1])
+            a = next(old_iter, None)
+            b = next(new_iter, None)
@@ -0,0 +1,93 @@
+"""Bridge between the Tk main loop and the asyncio core engine.
+
+Tk must only be touched from the thread running ``mainloop``, and asyncio
+needs its own loop. :class:`AsyncTkBridge` runs an event loop in a daemon
+thread. Coroutines are submitted to that loop, and their results come back
+through a queue that the Tk thread drains with ``after()``. No Tk call is
+ever made from the loop thread.
+"""
+import asyncio
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Coroutine, Optional
+
+POLL_INTERVAL_MS = 50
+
+
+class AsyncTkBridge:
+    """Run coroutines on a background event loop and deliver callbacks on the Tk thread."""
+
+    def __init__(self, root, poll_interval_ms: int = POLL_INTERVAL_MS):
+        self.root = root
+        self.poll_interval_ms = poll_interval_ms
+        self.loop = asyncio.new_event_loop()
+        self._callbacks: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._futures = set()
+        self._thread = threading.Thread(target=self._run_loop, name="vtfr-asyncio", daemon=True)
+        self._thread.start()
+        self._closed = False
+        self.root.after(self.poll_interval_ms, self._poll)
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def _poll(self):
+        """Tk side: run every callback posted from the loop thread."""
+        while True:
+            try:
+                callback, args = self._callbacks.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                callback(*args)
+            except Exception as e:  # Keep the poller alive whatever a callback does
+                print(f"Error in async callback: {e}")
+        if not self._closed:
+            self.root.after(self.poll_interval_ms, self._poll)
+
+    def post(self, callback: Callable, *args):
+        """Thread-safe: schedule ``callback(*args)`` on the Tk thread."""
+        self._callbacks.put((callback, args))
+
+    def submit(self, coro: Coroutine, on_done: Optional[Callable[[Any], None]] = None,
+               on_error: Optional[Callable[[BaseException], None]] = None) -> Future:
+        """Run ``coro`` on the loop; ``on_done(result)`` or ``on_error(exc)`` runs on the Tk thread."""
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        self._futures.add(future)
+
+        def _done(f: Future):
+            self._futures.discard(f)
+            if f.cancelled():
+                return
+            exc = f.exception()
+            if exc is not None:
+                if on_error:
+                    self.post(on_error, exc)
+            elif on_done:
+                self.post(on_done, f.result())
+
+        future.add_done_callback(_done)
+        return future
+
+    def close(self, timeout: float = 5.0):
+        """Cancel running coroutines (letting their cleanup run) and stop the loop."""
+        if self._closed:
+            return
+        self._closed = True
+        for future in list(self._futures):
+            future.cancel()
+
+        async def _drain():
+            tasks = [t for t in asyncio.all_tasks(self.loop) if t is not asyncio.current_task()]
+            if tasks:
+                await asyncio.wait(tasks, timeout=timeout)
+            await self.loop.shutdown_asyncgens()
+
+        try:
+            asyncio.run_coroutine_threadsafe(_drain(), self.loop).result(timeout + 1)
+        except Exception:
+            pass
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)